@@ -0,0 +1,267 @@
+"""benchmark suite of client hot paths with synthetic OHLC data.
+
+    python profile/benchmark.py --rows 20000 --symbols 4 --output benchmark.json
+    python profile/benchmark.py --baseline benchmark.json --threshold 1.25
+
+Each case is run --repeat times and the best and median seconds per operation are reported as JSON.
+With --baseline, cases slower than baseline * threshold are listed and the script exits with 1.
+"""
+
+import argparse
+import inspect
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, src_path)
+
+from finance_client.coincheck.tick_stream import ReplayTickSource, TickStreamHub
+from finance_client.csv.client import CSVClient
+from finance_client.fprocess.fprocess import idcprocess, preprocess
+
+DATE_COLUMN = "Time"
+SYMBOLS = ["USDJPY", "EURUSD", "GBPJPY", "AUDUSD", "EURJPY", "CHFJPY", "NZDUSD", "CADJPY"]
+STORAGES = ["memory", "sqlite", "file"]
+TICK_FRAMES = [1, 5, 60]
+TICK_CHUNK_SIZE = 1000
+# arguments of processes which can't be created or run on OHLC columns by default
+PROCESS_KWARGS = {
+    "RenkoProcess": {"window": 14},
+    "SimpleColumnDiffPreProcess": {"base_column": "Close", "target_columns": ["Open", "High", "Low", "Close"]},
+}
+
+
+def create_ohlc(rows: int, symbol_count: int, seed: int = 1017) -> dict:
+    """return random walk OHLC frames of 5 minutes by symbol"""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2024-01-01", periods=rows, freq="5min", tz="UTC", name=DATE_COLUMN)
+    frames = {}
+    for i in range(symbol_count):
+        symbol = SYMBOLS[i] if i < len(SYMBOLS) else f"SYM{i:03d}"
+        close = 100 + rng.standard_normal(rows).cumsum() * 0.1
+        spread = np.abs(rng.standard_normal(rows)) * 0.05
+        frames[symbol] = pd.DataFrame(
+            {
+                "Open": close - spread,
+                "High": close + spread * 2,
+                "Low": close - spread * 2,
+                "Close": close,
+                "Volume": rng.integers(1, 1000, rows).astype(float),
+            },
+            index=index,
+        )
+    return frames
+
+
+def write_csv_files(frames: dict, directory: str) -> list:
+    files = []
+    for symbol, df in frames.items():
+        file_path = os.path.join(directory, f"bench_{symbol}_min5.csv")
+        df.to_csv(file_path)
+        files.append(file_path)
+    return files
+
+
+def create_ticks(count: int, seed: int = 1017) -> ReplayTickSource:
+    """ticks of about 20 trades per second"""
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2025-01-01", tz="UTC").value
+    times = start + np.cumsum(rng.exponential(5e7, size=count)).astype(np.int64)
+    prices = 14000000 + rng.standard_normal(count).cumsum() * 1000
+    volumes = rng.uniform(0.001, 0.1, size=count)
+    return ReplayTickSource(times, prices, volumes, chunk_size=TICK_CHUNK_SIZE)
+
+
+def _create_client(files, **kwargs) -> CSVClient:
+    return CSVClient(files=files, date_column=DATE_COLUMN, file_cache=False, slip_type="none", **kwargs)
+
+
+def measure(func, repeat: int, ops: int = 1, setup=None) -> dict:
+    """run func repeat times and return seconds per operation. setup is run before each run and its result is passed to func."""
+    seconds = []
+    for _ in range(repeat):
+        arg = setup() if setup is not None else None
+        start = time.perf_counter()
+        if setup is not None:
+            func(arg)
+        else:
+            func()
+        seconds.append((time.perf_counter() - start) / ops)
+    return {"best": min(seconds), "median": statistics.median(seconds), "ops": ops, "runs": repeat}
+
+
+def _process_classes(module) -> list:
+    classes = []
+    for name, cls in inspect.getmembers(module, inspect.isclass):
+        if cls.__module__ == module.__name__ and name.endswith("Process") and hasattr(cls, "run"):
+            classes.append((name, cls))
+    return classes
+
+
+def _create_process(name, cls):
+    return cls(**PROCESS_KWARGS.get(name, {}))
+
+
+def benchmark_cases(files: list, frames: dict, args) -> dict:
+    symbols = list(frames.keys())
+    observation_length = 100
+    results = {}
+
+    def add(name, func, ops=1, setup=None):
+        try:
+            results[name] = measure(func, args.repeat, ops, setup)
+        except Exception as e:
+            # kept in results to see which cases can't be measured
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+        print(f"{name}: {results[name]}", file=sys.stderr)
+
+    add("csv_load", lambda: _create_client(files))
+
+    steps = args.steps
+
+    def run_steps(client, **kwargs):
+        for _ in range(steps):
+            client.get_ohlc(length=observation_length, symbols=symbols, **kwargs)
+
+    add("get_ohlc_step", run_steps, steps, lambda: _create_client(files, start_index=observation_length * 13, auto_step_index=True))
+    add(
+        "get_ohlc_step_frame_h1",
+        lambda client: run_steps(client, frame=60),
+        steps,
+        lambda: _create_client(files, start_index=observation_length * 13, auto_step_index=True),
+    )
+
+    batch_size = 32
+
+    def run_batches(client):
+        for index in range(steps):
+            client[index * batch_size : (index + 1) * batch_size]
+
+    add("batch_getitem", run_batches, steps, lambda: _create_client(files, observation_length=observation_length))
+
+    data = next(iter(frames.values()))
+    for module in (idcprocess, preprocess):
+        for name, cls in _process_classes(module):
+            add(
+                f"{module.__name__.split('.')[-1]}.{name}",
+                lambda process: process.run(data),
+                1,
+                lambda name=name, cls=cls: _create_process(name, cls),
+            )
+
+    trades = args.trades
+    for storage in STORAGES:
+
+        def run_trades(client):
+            positions = []
+            for _ in range(trades):
+                suc, position = client.open_trade(is_buy=True, volume=1.0, symbol=symbols[0])
+                positions.append(position)
+            for position in positions:
+                client.close_position(position=position)
+
+        add(
+            f"open_close.{storage}",
+            run_trades,
+            trades,
+            lambda storage=storage: _create_client(files, start_index=observation_length, storage=storage),
+        )
+
+    client = _create_client(files)
+    add("roll_ohlc_data_h1", lambda: client.roll_ohlc_data(client.data.copy(), 60, grouped_by_symbol=True))
+
+    source = create_ticks(args.ticks, args.seed)
+
+    def create_hub():
+        hub = TickStreamHub(start=source.start)
+        for frame in TICK_FRAMES:
+            hub.register(frame, on_bar=lambda frame, bars: None)
+        hub.attach(source)
+        return hub
+
+    # seconds per tick fanned out to all frames
+    add("tick_stream.fanout_m1_m5_h1", lambda hub: source.replay(), len(source), create_hub)
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """return (name, baseline seconds, current seconds, ratio) of cases slower than baseline * threshold"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None or "best" not in base or "best" not in result:
+            continue
+        ratio = result["best"] / base["best"] if base["best"] > 0 else float("inf")
+        print(f"{name:45s} {base['best'] * 1000:10.3f}ms -> {result['best'] * 1000:10.3f}ms ({ratio:5.2f}x)")
+        if ratio > threshold:
+            regressions.append((name, base["best"], result["best"], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark of finance_client hot paths")
+    parser.add_argument("--rows", type=int, default=20000, help="rows of each symbol")
+    parser.add_argument("--symbols", type=int, default=4)
+    parser.add_argument("--steps", type=int, default=200, help="steps of get_ohlc and batches of __getitem__")
+    parser.add_argument("--trades", type=int, default=50, help="positions opened and closed for each storage")
+    parser.add_argument("--ticks", type=int, default=1000000, help="ticks replayed to the tick stream hub")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1017)
+    parser.add_argument("--output", type=str, default=None, help="file to write results as JSON. stdout if omitted")
+    parser.add_argument("--baseline", type=str, default=None, help="results JSON to compare with")
+    parser.add_argument("--threshold", type=float, default=1.25, help="ratio to baseline reported as regression")
+    args = parser.parse_args()
+
+    frames = create_ohlc(args.rows, args.symbols, args.seed)
+    work_dir = tempfile.mkdtemp(prefix="finance_client_benchmark_")
+    cwd = os.getcwd()
+    try:
+        # storages and logs are created on the current directory
+        os.chdir(work_dir)
+        files = write_csv_files(frames, work_dir)
+        results = benchmark_cases(files, frames, args)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = {
+        "meta": {
+            "created_at": pd.Timestamp.now(tz="UTC").isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "rows": args.rows,
+            "symbols": args.symbols,
+            "steps": args.steps,
+            "trades": args.trades,
+            "ticks": args.ticks,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    if args.output is None:
+        print(json.dumps(output, indent=2))
+    else:
+        with open(args.output, "w") as fp:
+            json.dump(output, fp, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline, "r") as fp:
+            baseline = json.load(fp)
+        regressions = compare(results, baseline["results"], args.threshold)
+        if len(regressions) > 0:
+            print(f"{len(regressions)} cases are slower than baseline * {args.threshold}: {[name for name, *_ in regressions]}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""measure import time of finance_client in fresh interpreters.
+
+    python profile/profile_import.py --runs 5 --max-seconds 1.0
+
+exits with 1 when the median exceeds --max-seconds or modules which should be imported lazily are loaded by import finance_client.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+# modules which should be loaded only when related clients, tools or rendering are used
+LAZY_MODULES = [
+    "matplotlib", "scipy", "yfinance", "websocket", "finance_client.tool", "finance_client.coincheck.client", "finance_client.yfinance.client"
+]
+
+_MEASURE_CODE = """
+import json, sys, time
+start = time.perf_counter()
+import finance_client
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "modules": [name for name in %r if name in sys.modules]}))
+"""
+
+
+def measure_import(module_names: list = LAZY_MODULES) -> dict:
+    """import finance_client in a new interpreter and return seconds and loaded modules of module_names"""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([src_path, env.get("PYTHONPATH", "")])
+    result = subprocess.run([sys.executable, "-c", _MEASURE_CODE % (module_names,)], capture_output=True, text=True, env=env, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="import time benchmark of finance_client")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=None)
+    args = parser.parse_args()
+
+    results = [measure_import() for _ in range(args.runs)]
+    seconds = [result["seconds"] for result in results]
+    median = statistics.median(seconds)
+    loaded_modules = sorted(set(name for result in results for name in result["modules"]))
+    print(f"import finance_client: median {median:.3f}s, min {min(seconds):.3f}s, max {max(seconds):.3f}s ({args.runs} runs)")
+    if len(loaded_modules) > 0:
+        print(f"modules loaded eagerly: {loaded_modules}")
+    if len(loaded_modules) > 0 or (args.max_seconds is not None and median > args.max_seconds):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
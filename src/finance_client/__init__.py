@@ -1,25 +1,45 @@
+import importlib
+
 from . import frames as Frame
 from .client_base import ClientBase
-from .coincheck.client import CoinCheckClient
 from .csv.client import CSVClient
+from .feature_cache import FeatureCache
 from .fprocess import fprocess
 from .fprocess.fprocess import indicaters
 from .logger import setup_logging
-from .position import ORDER_TYPE, POSITION_SIDE, Position
-from .tool import AgentTool
-from .vantage.client import VantageClient
-from .yfinance.client import YahooClient
-
-available_clients = {
-    CSVClient.kinds: CSVClient,
-    VantageClient.kinds: VantageClient,
-    CoinCheckClient.kinds: CoinCheckClient,
-    YahooClient.kinds: YahooClient,
+from .position import ORDER_TYPE, POSITION_SIDE, Position, PositionBook
+
+# clients and tools which depend on network or plotting libraries are imported on first access
+_LAZY_ATTRIBUTES = {
+    "CoinCheckClient": ".coincheck.client",
+    "VantageClient": ".vantage.client",
+    "YahooClient": ".yfinance.client",
+    "AgentTool": ".tool",
 }
 
 setup_logging()
 
 
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    elif name == "available_clients":
+        value = {
+            CSVClient.kinds: CSVClient,
+            __getattr__("VantageClient").kinds: __getattr__("VantageClient"),
+            __getattr__("CoinCheckClient").kinds: __getattr__("CoinCheckClient"),
+            __getattr__("YahooClient").kinds: __getattr__("YahooClient"),
+        }
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals().keys()) + list(_LAZY_ATTRIBUTES.keys()) + ["available_clients"])
+
+
 def client_to_params(client):
     params = {}
     params["kinds"] = client.kinds
@@ -30,10 +50,11 @@ def client_to_params(client):
 
 def load_client(params: dict, credentials: tuple = None):
     kinds = params["kinds"]
+    available_clients = __getattr__("available_clients")
     if kinds in available_clients:
         dict_args = params["args"]
         _Client = available_clients[kinds]
-        if kinds == VantageClient.kinds:
+        if kinds == __getattr__("VantageClient").kinds:
             if credentials is None:
                 raise Exception(f"{kinds} need to specify a credential(s)")
             data_client = _Client(*credentials, **dict_args)
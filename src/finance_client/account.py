@@ -1,6 +1,7 @@
 import datetime
 import logging
 import os
+from contextlib import ExitStack, contextmanager
 from typing import List, Tuple
 
 import pandas as pd
@@ -8,7 +9,9 @@ import pandas as pd
 from finance_client.config import AccountRiskConfig, load_account_risk_config
 from finance_client.db import (LogCSVStorage, LogStorageBase,
                                PositionFileStorage, PositionStorageBase)
-from finance_client.position import POSITION_SIDE, ClosedResult, Position
+from finance_client.matching import TriggerBook
+from finance_client.position import (POSITION_SIDE, ClosedResult, Position,
+                                     PositionBook)
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +44,9 @@ class Manager:
             position_storage = PositionFileStorage(provider, None, save_period=0)
         # initialize positions which have tp or sl
         self.listening_positions = position_storage._get_listening_positions()
+        # tp/sl levels of listening positions sorted by price to find positions reached by a bar
+        self.listening_book = TriggerBook()
+        self.reset_listening_book()
         self.storage = position_storage
         if log_storage is None:
             self._trade_log_db = LogCSVStorage(provider, username=position_storage.username)
@@ -53,6 +59,10 @@ class Manager:
         elif not isinstance(account_risk_config, AccountRiskConfig):
             raise ValueError("account_risk_config must be either a file path or an AccountRiskConfig object")
         self.__account_risk_config = account_risk_config
+        # columns of open positions for vectorized valuation
+        self.position_book = PositionBook()
+        # margin, risk and exposure of open positions are computed from the book to avoid scanning storage for each order
+        self.reset_aggregates()
         self.update_daily_max_loss()
         if tz_info is None:
             tz_info = datetime.timezone.utc
@@ -113,8 +123,10 @@ class Manager:
                 option=option,
                 result=result,
             )
-            self.storage.store_position(position)
-            self._trade_log_db.store_log(position, order_type=1)
+            with self.transaction():
+                self.storage.store_position(position)
+                self._trade_log_db.store_log(position, order_type=1)
+            self._add_aggregate(position)
             return position
         else:
             required_cost = (trade_unit * volume * price) / leverage
@@ -131,14 +143,17 @@ class Manager:
                 option=option,
                 result=result,
             )
-            self.storage.store_position(position)
+            with self.transaction():
+                self.storage.store_position(position)
+                self._trade_log_db.store_log(position, order_type=1)
+            self._add_aggregate(position)
             # then reduce free margin
             self.free_margin -= required_cost
             # check if tp/sl exists
             if tp is not None or sl is not None:
                 self.listening_positions[position.id] = position
+                self.listening_book.add_position(position)
                 logger.debug("position is stored to listening list")
-            self._trade_log_db.store_log(position, order_type=1)
             return position
             # else:
             #     logger.info(f"current free margin {self.free_margin} is less than required {required_cost}")
@@ -166,13 +181,16 @@ class Manager:
             position.sl = sl
         elif position.sl is not None:
             position.sl = None
-        if self.storage.update_position(position) is False:
-            logger.error(f"failed to update position with id {position.id}")
-            return False
-        self._trade_log_db.store_log(position, order_type=0)
+        with self.transaction():
+            if self.storage.update_position(position) is False:
+                logger.error(f"failed to update position with id {position.id}")
+                return False
+            self._trade_log_db.store_log(position, order_type=0)
+        self._add_aggregate(position)
         # check if tp/sl exists
         if position.tp is not None or position.sl is not None:
             self.listening_positions[position.id] = position
+            self.listening_book.add_position(position)
             logger.debug("position is stored to listening list")
         else:
             self.remove_position_from_listening(position.id)
@@ -215,16 +233,6 @@ class Manager:
             trade_unit = position.trade_unit
             profit = trade_unit * volume * price_diff
             return_margin = (trade_unit * volume * position.price) / position.leverage + profit
-            if position.volume == volume:
-                self.storage.delete_position(id)
-            else:
-                position.volume -= volume
-                self.storage.update_position(position)
-            logger.info(f"closed result:: profit {profit}, free margin: {self.free_margin}, price_diff: {price_diff}")
-            self.free_margin += return_margin
-            self.remove_position_from_listening(id)
-            closed_result.update(id=id, price=price, volume=volume, profit=profit, price_diff=price_diff)
-            closed_result.error = False
             close_position = Position(
                 position.position_side,
                 position.symbol,
@@ -237,12 +245,29 @@ class Manager:
                 index,
                 id=position.id,
             )
-            self._trade_log_db.store_log(
-                # create position with closed price and volume for logging
-                close_position,
-                order_type=-1,
-                profit=profit,
-            )
+            is_closed_all = position.volume == volume
+            # position and its log are committed together when storages share a database
+            with self.transaction():
+                if is_closed_all:
+                    self.storage.delete_position(id)
+                else:
+                    position.volume -= volume
+                    self.storage.update_position(position)
+                self._trade_log_db.store_log(
+                    # create position with closed price and volume for logging
+                    close_position,
+                    order_type=-1,
+                    profit=profit,
+                )
+            if is_closed_all:
+                self._remove_aggregate(id)
+            else:
+                self._add_aggregate(position)
+            logger.info(f"closed result:: profit {profit}, free margin: {self.free_margin}, price_diff: {price_diff}")
+            self.free_margin += return_margin
+            self.remove_position_from_listening(id)
+            closed_result.update(id=id, price=price, volume=volume, profit=profit, price_diff=price_diff)
+            closed_result.error = False
             return closed_result
         else:
             self.remove_position_from_listening(id)
@@ -251,9 +276,24 @@ class Manager:
             closed_result.error = True
             return closed_result
 
+    @contextmanager
+    def transaction(self):
+        """scope to commit writes of position storage and log storage together"""
+        with ExitStack() as stack:
+            stack.enter_context(self.storage.transaction())
+            stack.enter_context(self._trade_log_db.transaction())
+            yield
+
     def remove_position_from_listening(self, id):
         if id in self.listening_positions:
             self.listening_positions.pop(id)
+        self.listening_book.remove_position(id)
+
+    def reset_listening_book(self):
+        """register tp/sl of listening positions to listening_book again. Call this when listening_positions is changed directly."""
+        self.listening_book.clear()
+        for position in self.listening_positions.values():
+            self.listening_book.add_position(position)
 
     def update_risk_config(self, risk_config: AccountRiskConfig):
         self.risk_config = risk_config
@@ -275,23 +315,74 @@ class Manager:
         long_positions, short_positions = self.storage.get_positions(symbols=symbols)
         return list(long_positions), list(short_positions)
 
+    def _add_aggregate(self, position: Position):
+        """add a position to the position book. A position already added is replaced and keeps its order."""
+        self.position_book.add(position)
+
+    def _remove_aggregate(self, id):
+        self.position_book.remove(id)
+
+    def reset_aggregates(self):
+        """rebuild the position book from positions in storage. Call this when positions in storage are changed outside of the Manager."""
+        self.position_book.clear()
+        long_positions, short_positions = self.get_positions()
+        for position in long_positions + short_positions:
+            self._add_aggregate(position)
+
+    def __get_aggregates(self) -> tuple:
+        book = self.position_book
+        return book.get_used_margin(), book.get_open_risk(), book.get_symbol_exposures(), set(book.ids)
+
+    def check_aggregates(self, tolerance: float = 1e-6) -> bool:
+        """compare totals of the position book with the ones recomputed from storage. The book is rebuilt from storage when they differ.
+
+        Args:
+            tolerance (float, optional): absolute tolerance of the comparison. Defaults to 1e-6.
+
+        Returns:
+            bool: True if the position book is consistent with storage
+        """
+        current = self.__get_aggregates()
+        self.reset_aggregates()
+        used_margin, open_risk, symbol_exposures, ids = self.__get_aggregates()
+        is_consistent = (
+            abs(current[0] - used_margin) <= tolerance
+            and abs(current[1] - open_risk) <= tolerance
+            and current[3] == ids
+            and all(
+                abs(current[2].get(symbol, 0.0) - symbol_exposures.get(symbol, 0.0)) <= tolerance
+                for symbol in set(current[2]) | set(symbol_exposures)
+            )
+        )
+        if not is_consistent:
+            logger.warning(
+                f"position book was inconsistent with storage. used margin: {current[0]} -> {used_margin}, open risk: {current[1]} -> {open_risk}"
+            )
+        return is_consistent
+
+    def get_symbol_exposure(self, symbol: str = None):
+        """
+            get net exposure (trade_unit * volume, short is negative) of open positions
+        Args:
+            symbol (str, optional): symbol to get the exposure. Defaults to None and return exposures of all symbols.
+        Returns:
+            float | Dict[str, float]: net exposure of the symbol or dict of symbol and exposure
+        """
+        exposures = self.position_book.get_symbol_exposures()
+        if symbol is None:
+            return exposures
+        return exposures.get(symbol, 0.0)
+
     def get_open_positions_risk_loss(self) -> float:
         """
             calculate total risk volume of open positions, which is used to consider max concurrent position limit
         Returns:
             float: total risk volume of open positions
         """
-        long_positions, short_positions = self.get_positions()
-        total_risk_volume = 0.0
-        for position in long_positions + short_positions:
-            if position.sl is not None:
-                price_diff = abs(position.price - position.sl)
-                risk_volume = position.trade_unit * position.volume * price_diff
-                total_risk_volume += risk_volume
-            else:
-                logger.warning(f"position {position.id} has no stop loss, add X to risk volume")
-
-        return total_risk_volume
+        no_sl_count = self.position_book.count_without_sl()
+        if no_sl_count > 0:
+            logger.warning(f"{no_sl_count} positions have no stop loss, add X to risk volume")
+        return self.position_book.get_open_risk()
 
     def get_daily_realized_pnl(self, date: str = None) -> float:
         """
@@ -305,9 +396,7 @@ class Manager:
         else:
             today = pd.Timestamp(date, tz=self.tz_info).normalize()
             end_date = today + pd.Timedelta(days=1)
-        logs = self._trade_log_db.get_profit_logs(start=today, end=end_date)
-        daily_realized_pnl = sum(log.profit for _, log in logs.iterrows())
-        return daily_realized_pnl
+        return self._trade_log_db.get_realized_pnl(start=today, end=end_date)
 
     def get_balance(self) -> float:
         """
@@ -315,15 +404,7 @@ class Manager:
         Returns:
             float: current balance
         """
-        balance = self.free_margin
-        used_margin = 0
-        long_positions, short_positions = self.get_positions()
-        for position in long_positions + short_positions:
-            if position.price is None:
-                continue
-            used_margin += (position.trade_unit * position.volume * position.price) / position.leverage
-        balance += used_margin
-        return balance
+        return self.free_margin + self.position_book.get_used_margin()
 
     def get_free_margin(self) -> float:
         """
@@ -360,18 +441,7 @@ class Manager:
         return (trade_unit * volume * price) / leverage
 
     def get_used_margin(self) -> float:
-        long_positions, short_positions = self.get_positions()
-        used_margin = 0.0
-
-        for position in long_positions + short_positions:
-            volume = position.volume
-            price = position.price
-            trade_unit = position.trade_unit
-            leverage = position.leverage
-            margin = self.calculate_margin(price, volume, trade_unit, leverage)
-            used_margin += margin
-
-        return used_margin
+        return self.position_book.get_used_margin()
 
     def __del__(self):
         if hasattr(self, "storage"):
@@ -1,6 +1,7 @@
 import datetime
 import logging
 import os
+import queue
 import random
 import threading
 import uuid
@@ -13,9 +14,9 @@ import pandas as pd
 from finance_client.config.model import AccountRiskConfig, SymbolRiskConfig
 from finance_client.risk_manager import RiskManager, RiskOption
 
-from . import account, db
+from . import account, db, metrics
 from . import frames as Frame
-from . import graph
+from .matching import TriggerBook
 from .position import ORDER_TYPE, POSITION_SIDE, ClosedResult, Order, Position
 
 try:
@@ -30,6 +31,8 @@ class ClientBase(metaclass=ABCMeta):
 
     simulation = False
     back_test = False
+    # per-stage timings are recorded only after enable_metrics is called
+    _metrics = metrics.NULL_METRICS
 
     def __init__(
         self,
@@ -49,9 +52,10 @@ class ClientBase(metaclass=ABCMeta):
         user_name: str = None,
         do_render=False,
         enable_trade_log=False,
-        storage: db.PositionStorageBase = None,
+        storage: db.PositionStorageBase | str = None,
         log_storage: db.LogStorageBase = None,
         risk_option: RiskOption = None,
+        incremental_process: bool = False,
     ):
         """Base Class of Finance Client. Each Client should overwride required method.
 
@@ -72,9 +76,11 @@ class ClientBase(metaclass=ABCMeta):
             user_name (str, optional): user name to separate info (e.g. position) within the same provider. Defaults to None. It means client doesn't care users.
             do_render (bool, optional): plot ohlc data with matplotlib or not. Defaults to False.
             enable_trade_log (bool, optional): Store trade log to csv or not. Defaults to False.
-            storage (db.PositionStorageBase, optional): Specify supported storage. Defaults to None, then use SQLite.
+            storage (db.PositionStorageBase | str, optional): Specify supported storage, or one of "sqlite", "file" and "memory". "memory" keeps positions in memory and flushes them to SQLite. Defaults to None, then use SQLite.
             log_storage (db.LogStorageBase, optional): Specify supported log storage. Defaults to None, then use CSV.
             risk_option (RiskOption, optional): risk option to use for smart_order when risk_option is not specified in smart_order. Defaults to None.
+            incremental_process (bool, optional): update processes by the new bar when trading data moves forward by one bar. Values of recursive indicators
+              (e.g. EMA, MACD, RSI) continue from the first processed frame, so they differ from run_processes on the returned frame. Defaults to False.
         """
         self.auto_index = None
         self._step_index = start_index
@@ -90,11 +96,19 @@ class ClientBase(metaclass=ABCMeta):
         self.do_render = do_render
         self.__closed_position_with_exist = {}
         self._open_orders = {}
+        # prices of limit/stop orders sorted by price to find orders reached by a bar
+        self._order_book = TriggerBook()
+        # check tp/sl and pending orders on a worker thread instead of the caller of get_ohlc. Checks are processed in order.
+        self.check_pending_in_background = False
+        self.__pending_check_queue = None
         self.frame = frame
         self.user_name = user_name
         self.observation_length = observation_length
         self.enable_trade_log = enable_trade_log
         if self.do_render:
+            # matplotlib is imported only when rendering is enabled
+            from . import graph
+
             self.__rendere = graph.Rendere()
             self.__ohlc_index = -1
             self.__is_graph_initialized = False
@@ -117,9 +131,8 @@ class ClientBase(metaclass=ABCMeta):
                     ohlc_dict[col] = col
             self.ohlc_columns = ohlc_dict
 
-        if storage is None:
-            db_path = os.path.join(os.getcwd(), "finance_client.db")
-            storage = db.PositionSQLiteStorage(db_path, provider, user_name)
+        if storage is None or isinstance(storage, str):
+            storage = self._create_position_storage(storage, provider, user_name)
         self.account = account.Manager(
             account_risk_config=self._default_account_config_path if account_risk_config is None else account_risk_config,
             free_margin=free_margin,
@@ -144,6 +157,16 @@ class ClientBase(metaclass=ABCMeta):
             self.pre_process = []
         else:
             self.pre_process = pre_process
+        # opt-in: update processes by the new bar instead of running them on whole data when get_ohlc moves forward by one bar.
+        # Recursive indicators (EMA, MACD, RSI etc.) keep state from the first processed frame, while run_processes on the returned frame starts
+        # from its first bar. So their values differ until the effect of the start converges. Values of window based indicators are same.
+        # The pipeline is rebuilt by run_processes when the frame is not the last frame shifted by one bar, e.g. after index is moved.
+        self.incremental_process = incremental_process
+        # FeatureCache to reuse indicator values in run_processes when the same data is processed again.
+        # Defaults to None and values are always computed.
+        self.feature_cache = None
+        self.__process_pipeline = None
+        self.__process_pipeline_key = None
         # Note: Economic indicater implementation is in progress
         if economic_keys is None:
             self.eco_keys = []
@@ -152,6 +175,17 @@ class ClientBase(metaclass=ABCMeta):
 
         self._indices = None
 
+    @staticmethod
+    def _create_position_storage(kinds: str, provider: str, user_name: str) -> db.PositionStorageBase:
+        if kinds is None or kinds == "sqlite":
+            return db.PositionSQLiteStorage(os.path.join(os.getcwd(), "finance_client.db"), provider, user_name)
+        if kinds == "file":
+            return db.PositionFileStorage(provider, user_name, save_period=0)
+        if kinds == "memory":
+            backend = db.PositionSQLiteStorage(os.path.join(os.getcwd(), "finance_client.db"), provider, user_name)
+            return db.PositionMemoryStorage(provider, user_name, backend=backend)
+        raise ValueError(f"unsupported storage: {kinds}. sqlite, file or memory is available.")
+
     def open_trade(
         self,
         is_buy: bool,
@@ -194,16 +228,17 @@ class ClientBase(metaclass=ABCMeta):
                     ohlc_df = self.get_ohlc(symbol, length=required_length, disable_step=True)
                 else:
                     ohlc_df = None
-                risk_result = self.risk_manager.evaluate_risk(
-                    risk_option=effective_risk_option,
-                    account_equity=self.get_equity(),
-                    symbol=symbol,
-                    is_buy=is_buy,
-                    entry_price=entry,
-                    stop_loss=sl,
-                    take_profit=tp,
-                    ohlc_df=ohlc_df,
-                )
+                with self._metrics.measure(metrics.RISK):
+                    risk_result = self.risk_manager.evaluate_risk(
+                        risk_option=effective_risk_option,
+                        account_equity=self.get_equity(),
+                        symbol=symbol,
+                        is_buy=is_buy,
+                        entry_price=entry,
+                        stop_loss=sl,
+                        take_profit=tp,
+                        ohlc_df=ohlc_df,
+                    )
                 volume = risk_result.volume
                 if sl is None:
                     sl = risk_result.stop_loss_price
@@ -231,7 +266,8 @@ class ClientBase(metaclass=ABCMeta):
                 else:
                     ask_rate = price
                 logger.debug(f"order price: {ask_rate}")
-                suc, result = self._market_buy(symbol=symbol, price=ask_rate, volume=volume, tp=tp, sl=sl, *args, **kwargs)
+                with self._metrics.measure(metrics.BROKER):
+                    suc, result = self._market_buy(symbol=symbol, price=ask_rate, volume=volume, tp=tp, sl=sl, *args, **kwargs)
                 if suc:
                     logger.info(f"open long position: {ask_rate}")
                     return True, self.__open_long_position(
@@ -255,7 +291,8 @@ class ClientBase(metaclass=ABCMeta):
                 else:
                     bid_rate = price
                 logger.debug(f"order price: {bid_rate}")
-                suc, result = self._market_sell(symbol=symbol, price=bid_rate, volume=volume, tp=tp, sl=sl, *args, **kwargs)
+                with self._metrics.measure(metrics.BROKER):
+                    suc, result = self._market_sell(symbol=symbol, price=bid_rate, volume=volume, tp=tp, sl=sl, *args, **kwargs)
                 if suc:
                     logger.info(f"open short position: {bid_rate}")
                     return True, self.__open_short_position(
@@ -319,6 +356,7 @@ class ClientBase(metaclass=ABCMeta):
                         id=ticket_id,
                         magic_number=magic_number,
                     )
+                    self._order_book.add_order(self._open_orders[ticket_id])
                     return suc, p
                 else:
                     return suc, ticket_id
@@ -347,6 +385,7 @@ class ClientBase(metaclass=ABCMeta):
                         id=ticket_id,
                         magic_number=magic_number,
                     )
+                    self._order_book.add_order(self._open_orders[ticket_id])
                     p.id = ticket_id
                     return suc, p
                 else:
@@ -508,7 +547,8 @@ class ClientBase(metaclass=ABCMeta):
                 price = self.get_current_bid(position.symbol)
                 logger.debug(f"order close with current ask rate {price}")
             logger.debug(f"close long position is ordered for {position}")
-            result = self._sell_to_close(position.symbol, price, volume, option_info=position.option, result=position.result)
+            with self._metrics.measure(metrics.BROKER):
+                result = self._sell_to_close(position.symbol, price, volume, option_info=position.option, result=position.result)
             if result is False:
                 default_closed_result.msg = "Failed to close position"
                 return default_closed_result
@@ -519,7 +559,8 @@ class ClientBase(metaclass=ABCMeta):
                 price = self.get_current_ask(position.symbol)
                 logger.debug(f"order close with current bid rate {price}")
             logger.debug(f"close short position is ordered for {position}")
-            result = self._buy_to_close(position.symbol, price, volume, option_info=position.option, result=position.result)
+            with self._metrics.measure(metrics.BROKER):
+                result = self._buy_to_close(position.symbol, price, volume, option_info=position.option, result=position.result)
             if result is False:
                 default_closed_result.msg = "Failed to close position"
                 return default_closed_result
@@ -528,7 +569,8 @@ class ClientBase(metaclass=ABCMeta):
             logger.warning(f"Unkown position_side {position.position_side} is specified on close_position.")
         if self.do_render:
             self.__rendere.add_trade_history_to_latest_tick(position_plot, price, self.__ohlc_index)
-        closed_result = self.account.close_position(position.id, price, volume=volume, position=position, index=self.get_current_datetime())
+        with self._metrics.measure(metrics.STORAGE):
+            closed_result = self.account.close_position(position.id, price, volume=volume, position=position, index=self.get_current_datetime())
         return closed_result
 
     def close_all_positions(self, symbols: list = None):
@@ -660,6 +702,31 @@ class ClientBase(metaclass=ABCMeta):
         if symbol_risk_config is not None:
             self.symbol_risk_config = symbol_risk_config
 
+    def enable_metrics(self, capacity: int = 4096, log_interval: float = None):
+        """record wall and CPU time of fetch, process, risk, broker, storage and pending_check stages
+
+        Args:
+            capacity (int, optional): number of recent records kept to calculate percentiles. Defaults to 4096.
+            log_interval (float, optional): seconds to emit summary through finance_client.metrics logger. Defaults to None.
+        """
+        self._metrics = metrics.StageMetrics(capacity=capacity, log_interval=log_interval)
+
+    def disable_metrics(self):
+        self._metrics = metrics.NULL_METRICS
+
+    def get_metrics(self, records: bool = False) -> Union[dict, pd.DataFrame]:
+        """return recorded metrics. Empty results are returned if enable_metrics is not called.
+
+        Args:
+            records (bool, optional): return recent records as DataFrame of stage, time, wall and cpu instead of summary. Defaults to False.
+
+        Returns:
+            dict | pd.DataFrame: summary by stage ({count, wall_total, wall_mean, wall_max, cpu_total, cpu_mean, wall_p50, wall_p95}) or recent records
+        """
+        if records:
+            return self._metrics.get_records()
+        return self._metrics.summary()
+
     def _sync_positions(self, actual_positions):
         long_positions, short_positions = self.account.storage.get_positions()
         all_our_positions = {}
@@ -684,6 +751,7 @@ class ClientBase(metaclass=ABCMeta):
             if str(actual_position.id) not in all_our_positions:
                 logger.debug(f"position {repr(actual_position.id)} is not found in our positions. add it to our positions.")
                 self.account.storage.store_position(actual_position)
+        self.account.reset_aggregates()
 
     def _get_required_length(self, processes: list) -> int:
         required_length_list = [0]
@@ -694,18 +762,52 @@ class ClientBase(metaclass=ABCMeta):
     def run_processes(self, data: pd.DataFrame, symbols: list = [], idc_processes=[], pre_processes=[], grouped_by_symbol=False) -> pd.DataFrame:
         """
         Ex. you can define and provide MACD as process. The results of the process are stored as dataframe[key] = values
+        When feature_cache is set, values of idc_processes are reused only when the index and values of data are same as data processed before.
         """
-        data_cp = data.copy()
-
-        if idc_processes is not None:
-            for process in idc_processes:
-                data_cp = process(data_cp, symbols, grouped_by_symbol)
+        if idc_processes is not None and len(idc_processes) > 0 and self.feature_cache is not None:
+            data_cp = self.feature_cache.get(
+                (repr(symbols), grouped_by_symbol),
+                None,
+                idc_processes,
+                data,
+                lambda source: self.__run_idc_processes(source, symbols, idc_processes, grouped_by_symbol),
+            )
+        else:
+            data_cp = self.__run_idc_processes(data, symbols, idc_processes, grouped_by_symbol)
 
         if pre_processes is not None:
             for process in pre_processes:
                 data_cp = process(data_cp, symbols, grouped_by_symbol)
         return data_cp
 
+    def __run_idc_processes(self, data: pd.DataFrame, symbols: list, idc_processes: list, grouped_by_symbol: bool) -> pd.DataFrame:
+        data_cp = data.copy()
+        if idc_processes is not None:
+            for process in idc_processes:
+                data_cp = process(data_cp, symbols, grouped_by_symbol)
+        return data_cp
+
+    def __run_processes_on_trading_data(self, data: pd.DataFrame, symbols, idc_processes, pre_processes, grouped_by_symbol, pipeline_key):
+        """run processes on data. If data is the last frame shifted by one bar, processes are updated by the new bar only."""
+        processes = idc_processes + pre_processes
+        if not self.incremental_process or not fprocess.IncrementalPipeline.is_supported(processes):
+            return self.run_processes(data, symbols, idc_processes, pre_processes, grouped_by_symbol)
+
+        pipeline = self.__process_pipeline
+        if pipeline is not None and self.__process_pipeline_key == pipeline_key and pipeline.can_update(data):
+            try:
+                return pipeline.update(data)
+            except Exception:
+                logger.exception("failed to update processes incrementally. run processes on whole data instead.")
+        processed_data = self.run_processes(data, symbols, idc_processes, pre_processes, grouped_by_symbol)
+        pipeline = fprocess.IncrementalPipeline(symbols, grouped_by_symbol)
+        if pipeline.initialize(processes, data, processed_data):
+            self.__process_pipeline = pipeline
+            self.__process_pipeline_key = pipeline_key
+        else:
+            self.__process_pipeline = None
+        return processed_data
+
     def get_economic_idc(self, keys, start, end):
         data = []
         for key in keys:
@@ -753,98 +855,138 @@ class ClientBase(metaclass=ABCMeta):
                 logger.error(f"unkown position_side: {position.position_side}")
         return closed_price
 
+    def __request_pending_check(self, ohlc_df: pd.DataFrame, symbols: list):
+        if ohlc_df is None or len(ohlc_df) == 0:
+            return
+        # only the latest bar is checked
+        ohlc_df = ohlc_df.iloc[-1:]
+        if self.check_pending_in_background is False:
+            self.__check_pending_safely(ohlc_df, symbols)
+            return
+        if self.__pending_check_queue is None:
+            self.__pending_check_queue = queue.Queue()
+            threading.Thread(target=self.__pending_check_worker, daemon=True).start()
+        self.__pending_check_queue.put((ohlc_df, symbols))
+
+    def __pending_check_worker(self):
+        while True:
+            ohlc_df, symbols = self.__pending_check_queue.get()
+            self.__check_pending_safely(ohlc_df, symbols)
+
+    def __check_pending_safely(self, ohlc_df: pd.DataFrame, symbols: list):
+        try:
+            with self._metrics.measure(metrics.PENDING_CHECK):
+                self.__check_pending_positions_completion(ohlc_df, symbols)
+        except Exception:
+            logger.exception("failed to check tp/sl and pending orders")
+
+    def __get_bar_prices(self, tick: pd.Series, high_column, low_column) -> dict:
+        """return {symbol: (high, low)} of the bar. symbol is None when the data doesn't have symbol level, then the bar is applied to all symbols."""
+        if isinstance(tick.index, pd.MultiIndex):
+            if fprocess.ohlc.is_grouped_by_symbol(tick.index):
+                symbols = tick.index.get_level_values(0).unique()
+                return {symbol: (tick[(symbol, high_column)], tick[(symbol, low_column)]) for symbol in symbols}
+            symbols = tick.index.get_level_values(1).unique()
+            return {symbol: (tick[(high_column, symbol)], tick[(low_column, symbol)]) for symbol in symbols}
+        return {None: (tick[high_column], tick[low_column])}
+
+    def __close_position_by_limit(self, position: Position, closed_price: float):
+        with self._metrics.measure(metrics.STORAGE):
+            result = self.account.close_position(
+                id=position.id,
+                price=closed_price,
+                volume=position.volume,
+                position=position,
+                index=self.get_current_datetime(),
+            )
+        if result is not None:
+            # save the result to decline close order to the position
+            # TODO: use history data instead of dict
+            result.msg = "Position is closed by tp/sl"
+            self.__closed_position_with_exist[position.id] = result
+            logger.info(f"Position is closed by limit: {result}")
+            if self.do_render:
+                if position.position_side == POSITION_SIDE.long:
+                    self.__rendere.add_trade_history_to_latest_tick(-2, position.sl, self.__ohlc_index)
+                else:
+                    self.__rendere.add_trade_history_to_latest_tick(-1, position.sl, self.__ohlc_index)
+        self.account.remove_position_from_listening(position.id)
+
     def __check_pending_positions_completion(self, ohlc_df: pd.DataFrame, symbols: list):
+        if len(self.account.listening_positions) == 0 and len(self._open_orders) == 0:
+            return
+        # assume trading data is retrieved every frame
+        if ohlc_df.empty:
+            return
+        if self.ohlc_columns is None:
+            self.ohlc_columns = self.get_ohlc_columns()
+        high_column = self.ohlc_columns["High"]
+        low_column = self.ohlc_columns["Low"]
+        tick = ohlc_df.iloc[-1]
+        bar_prices = self.__get_bar_prices(tick, high_column, low_column)
+
         if len(self.account.listening_positions) > 0:
             # handle take profit and stop loss
-            positions = self.account.listening_positions.copy()
             logger.debug("start checking the tp and sl of positions")
-            if self.ohlc_columns is None:
-                self.ohlc_columns = self.get_ohlc_columns()
-            high_column = self.ohlc_columns["High"]
-            low_column = self.ohlc_columns["Low"]
-            # assume trading data is retrieved every frame
-            if ohlc_df.empty:
-                return
-            tick = ohlc_df.iloc[-1]
-            for id, position in positions.items():
-                closed_price = self._check_position(position, low_price=tick[low_column], high_price=tick[high_column])
-                if closed_price is not None:
-                    result = self.account.close_position(
-                        id=position.id,
-                        price=closed_price,
-                        volume=position.volume,
-                        position=position,
-                        index=self.get_current_datetime(),
-                    )
-                    if result is not None:
-                        # save the result to decline close order to the position
-                        # TODO: use history data instead of dict
-                        result.msg = "Position is closed by tp/sl"
-                        self.__closed_position_with_exist[position.id] = result
-                        logger.info(f"Position is closed by limit: {result}")
-                        if self.do_render:
-                            if position.position_side == POSITION_SIDE.long:
-                                self.__rendere.add_trade_history_to_latest_tick(-2, position.sl, self.__ohlc_index)
-                            else:
-                                self.__rendere.add_trade_history_to_latest_tick(-1, position.sl, self.__ohlc_index)
-                    self.account.remove_position_from_listening(position.id)
+            if type(self)._check_position is not ClientBase._check_position:
+                # actual client checks each position by itself
+                positions = self.account.listening_positions.copy()
+                for id, position in positions.items():
+                    high_price, low_price = bar_prices.get(position.symbol, bar_prices.get(None, (None, None)))
+                    closed_price = self._check_position(position, low_price=low_price, high_price=high_price)
+                    if closed_price is not None:
+                        self.__close_position_by_limit(position, closed_price)
+            else:
+                book = self.account.listening_book
+                if book.position_count != len(self.account.listening_positions):
+                    self.account.reset_listening_book()
+                hits = []
+                for symbol, (high_price, low_price) in bar_prices.items():
+                    positions, _ = book.match(high_price, low_price, symbol)
+                    hits.extend(positions)
+                for position, closed_price in hits:
+                    self.__close_position_by_limit(position, closed_price)
+
         if len(self._open_orders) > 0:
             # handle limit and stop orders
-            orders = self._open_orders.copy()
             logger.debug("start checking the completion of open orders")
-            closed_orders = []
-            try:
-                tick = ohlc_df.iloc[-1]
-            except Exception as e:
-                logger.error(f"Failed to get the latest tick data: {e}")
-                return
-            for id, order in orders.items():
-                logger.debug(f"checking order: {id}")
-                if order.order_type == ORDER_TYPE.limit or order.order_type == ORDER_TYPE.stop:
-                    self.ohlc_columns = self.get_ohlc_columns()
-                    high_column = self.ohlc_columns["High"]
-                    low_column = self.ohlc_columns["Low"]
-                    open_price = None
-                    # logger.debug(f"tick: {tick}, order_price: {order.price}, order_type: {order.order_type}, position_side: {order.position_side}")
-                    if order.order_type == ORDER_TYPE.limit:
-                        if order.position_side == POSITION_SIDE.long:
-                            if tick[low_column] <= order.price:
-                                open_price = order.price
-                        elif order.position_side == POSITION_SIDE.short:
-                            if tick[high_column] >= order.price:
-                                open_price = order.price
-                    elif order.order_type == ORDER_TYPE.stop:
-                        if order.position_side == POSITION_SIDE.long:
-                            if tick[high_column] >= order.price:
-                                open_price = order.price
-                        elif order.position_side == POSITION_SIDE.short:
-                            if tick[low_column] <= order.price:
-                                open_price = order.price
-                    if open_price is not None:
-                        if order.position_side == POSITION_SIDE.long:
-                            logger.info(f"long position is opened by limit/stop order: {open_price}")
-                            if self.__open_long_position(
-                                symbol=order.symbol,
-                                bought_rate=open_price,
-                                volume=order.volume,
-                                trade_unit=order.trade_unit,
-                                leverage=order.leverage,
-                                tp=order.tp,
-                                sl=order.sl,
-                                result=None,
-                            ):
-                                closed_orders.append(id)
-                        else:
-                            logger.info(f"short position is opened by limit/stop order: {open_price}")
-                            if self.__open_short_position(
-                                symbol=order.symbol, sold_rate=open_price, volume=order.volume, tp=order.tp, sl=order.sl, result=None
-                            ):
-                                closed_orders.append(id)
-            # remove closed orders
-            for id in closed_orders:
-                ticket_id = str(id)
-                if ticket_id in self._open_orders:
-                    self._open_orders.pop(ticket_id)
+            if self._order_book.order_count != len(self._open_orders):
+                self._order_book.clear()
+                for order in self._open_orders.values():
+                    self._order_book.add_order(order)
+            hits = []
+            for symbol, (high_price, low_price) in bar_prices.items():
+                _, orders = self._order_book.match(high_price, low_price, symbol)
+                hits.extend(orders)
+            for order, open_price in hits:
+                if order.position_side == POSITION_SIDE.long:
+                    logger.info(f"long position is opened by limit/stop order: {open_price}")
+                    position = self.__open_long_position(
+                        symbol=order.symbol,
+                        bought_rate=open_price,
+                        volume=order.volume,
+                        trade_unit=order.trade_unit,
+                        leverage=order.leverage,
+                        tp=order.tp,
+                        sl=order.sl,
+                        result=None,
+                    )
+                else:
+                    logger.info(f"short position is opened by limit/stop order: {open_price}")
+                    position = self.__open_short_position(
+                        symbol=order.symbol,
+                        sold_rate=open_price,
+                        volume=order.volume,
+                        trade_unit=order.trade_unit,
+                        leverage=order.leverage,
+                        tp=order.tp,
+                        sl=order.sl,
+                        result=None,
+                    )
+                if position:
+                    ticket_id = str(order.id)
+                    self._open_orders.pop(ticket_id, None)
+                    self._order_book.remove_order(order.id)
                     logger.debug(f"order {ticket_id} is removed from open orders as it is closed by limit/stop order.")
 
     def __plot_data(self, symbols: list, data_df: pd.DataFrame):
@@ -873,6 +1015,38 @@ class ClientBase(metaclass=ABCMeta):
             self.__rendere.update_ohlc(data_df, self.__ohlc_index)
         self.__rendere.plot()
 
+    def __process_training_data(
+        self,
+        ohlc_df,
+        symbols,
+        frame,
+        idc_processes,
+        pre_processes,
+        economic_keys,
+        grouped_by_symbol,
+        do_run_process,
+        do_add_eco_idc,
+        data_freq,
+    ):
+        if do_run_process:
+            with self._metrics.measure(metrics.PROCESS):
+                data = self.run_processes(ohlc_df, symbols, idc_processes, pre_processes, grouped_by_symbol)
+        else:
+            data = ohlc_df
+
+        if do_add_eco_idc:
+            first_index = ohlc_df.index[0]
+            end_index = ohlc_df.index[-1]
+            indicaters_df = self.get_economic_idc(economic_keys, first_index, end_index)
+            indicaters_df = indicaters_df.groupby(pd.Grouper(level=0, freq=data_freq)).first()
+            if frame < Frame.D1:
+                if indicaters_df.index.tzinfo is None:
+                    indicaters_df.index = pd.to_datetime(indicaters_df.index, utc=True)
+            indicaters_df = indicaters_df.ffill()
+            data = pd.concat([data, indicaters_df], axis=1)
+            data.dropna(thresh=len(data.columns), inplace=True)
+        return data
+
     def __get_training_data(
         self,
         length,
@@ -890,44 +1064,69 @@ class ClientBase(metaclass=ABCMeta):
     ):
         if length is None:
             length = 1
-        chunk_data = []
-        for index in indices:
-            required_length = 0
-            if do_run_process:
-                required_length += self._get_required_length(idc_processes + pre_processes)
-            if length < required_length:
-                target_length = required_length
-            else:
-                target_length = length
+        indices = np.asarray(indices, dtype=np.int64)
+        if indices.ndim != 1 or len(indices) == 0:
+            raise ValueError(f"indices should be 1d list of int. {indices} is provided.")
+        required_length = 0
+        if do_run_process:
+            required_length += self._get_required_length(idc_processes + pre_processes)
+        target_length = max(length, required_length)
+        process_args = (symbols, frame, idc_processes, pre_processes, economic_keys, grouped_by_symbol, do_run_process, do_add_eco_idc, data_freq)
+
+        first_index = int(indices.min())
+        if first_index < length:
+            raise ValueError(f"index {first_index} is less than length {length}.")
+        # rolled bars and statistics of pre processes depend on the window, so such windows are processed one by one
+        if (self.frame is not None and frame != self.frame) or (do_run_process and len(pre_processes) > 0):
+            return self.__get_training_windows(length, target_length, columns, indices, process_args)
+
+        # retrieve the span covering all windows once, then run processes once over the span
+        last_index = int(indices.max())
+        span_length = min(last_index - first_index + target_length, last_index)
+        with self._metrics.measure(metrics.FETCH):
             ohlc_df = self._get_ohlc_from_client(
-                length=target_length,
+                length=span_length,
                 symbols=symbols,
                 frame=frame,
                 columns=columns,
-                index=index,
+                index=last_index,
                 grouped_by_symbol=grouped_by_symbol,
             )
+        if len(ohlc_df) != span_length:
+            # rows of the span don't correspond to source positions
+            return self.__get_training_windows(length, target_length, columns, indices, process_args)
+        data = self.__process_training_data(ohlc_df, *process_args)
 
-            if do_run_process:
-                data = self.run_processes(ohlc_df, symbols, idc_processes, pre_processes, grouped_by_symbol)
-            else:
-                data = ohlc_df
-
-            if do_add_eco_idc:
-                first_index = ohlc_df.index[0]
-                end_index = ohlc_df.index[-1]
-                indicaters_df = self.get_economic_idc(economic_keys, first_index, end_index)
-                indicaters_df = indicaters_df.groupby(pd.Grouper(level=0, freq=data_freq)).first()
-                if frame < Frame.D1:
-                    if indicaters_df.index.tzinfo is None:
-                        indicaters_df.index = pd.to_datetime(indicaters_df.index, utc=True)
-                indicaters_df = indicaters_df.ffill()
-                data = pd.concat([data, indicaters_df], axis=1)
-                data.dropna(thresh=len(data.columns), inplace=True)
+        try:
+            values = data.to_numpy(dtype=np.float64)
+        except (TypeError, ValueError):
+            values = data.to_numpy()
+        # window of an index ends at the row of index - 1. rows dropped by processes are skipped as same as the window of the index
+        ends = data.index.searchsorted(ohlc_df.index[span_length - (last_index - indices) - 1], side="right")
+        starts = ends - length
+        if starts.min() < 0 or len(values) < length:
+            raise ValueError(f"data length {len(values)} is insufficient to get windows of length {length} for indices {indices.min()} to {last_index}")
+        windows = np.lib.stride_tricks.sliding_window_view(values, length, axis=0)
+        chunk_data = np.empty((len(indices), length, values.shape[1]), dtype=values.dtype)
+        np.take(np.moveaxis(windows, -1, 1), starts, axis=0, out=chunk_data)
+        return chunk_data
 
+    def __get_training_windows(self, length, target_length, columns, indices, process_args):
+        symbols, frame, grouped_by_symbol = process_args[0], process_args[1], process_args[5]
+        chunk_data = []
+        for index in indices:
+            with self._metrics.measure(metrics.FETCH):
+                ohlc_df = self._get_ohlc_from_client(
+                    length=target_length,
+                    symbols=symbols,
+                    frame=frame,
+                    columns=columns,
+                    index=int(index),
+                    grouped_by_symbol=grouped_by_symbol,
+                )
+            data = self.__process_training_data(ohlc_df, *process_args)
             chunk_data.append(data.iloc[-length:].values)
-        chunk_data = np.array(chunk_data)
-        return chunk_data
+        return np.array(chunk_data)
 
     def __get_trading_data(
         self,
@@ -949,14 +1148,12 @@ class ClientBase(metaclass=ABCMeta):
             required_length += self._get_required_length(idc_processes + pre_processes)
 
         if length is None or length == slice(None):
-            ohlc_df = self._get_ohlc_from_client(
-                length=length, symbols=symbols, frame=frame, columns=columns, index=index, grouped_by_symbol=grouped_by_symbol
-            )
+            target_length = length
+        elif length < required_length:
+            target_length = required_length
         else:
-            if length < required_length:
-                target_length = required_length
-            else:
-                target_length = length
+            target_length = length
+        with self._metrics.measure(metrics.FETCH):
             ohlc_df = self._get_ohlc_from_client(
                 length=target_length, symbols=symbols, frame=frame, columns=columns, index=index, grouped_by_symbol=grouped_by_symbol
             )
@@ -966,12 +1163,14 @@ class ClientBase(metaclass=ABCMeta):
             ohlc_df = ohlc_df.groupby(pd.Grouper(level=0, freq=data_freq)).first()
             ohlc_df.dropna(how="all", inplace=True)
 
-        t = threading.Thread(target=self.__check_pending_positions_completion, args=(ohlc_df, symbols), daemon=True)
-        t.start()
+        self.__request_pending_check(ohlc_df, symbols)
 
         if do_run_process:
             if isinstance(ohlc_df, pd.DataFrame) and len(ohlc_df) >= required_length:
-                data = self.run_processes(ohlc_df, symbols, idc_processes, pre_processes, grouped_by_symbol)
+                process_ids = tuple(id(process) for process in idc_processes + pre_processes)
+                pipeline_key = (process_ids, repr(symbols), frame, repr(columns), grouped_by_symbol)
+                with self._metrics.measure(metrics.PROCESS):
+                    data = self.__run_processes_on_trading_data(ohlc_df, symbols, idc_processes, pre_processes, grouped_by_symbol, pipeline_key)
                 if self.do_render:
                     self.__plot_data_width_indicaters(symbols, data)
             else:
@@ -1086,7 +1285,10 @@ class ClientBase(metaclass=ABCMeta):
             symbols: selector of columns. Typically it passed as df.loc[index, symbols].
             length (int | None): specify data length > 1. If None is specified, return all date.
             frame (int | None): specify frame to get time series data. If None, default value is used instead.
-            index (int or list[int]): specify index copy from. If list has multiple indices, return numpy array as (indices_size, column_size, data_length).
+              When it is greater than the frame of the data, CSV clients roll the data and skip buckets without rows (e.g. holidays).
+            index (int or list[int]): specify index copy from. If list has multiple indices, return numpy array as (indices_size, data_length, column_size).
+              For multiple indices, indicater processes are applied once over the span covering all indices, then each window is sliced from it.
+              When frame is rolled or pre_processes are specified, each window is processed separately as bars and statistics depend on the window.
             columns: specify columns. If not specified, return open, high, low, close.
               step_index is not change if index is specified even auto_indx is True as typically this option is used for machine learning.
               Defaults None and this case step_index is used.
@@ -1143,20 +1345,21 @@ class ClientBase(metaclass=ABCMeta):
         if index is None or type(index) is int:
             # return DataFrame for trading
             try:
-                ohlc_df = self.__get_trading_data(
-                    length=length,
-                    symbols=symbols,
-                    frame=frame,
-                    columns=columns,
-                    index=index,
-                    idc_processes=idc_processes,
-                    pre_processes=pre_processes,
-                    economic_keys=economic_keys,
-                    grouped_by_symbol=grouped_by_symbol,
-                    do_run_process=do_run_process,
-                    do_add_eco_idc=do_add_eco_idc,
-                    data_freq=data_freq,
-                )
+                with self._metrics.measure(metrics.GET_OHLC):
+                    ohlc_df = self.__get_trading_data(
+                        length=length,
+                        symbols=symbols,
+                        frame=frame,
+                        columns=columns,
+                        index=index,
+                        idc_processes=idc_processes,
+                        pre_processes=pre_processes,
+                        economic_keys=economic_keys,
+                        grouped_by_symbol=grouped_by_symbol,
+                        do_run_process=do_run_process,
+                        do_add_eco_idc=do_add_eco_idc,
+                        data_freq=data_freq,
+                    )
             except Exception as e:
                 logger.error(f"Failed to get trading data: {e}")
                 if disable_step:
@@ -1197,10 +1400,11 @@ class ClientBase(metaclass=ABCMeta):
                 )
             except Exception as e:
                 logger.error(f"Failed to get training data: {e}")
+                ohlc_df = pd.DataFrame()
             finally:
                 if disable_step:
                     self.auto_step_index = auto_step_index
-                return pd.DataFrame()
+            return ohlc_df
 
     # Need to implement in the actual client
 
@@ -1290,6 +1494,7 @@ class ClientBase(metaclass=ABCMeta):
         ticket_id = str(id)
         if ticket_id in self._open_orders:
             self._open_orders.pop(ticket_id)
+            self._order_book.remove_order(ticket_id)
             return True
         return False
 
@@ -1382,19 +1587,20 @@ class ClientBase(metaclass=ABCMeta):
 
     def __open_long_position(self, symbol, bought_rate, volume, trade_unit, leverage=1.0, tp=None, sl=None, option_info=None, result=None):
         logger.debug(f"open long position is created: {symbol}, {bought_rate}, {volume}, {tp}, {sl}, {option_info}, {result}")
-        p = self.account.open_position(
-            position_side=POSITION_SIDE.long,
-            symbol=symbol,
-            price=bought_rate,
-            volume=volume,
-            trade_unit=trade_unit,
-            leverage=leverage,
-            tp=tp,
-            sl=sl,
-            index=self.get_current_datetime(),
-            option=option_info,
-            result=result,
-        )
+        with self._metrics.measure(metrics.STORAGE):
+            p = self.account.open_position(
+                position_side=POSITION_SIDE.long,
+                symbol=symbol,
+                price=bought_rate,
+                volume=volume,
+                trade_unit=trade_unit,
+                leverage=leverage,
+                tp=tp,
+                sl=sl,
+                index=self.get_current_datetime(),
+                option=option_info,
+                result=result,
+            )
         if p is not None:
             if self.do_render:
                 self.__rendere.add_trade_history_to_latest_tick(1, bought_rate, self.__ohlc_index)
@@ -1404,19 +1610,20 @@ class ClientBase(metaclass=ABCMeta):
 
     def __open_short_position(self, symbol, sold_rate, volume, trade_unit, leverage=1.0, tp=None, sl=None, option_info=None, result=None):
         logger.debug(f"open short position is created: {symbol}, {sold_rate}, {volume}, {tp}, {sl}, {option_info}, {result}")
-        p = self.account.open_position(
-            position_side=POSITION_SIDE.short,
-            symbol=symbol,
-            price=sold_rate,
-            volume=volume,
-            trade_unit=trade_unit,
-            leverage=leverage,
-            tp=tp,
-            sl=sl,
-            index=self.get_current_datetime(),
-            option=option_info,
-            result=result,
-        )
+        with self._metrics.measure(metrics.STORAGE):
+            p = self.account.open_position(
+                position_side=POSITION_SIDE.short,
+                symbol=symbol,
+                price=sold_rate,
+                volume=volume,
+                trade_unit=trade_unit,
+                leverage=leverage,
+                tp=tp,
+                sl=sl,
+                index=self.get_current_datetime(),
+                option=option_info,
+                result=result,
+            )
         if p is not None:
             if self.do_render:
                 self.__rendere.add_trade_history_to_latest_tick(2, sold_rate, self.__ohlc_index)
@@ -1636,37 +1843,32 @@ class ClientBase(metaclass=ABCMeta):
     def get_daily_max_loss(self) -> float:
         return self.account.get_daily_max_loss()
 
-    def get_profit_loss(self) -> float:
-        profit_loss = 0.0
-        long_positions, short_positions = self.account.storage.get_positions()
-        long_symbols = set([position.symbol for position in long_positions])
-        short_symbols = set([position.symbol for position in short_positions])
+    def get_current_quotes(self, symbols: list) -> tuple:
+        """return bid and ask rates of symbols. Override this if the provider returns both by one request.
 
-        bid_rates = self.get_current_bid(list(long_symbols)) if len(long_symbols) > 0 else {}
-        ask_rates = self.get_current_ask(list(short_symbols)) if len(short_symbols) > 0 else {}
+        Args:
+            symbols (list): symbols to get quotes
 
-        for position in long_positions:
-            if isinstance(bid_rates, pd.Series) or isinstance(bid_rates, dict):
-                current_bid = bid_rates.get(position.symbol, None)
-            elif isinstance(bid_rates, (int, float)) or isinstance(bid_rates, int):
-                current_bid = bid_rates
-            else:
-                logger.warning(f"Failed to get current bid for symbol {position.symbol}. It is not included in profit/loss calculation.")
-                current_bid = None
-            if current_bid is not None:
-                profit_loss += (current_bid - position.price) * position.volume
-            else:
-                logger.warning(f"Failed to get current bid for symbol {position.symbol}. It is not included in profit/loss calculation.")
-        for position in short_positions:
-            if isinstance(ask_rates, pd.Series) or isinstance(ask_rates, dict):
-                current_ask = ask_rates.get(position.symbol, None)
-            elif isinstance(ask_rates, (int, float)) or isinstance(ask_rates, int):
-                current_ask = ask_rates
-            if current_ask is not None:
-                profit_loss += (position.price - current_ask) * position.volume
-            else:
-                logger.warning(f"Failed to get current ask for symbol {position.symbol}. It is not included in profit/loss calculation.")
-        return profit_loss
+        Returns:
+            tuple: bid rates and ask rates. pd.Series or dict by symbol, or a rate for a single symbol.
+        """
+        if len(symbols) == 0:
+            return {}, {}
+        return self.get_current_bid(symbols), self.get_current_ask(symbols)
+
+    def __get_book_quotes(self):
+        book = self.account.position_book
+        bid_rates, ask_rates = self.get_current_quotes(book.get_symbols())
+        return book, bid_rates, ask_rates
+
+    def get_profit_loss(self) -> float:
+        book, bid_rates, ask_rates = self.__get_book_quotes()
+        profit_losses = book.get_profit_losses(bid_rates, ask_rates)
+        is_unknown = np.isnan(profit_losses)
+        if is_unknown.any():
+            unknown_symbols = set(book.get_symbols_of(is_unknown))
+            logger.warning(f"Failed to get current rates for symbols {unknown_symbols}. They are not included in profit/loss calculation.")
+        return float(profit_losses[~is_unknown].sum())
 
     def get_equity(self) -> float:
         """
@@ -1696,52 +1898,25 @@ class ClientBase(metaclass=ABCMeta):
         return self._symbols
 
     def get_portfolio(self) -> tuple:
-        portfolio = {"long": {}, "short": {}}
-        long_positions, short_positions = self.account.storage.get_positions()
-        ask_symbols = []
-        ask_position_states = []
-        if len(long_positions) > 0:
-            for position in long_positions:
-                symbol = position.symbol
-                ask_symbols.append(symbol)
-                if symbol in portfolio["long"]:
-                    portfolio["long"][symbol].append(position)
-                else:
-                    portfolio["long"][symbol] = [position]
-                    bid_rates = self.get_current_bid(list(set(ask_symbols)))
-            if isinstance(bid_rates, pd.Series):
-                get_bid_rate = lambda symbol: bid_rates[symbol]
-            else:
-                get_bid_rate = lambda symbol: bid_rates
-            for symbol, positions in portfolio["long"].items():
-                bid_rate = get_bid_rate(symbol)
-                for position in positions:
-                    profit = (bid_rate - position.price) * position.volume
-                    profit_rate = bid_rate / position.price
-                    ask_position_states.append((symbol, position.price, position.volume, bid_rate, profit, profit_rate))
-
-        bid_symbols = []
-        bid_position_states = []
-        if len(short_positions) > 0:
-            for position in short_positions:
-                symbol = position.symbol
-                bid_symbols.append(symbol)
-                if symbol in portfolio["short"]:
-                    portfolio["short"][symbol].append(position)
-                else:
-                    portfolio["short"][symbol] = [position]
-            ask_rates = self.get_current_ask(list(set(bid_symbols)))
-            if isinstance(ask_rates, pd.Series):
-                get_ask_rate = lambda symbol: ask_rates[symbol]
-            else:
-                get_ask_rate = lambda symbol: ask_rates
-            for symbol, positions in portfolio["short"].items():
-                ask_rate = get_ask_rate(symbol)
-                for position in positions:
-                    profit = (position.price - ask_rate) * position.volume
-                    profit_rate = position.price / ask_rate
-                    bid_position_states.append((symbol, position.price, position.volume, ask_rate, profit, profit_rate))
-        return ask_position_states, bid_position_states
+        book, bid_rates, ask_rates = self.__get_book_quotes()
+        return book.get_portfolio(bid_rates, ask_rates)
+
+    def get_portfolio_frame(self, by_symbol: bool = False) -> pd.DataFrame:
+        """value open positions with current rates. Long positions are valued with bid and short positions with ask.
+
+        Args:
+            by_symbol (bool, optional): return totals by symbol instead of positions. Defaults to False.
+
+        Returns:
+            pd.DataFrame: positions indexed by id with symbol, position_side (1 for long, -1 for short), price, volume, trade_unit, leverage, tp, sl, rate, profit, profit_rate and margin columns.
+                If by_symbol is True, symbols with count, long_volume, short_volume, exposure, margin and profit columns.
+        """
+        book, bid_rates, ask_rates = self.__get_book_quotes()
+        if by_symbol:
+            values = book.get_symbol_values(bid_rates, ask_rates)
+            return pd.DataFrame(values).set_index("symbol")
+        values = book.get_values(bid_rates, ask_rates)
+        return pd.DataFrame(values).set_index("id")
 
     def seed(self, seed=None):
         if seed is None:
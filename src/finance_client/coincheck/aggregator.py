@@ -0,0 +1,270 @@
+import datetime
+import threading
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from .. import frames as Frame
+
+
+def get_frame_start(time: datetime.datetime, frame: int) -> datetime.datetime:
+    """return start time of the bar which includes time"""
+    if frame < Frame.H1:
+        additional_mins = time.minute % frame
+        delta = datetime.timedelta(minutes=additional_mins, seconds=time.second, microseconds=time.microsecond)
+    elif frame < Frame.D1:
+        additional_hours = time.hour % (frame / 60)
+        delta = datetime.timedelta(hours=additional_hours, minutes=time.minute, seconds=time.second, microseconds=time.microsecond)
+    elif frame < Frame.MO1:
+        additional_days = time.day % (frame / (60 * 24))
+        delta = datetime.timedelta(days=additional_days, hours=time.hour, minutes=time.minute, seconds=time.second, microseconds=time.microsecond)
+    else:
+        return datetime.datetime(year=time.year, month=time.month, day=1, tzinfo=time.tzinfo)
+    return time - delta
+
+
+def get_next_frame(frame_time: datetime.datetime, frame: int) -> datetime.datetime:
+    """return start time of the bar next to the bar starting at frame_time"""
+    if frame < Frame.MO1:
+        return frame_time + datetime.timedelta(minutes=frame)
+    if frame_time.month == 12:
+        return datetime.datetime(year=frame_time.year + 1, month=1, day=1, tzinfo=frame_time.tzinfo)
+    return datetime.datetime(year=frame_time.year, month=frame_time.month + 1, day=1, tzinfo=frame_time.tzinfo)
+
+
+class TickAggregator:
+    """aggregate ticks to ohlcv bars.
+
+    The bar in progress is kept as scalars and finished bars are appended to numpy arrays which grow by doubling.
+    When max_bars is specified, the arrays are used as a ring buffer and the oldest bars are overwritten.
+    DataFrames are created only when they are requested. Thread safe for a writer (websocket) and readers.
+    """
+
+    COLUMNS = ["open", "high", "low", "close", "volume"]
+
+    def __init__(
+        self,
+        current_frame: datetime.datetime,
+        get_next_frame: Callable[[datetime.datetime], datetime.datetime],
+        capacity: int = 1024,
+        max_bars: int = None,
+        index_name: str = "time",
+    ):
+        """
+        Args:
+            current_frame (datetime.datetime): start time of the bar in progress
+            get_next_frame (Callable[[datetime.datetime], datetime.datetime]): function to return start time of the next bar from start time of a bar
+            capacity (int, optional): initial number of bars allocated. Defaults to 1024.
+            max_bars (int, optional): max number of finished bars kept. Defaults to None and bars are kept without limit.
+            index_name (str, optional): name of the index of DataFrame. Defaults to "time".
+        """
+        if max_bars is not None:
+            capacity = min(capacity, max_bars)
+        self.get_next_frame = get_next_frame
+        self.max_bars = max_bars
+        self.index_name = index_name
+        self._times = np.empty(max(capacity, 1), dtype=np.int64)
+        self._values = np.empty((max(capacity, 1), len(self.COLUMNS)), dtype=np.float64)
+        self._start = 0
+        self._count = 0
+        # number of bars finished since the aggregator was created. used as a position to read new bars.
+        self.total = 0
+        self.current_frame = current_frame
+        self.next_frame = get_next_frame(current_frame)
+        self._bar = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def capacity(self) -> int:
+        return len(self._times)
+
+    def __grow(self):
+        capacity = self.capacity * 2
+        if self.max_bars is not None:
+            capacity = min(capacity, self.max_bars)
+        order = self.__order()
+        times = np.empty(capacity, dtype=np.int64)
+        values = np.empty((capacity, len(self.COLUMNS)), dtype=np.float64)
+        times[: self._count] = self._times[order]
+        values[: self._count] = self._values[order]
+        self._times, self._values, self._start = times, values, 0
+
+    def __order(self) -> np.ndarray:
+        return (self._start + np.arange(self._count)) % self.capacity
+
+    def __append(self, time: datetime.datetime, bar: list):
+        if self._count == self.capacity and (self.max_bars is None or self.capacity < self.max_bars):
+            self.__grow()
+        if self._count == self.capacity:
+            # overwrite the oldest bar
+            position = self._start
+            self._start = (self._start + 1) % self.capacity
+        else:
+            position = (self._start + self._count) % self.capacity
+            self._count += 1
+        self._times[position] = pd.Timestamp(time).value
+        self._values[position] = bar
+        self.total += 1
+
+    def extend(self, df: pd.DataFrame):
+        """append finished bars. df should have COLUMNS and tz aware DatetimeIndex. volume is filled with 0 if it doesn't exist."""
+        if df is None or len(df) == 0:
+            return
+        df = df.reindex(columns=self.COLUMNS).fillna({"volume": 0.0})
+        index = pd.DatetimeIndex(df.index)
+        index = index.tz_localize("UTC") if index.tz is None else index.tz_convert("UTC")
+        values = df.to_numpy(dtype=np.float64)
+        with self._lock:
+            for time, bar in zip(index, values):
+                self.__append(time, bar)
+
+    def set_current(self, time: datetime.datetime, open: float, high: float, low: float, close: float, volume: float = 0.0):
+        """set the bar in progress, e.g. the latest bar of history data"""
+        with self._lock:
+            self.current_frame = time
+            self.next_frame = self.get_next_frame(time)
+            self._bar = [open, high, low, close, volume]
+
+    def add_ticks(self, ticks: list) -> int:
+        """update bars with ticks
+
+        Args:
+            ticks (list[dict]): ticks which have time (datetime), price and volume
+
+        Returns:
+            int: number of bars finished by the ticks
+        """
+        finished = 0
+        with self._lock:
+            bar = self._bar
+            for tick in ticks:
+                tick_time = tick["time"]
+                price = tick["price"]
+                if tick_time >= self.next_frame:
+                    if bar is not None:
+                        self.__append(self.current_frame, bar)
+                        finished += 1
+                        bar = None
+                    # skip frames without ticks
+                    while tick_time >= self.next_frame:
+                        self.current_frame = self.next_frame
+                        self.next_frame = self.get_next_frame(self.next_frame)
+                if bar is None:
+                    bar = [price, price, price, price, tick["volume"]]
+                else:
+                    if bar[1] < price:
+                        bar[1] = price
+                    elif bar[2] > price:
+                        bar[2] = price
+                    bar[3] = price
+                    bar[4] += tick["volume"]
+            self._bar = bar
+        return finished
+
+    def add_arrays(self, times: np.ndarray, prices: np.ndarray, volumes: np.ndarray) -> int:
+        """update bars with arrays of ticks. Same as add_ticks but ticks are aggregated by numpy.
+
+        Args:
+            times (np.ndarray): UTC timestamps of ticks in nanoseconds (int64), sorted
+            prices (np.ndarray): prices of ticks
+            volumes (np.ndarray): volumes of ticks
+
+        Returns:
+            int: number of bars finished by the ticks
+        """
+        if len(times) == 0:
+            return 0
+        with self._lock:
+            # start times of bars the ticks can belong to
+            frames = [self.current_frame]
+            boundaries = []
+            next_frame = self.next_frame
+            next_value = pd.Timestamp(next_frame).value
+            last_value = times[-1]
+            while next_value <= last_value:
+                frames.append(next_frame)
+                boundaries.append(next_value)
+                next_frame = self.get_next_frame(next_frame)
+                next_value = pd.Timestamp(next_frame).value
+
+            if len(boundaries) == 0:
+                starts = np.zeros(1, dtype=np.int64)
+                groups = starts
+            else:
+                # late ticks are merged to the latest bar as add_ticks does
+                bar_index = np.maximum.accumulate(np.searchsorted(np.asarray(boundaries, dtype=np.int64), times, side="right"))
+                starts = np.concatenate(([0], np.flatnonzero(np.diff(bar_index)) + 1))
+                groups = bar_index[starts]
+            ends = np.append(starts[1:], len(times)) - 1
+            opens = prices[starts]
+            highs = np.maximum.reduceat(prices, starts)
+            lows = np.minimum.reduceat(prices, starts)
+            closes = prices[ends]
+            sums = np.add.reduceat(volumes, starts)
+
+            finished = 0
+            bar = self._bar
+            group = 0
+            for index in range(len(starts)):
+                if bar is not None and groups[index] == group:
+                    bar[1] = max(bar[1], highs[index])
+                    bar[2] = min(bar[2], lows[index])
+                    bar[3] = closes[index]
+                    bar[4] += sums[index]
+                else:
+                    if bar is not None:
+                        self.__append(frames[group], bar)
+                        finished += 1
+                    group = groups[index]
+                    bar = [opens[index], highs[index], lows[index], closes[index], sums[index]]
+            self._bar = bar
+            self.current_frame = frames[-1]
+            self.next_frame = next_frame
+        return finished
+
+    def __to_frame(self, times: np.ndarray, values: np.ndarray) -> pd.DataFrame:
+        index = pd.DatetimeIndex(pd.to_datetime(times, utc=True), name=self.index_name)
+        return pd.DataFrame(values, index=index, columns=self.COLUMNS)
+
+    def __select(self, length: int = None, include_current: bool = False) -> pd.DataFrame:
+        order = self.__order()
+        if length is not None:
+            order = order[max(len(order) - length, 0) :]
+        times = self._times[order]
+        values = self._values[order]
+        if include_current and self._bar is not None:
+            times = np.append(times, pd.Timestamp(self.current_frame).value)
+            values = np.vstack([values, self._bar])
+        return self.__to_frame(times, values)
+
+    def to_frame(self, length: int = None, include_current: bool = False) -> pd.DataFrame:
+        """return DataFrame of finished bars
+
+        Args:
+            length (int, optional): number of latest bars. Defaults to None and all bars are returned.
+            include_current (bool, optional): add the bar in progress at the end. Defaults to False.
+        """
+        with self._lock:
+            return self.__select(length, include_current)
+
+    def current(self) -> pd.DataFrame:
+        """return DataFrame of the bar in progress. Empty if no tick is received in the frame."""
+        with self._lock:
+            return self.__select(0, include_current=True)
+
+    def new_bars(self, position: int) -> tuple:
+        """return bars finished after the position
+
+        Args:
+            position (int): total returned by the previous call
+
+        Returns:
+            tuple[pd.DataFrame, int]: new bars and the position for the next call
+        """
+        with self._lock:
+            length = max(min(self.total - position, self._count), 0)
+            return self.__select(length), self.total
@@ -14,3 +14,9 @@ class Account:
 
     def info(self, params={}):
         return self.service.request(ServiceBase.METHOD_GET, self.baseUrl, params)
+
+    async def balance_async(self, params={}):
+        return await self.service.request_async(ServiceBase.METHOD_GET, self.baseUrl + "/balance", params)
+
+    async def leverage_balance_async(self, params={}):
+        return await self.service.request_async(ServiceBase.METHOD_GET, self.baseUrl + "/leverage_balance", params)
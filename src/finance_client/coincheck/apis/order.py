@@ -62,3 +62,13 @@ def get_pending_orders():
 def get_my_trade_history():
     response = service.request(ServiceBase.METHOD_GET, baseUrl + "/transactions")
     return service.parse_str_to_dict(response)
+
+
+async def get_pending_orders_async():
+    """get orders concurrently with other requests. GET /opens"""
+    return await service.request_async(ServiceBase.METHOD_GET, baseUrl + "/opens")
+
+
+async def get_my_trade_history_async():
+    response = await service.request_async(ServiceBase.METHOD_GET, baseUrl + "/transactions")
+    return service.parse_str_to_dict(response)
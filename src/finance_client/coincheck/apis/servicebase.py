@@ -1,15 +1,67 @@
 import ast
+import asyncio
 import hashlib
 import hmac
 import http.client
 import json
 import logging
 import os
+import threading
 import time
 import urllib
 
 logger = logging.getLogger(__name__)
 
+# errors raised when a kept-alive connection was closed by the server
+_STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, http.client.CannotSendRequest, ConnectionResetError, BrokenPipeError)
+# methods which can be sent again when the response is lost. Orders (POST/DELETE) must not be duplicated
+_IDEMPOTENT_METHODS = ("GET",)
+
+
+class ConnectionPool:
+    """keep-alive connections to a host. Idle connections are reused by any thread."""
+
+    def __init__(self, host: str, timeout: float = 10.0, max_size: int = 4, connection_factory=http.client.HTTPSConnection):
+        """
+        Args:
+            host (str): host name of the api
+            timeout (float, optional): seconds to wait connect and response. Defaults to 10.0.
+            max_size (int, optional): max number of idle connections kept. Defaults to 4.
+            connection_factory (Callable, optional): function to create a connection from host and timeout. Defaults to http.client.HTTPSConnection.
+        """
+        self.host = host
+        self.timeout = timeout
+        self.max_size = max_size
+        self.connection_factory = connection_factory
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """return an idle connection or a new connection
+
+        Returns:
+            tuple[HTTPConnection, bool]: connection and whether it was used before
+        """
+        with self._lock:
+            if len(self._idle) > 0:
+                return self._idle.pop(), True
+        return self.connection_factory(self.host, timeout=self.timeout), False
+
+    def release(self, connection, reuse: bool = True):
+        """return the connection to the pool. It is closed when reuse is False or the pool is full."""
+        if reuse:
+            with self._lock:
+                if len(self._idle) < self.max_size:
+                    self._idle.append(connection)
+                    return
+        connection.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
 
 class ServiceBase:
     METHOD_GET = "GET"
@@ -20,6 +72,14 @@ class ServiceBase:
     ACCESS_ID_KEY = "ACCESS_ID"
     ACCESS_SECRET_KEY = "ACCESS_SECRET"
 
+    timeout = 10.0
+    pool_size = 4
+    connection_factory = http.client.HTTPSConnection
+    __pool = None
+    __pool_lock = threading.Lock()
+    __last_nonce = 0
+    __nonce_lock = threading.Lock()
+
     def __new__(cls, ACCESS_ID=None, ACCESS_SECRET=None):
         if cls.__singleton is None:
             cls.__singleton = super(ServiceBase, cls).__new__(cls)
@@ -41,6 +101,41 @@ class ServiceBase:
             print("credentials are stored.")
         return cls.__singleton
 
+    @classmethod
+    def configure(cls, timeout: float = None, pool_size: int = None, connection_factory=None, api_base: str = None):
+        """change settings of the session shared by apis. Connections kept alive are closed.
+
+        Args:
+            timeout (float, optional): seconds to wait connect and response. Defaults to None and current value is used.
+            pool_size (int, optional): max number of connections kept alive. Defaults to None and current value is used.
+            connection_factory (Callable, optional): function to create a connection from host and timeout. Defaults to None and current value is used.
+            api_base (str, optional): host of the api. Defaults to None and current value is used.
+        """
+        cls()
+        if timeout is not None:
+            cls.timeout = timeout
+        if pool_size is not None:
+            cls.pool_size = pool_size
+        if connection_factory is not None:
+            cls.connection_factory = staticmethod(connection_factory)
+        if api_base is not None:
+            cls.apiBase = api_base
+        cls.close()
+
+    @classmethod
+    def close(cls):
+        """close connections kept alive"""
+        with cls.__pool_lock:
+            pool, cls.__pool = cls.__pool, None
+        if pool is not None:
+            pool.close()
+
+    def _get_pool(self) -> ConnectionPool:
+        with ServiceBase.__pool_lock:
+            if ServiceBase.__pool is None:
+                ServiceBase.__pool = ConnectionPool(self.apiBase, self.timeout, self.pool_size, self.connection_factory)
+            return ServiceBase.__pool
+
     def __setSignature(self, request_headers, path, body=None):
         url = "https://" + self.apiBase + path
         creds_header = self.create_credential_header(url=url, body=body)
@@ -48,8 +143,16 @@ class ServiceBase:
 
         logger.debug(f"Set signature: {creds_header}")
 
+    @classmethod
+    def __next_nonce(cls) -> str:
+        # nonce should be increased even if requests are created at the same time from threads
+        with cls.__nonce_lock:
+            nonce = max(round(time.time() * 1000000), cls.__last_nonce + 1)
+            cls.__last_nonce = nonce
+        return str(nonce)
+
     def create_credential_header(self, url, body=None):
-        nonce = str(round(time.time() * 1000000))
+        nonce = self.__next_nonce()
         message = nonce + url
         if body is not None:
             message += body
@@ -63,25 +166,46 @@ class ServiceBase:
         body = ""
         if _body is not None:
             body = json.dumps(_body)
-        request_headers = {"content-type": "application/json"}
-        self.__setSignature(request_headers, path, body=body)
+        pool = self._get_pool()
+        while True:
+            request_headers = {"content-type": "application/json"}
+            self.__setSignature(request_headers, path, body=body)
+            client, reused = pool.acquire()
+            logger.debug("Process request...")
+            sent = False
+            try:
+                client.request(method, path, body, request_headers)
+                sent = True
+                res = client.getresponse()
+                data = res.read()
+            except _STALE_CONNECTION_ERRORS as e:
+                client.close()
+                if reused and (not sent or method.upper() in _IDEMPOTENT_METHODS):
+                    # server closed the idle connection. retry with another connection
+                    logger.debug(f"connection kept alive is closed: {e}")
+                    continue
+                if sent:
+                    # the request may have been processed by the server
+                    logger.error(f"connection is closed after {method} {path} was sent: {e}")
+                raise
+            except Exception:
+                client.close()
+                raise
+            pool.release(client, reuse=not res.will_close)
+            return data.decode("utf-8")
 
-        client = http.client.HTTPSConnection(self.apiBase)
-        logger.debug("Process request...")
-        client.request(method, path, body, request_headers)
-        res = client.getresponse()
-        data = res.read()
-        client.close()
-        return data.decode("utf-8")
+    async def request_async(self, method, path, query_params={}, _body: dict = None):
+        """request on a worker thread so that requests can be awaited concurrently. Connections are shared with request."""
+        return await asyncio.to_thread(self.request, method, path, query_params, _body)
 
     def parse_str_to_dict(self, _str):
         try:
-            return ast.literal_eval(_str)
+            return json.loads(_str)
         except Exception:
             pass
 
         try:
-            return json.loads(_str)
+            return ast.literal_eval(_str)
         except Exception as e:
             print(f"couldn't parse: {e}")
         return _str
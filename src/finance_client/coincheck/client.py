@@ -4,17 +4,19 @@ import time
 
 import pandas as pd
 
-import finance_client.frames as Frame
 from finance_client.client_base import ClientBase
 
 try:
-    from ..fprocess.fprocess.csvrw import write_df_to_csv
+    from ..fprocess.fprocess.csvrw import get_file_path
 except ImportError:
-    from ..fprocess.csvrw import write_df_to_csv
+    from ..fprocess.csvrw import get_file_path
 
+from ..csv.incremental_store import IncrementalCSVStore
 from . import apis
+from .aggregator import TickAggregator, get_frame_start, get_next_frame
 from .apis.servicebase import ServiceBase
 from .apis.ws import TradeHistory
+from .tick_stream import TickStreamHub
 
 logger = logging.getLogger(__name__)
 
@@ -24,61 +26,10 @@ class CoinCheckClient(ClientBase):
     provider = "CoinCheck"
 
     def __store_ticks(self, ticks):
-        for tick in ticks:
-            tick_time = tick["time"]
-            tick_price = tick["price"]
-            tick_volume = tick["volume"]
-
-            if self.frame_ohlcv is None:
-                # update frame if frame is changed before this method is called
-                if tick_time >= self.next_frame:
-                    self.current_frame = self.next_frame
-                    self.__update_next_frame()
-                # initialization at start script
-                self.frame_ohlcv = pd.DataFrame(
-                    {"open": tick_price, "high": tick_price, "low": tick_price, "close": tick_price, "volume": tick_volume},
-                    index=[self.current_frame],
-                )
-                self.frame_ohlcv.index.name = self.time_column_name
-
-            if tick_time >= self.next_frame:
-                # self.frame_ohlcv.close = self.last_tick.price
-                # concat frame_data to data
-                self.data = pd.concat([self.data, self.frame_ohlcv])
-                self.current_frame = self.next_frame
-                self.__update_next_frame()
-                # initialization on frame
-                self.frame_ohlcv = pd.DataFrame(
-                    {"open": tick_price, "high": tick_price, "low": tick_price, "close": tick_price, "volume": tick_volume},
-                    index=[self.current_frame],
-                )
-                self.frame_ohlcv.index.name = self.time_column_name
-            else:
-                if self.frame_ohlcv.iloc[-1].high < tick_price:
-                    self.frame_ohlcv.high = tick_price
-                if self.frame_ohlcv.iloc[-1].low > tick_price:
-                    self.frame_ohlcv.low = tick_price
-
-                self.frame_ohlcv.volume += tick_volume
-                self.frame_ohlcv.close = tick_price
-            # self.last_tick = tick
-
-    def __update_next_frame(self):
-        if self.frame_delta is None:
-            if self.frame == Frame.MO1:
-                year = self.next_frame.year
-                if self.next_frame.month == 12:
-                    year += 1
-                    month = 1
-                else:
-                    month = self.next_frame.month + 1
-                self.next_frame = datetime.datetime(year=year, month=month, day=1, tzinfo=datetime.timezone.utc)
-            else:
-                err_txt = f"frame_delta is not defined somehow for {self.frame}"
-                logger.error(err_txt)
-                raise Exception(err_txt)
-        else:
-            self.next_frame = self.next_frame + self.frame_delta
+        self.__aggregator.add_ticks(ticks)
+
+    def __get_next_frame(self, frame_time: datetime.datetime) -> datetime.datetime:
+        return get_next_frame(frame_time, self.frame)
 
     def __init__(
         self,
@@ -94,6 +45,7 @@ class CoinCheckClient(ClientBase):
         user_name=None,
         enable_trade_log=False,
         storage=None,
+        tick_hub: TickStreamHub = None,
     ):
         """CoinCheck Client. Create OHLCV data from tick data obtained from websocket.
         Create order with API. Need to specify the credentials
@@ -107,10 +59,11 @@ class CoinCheckClient(ClientBase):
             initialized_with (Client | None, optional): CoinCheck API don't provide history data. You can specify other Client to initialized ohlc with history data of the client. Defaults to None.
             do_render (bool, optional): If true, plot ohlc data by matplotlib. Defaults to False.
             user_name (str, optional): user name to separate info (e.g. position) within the same provider. Defaults to None. It means client doesn't care users.
+            tick_hub (TickStreamHub, optional): hub which shares a tick stream with clients of other frames. Defaults to None and the client subscribes trades by itself.
         """
         super().__init__(
             free_margin,
-            "CoinCheck",
+            provider="CoinCheck",
             frame=frame,
             observation_length=observation_length,
             do_render=do_render,
@@ -124,41 +77,10 @@ class CoinCheckClient(ClientBase):
 
         # Initialize required params
         current_time = datetime.datetime.now(tz=datetime.timezone.utc)
-        if self.frame < Frame.H1:
-            additional_mins = current_time.minute % self.frame
-            delta = datetime.timedelta(minutes=additional_mins, seconds=current_time.second, microseconds=current_time.microsecond)
-            self.current_frame = current_time - delta
-            self.frame_delta = datetime.timedelta(minutes=self.frame)
-        elif self.frame < Frame.D1:
-            additional_hours = current_time.hour % (self.frame / 60)
-            delta = datetime.timedelta(
-                hours=additional_hours,
-                minutes=current_time.minute,
-                seconds=current_time.second,
-                microseconds=current_time.microsecond,
-            )
-            self.current_frame = current_time - delta
-            self.frame_delta = datetime.timedelta(hours=self.frame / 60)
-        elif self.frame < Frame.MO1:
-            additional_days = current_time.day % (self.frame / (60 * 24))
-            delta = datetime.timedelta(
-                days=additional_days,
-                hours=current_time.hour,
-                minutes=current_time.minute,
-                seconds=current_time.second,
-                microseconds=current_time.microsecond,
-            )
-            self.current_frame = current_time - delta
-            self.frame_delta = datetime.timedelta(days=self.frame / (60 * 24))
-        else:  # Frame.MO1
-            self.current_frame = datetime.datetime(year=current_time.year, month=current_time.month, day=1, tzinfo=datetime.timezone.utc)
-            self.frame_delta = None
+        self.current_frame = get_frame_start(current_time, self.frame)
         self.__return_intermidiate_data = return_intermidiate_data
-        self.next_frame = self.current_frame
-        self.__update_next_frame()
-        # self.last_tick = None
-        self.frame_ohlcv = None
-        self.data = pd.DataFrame({})
+        frame_ohlcv = None
+        data = pd.DataFrame({})
         self.time_column_name = "time"
         self.simulation = simulation
 
@@ -169,7 +91,7 @@ class CoinCheckClient(ClientBase):
                 self._symbols = initialized_with.symbols
             if initialized_with.frame != frame:
                 raise ValueError("initialize client and frame should be same.")
-            self.data = initialized_with.get_ohlc()
+            data = initialized_with.get_ohlc()
             # update columns name with cc policy
             ohlc_dict = initialized_with.get_ohlc_columns()
             new_column_dict = {
@@ -180,54 +102,54 @@ class CoinCheckClient(ClientBase):
             }
             if "Volume" in ohlc_dict:
                 new_column_dict.update({ohlc_dict["Volume"]: "volume"})
-            self.data.rename(columns=new_column_dict)
+            data = data.rename(columns=new_column_dict)
 
             if "Time" in ohlc_dict:
-                self.data = self.data.set_index(ohlc_dict["Time"])
-                self.data.index.name = self.time_column_name
+                data = data.set_index(ohlc_dict["Time"])
+                data.index.name = self.time_column_name
 
                 # check type of time column. If str, convert it to pd.datetime
-                if type(self.data.iloc[-1].index) is str:
+                if type(data.iloc[-1].index) is str:
                     try:
-                        self.data.index = pd.to_datetime(self.data.index, utc=True)
+                        data.index = pd.to_datetime(data.index, utc=True)
                     except Exception:
                         logger.error("can't convert str to datetime")
 
             # convert timezone
-            if self.data.index[-1].tzinfo != "UTC":
+            if data.index[-1].tzinfo != "UTC":
                 # convert them to UTC
                 try:
-                    self.data.index = self.data.index.tz_convert("UTC")
+                    data.index = data.index.tz_convert("UTC")
                 except Exception:
                     logger.info("can't convert timezone on initialization")
 
             # fit initialization client to current time frame
             last_frame_time = None
             try:
-                last_frame_time = self.data.index[-1].to_pydatetime()
+                last_frame_time = data.index[-1].to_pydatetime()
             except Exception:
                 logger.error("can't find time column or index. ignore time.")
             if last_frame_time is not None:
                 # If last_frame_time equal to currenet_frame, set it as frame_ohlc. Then remove last ohlc
                 if last_frame_time == self.current_frame:
                     logger.info("initialize client returned current time frame data. try to merge it with tick data obtained from coincheck.")
-                    self.frame_ohlcv = self.data.iloc[-1:]  # store last tick df
-                    self.data = self.data.drop([self.data.index[-1]])
+                    frame_ohlcv = data.iloc[-1:]  # store last tick df
+                    data = data.drop([data.index[-1]])
                 # If last_frame_time is greater than current_time, assuming server time and client time are mismatching. so convert(reduce) server datetime
                 elif last_frame_time > self.current_frame:
                     logger.info(
                         f"initialize client returns {last_frame_time} as last frame. But current frame based on device time is {self.current_frame}. Try to fit server time to device time."
                     )
                     delta = last_frame_time - self.current_frame
-                    self.data.index = (
-                        self.data.index - delta - datetime.timedelta(minutes=self.frame)
+                    data.index = (
+                        data.index - delta - datetime.timedelta(minutes=self.frame)
                     )  # Not sure last tick is actually on time. So put it on 1 frame before
-                    if self.data.index[-1].to_pydatetime() == self.current_frame:
-                        self.frame_ohlcv = self.data.iloc[-1:]
-                        self.data = self.data.drop([self.data.index[-1]])
+                    if data.index[-1].to_pydatetime() == self.current_frame:
+                        frame_ohlcv = data.iloc[-1:]
+                        data = data.drop([data.index[-1]])
                     else:
                         logger.error(
-                            f"Unexpectedly time isn't fitted. last frame time is {self.data.index[-1]} and current time frame is {self.current_frame}"
+                            f"Unexpectedly time isn't fitted. last frame time is {data.index[-1]} and current time frame is {self.current_frame}"
                         )
                         exit()  # exit to prevent caliculating indicaters based on bad data
                 # When last_frame_time is less than current_Time, if difference is just a frame ignore it otherwise assuming server time and client time are mismatching. so convert(reduce) server datetime
@@ -241,39 +163,58 @@ class CoinCheckClient(ClientBase):
                         fitting_time = delta - datetime.timedelta(
                             minutes=self.frame
                         )  # Not sure last tick is actually on time. So put it on 1 frame before
-                        self.data.index = self.data.index + fitting_time
+                        data.index = data.index + fitting_time
                     else:
                         logger.info(f"initialize client retuened {last_frame_time} for latest frame data. It is working as expected.")
-                if self.frame_ohlcv is not None and "volume" not in self.frame_ohlcv.columns:
-                    self.frame_ohlcv["volume"] = 0
-
-        th = TradeHistory()
-        th.subscribe(on_tick=self.__store_ticks)
+                if frame_ohlcv is not None and "volume" not in frame_ohlcv.columns:
+                    frame_ohlcv["volume"] = 0
+
+        self.__aggregator = TickAggregator(self.current_frame, self.__get_next_frame, index_name=self.time_column_name)
+        self.__aggregator.extend(data)
+        if frame_ohlcv is not None:
+            bar = frame_ohlcv.iloc[-1]
+            self.__aggregator.set_current(self.current_frame, bar["open"], bar["high"], bar["low"], bar["close"], bar["volume"])
+        self.__store = IncrementalCSVStore(get_file_path(self.provider, f"CC_BTC_{self.frame}.csv"), self.time_column_name)
+        self.__persisted = 0
+
+        if tick_hub is None:
+            th = TradeHistory()
+            th.subscribe(on_tick=self.__store_ticks)
+        else:
+            tick_hub.register(self.frame, aggregator=self.__aggregator)
 
     # TODO: use cctx
 
     def get_additional_params(self):
         return {}
 
-    def _get_ohlc_from_client(self, length: int = None, symbols: list = None, columns=None, frame: int = None, index=None, grouped_by_symbol=True):
+    @property
+    def data(self) -> pd.DataFrame:
+        return self.__aggregator.to_frame()
+
+    @property
+    def frame_ohlcv(self) -> pd.DataFrame:
+        return self.__aggregator.current()
+
+    def __persist(self):
+        """append bars finished after the last call to the csv file"""
         try:
-            write_df_to_csv(self.data, self.provider, f"CC_BTC_{self.frame}.csv")
+            new_bars, position = self.__aggregator.new_bars(self.__persisted)
+            self.__store.append(new_bars)
+            self.__persisted = position
         except Exception as e:
             logger.error(e)
+
+    def _get_ohlc_from_client(self, length: int = None, symbols: list = None, columns=None, frame: int = None, index=None, grouped_by_symbol=True):
+        self.__persist()
         if length is None:
             if index is None:
-                if self.__return_intermidiate_data:
-                    return pd.concat([self.data, self.frame_ohlcv])
-                else:
-                    return self.data.copy()
+                return self.__aggregator.to_frame(include_current=self.__return_intermidiate_data)
             else:
                 return self.data.iloc[:index]
         elif length > 0:
             if index is None:
-                if self.__return_intermidiate_data:
-                    return pd.concat([self.data, self.frame_ohlcv]).iloc[-length:]
-                else:
-                    return self.data.iloc[-length:]
+                return self.__aggregator.to_frame(length, include_current=self.__return_intermidiate_data).iloc[-length:]
             else:
                 return self.data.iloc[-length:index]
         else:
@@ -359,7 +300,7 @@ class CoinCheckClient(ClientBase):
         return -1
 
     def __len__(self):
-        return len(self.data)
+        return len(self.__aggregator)
 
     def get_ohlc_columns(self) -> dict:
         return {
@@ -0,0 +1,231 @@
+import asyncio
+import datetime
+import logging
+import threading
+from typing import Callable, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from .aggregator import TickAggregator, get_frame_start, get_next_frame
+
+logger = logging.getLogger(__name__)
+
+
+class TickBatch(NamedTuple):
+    """ticks as arrays. times are UTC timestamps in nanoseconds."""
+
+    times: np.ndarray
+    prices: np.ndarray
+    volumes: np.ndarray
+
+    def __len__(self):
+        return len(self.times)
+
+
+def ticks_to_batch(ticks: list) -> TickBatch:
+    """convert ticks of TradeHistory (list of dict which has time, price and volume) to TickBatch"""
+    times = np.fromiter((pd.Timestamp(tick["time"]).value for tick in ticks), dtype=np.int64, count=len(ticks))
+    prices = np.fromiter((tick["price"] for tick in ticks), dtype=np.float64, count=len(ticks))
+    volumes = np.fromiter((tick["volume"] for tick in ticks), dtype=np.float64, count=len(ticks))
+    return TickBatch(times, prices, volumes)
+
+
+class ReplayTickSource:
+    """tick source which replays recorded ticks. It can be subscribed like TradeHistory."""
+
+    def __init__(self, times, prices, volumes, chunk_size: int = 1000):
+        """
+        Args:
+            times (array like): datetimes or UTC timestamps in nanoseconds of ticks, sorted
+            prices (array like): prices of ticks
+            volumes (array like): volumes of ticks
+            chunk_size (int, optional): number of ticks passed to on_tick at once. Defaults to 1000.
+        """
+        times = np.asarray(times)
+        if not np.issubdtype(times.dtype, np.integer):
+            # naive datetimes are handled as UTC
+            times = pd.DatetimeIndex(times).asi8
+        self.batch = TickBatch(times.astype(np.int64), np.asarray(prices, dtype=np.float64), np.asarray(volumes, dtype=np.float64))
+        self.chunk_size = max(1, chunk_size)
+        self.on_tick = None
+
+    @classmethod
+    def from_ticks(cls, ticks: list, chunk_size: int = 1000):
+        """create a source from ticks recorded from TradeHistory"""
+        return cls(*ticks_to_batch(ticks), chunk_size=chunk_size)
+
+    def __len__(self):
+        return len(self.batch)
+
+    @property
+    def start(self) -> datetime.datetime:
+        """time of the first tick"""
+        return pd.Timestamp(self.batch.times[0], tz="UTC").to_pydatetime(warn=False)
+
+    def subscribe(self, on_tick: Callable, pair="btc_jpy"):
+        self.on_tick = on_tick
+
+    def replay(self) -> int:
+        """pass the recorded ticks to on_tick by chunk
+
+        Returns:
+            int: number of ticks replayed
+        """
+        times, prices, volumes = self.batch
+        for index in range(0, len(times), self.chunk_size):
+            end = index + self.chunk_size
+            self.on_tick(TickBatch(times[index:end], prices[index:end], volumes[index:end]))
+        return len(times)
+
+    def close(self):
+        self.on_tick = None
+
+
+class _FrameStream:
+    def __init__(self, frame: int, aggregator: TickAggregator):
+        self.frame = frame
+        self.aggregator = aggregator
+        self.position = aggregator.total
+        self.callbacks = []
+
+
+class TickStreamHub:
+    """maintain candles of multiple frames from a tick stream.
+
+    Ticks are aggregated incrementally by a TickAggregator of each registered frame. Callbacks are called with (frame, DataFrame of closed bars)
+    when bars of the frame are closed, and bars() returns an async iterator of them.
+    """
+
+    def __init__(self, start: datetime.datetime = None, max_bars: int = None):
+        """
+        Args:
+            start (datetime.datetime, optional): time to align the first bar of frames registered. Defaults to None and current time is used. Specify time of the first tick to replay recorded ticks.
+            max_bars (int, optional): max number of closed bars kept for each frame. Defaults to None and bars are kept without limit.
+        """
+        self.start = start
+        self.max_bars = max_bars
+        self._streams = []
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    @property
+    def frames(self) -> list:
+        return list(dict.fromkeys(stream.frame for stream in self._streams))
+
+    def __find(self, frame: int) -> _FrameStream:
+        for stream in self._streams:
+            if stream.frame == frame:
+                return stream
+        return None
+
+    def register(self, frame: int, on_bar: Callable = None, aggregator: TickAggregator = None) -> TickAggregator:
+        """start to aggregate ticks for the frame
+
+        Args:
+            frame (int): frame minutes
+            on_bar (Callable[[int, pd.DataFrame], None], optional): called with frame and closed bars. Defaults to None.
+            aggregator (TickAggregator, optional): aggregator which already has bars, e.g. of CoinCheckClient. Defaults to None and the aggregator of the frame is used or created.
+
+        Returns:
+            TickAggregator: aggregator of the frame
+        """
+        with self._lock:
+            stream = None if aggregator is not None else self.__find(frame)
+            if stream is None:
+                if aggregator is None:
+                    start = self.start if self.start is not None else datetime.datetime.now(tz=datetime.timezone.utc)
+                    aggregator = TickAggregator(get_frame_start(start, frame), lambda frame_time: get_next_frame(frame_time, frame), max_bars=self.max_bars)
+                stream = _FrameStream(frame, aggregator)
+                self._streams.append(stream)
+            if on_bar is not None:
+                stream.callbacks.append(on_bar)
+            return stream.aggregator
+
+    def subscribe(self, on_bar: Callable, frames: list = None):
+        """call on_bar with (frame, closed bars) when bars of frames are closed. all frames when frames is None."""
+        with self._lock:
+            self._subscribers.append((on_bar, None if frames is None else set(frames)))
+
+    def unsubscribe(self, on_bar: Callable):
+        with self._lock:
+            self._subscribers = [subscriber for subscriber in self._subscribers if subscriber[0] is not on_bar]
+            for stream in self._streams:
+                stream.callbacks = [callback for callback in stream.callbacks if callback is not on_bar]
+
+    def bars(self, frames: list = None) -> "BarStream":
+        """return an async iterator of (frame, closed bars). It should be created on the event loop."""
+        return BarStream(self, frames)
+
+    def attach(self, source, pair="btc_jpy"):
+        """subscribe ticks of a source like TradeHistory or ReplayTickSource"""
+        source.subscribe(on_tick=self.add_ticks, pair=pair)
+
+    def add_ticks(self, ticks) -> dict:
+        """update candles of all frames
+
+        Args:
+            ticks (list[dict] | TickBatch): ticks of TradeHistory or TickBatch
+
+        Returns:
+            dict[int, int]: number of bars closed by frame
+        """
+        if ticks is None:
+            return {}
+        batch = ticks if isinstance(ticks, TickBatch) else ticks_to_batch(ticks)
+        if len(batch) == 0:
+            return {}
+        closed = {}
+        for stream in self._streams:
+            finished = stream.aggregator.add_arrays(batch.times, batch.prices, batch.volumes)
+            if finished > 0:
+                closed[stream.frame] = closed.get(stream.frame, 0) + finished
+                self.__notify(stream)
+        return closed
+
+    def __notify(self, stream: _FrameStream):
+        callbacks = list(stream.callbacks)
+        callbacks.extend(on_bar for on_bar, frames in self._subscribers if frames is None or stream.frame in frames)
+        if len(callbacks) == 0:
+            stream.position = stream.aggregator.total
+            return
+        bars, stream.position = stream.aggregator.new_bars(stream.position)
+        for callback in callbacks:
+            try:
+                callback(stream.frame, bars)
+            except Exception:
+                logger.exception(f"failed to handle bars of {stream.frame}")
+
+    def get_ohlc(self, frame: int, length: int = None, include_current: bool = False) -> pd.DataFrame:
+        """return closed bars of the frame"""
+        stream = self.__find(frame)
+        if stream is None:
+            raise ValueError(f"{frame} is not registered")
+        return stream.aggregator.to_frame(length, include_current=include_current)
+
+
+class BarStream:
+    """async iterator of (frame, closed bars) of a TickStreamHub. Ticks can be added from other threads."""
+
+    def __init__(self, hub: TickStreamHub, frames: list = None):
+        self._hub = hub
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        hub.subscribe(self._on_bar, frames)
+
+    def _on_bar(self, frame: int, bars: pd.DataFrame):
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, (frame, bars))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        item = await self._queue.get()
+        if item is None:
+            raise StopAsyncIteration
+        return item
+
+    def close(self):
+        """stop the iteration after bars received until now"""
+        self._hub.unsubscribe(self._on_bar)
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, None)
@@ -0,0 +1,204 @@
+import hashlib
+import json
+import logging
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:
+    pyarrow = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 2
+CACHE_DIR_NAME = ".fc_cache"
+_METADATA_KEY = b"finance_client"
+_ATTRS_KEY = b"finance_client_attrs"
+
+
+def is_available() -> bool:
+    return pyarrow is not None
+
+
+def _normalize_kwargs(read_kwargs: dict) -> dict:
+    """convert read_csv kwargs to json serializable values. chunksize is ignored as it doesn't change the content."""
+    normalized = {}
+    for key, value in read_kwargs.items():
+        if key == "chunksize":
+            continue
+        if isinstance(value, range):
+            value = [value.start, value.stop, value.step]
+        elif isinstance(value, (set, frozenset)):
+            value = sorted([str(item) for item in value])
+        elif isinstance(value, (list, tuple)):
+            value = [str(item) for item in value]
+        elif value is not None and not isinstance(value, (bool, int, float, str)):
+            value = str(value)
+        normalized[key] = value
+    return normalized
+
+
+class ChunkReader:
+    """TextFileReader like reader to get chunks of cached parquet file"""
+
+    def __init__(self, file: str, chunksize: int):
+        self.parquet_file = pq.ParquetFile(file)
+        self._batches = self.parquet_file.iter_batches(batch_size=chunksize)
+
+    def get_chunk(self, size=None) -> pd.DataFrame:
+        batch = next(self._batches)
+        return pyarrow.Table.from_batches([batch], schema=self.parquet_file.schema_arrow).to_pandas()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.get_chunk()
+
+    def close(self):
+        self.parquet_file.close()
+
+
+class CSVFrameCache:
+    """Parquet cache of parsed CSV files.
+
+    A cache entry is identified by the csv path, read_csv kwargs and the normalize function, and it is valid while mtime and size of the csv are unchanged.
+    Frames are stored after normalize is applied, so that loading from the cache skips it. attrs of the frame are stored as well.
+    """
+
+    def __init__(self, cache_dir: str = None):
+        """
+        Args:
+            cache_dir (str, optional): directory to store cache files. Defaults to None and `.fc_cache` next to each csv file is used.
+        """
+        self.cache_dir = cache_dir
+
+    def get_cache_path(self, file: str, read_kwargs: dict, normalize=None) -> str:
+        file = os.path.abspath(file)
+        normalize_name = None if normalize is None else getattr(normalize, "__qualname__", str(normalize))
+        key = json.dumps(
+            {"file": file, "kwargs": _normalize_kwargs(read_kwargs), "normalize": normalize_name, "version": CACHE_VERSION}, sort_keys=True
+        )
+        file_name = f"{os.path.splitext(os.path.basename(file))[0]}_{hashlib.sha1(key.encode()).hexdigest()[:16]}.parquet"
+        if self.cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(file), CACHE_DIR_NAME)
+        else:
+            cache_dir = self.cache_dir
+        return os.path.join(cache_dir, file_name)
+
+    @staticmethod
+    def _get_source_info(file: str) -> dict:
+        stat = os.stat(file)
+        return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "version": CACHE_VERSION}
+
+    @staticmethod
+    def _read_metadata(cache_path: str) -> dict:
+        if not os.path.exists(cache_path):
+            return None
+        try:
+            return pq.read_schema(cache_path).metadata or {}
+        except Exception:
+            logger.warning(f"failed to read cache schema of {cache_path}. cache is ignored.")
+            return None
+
+    @staticmethod
+    def _is_valid(metadata: dict, source_info: dict) -> bool:
+        if metadata is None or _METADATA_KEY not in metadata:
+            return False
+        return json.loads(metadata[_METADATA_KEY]) == source_info
+
+    @staticmethod
+    def _to_table(df: pd.DataFrame):
+        table = pyarrow.Table.from_pandas(df, preserve_index=True)
+        if len(df.attrs) > 0:
+            metadata = dict(table.schema.metadata or {})
+            metadata[_ATTRS_KEY] = json.dumps(df.attrs).encode()
+            table = table.replace_schema_metadata(metadata)
+        return table
+
+    def _write(self, cache_path: str, source_info: dict, tables):
+        """write tables to cache_path. Write to temporal file then replace it to avoid other processes read a partial file."""
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        writer = None
+        try:
+            for table in tables:
+                if writer is None:
+                    metadata = dict(table.schema.metadata or {})
+                    metadata[_METADATA_KEY] = json.dumps(source_info).encode()
+                    schema = table.schema.with_metadata(metadata)
+                    writer = pq.ParquetWriter(temp_path, schema)
+                writer.write_table(table.cast(schema))
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            return False
+        os.replace(temp_path, cache_path)
+        return True
+
+    def read_csv(self, file: str, normalize=None, **read_kwargs):
+        """read csv through the cache. Arguments are same as pd.read_csv. If chunksize is specified, TextFileReader like reader is returned.
+
+        Args:
+            file (str): path of the csv file
+            normalize (Callable[[pd.DataFrame], pd.DataFrame], optional): function applied to the frame (or each chunk) before it is cached, e.g.
+                a method of the client which converts the index. Defaults to None and frames are cached as read_csv returns.
+        """
+        if pyarrow is None:
+            return self.__read_csv(file, normalize, read_kwargs)
+        file = os.path.abspath(file)
+        cache_path = self.get_cache_path(file, read_kwargs, normalize)
+        source_info = self._get_source_info(file)
+        chunksize = read_kwargs.get("chunksize")
+        metadata = self._read_metadata(cache_path)
+        if self._is_valid(metadata, source_info):
+            try:
+                if chunksize is None:
+                    df = pd.read_parquet(cache_path)
+                    if _ATTRS_KEY in metadata:
+                        df.attrs.update(json.loads(metadata[_ATTRS_KEY]))
+                    return df
+                return ChunkReader(cache_path, chunksize)
+            except Exception:
+                logger.exception(f"failed to read cache {cache_path}. read csv instead.")
+                return self.__read_csv(file, normalize, read_kwargs)
+
+        if chunksize is None:
+            df = self.__read_csv(file, normalize, read_kwargs)
+            self._try_write(file, cache_path, source_info, lambda: [self._to_table(df)])
+            return df
+
+        def create_tables():
+            # stream chunks to parquet so that memory usage is limited to a chunk
+            with pd.read_csv(file, **read_kwargs) as reader:
+                for chunk in reader:
+                    if normalize is not None:
+                        chunk = normalize(chunk)
+                    yield pyarrow.Table.from_pandas(chunk, preserve_index=True)
+
+        if self._try_write(file, cache_path, source_info, create_tables):
+            return ChunkReader(cache_path, chunksize)
+        return pd.read_csv(file, **read_kwargs)
+
+    @staticmethod
+    def __read_csv(file: str, normalize, read_kwargs: dict):
+        if read_kwargs.get("chunksize") is not None or normalize is None:
+            return pd.read_csv(file, **read_kwargs)
+        return normalize(pd.read_csv(file, **read_kwargs))
+
+    def _try_write(self, file, cache_path, source_info, create_tables) -> bool:
+        try:
+            return self._write(cache_path, source_info, create_tables())
+        except (OSError, pyarrow.ArrowException) as e:
+            logger.warning(f"failed to create cache of {file}: {e}")
+        except Exception:
+            logger.exception(f"failed to create cache of {file}")
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False
@@ -9,12 +9,19 @@ from abc import ABCMeta, abstractmethod
 
 import numpy
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 
 import finance_client.frames as Frame
 from finance_client.client_base import ClientBase
 from finance_client.config import AccountRiskConfig
 from finance_client.config.model import SymbolRiskConfig
 from finance_client.risk_manager.risk_options.risk_option import RiskOption
+from finance_client.rolling import FIRST, LAST, MAX, MIN, SUM, RolledOHLC
+
+from .cache import CSVFrameCache
+from .cache import is_available as is_file_cache_available
+from .shared_store import SharedOHLCStore
+from .stream import RingBuffer, SymbolStream
 
 logger = logging.getLogger(__name__)
 
@@ -40,8 +47,16 @@ class CSVClientBase(ClientBase, metaclass=ABCMeta):
                 temp_columns["Close"] = column
             elif "time" in column_:  # assume time, timestamp or datetime
                 temp_columns["Time"] = column
+            elif "volume" in column_ and "Volume" not in temp_columns:
+                # use the first one when there are multiple volumes (e.g. tick_volume and real_volume of MT5)
+                temp_columns["Volume"] = column
         self.ohlc_columns.update(temp_columns)
 
+    def _roll_ohlc_data(self, data: pd.DataFrame, frame: int) -> pd.DataFrame:
+        """roll data grouped by symbol to frame. Volume is summed if the column exists."""
+        volume = "Volume" if "Volume" in self.get_ohlc_columns() else None
+        return self.roll_ohlc_data(data, frame, grouped_by_symbol=True, Volume=volume)
+
     def _initialize_file_name_func(self, file_names: list):
         def has_strings(file_name: str, strs_list):
             if len(strs_list) > 0:
@@ -100,19 +115,17 @@ class CSVClientBase(ClientBase, metaclass=ABCMeta):
                 else:
                     logger.debug("file_name_generator is not initialized automatically as it is specified manually.")
 
-    def _initialize_date_index(self, data: pd.DataFrame, ascending: bool):
-        data = data.sort_index(ascending=ascending)
-
-        if ascending:
-            delta = data.index[1:] - data.index[:-1]
-        else:
-            delta = (data.index[:-1] - data.index[1:]).to_series().mode()
-        df = delta.to_series()
-        delta = df.mode().values[0]
+    @staticmethod
+    def _infer_frame(index: pd.DatetimeIndex) -> float:
+        delta = (index[1:] - index[:-1]).to_series().mode().values[0]
         delta = delta / numpy.timedelta64(1, "s")
-        delta = delta / 60
+        return abs(delta / 60)
+
+    def _initialize_date_index(self, data: pd.DataFrame, ascending: bool, frame: float = None):
+        data = data.sort_index(ascending=ascending)
 
-        frame = delta
+        if frame is None:
+            frame = self._infer_frame(data.index)
 
         if self.frame is None:
             self.frame = frame
@@ -161,7 +174,28 @@ class CSVClientBase(ClientBase, metaclass=ABCMeta):
             kwargs["skiprows"] = range(1, skiprows + 1)
         return kwargs
 
-    def _create_dfs_by_files(self, files, symbols, kwargs):
+    def _normalize_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """sort df read from a file by datetime index, localize it to UTC and store the frame in attrs. df is returned as is if index is not datetime."""
+        if not isinstance(df.index, pd.DatetimeIndex):
+            if df.index.dtype != object or len(df) == 0:
+                return df
+            for format in (None, "ISO8601", "mixed"):
+                try:
+                    df.index = pd.to_datetime(df.index, utc=True, format=format)
+                    break
+                except Exception:
+                    continue
+            else:
+                return df
+        df = df.sort_index(ascending=True)
+        if len(df) > 1:
+            frame = self._infer_frame(df.index)
+            df.attrs["frame"] = float(frame)
+            if frame < Frame.D1 and df.index.tzinfo is None:
+                df.index = df.index.tz_localize("UTC")
+        return df
+
+    def _create_dfs_by_files(self, files, symbols, kwargs, normalize=None):
         __symbols = []
         DFS = {}
         handled_files = set(self.files)
@@ -173,7 +207,13 @@ class CSVClientBase(ClientBase, metaclass=ABCMeta):
             else:
                 symbol = self._get_symbol_from_filename(file)
             try:
-                df = pd.read_csv(file, header=0, **kwargs)
+                if self._file_cache is None:
+                    df = pd.read_csv(file, header=0, **kwargs)
+                    if normalize is not None and kwargs.get("chunksize") is None:
+                        df = normalize(df)
+                else:
+                    # normalized frames are cached so that they are not sorted and converted again
+                    df = self._file_cache.read_csv(file, normalize=normalize, header=0, **kwargs)
                 handled_files.add(file)
                 __symbols.append(symbol)
                 DFS[symbol] = df
@@ -308,7 +348,11 @@ class CSVClientBase(ClientBase, metaclass=ABCMeta):
         enable_trade_log=False,
         risk_option: RiskOption = None,
         account_risk_config: AccountRiskConfig = None,
-        symbol_risk_config: str | SymbolRiskConfig = None
+        symbol_risk_config: str | SymbolRiskConfig = None,
+        copy_batch: bool = False,
+        file_cache: bool = False,
+        file_cache_dir: str = None,
+        shared_store: str | SharedOHLCStore = None,
     ):
         """CSV Client Base
         Need to change codes to use settings file
@@ -342,11 +386,26 @@ class CSVClientBase(ClientBase, metaclass=ABCMeta):
             symbol_risk_config=symbol_risk_config
         )
         random.seed(seed)
+        if file_cache and is_file_cache_available():
+            self._file_cache = CSVFrameCache(file_cache_dir)
+        else:
+            if file_cache:
+                logger.debug("pyarrow is not available. csv files are parsed without cache.")
+            self._file_cache = None
+        if isinstance(shared_store, str):
+            shared_store = SharedOHLCStore(shared_store)
+        self._shared_store = shared_store
         self.data = None
         self.files = []
         self.ohlc_columns = {}
         self.auto_step_index = auto_step_index
         self.keep_observation_length = keep_observation_length
+        self.copy_batch = copy_batch
+        self._batch_values_cache = {}
+        # (symbols, frame): (data, RolledOHLC)
+        self._rolled_rates_cache = {}
+        self._batch_indices_cache = None
+        self._price_cache = None
         slip_type = slip_type.lower()
         if slip_type in self.available_slip_type:
             if slip_type == "percent" or slip_type == "pct":
@@ -377,6 +436,10 @@ class CSVClientBase(ClientBase, metaclass=ABCMeta):
             "skiprows": skiprows,
             "slip_type": slip_type,
             "seed": seed,
+            "copy_batch": copy_batch,
+            "file_cache": file_cache,
+            "file_cache_dir": file_cache_dir,
+            "shared_store": shared_store.path if shared_store is not None else None,
         }
 
         self.file_name_generator = file_name_generator
@@ -406,7 +469,21 @@ class CSVClientBase(ClientBase, metaclass=ABCMeta):
         else:
             self._step_index = 1
 
-        if len(files) > 0:
+        if self._shared_store is not None:
+            # self.data is built from the store lazily
+            self._symbols = self._shared_store.symbols
+            if isinstance(self._shared_store.columns, pd.MultiIndex):
+                self._update_columns(self._shared_store.columns.get_level_values(1).unique())
+            else:
+                self._update_columns(self._shared_store.columns)
+            if self._shared_store.frame is not None:
+                self.frame = self._shared_store.frame
+            self._proceed_step_until_date(self.data, start_date)
+            if _index_update_required:
+                self._step_index = len(self) + start_index  # assume negative value is specified
+            elif start_random_index:
+                self._step_index = random.randint(1, len(self))
+        elif len(files) > 0:
             if type(files) == str:
                 self.files = [os.path.abspath(files)]
             else:
@@ -428,6 +505,29 @@ class CSVClientBase(ClientBase, metaclass=ABCMeta):
         if self._step_index > len(self):
             logger.warning(f"step index {self._step_index} is greater than data length {len(self)}")
 
+    @property
+    def data(self) -> pd.DataFrame:
+        data = getattr(self, "_data", None)
+        if data is None and getattr(self, "_shared_store", None) is not None:
+            data = self._data = self._shared_store.to_frame()
+        return data
+
+    @data.setter
+    def data(self, value: pd.DataFrame):
+        self._data = value
+
+    def to_shared_store(self, path: str, dtype=numpy.float64) -> SharedOHLCStore:
+        """write self.data to a memory mapped store so that other clients can attach it by shared_store=path.
+
+        Args:
+            path (str): directory to write the store
+            dtype (optional): dtype of the stored values. Defaults to numpy.float64.
+
+        Returns:
+            SharedOHLCStore: store attached to the written files
+        """
+        return SharedOHLCStore.create(path, self.data, dtype=dtype, frame=self.frame)
+
     def get_current_index(self):
         return self._step_index
 
@@ -501,30 +601,86 @@ class CSVClientBase(ClientBase, metaclass=ABCMeta):
     def reset(self, mode: str = None, retry=0):
         pass
 
+    def _get_batch_values(self, columns=None) -> numpy.ndarray:
+        """return self.data (or selected columns of it) as one contiguous array. The array is cached until self.data is replaced."""
+        if isinstance(columns, list):
+            columns_key = tuple(columns)
+        else:
+            columns_key = columns
+        cache = self._batch_values_cache.get(columns_key)
+        if cache is not None and cache[0] is self.data:
+            return cache[1]
+        values = self._to_batch_values(self.data, columns)
+        self._batch_values_cache[columns_key] = (self.data, values)
+        return values
+
+    @staticmethod
+    def _to_batch_values(data: pd.DataFrame, columns=None) -> numpy.ndarray:
+        """return data (or selected columns of it) as one contiguous 2d array"""
+        if columns is None:
+            df = data
+        elif isinstance(data.columns, pd.MultiIndex):
+            df = data.swaplevel(0, 1, axis=1)[columns]
+        else:
+            df = data[columns]
+        try:
+            values = df.to_numpy(dtype=numpy.float64)
+        except (TypeError, ValueError):
+            values = df.to_numpy()
+        values = numpy.ascontiguousarray(values)
+        if values.ndim == 1:
+            values = values.reshape(-1, 1)
+        return values
+
+    def _get_batch_indices(self) -> numpy.ndarray:
+        indices = self.indices
+        if self._batch_indices_cache is None or self._batch_indices_cache[0] is not indices:
+            self._batch_indices_cache = (indices, numpy.asarray(indices, dtype=numpy.int64))
+        return self._batch_indices_cache[1]
+
+    def get_batch(self, batch_idx, columns=None, copy: bool = None) -> numpy.ndarray:
+        """get observations ending at self.indices[batch_idx] as (batch_size, observation_length, feature_size) array.
+
+        Windows are served as views of a sliding window over one contiguous array. Consecutive slices return a view without copy,
+        other index lists are gathered with a single fancy index.
+
+        Args:
+            batch_idx (int | slice | list[int] | numpy.ndarray): index of self.indices
+            columns (str | list, optional): column names to select from each symbol. Defaults to None and all columns are returned.
+            copy (bool, optional): return writable copy instead of read-only view. Defaults to None and copy_batch of the client is used.
+
+        Returns:
+            numpy.ndarray: (batch_size, observation_length, feature_size). (observation_length, feature_size) if batch_idx is int.
+        """
+        if self.observation_length is None:
+            raise ValueError("observation_length should be specified to get batch data.")
+        if copy is None:
+            copy = self.copy_batch
+        length = self.observation_length
+        values = self._get_batch_values(columns)
+        # (len(values) - length + 1, feature_size, length) -> (len(values) - length + 1, length, feature_size)
+        windows = numpy.moveaxis(sliding_window_view(values, length, axis=0), -1, 1)
+
+        starts = self._get_batch_indices()[batch_idx] - length
+        if isinstance(starts, numpy.ndarray) and starts.ndim > 0:
+            if isinstance(batch_idx, slice) and batch_idx.step in (None, 1) and len(starts) > 0 and starts[-1] - starts[0] == len(starts) - 1:
+                chunk_data = windows[starts[0] : starts[-1] + 1]
+            else:
+                chunk_data = windows[starts]
+        else:
+            chunk_data = windows[starts]
+        if copy and numpy.may_share_memory(chunk_data, values):
+            chunk_data = chunk_data.copy()
+        return chunk_data
+
     def __getitem__(self, batch_idx):
         if type(batch_idx) is tuple:
             idx = batch_idx[0]
             columns = batch_idx[1]
-            if columns is None:
-                df = self.data
-            else:
-                self.data.columns = self.data.columns.swaplevel(0, 1)
-                df = self.data[columns]
-                self.data.columns = self.data.columns.swaplevel(0, 1)
         else:
-            df = self.data
             idx = batch_idx
-
-        chunk_data = numpy.array([])
-        item = numpy.array([])
-        chunk_size = 0
-
-        for index in self.indices[idx]:
-            item = df.iloc[index - self.observation_length : index].values
-            chunk_size += 1
-            chunk_data = numpy.append(chunk_data, item)
-        chunk_data = chunk_data.reshape(chunk_size, *item.shape)
-        return chunk_data
+            columns = None
+        return self.get_batch(idx, columns)
 
 
 class CSVClient(CSVClientBase):
@@ -557,7 +713,11 @@ class CSVClient(CSVClientBase):
         user_name:str = None,
         risk_option: RiskOption = None,
         account_risk_config: AccountRiskConfig = None,
-        symbol_risk_config: str | SymbolRiskConfig = None
+        symbol_risk_config: str | SymbolRiskConfig = None,
+        copy_batch: bool = False,
+        file_cache: bool = False,
+        file_cache_dir: str = None,
+        shared_store: str | SharedOHLCStore = None,
     ):
         """CSV Client for time series data like bitcoin, stock, finance
 
@@ -588,6 +748,10 @@ class CSVClient(CSVClientBase):
             risk_option (RiskOption, optional): risk option to manage risk. Defaults to None.
             account_risk_config (AccountRiskConfig, optional): account risk config to manage risk. Defaults to None.
             symbol_risk_config (str | SymbolRiskConfig, optional): symbol risk config to manage risk. It can be file path or SymbolRiskConfig object. Defaults to None.
+            copy_batch (bool, optional): If true, __getitem__ returns writable copies instead of read-only views of the data. Defaults to False.
+            file_cache (bool, optional): If true and pyarrow is available, parsed csv files are cached as parquet after they are sorted and localized, and reused while the csv is unchanged. Defaults to False.
+            file_cache_dir (str, optional): directory to store the parquet cache. Defaults to None and `.fc_cache` next to each csv file is used.
+            shared_store (str | SharedOHLCStore, optional): memory mapped store created by to_shared_store. If specified, files are not read and data is a read-only view of the store shared with other processes. Defaults to None.
         """
         super().__init__(
             files=files,
@@ -618,16 +782,22 @@ class CSVClient(CSVClientBase):
             enable_trade_log=enable_trade_log,
             risk_option=risk_option,
             account_risk_config=account_risk_config,
-            symbol_risk_config=symbol_risk_config
+            symbol_risk_config=symbol_risk_config,
+            copy_batch=copy_batch,
+            file_cache=file_cache,
+            file_cache_dir=file_cache_dir,
+            shared_store=shared_store,
         )
         if out_frame is not None:
             if self.frame < out_frame:
                 # Rolled result has NaN regardless market is open or not.
-                self.data = self.roll_ohlc_data(self.data, out_frame, grouped_by_symbol=True)
+                self.data = self._roll_ohlc_data(self.data, out_frame)
                 self.data.dropna(thresh=len(self.data.columns), inplace=True)
                 self.frame = out_frame
         if self.data is not None and len(self.data) > 0:
-            self.data = self.run_processes(self.data, self._symbols, [], pre_process, True)
+            # run_processes copies data, so skip it when there is nothing to apply
+            if pre_process is not None and len(pre_process) > 0:
+                self.data = self.run_processes(self.data, self._symbols, [], pre_process, True)
             self.pre_process = []
 
     def _read_csv(self, files, symbols=None, columns=None, date_col=None, skiprows=None, start_date=None, frame=None):
@@ -645,7 +815,9 @@ class CSVClient(CSVClientBase):
         kwargs = self._create_csv_kwargs(columns, date_col, skiprows, is_multi_mode)
 
         # read csvs by pandas feature
-        DFS, __symbols = self._create_dfs_by_files(files, symbols, kwargs)
+        DFS, __symbols = self._create_dfs_by_files(files, symbols, kwargs, self._normalize_frame)
+        # frame inferred for each file. it is inferred again from concatenated index if files have different frames
+        frames = {df.attrs.get("frame") for df in DFS.values()}
         data = pd.concat(DFS.values(), axis=1, keys=DFS.keys())
         is_date_index = isinstance(data.index, pd.DatetimeIndex)
 
@@ -691,7 +863,7 @@ class CSVClient(CSVClientBase):
             else:
                 logger.error("Couldn't daterming date column")
         if len(data) > 0 and is_date_index is True:
-            data = self._initialize_date_index(data, True)
+            data = self._initialize_date_index(data, True, frames.pop() if len(frames) == 1 else None)
             self._proceed_step_until_date(data, start_date)
         # read csv is called with different columns when get_ohlc is called with different symbols, so marge managing symbols
         return data, __symbols
@@ -715,11 +887,42 @@ class CSVClient(CSVClientBase):
             return __symbols, data
         return target_symbols, pd.DataFrame()
 
+    def _get_rolled_rates(self, symbols, frame: int) -> RolledOHLC:
+        """return OHLC of symbols rolled to frame. Rolled data is cached until self.data is replaced. None is returned if data can't be rolled by the cache."""
+        key = (tuple(symbols) if isinstance(symbols, list) else symbols, frame)
+        cache = self._rolled_rates_cache.get(key)
+        if cache is not None and cache[0] is self.data:
+            return cache[1]
+        ohlc_columns = self.get_ohlc_columns()
+        aggregations = {}
+        for key_column, aggregation in (("Open", FIRST), ("High", MAX), ("Low", MIN), ("Close", LAST), ("Volume", SUM)):
+            if key_column in ohlc_columns:
+                aggregations[ohlc_columns[key_column]] = aggregation
+        if isinstance(symbols, list) and len(symbols) == 0:
+            data = self.data
+        else:
+            data = self.data[symbols]
+        try:
+            rolled = RolledOHLC(data, Frame.freq_str[frame], aggregations)
+        except (KeyError, ValueError) as e:
+            logger.debug(f"rolled rates are not cached: {e}")
+            rolled = None
+        self._rolled_rates_cache[key] = (self.data, rolled)
+        return rolled
+
     def __get_rates(self, index, length, symbols, frame, columns):
+        is_rolled = frame is not None and self.frame < frame
         if length is None or length == slice(None):
+            # all symbols are rolled before a symbol is selected
+            rolled = self._get_rolled_rates([symbols] if isinstance(symbols, str) else symbols, frame) if is_rolled else None
+            if rolled is not None:
+                rates = rolled.get(index)
+                if isinstance(symbols, str):
+                    rates = rates[symbols]
+                return rates if columns is None else rates[columns]
             rates = self.data
-            if frame is not None and self.frame < frame:
-                rates = self.roll_ohlc_data(rates, frame, grouped_by_symbol=True)
+            if is_rolled:
+                rates = self._roll_ohlc_data(rates, frame)
             if len(symbols) > 0:
                 rates = rates[symbols]
             if columns is None:
@@ -727,9 +930,14 @@ class CSVClient(CSVClientBase):
             else:
                 return rates[columns].iloc[:index]
         elif length >= 1:
+            rolled = self._get_rolled_rates(symbols, frame) if is_rolled else None
+            if rolled is not None:
+                # completed buckets are sliced from the cache and the bucket of the current step is aggregated until index
+                rates = rolled.get(index, length, dropna=True)
+                return rates if columns is None else rates[columns]
             rates = None
             out_length = length
-            if frame is not None and self.frame < frame:
+            if is_rolled:
                 length = math.ceil(frame / self.frame) * length
             try:
                 # return data which have length length
@@ -747,8 +955,8 @@ class CSVClient(CSVClientBase):
             except Exception as e:
                 logger.error(f"can't find data fom {index - length} to {index}: {e}")
 
-            if frame is not None and self.frame < frame:
-                rates = self.roll_ohlc_data(rates, frame, grouped_by_symbol=True)
+            if is_rolled:
+                rates = self._roll_ohlc_data(rates, frame)
                 rates.dropna(thresh=len(rates.columns), inplace=True)
             rates = rates.iloc[:out_length]
             if columns is None:
@@ -836,11 +1044,65 @@ class CSVClient(CSVClientBase):
         else:
             raise Exception(f"length should be greater than 0. {length} is provided.")
 
+    def _get_price_matrix(self, column) -> tuple:
+        """return forward filled values of column as (data_length, symbol_size) array and symbol position dict.
+
+        The array is built once per column and cached until self.data is replaced, so that ask/bid is a row lookup.
+        """
+        if self._price_cache is None or self._price_cache["data"] is not self.data:
+            self._price_cache = {"data": self.data, "columns": {}}
+        cache = self._price_cache["columns"].get(column)
+        if cache is not None:
+            return cache
+
+        if isinstance(self.data.columns, pd.MultiIndex):
+            target_columns = [key for key in self.data.columns if key[1] == column]
+            symbol_positions = {key[0]: position for position, key in enumerate(target_columns)}
+        else:
+            target_columns = [column]
+            symbol_positions = {}
+        df = self.data[target_columns].ffill()
+        try:
+            values = df.to_numpy(dtype=numpy.float64)
+        except (TypeError, ValueError):
+            values = df.to_numpy()
+        cache = (numpy.ascontiguousarray(values), symbol_positions)
+        self._price_cache["columns"][column] = cache
+        return cache
+
+    def _get_current_prices(self, symbols, open_column, sub_column):
+        """return open and sub (high or low) values of current tick for symbols. Return None if symbols is unknown str."""
+        row_index = max(min(self._step_index, len(self.data)) - 1, 0)
+        open_values, symbol_positions = self._get_price_matrix(open_column)
+        sub_values, _ = self._get_price_matrix(sub_column)
+        open_row = open_values[row_index]
+        sub_row = sub_values[row_index]
+        if isinstance(self.data.columns, pd.MultiIndex):
+            if type(symbols) is str:
+                if symbols in self._symbols and symbols in symbol_positions:
+                    position = symbol_positions[symbols]
+                    return open_row[position], sub_row[position]
+                return None
+            elif type(symbols) is list:
+                if len(symbols) > 0:
+                    target_symbols = [symbol for symbol in symbols if symbol in self._symbols]
+                else:
+                    target_symbols = self._symbols
+                positions = [symbol_positions[symbol] for symbol in target_symbols]
+                if len(target_symbols) == 1:
+                    return open_row[positions[0]], sub_row[positions[0]]
+                open_value = pd.Series(open_row[positions], index=target_symbols)
+                sub_value = pd.Series(sub_row[positions], index=target_symbols)
+                return open_value, sub_value
+            else:
+                err_msg = f"Unknown type is specified as symbols: {type(symbols)}"
+                logger.error(err_msg)
+                raise Exception(err_msg)
+        return open_row[0], sub_row[0]
+
     def get_current_ask(self, symbols: list = None):
         if symbols is None:
             symbols = []
-        last_10_ticks = self.data.iloc[: self._step_index].ffill()
-        tick = last_10_ticks.iloc[-1]
         open_column = None
         high_column = None
 
@@ -854,40 +1116,13 @@ class CSVClient(CSVClientBase):
             open_column = self.ohlc_columns["Open"]
             high_column = self.ohlc_columns["Open"]
         if open_column is not None:
-            if type(tick.index) is pd.MultiIndex:
-                if type(symbols) is str:
-                    if symbols in self._symbols:
-                        open_value = tick[symbols][open_column]
-                        high_value = tick[symbols][high_column]
-                    else:
-                        return None
-                elif type(symbols) is list:
-                    if len(symbols) > 0:
-                        target_symbols = set(self._symbols) & set(symbols)
-                        target_symbols = list(target_symbols)
-                    else:
-                        target_symbols = self._symbols
-
-                    if len(target_symbols) == 1:
-                        open_value = tick[target_symbols[0]][open_column]
-                        high_value = tick[target_symbols[0]][high_column]
-                    else:
-                        open_value = tick[[(__symbol, open_column) for __symbol in target_symbols]]
-                        open_value.index = target_symbols
-                        high_value = tick[[(__symbol, high_column) for __symbol in target_symbols]]
-                        high_value.index = target_symbols
-                else:
-                    err_msg = f"Unknown type is specified as symbols: {type(symbols)}"
-                    logger.error(err_msg)
-                    raise Exception(err_msg)
-            else:
-                open_value = tick[open_column]
-                high_value = tick[high_column]
+            prices = self._get_current_prices(symbols, open_column, high_column)
+            if prices is None:
+                return None
+            open_value, high_value = prices
         else:
-            if isinstance(tick, pd.DataFrame):
-                column = random.choice(tick.columns)
-            elif isinstance(tick, pd.Series):
-                column = tick.name
+            tick = self.data.iloc[: self._step_index].ffill().iloc[-1]
+            column = tick.name
             open_value = tick[column]
             high_value = tick[column]
         return self._get_current_ask(open_value, high_value)
@@ -895,8 +1130,6 @@ class CSVClient(CSVClientBase):
     def get_current_bid(self, symbols: list = None):
         if symbols is None:
             symbols = []
-        last_10_ticks = self.data.iloc[: self._step_index].ffill()
-        tick = last_10_ticks.iloc[-1]
         open_column = None
         low_column = None
 
@@ -910,40 +1143,13 @@ class CSVClient(CSVClientBase):
             open_column = self.ohlc_columns["Open"]
             low_column = self.ohlc_columns["Open"]
         if open_column is not None:
-            if type(tick.index) is pd.MultiIndex:
-                if type(symbols) is str:
-                    if symbols in self._symbols:
-                        open_value = tick[symbols][open_column]
-                        low_value = tick[symbols][low_column]
-                    else:
-                        return None
-                elif type(symbols) is list:
-                    if len(symbols) > 0:
-                        target_symbols = set(self._symbols) & set(symbols)
-                        target_symbols = list(target_symbols)
-                    else:
-                        target_symbols = self._symbols
-
-                    if len(target_symbols) == 1:
-                        open_value = tick[target_symbols[0]][open_column]
-                        low_value = tick[target_symbols[0]][low_column]
-                    else:
-                        open_value = tick[[(__symbol, open_column) for __symbol in target_symbols]]
-                        open_value.index = target_symbols
-                        low_value = tick[[(__symbol, low_column) for __symbol in target_symbols]]
-                        low_value.index = target_symbols
-                else:
-                    err_msg = f"Unknown type is specified as symbols: {type(symbols)}"
-                    logger.error(err_msg)
-                    raise Exception(err_msg)
-            else:
-                open_value = tick[open_column]
-                low_value = tick[low_column]
+            prices = self._get_current_prices(symbols, open_column, low_column)
+            if prices is None:
+                return None
+            open_value, low_value = prices
         else:
-            if isinstance(tick, pd.DataFrame):
-                column = random.choice(tick.columns)
-            elif isinstance(tick, pd.Series):
-                column = tick.name
+            tick = self.data.iloc[: self._step_index].ffill().iloc[-1]
+            column = tick.name
             open_value = tick[column]
             low_value = tick[column]
 
@@ -1025,13 +1231,22 @@ class CSVChunkClient(CSVClientBase):
         auto_reset_index=False,
         slip_type="random",
         free_margin=1000000,
+        storage=None,
         do_render=False,
         seed=1017,
         user_name:str = None,
         provider="csv",
+        file_cache: bool = False,
+        file_cache_dir: str = None,
+        idc_process=None,
+        pre_process=None,
+        prefetch_size: int = 1,
     ):
         """Low memory CSV Client
 
+        Rows of each symbol are streamed chunk by chunk and merged by timestamp. Only the latest rows are kept in ring buffers sized to
+        max(observation_length, chunksize) + warm-up length of idc_process, so memory usage doesn't depend on the file size.
+
         Args:
             chunksize (int): To load huge file partially, you can specify chunk size.
             files (list<str>, optional): You can directly specify the file names. Defaults to None.
@@ -1042,312 +1257,498 @@ class CSVChunkClient(CSVClientBase):
             frame (int, optional): input frame. Specify time series span by minutes. Defaults None and determined by data.
             out_frame (int, optional): output frame. Ex) Convert 5MIN data to 30MIN by out_frame=30. Defaults to None.
             observation_length (int, optional): specify data length for __getitem__.
-            start_index (int, optional): specify minimum index. If not specified, start from 0. Defauls to None.
+            start_index (int, optional): specify minimum index. If not specified, start from 0. Negative index is not supported. Defauls to None.
             start_date (datetime, optional): specify start date. start_date overwrite the start_index. If not specified, start from index=0. Defaults to None.
-            start_random_index (bool, optional): After init or reset_index, random index is used as initial index. Defaults to False.
+            start_random_index (bool, optional): After init or reset_index, random index within loaded rows is used as initial index. Defaults to False.
             auto_step_index (bool, optional): If true, get_rate function returns data with advancing the index. Otherwise data index is advanced only when get_next_tick is called
             skiprows (int, optional): specify number to skip row of csv. For multi symbols, row is skipped for each files. Defaults None, not skipped.
             auto_reset_index ( bool, optional): refreh the index when index reach the end. Defaults False
             slip_type (str, optional): Specify how ask and bid slipped. random: random value from Close[i] to High[i] and Low[i]. prcent or pct: slip_rate=0.1 is applied. none: no slip.
+            storage (str | PositionStorage, optional): storage of positions. Defaults to None.
             do_render (bool, optional): If true, plot OHLC and supported indicaters.
             seed (int, optional): specify random seed. Defaults to 1017
             user_name (str, optional): user name to separate info (e.g. position) within the same provider. Defaults to None. It means client doesn't care users.
+            file_cache (bool, optional): If true and pyarrow is available, parsed csv files are cached as parquet and chunks are read from the cache. Defaults to False.
+            file_cache_dir (str, optional): directory to store the parquet cache. Defaults to None and `.fc_cache` next to each csv file is used.
+            idc_process (list<Process>, optional): list of technical indicater processes. Their minimum required length is kept in the buffers. Defaults to None.
+            pre_process (list<PreProcess>, optional): list of pre-process. Defaults to None.
+            prefetch_size (int, optional): number of chunks read ahead on background thread for each symbol. Defaults to 1.
         """
         if chunksize < 1:
             raise ValueError("chunksize should be greater than 0.")
-        self.TIMES = {}
-        self.TRS = {}
+        if start_index is not None and start_index < 0:
+            raise ValueError("negative start_index is not supported as CSVChunkClient doesn't know the data length.")
         self.chunksize = chunksize
+        self.prefetch_size = prefetch_size
+        self._streams = {}
+        self._stream_files = {}
+        self._time_buffer = None
+        self._symbol_buffers = {}
+        self._last_values = {}
+        self._max_values = {}
+        self._min_values = {}
+        self._tick_columns = None
         super().__init__(
-            files,
-            columns,
-            date_column,
-            file_name_generator,
-            symbols,
-            frame,
-            out_frame,
-            observation_length,
-            start_index,
-            start_date,
-            start_random_index,
-            auto_step_index,
-            skiprows,
-            auto_reset_index,
-            slip_type,
-            free_margin,
-            do_render,
-            seed,
-            provider,
+            files=files,
+            columns=columns,
+            date_column=date_column,
+            file_name_generator=file_name_generator,
+            symbols=symbols,
+            frame=frame,
+            out_frame=out_frame,
+            observation_length=observation_length,
+            idc_process=idc_process,
+            pre_process=pre_process,
+            start_index=start_index,
+            start_date=start_date,
+            start_random_index=start_random_index,
+            auto_step_index=auto_step_index,
+            skiprows=skiprows,
+            auto_reset_index=auto_reset_index,
+            slip_type=slip_type,
+            free_margin=free_margin,
+            storage=storage,
+            do_render=do_render,
+            seed=seed,
+            user_name=user_name,
+            provider=provider,
+            file_cache=file_cache,
+            file_cache_dir=file_cache_dir,
         )
-        data = pd.concat(self.data.values(), axis=1, keys=self.data.keys())
-        # to avoid
-        is_date_found = self._proceed_step_until_date(data, start_date)
-        while is_date_found is False:
-            dfs = [self.__read_chunk_data(symbol) for symbol in self._symbols]
-            new_data = pd.concat(dfs, axis=1, keys=self._symbols)
-            data = self._initialize_date_index(new_data, True)
-            is_date_found = self._proceed_step_until_date(data, start_date)
-        TIMES = {}
-        for symbol in self._symbols:
-            df = data[symbol].dropna()
-            last_time = df.index[-1]
-            TIMES[symbol] = (df.index[0], last_time)
-        self.TIMES.update(TIMES)
+        self._base_frame = self.frame
+        if out_frame is not None and self.frame is not None and self.frame < out_frame:
+            # rows are rolled when get_ohlc is called
+            self.frame = out_frame
 
-    def _read_csv(self, files, symbols=[], columns=[], date_col=None, skiprows=None, start_date=None, frame=None):
-        is_multi_mode = False
-        if len(files) > 1:
-            is_multi_mode = True
+    @property
+    def data(self) -> pd.DataFrame:
+        """rows kept in the buffers"""
+        if self._time_buffer is None or self._time_buffer.count == 0:
+            return None
+        return self.__get_rates(self._time_buffer.first_position, self._time_buffer.count, list(self._streams.keys()))
+
+    @data.setter
+    def data(self, value):
+        if value is not None:
+            raise AttributeError("data of CSVChunkClient is streamed from files and can't be replaced.")
+
+    def _convert_chunk(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """make a chunk to have sorted UTC DatetimeIndex"""
+        self._update_columns(chunk.columns)
+        if not isinstance(chunk.index, pd.DatetimeIndex):
+            time_column = self.ohlc_columns.get("Time")
+            if time_column is not None and time_column in chunk.columns:
+                chunk = chunk.set_index(time_column)
+            if not isinstance(chunk.index, pd.DatetimeIndex):
+                try:
+                    chunk.index = pd.to_datetime(chunk.index, utc=True)
+                except (TypeError, ValueError):
+                    chunk.index = pd.to_datetime(chunk.index, utc=True, format="mixed")
+        if chunk.index.tz is None:
+            chunk.index = chunk.index.tz_localize("UTC")
+        else:
+            chunk.index = chunk.index.tz_convert("UTC")
+        return chunk.sort_index()
 
-        # create kwargs from provided args
-        kwargs = self._create_csv_kwargs(columns, date_col, skiprows, is_multi_mode)
+    def _read_csv(self, files, symbols=[], columns=[], date_col=None, skiprows=None, start_date=None, frame=None):
+        if symbols is None:
+            symbols = []
+        if columns is None:
+            columns = []
+        # rows are skipped for each file
+        kwargs = self._create_csv_kwargs(columns, date_col, skiprows, is_multi_mode=False)
         kwargs["chunksize"] = self.chunksize
-        is_date_index = False
-        if "parse_dates" in kwargs:
-            is_date_index = True
-
-        # read csvs by pandas feature. When chunksize is specified, TextReader is stored instead of DataFrame
-        TRS, __symbols = self._create_dfs_by_files(files, symbols, kwargs)
-        # when _read_csv is called twice or more times for same file, ignore it. This case should not be caused.
-        duplicated_key_set = set(TRS.keys()) & set(self.TRS.keys())
-        if len(duplicated_key_set) > 0:
-            logger.warning("same file is initialized with chunkmode. TextReader is ignored.")
-            for file in duplicated_key_set:
-                TRS.pop(file)
-        self.TRS.update(TRS)
-
-        DFS = {}
-        for key, tr in TRS.items():
-            df = tr.get_chunk()
-            DFS[key] = df
-        data = pd.concat(DFS.values(), axis=1, keys=__symbols)
-        if skiprows is not None and is_multi_mode:
-            if skiprows > 0:
-                data = data.iloc[skiprows:].copy()
 
-        # update ohlc column info. If different column csv has read, overwrite old column info
-        __columns = data[__symbols[0]].columns
-        self._update_columns(__columns)
+        # When chunksize is specified, TextFileReader is returned instead of DataFrame
+        readers, __symbols = self._create_dfs_by_files(files, symbols, kwargs, self._convert_chunk)
+        for symbol, file in zip(__symbols, files):
+            reader = readers[symbol]
+            if symbol in self._streams:
+                logger.warning(f"{symbol} is already streamed. reader is ignored.")
+                reader.close()
+                continue
+            self._streams[symbol] = SymbolStream(reader, self._convert_chunk, self.prefetch_size)
+            self._stream_files[symbol] = os.path.abspath(file)
+        self.__initialize_buffers()
+        self.__proceed_to_start(start_date)
+        # data is served from the buffers by data property
+        return None, __symbols
+
+    def __initialize_buffers(self):
+        warmup_length = self._get_required_length(self.idc_process + self.pre_process)
+        capacity = max(self.observation_length or 0, self.chunksize) + warmup_length
+        self._time_buffer = RingBuffer(capacity, 1, dtype=numpy.int64, fill_value=0)
+        self._symbol_buffers = {}
+        for symbol, stream in self._streams.items():
+            width = len(stream.columns)
+            self._symbol_buffers[symbol] = RingBuffer(capacity, width)
+            self._last_values[symbol] = numpy.full(width, numpy.nan)
+            self._max_values[symbol] = numpy.full(width, numpy.nan)
+            self._min_values[symbol] = numpy.full(width, numpy.nan)
 
-        # convert TIME column values to datetime index if date column name is not defined, but there is time column
-        if is_date_index is False and "Time" in self.ohlc_columns:
-            # make Time column to index
-            time_column = self.ohlc_columns["Time"]
-            if time_column in __columns:
-                DFS = self._make_timecolumn_to_index(data, __symbols, time_column, columns, is_multi_mode)
-                data = pd.concat(DFS.values(), axis=1, keys=DFS.keys())
-                is_date_index = True
-        if is_date_index is False:
-            if start_date is not None and frame is not None:
-                data.index = self._create_datetime_index(start_date, frame, len(data))
-                is_date_index = True
+        if self.frame is None:
+            # determine frame by first rows
+            times = []
+            while len(times) < 3 and self.__advance():
+                times.append(self._time_buffer.row(self._time_buffer.count - 1)[0])
+            if len(times) > 1:
+                self.frame = int(numpy.diff(times).min() / 60e9)
             else:
-                raise Exception("Couldn't daterming date column")
-            raise Exception("Couldn't daterming date column")
-        data = self._initialize_date_index(data, True)
-        DFS = {}
-        for _symbol in __symbols:
-            # store each df. It may reduce the memory usage for NaM. (Is it handled in pandas?)
-            DFS[_symbol] = data[_symbol].dropna()
-        # read csv is called with different columns when get_ohlc is called with different symbols, so marge managing symbols
-        return DFS, __symbols
+                logger.warning("couldn't determine frame from data")
+
+    def __proceed_to_start(self, start_date):
+        if start_date is not None and isinstance(start_date, datetime.datetime):
+            start_time = pd.Timestamp(start_date)
+            if start_time.tzinfo is None:
+                start_time = start_time.tz_localize("UTC")
+            start_time = start_time.as_unit("ns").value
+            while True:
+                next_times = [stream.peek_time() for stream in self._streams.values()]
+                next_times = [next_time for next_time in next_times if next_time is not None]
+                if len(next_times) == 0:
+                    logger.warning(f"start date {start_date} doesn't exit in the index")
+                    break
+                if min(next_times) >= start_time:
+                    # date is retrievd by [:step_index], so we need to plus 1
+                    self._step_index = self._time_buffer.count + 1
+                    break
+                self.__advance()
+        self.__ensure_rows(self._step_index)
+
+    def __advance(self) -> bool:
+        """merge next rows of symbols by timestamp into the buffers. Return False if all streams reached the end."""
+        next_times = {symbol: stream.peek_time() for symbol, stream in self._streams.items()}
+        valid_times = [next_time for next_time in next_times.values() if next_time is not None]
+        if len(valid_times) == 0:
+            return False
+        current_time = min(valid_times)
+        self._time_buffer.append(current_time)
+        for symbol, stream in self._streams.items():
+            buffer = self._symbol_buffers[symbol]
+            if next_times[symbol] == current_time:
+                row = stream.pop()
+                buffer.append(row)
+                is_valid = ~numpy.isnan(row)
+                self._last_values[symbol][is_valid] = row[is_valid]
+                numpy.fmax(self._max_values[symbol], row, out=self._max_values[symbol])
+                numpy.fmin(self._min_values[symbol], row, out=self._min_values[symbol])
+            else:
+                buffer.append(numpy.nan)
+        return True
 
-    def __read_chunk_data(self, symbol):
-        if symbol in self.TRS:
-            tr = self.TRS[symbol]
-            try:
-                df = tr.get_chunk()
-                return df
-            except StopIteration:
-                self.TRS.pop(symbol)
-            except Exception as e:
-                logger.error(f"failed read {symbol} file by {e}")
-        else:
-            logger.debug(f"{symbol} is not in TRS")
-        return pd.DataFrame()
+    def __ensure_rows(self, count: int) -> bool:
+        while self._time_buffer.count < count:
+            if self.__advance() is False:
+                return False
+        return True
 
-    def __update_chunkdata_with_time(self, symbols: list = [], interval: int = None):
-        min_last_time = datetime.datetime.now()
-        min_last_time = min_last_time.astimezone(tz=datetime.timezone.utc)
+    def __grow_buffers(self, capacity: int):
+        if capacity <= self._time_buffer.capacity:
+            return
+        if self._time_buffer.first_position > 0:
+            logger.warning(f"length {capacity} is greater than buffer size {self._time_buffer.capacity}. older rows are already dropped.")
+        self._time_buffer.grow(capacity)
+        for buffer in self._symbol_buffers.values():
+            buffer.grow(capacity)
+
+    def __reload(self, stop: int, capacity: int):
+        """read files again from the beginning until stop, as rows before stop were already dropped from the buffers"""
+        logger.warning(f"rows before {stop} were dropped from the buffer. read files again from the beginning.")
+        step_index = self._step_index
+        stream_files = self._stream_files
+        self.__close_streams()
+        self._stream_files = {}
+        # rows are read after the buffers are grown to capacity
+        self._step_index = 0
+        columns = self._args["columns"] or []
+        self._read_csv(list(stream_files.values()), list(stream_files.keys()), columns, self._args["date_column"], self._args["skiprows"])
+        self._step_index = step_index
+        self.__grow_buffers(capacity)
+        self.__ensure_rows(stop)
+
+    def __get_time(self, position: int) -> pd.Timestamp:
+        """return time of the row at position (absolute position). files are read again if the row was dropped from the buffers."""
+        if position < self._time_buffer.first_position:
+            self.__reload(position + 1, self._time_buffer.capacity)
+        elif self.__ensure_rows(position + 1) is False:
+            position = len(self) - 1
+        return pd.Timestamp(self._time_buffer.row(position)[0], tz="UTC")
 
-        for symbol in symbols:
-            if symbol not in self.TIMES:
-                # if file_name_generator is defined, initialize it
-                # else case, check symbol is a part of any column name
-                # and else, show warning
-                print(f"{symbol} is not initialized")
-                pass
-            first_time, last_time = self.TIMES[symbol]
-            if last_time.tzinfo is None:
-                last_time = last_time.tz_localize(tz=datetime.timezone.utc)
-            if min_last_time > last_time:
-                min_last_time = last_time
-                min_time_symbol = symbol
-
-        if len(self.data[min_time_symbol]) - self._step_index < interval:
-            DFS = {}
-            # update data of min_date symbol.
-            temp_df = self.data[min_time_symbol].dropna()
-            short_length = interval - len(temp_df) + self._step_index
-            short_chunk_count = math.ceil(short_length / self.chunksize)
-            tr = self.TRS[min_time_symbol]
-            temp_dfs = [temp_df]
-            ohlc_columns = self.get_ohlc_columns()
-            time_convert_required = False
-            if "Time" in ohlc_columns:
-                time_column = ohlc_columns["Time"]
-                time_convert_required = True
-
-            for count in range(0, short_chunk_count):
-                # may happen error
-                temp_df = tr.get_chunk()
-                if time_convert_required:
-                    temp_df.set_index(time_column, inplace=True)
-                    if type(temp_df.index) != pd.DatetimeIndex:
-                        temp_df.index = pd.to_datetime(temp_df.index, utc=True)
-                    temp_df = temp_df.sort_index(ascending=True)
-                temp_dfs.append(temp_df)
-            temp_df = pd.concat(temp_dfs, axis=0)
-            required_last_time = temp_df.index[self._step_index + interval - 1]
-            temp_df = temp_df.dropna()
-
-            if self.frame < Frame.D1:
-                temp_df.index = pd.to_datetime(temp_df.index, utc=True)
-            DFS[min_time_symbol] = temp_df
-            self.TIMES[min_time_symbol] = (temp_df.index[0], temp_df.index[-1])
-            min_last_time = temp_df.index[-1]
-
-            # update remaining symbols and confirm if symbol of min_date is changed by the updates.
-            remaining_symbols = set(self.TRS.keys()) - {min_time_symbol}
-            for symbol in remaining_symbols:
-                date_set = self.TIMES[symbol]
-                symbol_last_date = date_set[1]
-                tr = self.TRS[symbol]
-                temp_dfs = [self.data[symbol].dropna()]
-                while symbol_last_date < required_last_time:
-                    temp_df = tr.get_chunk()
-                    if time_convert_required:
-                        temp_df.set_index(time_column, inplace=True)
-                        if type(temp_df.index) != pd.DatetimeIndex:
-                            temp_df.index = pd.to_datetime(temp_df.index, utc=True)
-                        temp_df = temp_df.sort_index(ascending=True)
-                    temp_dfs.append(temp_df)
-                    symbol_last_date = temp_df.index[-1]
-                if len(temp_df) > 1:
-                    temp_df = pd.concat(temp_dfs, axis=0)
-                    temp_df = temp_df.dropna()
-                    if self.frame < Frame.D1:
-                        if type(temp_df.index) != pd.DatetimeIndex:
-                            temp_df.index = pd.to_datetime(temp_df.index, utc=True)
-                    DFS[symbol] = temp_df
-                    self.TIMES[symbol] = (temp_df.index[0], temp_df.index[-1])
-                    if min_last_time > temp_df.index[-1]:
-                        min_last_time = temp_df.index[-1]
-                        min_time_symbol = symbol
-                else:
-                    DFS[symbol] = self.data[min_time_symbol].dropna()
-            self.data.update(DFS)
-            temp_df = pd.concat(DFS.values(), axis=1, keys=DFS.keys())
-            self._proceed_step_until_date(temp_df, self._args["start_date"])
-
-    def __get_rates_by_chunk(self, interval: int = None, symbols: list = [], frame: int = None):
-        target_symbols = list(set(self._symbols) & set(symbols))
-        if interval is None or interval == slice(None):
-            # todo: update missing columns
-            if self.auto_step_index:
-                self._step_index += 1
-            if len(target_symbols) > 0:
-                rates = pd.concat([self.data[symbol] for symbol in target_symbols], axis=1, keys=target_symbols)
-        else:
-            self.__update_chunkdata_with_time(target_symbols, interval)
-            if len(target_symbols) > 0:
-                symbols_dfs = pd.concat([self.data[symbol] for symbol in target_symbols], axis=1, keys=target_symbols)
-            else:
-                symbols_dfs = pd.concat(self.data.values(), axis=1, keys=self.data.keys())
+    def get_current_datetime(self):
+        index = self.__get_time(max(self._step_index - 1, 0))
+        try:
+            return self._index_to_datetime(index)
+        except Exception as e:
+            logger.error(f"Failed to convert index to datetime: {index}. Error: {e}")
+        return str(index)
 
-            if self._step_index >= interval - 1:
-                rates = symbols_dfs.iloc[self._step_index - interval : self._step_index]
-            else:
-                rates = symbols_dfs[:interval]
-                logger.warning(
-                    f"current step index {self._step_index} is less than length {interval}. return length from index 0. Please assgin start_index."
-                )
+    def get_batch(self, batch_idx, columns=None, copy: bool = None) -> numpy.ndarray:
+        """get observations ending at self.indices[batch_idx] from the buffers. Rows dropped from the buffers are read again from files.
 
-            if self.auto_step_index:
-                self._step_index += 1
-        return rates
+        Args:
+            batch_idx (int | slice | list[int] | numpy.ndarray): index of self.indices
+            columns (str | list, optional): column names to select from each symbol. Defaults to None and all columns are returned.
+            copy (bool, optional): ignored as rows are always copied from the buffers.
+
+        Returns:
+            numpy.ndarray: (batch_size, observation_length, feature_size). (observation_length, feature_size) if batch_idx is int.
+        """
+        if self.observation_length is None:
+            raise ValueError("observation_length should be specified to get batch data.")
+        length = self.observation_length
+        stops = self._get_batch_indices()[batch_idx]
+        is_single = numpy.ndim(stops) == 0
+        stops = numpy.atleast_1d(stops)
+        first = int(stops.min()) - length
+        last = int(stops.max())
+        if first < self._time_buffer.first_position:
+            self.__reload(last, last - first)
+        else:
+            self.__grow_buffers(last - first)
+            self.__ensure_rows(last)
+        values = self._to_batch_values(self.__get_rates(first, last, list(self._streams.keys())), columns)
+        windows = numpy.moveaxis(sliding_window_view(values, length, axis=0), -1, 1)
+        chunk_data = windows[stops - length - first]
+        if is_single:
+            return chunk_data[0]
+        return chunk_data
+
+    def __get_rates(self, start: int, stop: int, symbols: list, columns=None) -> pd.DataFrame:
+        times = self._time_buffer.get(start, stop).ravel()
+        index = pd.DatetimeIndex(times.view("datetime64[ns]"), name=self._args["date_column"]).tz_localize("UTC")
+        DFS = {}
+        for symbol in symbols:
+            df = pd.DataFrame(self._symbol_buffers[symbol].get(start, stop), index=index, columns=self._streams[symbol].columns)
+            if columns is not None:
+                df = df[[column for column in columns if column in df.columns]]
+            DFS[symbol] = df
+        return pd.concat(DFS.values(), axis=1, keys=DFS.keys())
 
-    def _get_ohlc_from_client(self, length=None, symbols: list = None, frame: int = None, index=None, grouped_by_symbol: bool = False):
+    def __get_target_symbols(self, symbols) -> list:
         if symbols is None or symbols == slice(None):
-            symbols = []
-        target_symbols, missing_files, missing_symbols = self._get_target_symbols(symbols)
-        if len(missing_files) > 0:
-            try:
-                missing_DFS, __symbols = self._read_csv(list(set(missing_files)), missing_symbols, self._args["columns"], self._args["date_column"])
-                self._symbols.extend(list(__symbols))
-            except Exception as e:
-                logger.error(f"Filed to read csv on get_ohlc_data of CSV client by {e}")
-            if missing_DFS is not None and len(missing_DFS) > 0:
-                times_df = pd.DataFrame.from_dict(self.TIMES)
-                min_datetime = times_df.T[0].min()
-                DFS = {}
-                for symbol, df in missing_DFS.items():
-                    df = df[df.index >= min_datetime]
-                    DFS[symbol] = df
-                self.data.update(DFS)
-        rates = self.__get_rates_by_chunk(length, target_symbols, frame)
-        if grouped_by_symbol is False:
+            return list(self._streams.keys())
+        if isinstance(symbols, str):
+            symbols = [symbols]
+        if len(symbols) == 0:
+            return list(self._streams.keys())
+        target_symbols = [symbol for symbol in symbols if symbol in self._streams]
+        if len(target_symbols) < len(symbols):
+            logger.warning(f"{set(symbols) - set(target_symbols)} are not streamed. CSVChunkClient can't add symbols after initialization.")
+        return target_symbols
+
+    def _get_ohlc_from_client(self, length=None, symbols: list = None, frame: int = None, columns=None, index=None, grouped_by_symbol: bool = False):
+        target_symbols = self.__get_target_symbols(symbols)
+        if len(target_symbols) == 0:
+            logger.warning(f"Specified symbols can't be handled as csv file or its symbol name: {symbols}")
+            return pd.DataFrame()
+
+        if index is None:
+            index = self._step_index
+        if self.__ensure_rows(index) is False:
+            if self._auto_reset:
+                self.reset()
+                index = self._step_index
+                self.__ensure_rows(index)
+            else:
+                logger.warning(f"current step {index} over the data length {len(self)}. Fix step index to last index")
+                index = len(self)
+                self._step_index = index
+
+        out_length = length
+        if length is None or length == slice(None):
+            if index < self._time_buffer.first_position:
+                self.__reload(index, index)
+            start = self._time_buffer.first_position
+        else:
+            if frame is not None and self._base_frame is not None and self._base_frame < frame:
+                length = math.ceil(frame / self._base_frame) * length
+            self.__grow_buffers(length)
+            if index < length - 1:
+                logger.warning(f"index {index} is less than length {length}. return length from index 0. Please assgin start_index.")
+                index = length
+                if self.__ensure_rows(index) is False:
+                    index = len(self)
+            if index < self._time_buffer.first_position:
+                self.__reload(index, length)
+            start = max(index - length, self._time_buffer.first_position)
+        rates = self.__get_rates(start, index, target_symbols, columns)
+
+        if out_length is not None and frame is not None and self._base_frame is not None and self._base_frame < frame:
+            rates = self._roll_ohlc_data(rates, frame)
+            rates.dropna(thresh=len(rates.columns), inplace=True)
+            rates = rates.iloc[-out_length:]
+        if len(target_symbols) == 1:
+            rates = rates[target_symbols[0]]
+        elif grouped_by_symbol is False:
             rates.columns = rates.columns.swaplevel(0, 1)
             rates.sort_index(level=0, axis=1, inplace=True)
+        if self.auto_step_index:
+            self._step_index += 1
         return rates
 
     def get_future_rates(self, length=1, back_length=0, symbols: list = []):
-        pass
+        if length > 1:
+            stop = self._step_index + length + 1
+            self.__ensure_rows(stop)
+            self.__grow_buffers(length + back_length + 1)
+            stop = min(stop, len(self))
+            start = max(self._step_index - back_length, self._time_buffer.first_position)
+            return self.__get_rates(start, stop, self.__get_target_symbols(symbols))
+        else:
+            raise Exception(f"length should be greater than 0. {length} is provided.")
+
+    def __get_last_values(self, symbol, position: int) -> numpy.ndarray:
+        """return forward filled values of symbol at position"""
+        if position == self._time_buffer.count - 1:
+            return self._last_values[symbol].copy()
+        buffer = self._symbol_buffers[symbol]
+        values = buffer.row(position)
+        is_missing = numpy.isnan(values)
+        stop = position
+        while is_missing.any() and stop > buffer.first_position:
+            start = max(stop - 64, buffer.first_position)
+            for row in buffer.get(start, stop)[::-1]:
+                is_filled = is_missing & ~numpy.isnan(row)
+                values[is_filled] = row[is_filled]
+                is_missing &= ~is_filled
+                if not is_missing.any():
+                    break
+            stop = start
+        return values
+
+    def __get_current_prices(self, symbols, open_key, sub_key):
+        """return open and sub (high or low) values of current tick for symbols. Return None if symbols is unknown str."""
+        self.__ensure_rows(self._step_index)
+        position = max(min(self._step_index, len(self)) - 1, 0)
+        if isinstance(symbols, str):
+            if symbols not in self._streams:
+                return None
+            target_symbols = [symbols]
+        elif isinstance(symbols, list):
+            target_symbols = self.__get_target_symbols(symbols)
+        else:
+            err_msg = f"Unknown type is specified as symbols: {type(symbols)}"
+            logger.error(err_msg)
+            raise Exception(err_msg)
+
+        open_values = []
+        sub_values = []
+        for symbol in target_symbols:
+            values = self.__get_last_values(symbol, position)
+            stream_columns = self._streams[symbol].columns
+            open_values.append(values[stream_columns.index(self.ohlc_columns[open_key])])
+            sub_values.append(values[stream_columns.index(self.ohlc_columns[sub_key])])
+        if len(target_symbols) == 1:
+            return open_values[0], sub_values[0]
+        return pd.Series(open_values, index=target_symbols), pd.Series(sub_values, index=target_symbols)
 
     def get_current_ask(self, symbols=None):
-        pass
+        if symbols is None:
+            symbols = []
+        if "Open" in self.ohlc_columns and "High" in self.ohlc_columns:
+            prices = self.__get_current_prices(symbols, "Open", "High")
+        elif "Close" in self.ohlc_columns:
+            prices = self.__get_current_prices(symbols, "Close", "Close")
+        elif "Open" in self.ohlc_columns:
+            prices = self.__get_current_prices(symbols, "Open", "Open")
+        else:
+            logger.error("ohlc columns are not found to get ask")
+            return None
+        if prices is None:
+            return None
+        return self._get_current_ask(*prices)
 
     def get_current_bid(self, symbols=None):
-        pass
+        if symbols is None:
+            symbols = []
+        if "Open" in self.ohlc_columns and "Low" in self.ohlc_columns:
+            prices = self.__get_current_prices(symbols, "Open", "Low")
+        elif "Close" in self.ohlc_columns:
+            prices = self.__get_current_prices(symbols, "Close", "Close")
+        elif "Open" in self.ohlc_columns:
+            prices = self.__get_current_prices(symbols, "Open", "Open")
+        else:
+            logger.error("ohlc columns are not found to get bid")
+            return None
+        if prices is None:
+            return None
+        return self._get_current_bid(*prices)
+
+    def __close_streams(self):
+        for stream in self._streams.values():
+            stream.close()
+        self._streams = {}
 
     def reset(self, mode: str = None, retry=0) -> bool:
-        pass
+        """restart streams from the beginning of files. mode is not supported."""
+        if mode is not None:
+            logger.warning(f"mode {mode} is not supported by CSVChunkClient. reset to the start.")
+        stream_files = self._stream_files
+        self.__close_streams()
+        self._tick_columns = None
+        self._stream_files = {}
+        start_index = self._args["start_index"]
+        self._step_index = start_index if start_index else 1
+        columns = self._args["columns"] or []
+        self._read_csv(list(stream_files.values()), list(stream_files.keys()), columns, self._args["date_column"], self._args["skiprows"], self._args["start_date"])
+        if self._args["start_random_index"]:
+            self._step_index = random.randint(1, len(self))
+        return True
+
+    def __get_tick(self, position: int) -> pd.Series:
+        if self._tick_columns is None:
+            keys = [(symbol, column) for symbol, stream in self._streams.items() for column in stream.columns]
+            self._tick_columns = pd.MultiIndex.from_tuples(keys)
+        values = [self._symbol_buffers[symbol].row(position) for symbol in self._streams.keys()]
+        name = pd.Timestamp(self._time_buffer.row(position)[0], tz="UTC")
+        return pd.Series(numpy.concatenate(values), index=self._tick_columns, name=name)
 
     def get_next_tick(self):
-        rates = pd.concat(self.data.values(), axis=1, keys=self.data.keys())
-        if self._step_index < len(rates) - 2:
+        if self.__ensure_rows(self._step_index + 2):
             self._step_index += 1
-            tick = rates.iloc[self._step_index]
+            tick = self.__get_tick(self._step_index)
             # raise index change event
             return tick, False
         else:
             if self._auto_reset:
-                self._step_index = random.randint(0, len(rates))
+                self.reset()
+                self.__ensure_rows(self._step_index + 1)
+                tick = self.__get_tick(self._step_index)
                 # raise index change event
-                tick = rates.iloc[self._step_index]
                 return tick, True
             else:
                 logger.warning(f"not more data on index {self._step_index}")
             return pd.DataFrame(), True
 
+    def __get_running_values(self, values: dict) -> pd.Series:
+        keys = []
+        DATA = []
+        for symbol, stream in self._streams.items():
+            keys.extend([(symbol, column) for column in stream.columns])
+            DATA.extend(values[symbol])
+        return pd.Series(DATA, index=pd.MultiIndex.from_tuples(keys))
+
     @property
     def max(self):
-        pass
+        """max values of each column in rows streamed so far"""
+        return self.__get_running_values(self._max_values)
 
     @property
     def min(self):
-        pass
+        """min values of each column in rows streamed so far"""
+        return self.__get_running_values(self._min_values)
 
     def get_additional_params(self):
         return {"chunksize": self.chunksize, "files": self.files}
 
     def __del__(self):
-        if len(self.TRS) > 0:
-            for key, value in self.TRS.items():
-                value.close()
+        try:
+            self.__close_streams()
+        except Exception:
+            pass
 
     def __len__(self):
-        if self.data is not None and len(self.data) > 0:
-            rates = pd.concat(self.data.values(), axis=1, keys=self.data.keys())
-            return len(rates)
-        return 0
+        """number of rows streamed so far"""
+        if self._time_buffer is None:
+            return 0
+        return self._time_buffer.count
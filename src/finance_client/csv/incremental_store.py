@@ -0,0 +1,161 @@
+import json
+import logging
+import os
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+INDEX_SUFFIX = ".index.json"
+_TAIL_SIZE = 64 * 1024
+
+
+def _to_comparable(timestamp: pd.Timestamp, index: pd.Index) -> pd.Timestamp:
+    """align tz awareness of timestamp to index"""
+    tz = getattr(index, "tz", None)
+    if timestamp.tzinfo is None and tz is not None:
+        return timestamp.tz_localize(tz)
+    if timestamp.tzinfo is not None and tz is None and isinstance(index, pd.DatetimeIndex):
+        return timestamp.tz_convert(None)
+    return timestamp
+
+
+class IncrementalCSVStore:
+    """CSV file of time series which is only appended.
+
+    The last timestamp, the byte offset of the last row and the file size are kept in a sidecar index ({file}.index.json),
+    so a refresh reads and writes only the tail of the file. Rows after the last timestamp are appended and a row of the last timestamp replaces the last row
+    as the latest bar may be updated after it was written. The index is rebuilt from the tail of the file when the file is changed by others.
+    """
+
+    def __init__(self, file_path: str, index_label: str):
+        """
+        Args:
+            file_path (str): path of the csv file
+            index_label (str): column name of the index written on the header
+        """
+        self.file_path = file_path
+        self.index_label = index_label
+        self.index_path = f"{file_path}{INDEX_SUFFIX}"
+        self._index = None
+
+    def exists(self) -> bool:
+        return os.path.exists(self.file_path) and os.path.getsize(self.file_path) > 0
+
+    def __read_index(self):
+        if self._index is None and os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r") as fp:
+                    self._index = json.load(fp)
+            except (OSError, ValueError):
+                logger.warning(f"failed to read index of {self.file_path}. rebuild it.")
+                self._index = None
+        if self._index is not None and self._index.get("size") == os.path.getsize(self.file_path):
+            return self._index
+        self._index = self.__build_index()
+        return self._index
+
+    def __build_index(self) -> dict:
+        """read the header and the last row of the file"""
+        size = os.path.getsize(self.file_path)
+        with open(self.file_path, "rb") as fp:
+            header = fp.readline().decode("utf-8").strip()
+            header_end = fp.tell()
+            tail_start = max(size - _TAIL_SIZE, header_end)
+            fp.seek(tail_start)
+            tail = fp.read()
+        columns = header.split(",")[1:]
+        lines = tail.rstrip(b"\r\n")
+        if len(lines) == 0:
+            last, last_offset = None, size
+        else:
+            line_start = lines.rfind(b"\n") + 1
+            if line_start == 0 and tail_start > header_end:
+                # the last row is longer than the tail. read it from the head
+                return self.__build_index_by_read(columns)
+            last = lines[line_start:].decode("utf-8").split(",")[0]
+            last_offset = tail_start + line_start
+        index = {"columns": columns, "last": last, "last_offset": last_offset, "size": size}
+        self.__write_index(index)
+        return index
+
+    def __build_index_by_read(self, columns: list) -> dict:
+        df = pd.read_csv(self.file_path, usecols=[0])
+        with open(self.file_path, "rb") as fp:
+            content = fp.read()
+        line_start = content.rstrip(b"\r\n").rfind(b"\n") + 1
+        index = {"columns": columns, "last": str(df.iloc[-1, 0]), "last_offset": line_start, "size": len(content)}
+        self.__write_index(index)
+        return index
+
+    def __write_index(self, index: dict):
+        self._index = index
+        with open(self.index_path, "w") as fp:
+            json.dump(index, fp)
+
+    def last_timestamp(self) -> pd.Timestamp:
+        """return the last timestamp of the file. None if the file doesn't have rows."""
+        if not self.exists():
+            return None
+        last = self.__read_index()["last"]
+        if last is None:
+            return None
+        return pd.Timestamp(last)
+
+    def read(self, parse_dates: bool = True) -> pd.DataFrame:
+        """read all rows of the file"""
+        if not self.exists():
+            return None
+        if parse_dates:
+            return pd.read_csv(self.file_path, index_col=self.index_label, parse_dates=[self.index_label])
+        return pd.read_csv(self.file_path, index_col=self.index_label)
+
+    def append(self, df: pd.DataFrame) -> int:
+        """append rows of df after the last timestamp of the file. A row of the last timestamp replaces the last row.
+
+        Args:
+            df (pd.DataFrame): rows sorted by index
+
+        Returns:
+            int: number of rows written
+        """
+        if df is None or len(df) == 0:
+            return 0
+        if not self.exists():
+            self.__rewrite(df)
+            return len(df)
+
+        index = self.__read_index()
+        if index["last"] is not None:
+            last = _to_comparable(pd.Timestamp(index["last"]), df.index)
+            df = df[df.index >= last]
+            if len(df) == 0:
+                return 0
+            replace_last = df.index[0] == last
+        else:
+            replace_last = False
+
+        columns = index["columns"]
+        if list(df.columns) != columns:
+            if set(columns) <= set(df.columns) and len(columns) == len(df.columns):
+                df = df[columns]
+            else:
+                logger.info(f"columns of {self.file_path} are changed. rewrite the file.")
+                existing_df = self.read()
+                if existing_df is not None:
+                    existing_df = existing_df[existing_df.index < df.index[0]]
+                    df = pd.concat([existing_df, df])
+                self.__rewrite(df)
+                return len(df)
+
+        with open(self.file_path, "r+b") as fp:
+            if replace_last:
+                fp.truncate(index["last_offset"])
+        df.to_csv(self.file_path, mode="a", header=False)
+        self.__build_index()
+        return len(df)
+
+    def __rewrite(self, df: pd.DataFrame):
+        os.makedirs(os.path.dirname(os.path.abspath(self.file_path)), exist_ok=True)
+        df.to_csv(self.file_path, index_label=self.index_label)
+        self.__build_index()
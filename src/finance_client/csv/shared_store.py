@@ -0,0 +1,131 @@
+import json
+import logging
+import os
+
+import numpy
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+STORE_VERSION = 1
+VALUES_FILE = "values.npy"
+INDEX_FILE = "index.npy"
+META_FILE = "meta.json"
+
+
+class SharedOHLCStore:
+    """Read-only memory mapped OHLC store.
+
+    The store is a directory which has a values.npy (rows x columns matrix), an index.npy (UTC timestamps as int64 ns) and a meta.json (columns, tz and frame).
+    As values are opened with numpy.memmap, processes attaching the same store share pages through the OS page cache.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): directory created by SharedOHLCStore.create
+        """
+        self.path = os.path.abspath(path)
+        meta_path = os.path.join(self.path, META_FILE)
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(f"shared store is not found on {self.path}")
+        with open(meta_path, "r") as fp:
+            self.meta = json.load(fp)
+        if self.meta.get("version") != STORE_VERSION:
+            raise ValueError(f"unsupported store version {self.meta.get('version')} on {self.path}")
+        self._values = None
+        self._index = None
+
+    @classmethod
+    def create(cls, path: str, data: pd.DataFrame, dtype=numpy.float64, frame: int = None) -> "SharedOHLCStore":
+        """write data to path and return the store attached to it.
+
+        Args:
+            path (str): directory to write the store
+            data (pd.DataFrame): numeric ohlc data. MultiIndex columns of (symbol, column) and single level columns are supported.
+            dtype (optional): dtype of the matrix. numpy.float32 halves the memory. Defaults to numpy.float64.
+            frame (int, optional): frame minutes of data. Defaults to None.
+
+        Returns:
+            SharedOHLCStore: store attached to the written files
+        """
+        path = os.path.abspath(path)
+        if not isinstance(data.index, pd.DatetimeIndex):
+            raise ValueError("data should have DatetimeIndex to create shared store")
+        try:
+            values = numpy.ascontiguousarray(data.to_numpy(dtype=dtype))
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"shared store supports numeric columns only: {e}")
+        index = data.index
+        tz = None
+        if index.tz is not None:
+            tz = str(index.tz)
+            index = index.tz_convert("UTC").tz_localize(None)
+        index_values = numpy.ascontiguousarray(index.as_unit("ns").asi8)
+        if isinstance(data.columns, pd.MultiIndex):
+            columns = [list(column) for column in data.columns]
+        else:
+            columns = list(data.columns)
+        meta = {
+            "version": STORE_VERSION,
+            "columns": columns,
+            "is_multi_columns": isinstance(data.columns, pd.MultiIndex),
+            "index_name": data.index.name,
+            "tz": tz,
+            "frame": frame,
+            "dtype": numpy.dtype(dtype).name,
+            "shape": list(values.shape),
+        }
+
+        os.makedirs(path, exist_ok=True)
+        suffix = f".{os.getpid()}.tmp"
+        # write meta at last so that readers don't attach half written store
+        for file_name, array in ((VALUES_FILE, values), (INDEX_FILE, index_values)):
+            temp_path = os.path.join(path, file_name + suffix)
+            with open(temp_path, "wb") as fp:
+                numpy.save(fp, array)
+            os.replace(temp_path, os.path.join(path, file_name))
+        temp_path = os.path.join(path, META_FILE + suffix)
+        with open(temp_path, "w") as fp:
+            json.dump(meta, fp)
+        os.replace(temp_path, os.path.join(path, META_FILE))
+        return cls(path)
+
+    @property
+    def values(self) -> numpy.ndarray:
+        if self._values is None:
+            self._values = numpy.load(os.path.join(self.path, VALUES_FILE), mmap_mode="r")
+        return self._values
+
+    @property
+    def index(self) -> pd.DatetimeIndex:
+        if self._index is None:
+            index_values = numpy.load(os.path.join(self.path, INDEX_FILE), mmap_mode="r")
+            index = pd.DatetimeIndex(index_values.view("datetime64[ns]"), name=self.meta["index_name"])
+            if self.meta["tz"] is not None:
+                index = index.tz_localize("UTC").tz_convert(self.meta["tz"])
+            self._index = index
+        return self._index
+
+    @property
+    def columns(self) -> pd.Index:
+        if self.meta["is_multi_columns"]:
+            return pd.MultiIndex.from_tuples([tuple(column) for column in self.meta["columns"]])
+        return pd.Index(self.meta["columns"])
+
+    @property
+    def symbols(self) -> list:
+        if self.meta["is_multi_columns"]:
+            return list(dict.fromkeys([column[0] for column in self.meta["columns"]]))
+        return []
+
+    @property
+    def frame(self):
+        return self.meta["frame"]
+
+    def to_frame(self) -> pd.DataFrame:
+        """return DataFrame backed by the memory mapped values without copy. The frame is read-only."""
+        return pd.DataFrame(self.values, index=self.index, columns=self.columns, copy=False)
+
+    def __len__(self):
+        return self.meta["shape"][0]
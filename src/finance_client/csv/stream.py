@@ -0,0 +1,165 @@
+import logging
+import queue
+import threading
+
+import numpy
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_END_OF_STREAM = object()
+
+
+class RingBuffer:
+    """Fixed size buffer of rows. Rows are addressed by absolute position, which is the number of rows appended before the row."""
+
+    def __init__(self, capacity: int, width: int, dtype=numpy.float64, fill_value=numpy.nan):
+        if capacity < 1:
+            raise ValueError("capacity should be greater than 0.")
+        self.capacity = capacity
+        self.fill_value = fill_value
+        self._values = numpy.full((capacity, width), fill_value, dtype=dtype)
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    @property
+    def first_position(self) -> int:
+        return self.count - len(self)
+
+    def append(self, row):
+        self._values[self.count % self.capacity] = row
+        self.count += 1
+
+    def get(self, start: int, stop: int) -> numpy.ndarray:
+        """return copy of rows from start to stop (absolute positions) in appended order."""
+        if start < self.first_position or stop > self.count or start > stop:
+            raise IndexError(f"rows from {start} to {stop} are not in the buffer ({self.first_position} to {self.count})")
+        positions = numpy.arange(start, stop) % self.capacity
+        return self._values[positions]
+
+    def row(self, position: int) -> numpy.ndarray:
+        """return copy of a row at position (absolute position)"""
+        if position < self.first_position or position >= self.count:
+            raise IndexError(f"row {position} is not in the buffer ({self.first_position} to {self.count})")
+        return self._values[position % self.capacity].copy()
+
+    def grow(self, capacity: int):
+        """extend the capacity. Rows already dropped from the buffer can't be recovered."""
+        if capacity <= self.capacity:
+            return
+        length = len(self)
+        rows = self.get(self.count - length, self.count)
+        values = numpy.full((capacity, self._values.shape[1]), self.fill_value, dtype=self._values.dtype)
+        # keep row positions consistent with count % capacity
+        positions = numpy.arange(self.count - length, self.count) % capacity
+        values[positions] = rows
+        self._values = values
+        self.capacity = capacity
+
+
+class ChunkPrefetcher:
+    """read chunks of TextFileReader like reader on a background thread"""
+
+    def __init__(self, reader, prefetch_size: int = 1):
+        self.reader = reader
+        self._queue = queue.Queue(maxsize=prefetch_size)
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self.__read, daemon=True)
+        self._thread.start()
+
+    def __put(self, item) -> bool:
+        while not self._stop_event.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __read(self):
+        while not self._stop_event.is_set():
+            try:
+                chunk = self.reader.get_chunk()
+            except StopIteration:
+                self.__put(_END_OF_STREAM)
+                return
+            except Exception as e:
+                self.__put(e)
+                return
+            if not self.__put(chunk):
+                return
+
+    def get(self) -> pd.DataFrame:
+        """return next chunk. None is returned when the reader reaches the end."""
+        if self._stop_event.is_set():
+            return None
+        item = self._queue.get()
+        if item is _END_OF_STREAM:
+            self._stop_event.set()
+            return None
+        if isinstance(item, Exception):
+            self._stop_event.set()
+            raise item
+        return item
+
+    def close(self):
+        self._stop_event.set()
+        self._thread.join(timeout=1)
+        try:
+            self.reader.close()
+        except Exception:
+            logger.debug("failed to close the reader")
+
+
+class SymbolStream:
+    """rows of a symbol as numpy arrays. Next chunk is prefetched while rows of current chunk are consumed."""
+
+    def __init__(self, reader, convert, prefetch_size: int = 1):
+        """
+        Args:
+            reader: TextFileReader like reader which has get_chunk
+            convert (Callable[[pd.DataFrame], pd.DataFrame]): function to convert a chunk to UTC DatetimeIndex frame
+            prefetch_size (int, optional): number of chunks to read ahead. Defaults to 1.
+        """
+        self.convert = convert
+        self._prefetcher = ChunkPrefetcher(reader, prefetch_size)
+        self.columns = None
+        self._times = numpy.empty(0, dtype=numpy.int64)
+        self._values = numpy.empty((0, 0))
+        self._cursor = 0
+        self.is_end = False
+        # load first chunk to fix columns
+        self.__load_next_chunk()
+
+    def __load_next_chunk(self) -> bool:
+        while True:
+            chunk = self._prefetcher.get()
+            if chunk is None:
+                self.is_end = True
+                return False
+            chunk = self.convert(chunk)
+            if self.columns is None:
+                self.columns = list(chunk.select_dtypes(include="number").columns)
+            if len(chunk) == 0:
+                continue
+            self._times = chunk.index.as_unit("ns").asi8
+            self._values = chunk[self.columns].to_numpy(dtype=numpy.float64)
+            self._cursor = 0
+            return True
+
+    def peek_time(self):
+        """return timestamp (ns) of next row. None is returned when all rows are consumed."""
+        if self._cursor >= len(self._times):
+            if self.is_end or self.__load_next_chunk() is False:
+                return None
+        return self._times[self._cursor]
+
+    def pop(self) -> numpy.ndarray:
+        row = self._values[self._cursor]
+        self._cursor += 1
+        return row
+
+    def close(self):
+        self._prefetcher.close()
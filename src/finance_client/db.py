@@ -1,14 +1,18 @@
+import atexit
 import datetime
 import glob
 import json
 import logging
 import os
+import queue
 import sqlite3
 import threading
 import time
 from abc import ABCMeta, abstractmethod
+from contextlib import contextmanager, nullcontext
 from typing import List, Union
 
+import numpy
 import pandas as pd
 
 from finance_client.position import POSITION_SIDE, Position
@@ -54,6 +58,380 @@ def _index_to_str(index):
     return time_index
 
 
+def _to_utc_ns(index) -> int:
+    """convert index to UTC epoch nanoseconds. Naive index is treated as UTC."""
+    timestamp = pd.Timestamp(index)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize("UTC")
+    return timestamp.value
+
+
+class ProfitLedger:
+    """Realized profits sorted by time to sum profits of a period without reading logs."""
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self._times = numpy.empty(capacity, dtype=numpy.int64)
+        self._profits = numpy.empty(capacity, dtype=numpy.float64)
+        self._size = 0
+        self._is_sorted = True
+
+    def __len__(self):
+        return self._size
+
+    def add(self, index, profit: float):
+        self.add_many(numpy.array([_to_utc_ns(index)], dtype=numpy.int64), numpy.array([profit], dtype=numpy.float64))
+
+    def add_many(self, times_ns: numpy.ndarray, profits: numpy.ndarray):
+        """add profits with UTC epoch nanoseconds"""
+        length = len(times_ns)
+        if length == 0:
+            return
+        required = self._size + length
+        if required > len(self._times):
+            capacity = max(required, len(self._times) * 2)
+            self._times = numpy.resize(self._times, capacity)
+            self._profits = numpy.resize(self._profits, capacity)
+        if self._is_sorted:
+            last_time = self._times[self._size - 1] if self._size > 0 else times_ns[0]
+            self._is_sorted = bool(times_ns[0] >= last_time and numpy.all(times_ns[1:] >= times_ns[:-1]))
+        self._times[self._size : required] = times_ns
+        self._profits[self._size : required] = profits
+        self._size = required
+
+    def __sort(self):
+        order = numpy.argsort(self._times[: self._size], kind="stable")
+        self._times[: self._size] = self._times[: self._size][order]
+        self._profits[: self._size] = self._profits[: self._size][order]
+        self._is_sorted = True
+
+    def sum(self, start=None, end=None) -> float:
+        """sum profits of start <= time <= end"""
+        if self._is_sorted is False:
+            self.__sort()
+        times = self._times[: self._size]
+        start_position = 0 if start is None else numpy.searchsorted(times, _to_utc_ns(start), side="left")
+        end_position = self._size if end is None else numpy.searchsorted(times, _to_utc_ns(end), side="right")
+        if end_position <= start_position:
+            return 0.0
+        return float(self._profits[start_position:end_position].sum())
+
+    def to_daily(self, tz_info=None) -> pd.Series:
+        """return profits summed by day of tz_info (UTC by default)"""
+        if self._is_sorted is False:
+            self.__sort()
+        index = pd.DatetimeIndex(self._times[: self._size].view("datetime64[ns]")).tz_localize("UTC")
+        if tz_info is not None:
+            index = index.tz_convert(tz_info)
+        profits = pd.Series(self._profits[: self._size], index=index)
+        return profits.groupby(index.normalize()).sum()
+
+
+def _append_csv(file_path: str, rows: List[dict]):
+    df = pd.DataFrame.from_records(rows, columns=list(rows[0].keys()))
+    save_header = not os.path.exists(file_path) or os.path.getsize(file_path) == 0
+    df.to_csv(file_path, mode="a", header=save_header, index_label=None, index=False)
+
+
+class ColumnarLog:
+    """Append-only log rows kept as a list per column.
+
+    DataFrame of all rows is built only when it is read, and rows of a position are looked up by position_id without filtering all rows.
+    """
+
+    def __init__(self, frame: pd.DataFrame = None) -> None:
+        self._columns = {}
+        self._size = 0
+        self._rows_by_id = {}
+        self._frame = None
+        if frame is not None and len(frame) > 0:
+            self._columns = {column: frame[column].tolist() for column in frame.columns}
+            self._size = len(frame)
+            if "position_id" in self._columns:
+                for row_index, id in enumerate(self._columns["position_id"]):
+                    self._rows_by_id.setdefault(id, []).append(row_index)
+
+    def __len__(self):
+        return self._size
+
+    def append(self, row: dict):
+        for key in row.keys() - self._columns.keys():
+            self._columns[key] = [None] * self._size
+        for key, values in self._columns.items():
+            values.append(row.get(key))
+        id = row.get("position_id")
+        if id is not None:
+            self._rows_by_id.setdefault(id, []).append(self._size)
+        self._size += 1
+        self._frame = None
+
+    def extend(self, rows: List[dict]):
+        for row in rows:
+            self.append(row)
+
+    def to_frame(self) -> pd.DataFrame:
+        if self._frame is None:
+            self._frame = pd.DataFrame(self._columns)
+        return self._frame
+
+    def get_rows(self, id) -> pd.DataFrame:
+        """return rows of position_id in appended order"""
+        row_indices = self._rows_by_id.get(id)
+        if not row_indices:
+            return pd.DataFrame()
+        return pd.DataFrame({key: [values[row_index] for row_index in row_indices] for key, values in self._columns.items()}, index=row_indices)
+
+
+class BufferedCSVWriter:
+    """Append rows to a CSV file in batches on a background thread.
+
+    Rows are queued by write and appended when batch_size rows are queued or flush_interval seconds passed since the first queued row.
+    The queue is bounded by max_queue_size and write blocks when it is full. A writer is shared by storages appending to the same file.
+    Queued rows are written on close and at interpreter exit.
+    """
+
+    _writers = {}
+    _writers_lock = threading.Lock()
+
+    def __init__(self, file_path: str, batch_size: int = 1000, flush_interval: float = 1.0, max_queue_size: int = 10000) -> None:
+        """
+        Args:
+            file_path (str): CSV file to append rows
+            batch_size (int, optional): number of rows to write at once. Defaults to 1000.
+            flush_interval (float, optional): max seconds rows wait in the queue. Defaults to 1.0.
+            max_queue_size (int, optional): max number of queued rows. Defaults to 10000.
+        """
+        self.file_path = os.path.abspath(file_path)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._ref_count = 0
+        self._is_closed = False
+        self._closing_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self.__run, daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def acquire(cls, file_path: str, **kwargs) -> "BufferedCSVWriter":
+        """return a writer of file_path. Writers are shared and reference counted by file path."""
+        key = os.path.abspath(file_path)
+        with cls._writers_lock:
+            writer = cls._writers.get(key)
+            if writer is None:
+                writer = cls(key, **kwargs)
+                cls._writers[key] = writer
+            writer._ref_count += 1
+        return writer
+
+    def release(self):
+        with self._writers_lock:
+            self._ref_count -= 1
+            if self._ref_count > 0:
+                return
+            if self._writers.get(self.file_path) is self:
+                del self._writers[self.file_path]
+        self.close()
+
+    def __write(self, rows: List[dict]):
+        try:
+            _append_csv(self.file_path, rows)
+        except Exception:
+            logger.exception(f"failed to write {len(rows)} logs to {self.file_path}")
+
+    def __run(self):
+        rows = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if isinstance(item, dict):
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                rows.append(item)
+                if len(rows) < self.batch_size:
+                    continue
+            elif item is not None and len(rows) == 0:
+                # flush or stop request without queued rows
+                item.set()
+                if item is self._stop_event:
+                    return
+                continue
+            elif item is None and deadline is not None and time.monotonic() < deadline:
+                continue
+            if len(rows) > 0:
+                self.__write(rows)
+            rows = []
+            deadline = None
+            if isinstance(item, threading.Event):
+                item.set()
+                if item is self._stop_event:
+                    return
+
+    def write(self, rows: List[dict]):
+        with self._closing_lock:
+            if self._is_closed:
+                _append_csv(self.file_path, rows)
+                return
+            for row in rows:
+                self._queue.put(row)
+
+    def flush(self, timeout: float = None):
+        """wait until queued rows are written"""
+        if self._is_closed or self._thread.is_alive() is False:
+            return
+        event = threading.Event()
+        self._queue.put(event)
+        event.wait(timeout)
+
+    def close(self):
+        with self._closing_lock:
+            if self._is_closed:
+                return
+            self._is_closed = True
+            if self._thread.is_alive():
+                self._queue.put(self._stop_event)
+        self._thread.join()
+
+    @classmethod
+    def close_all(cls):
+        with cls._writers_lock:
+            writers = list(cls._writers.values())
+            cls._writers.clear()
+        for writer in writers:
+            writer.close()
+
+
+atexit.register(BufferedCSVWriter.close_all)
+
+
+class SQLiteConnectionPool:
+    """Thread local persistent connections to a SQLite database.
+
+    A connection is opened once per thread with WAL journal mode and synchronous=NORMAL, and statements are reused by the statement cache of the connection.
+    Storages with the same database path share a pool, so their writes in a transaction scope are committed together.
+    """
+
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    def __init__(self, database_path: str, timeout: float = 30.0, cached_statements: int = 256) -> None:
+        self.database_path = database_path
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self._generation = 0
+        self._file_id = None
+        self._ref_count = 0
+
+    @classmethod
+    def acquire(cls, database_path: str) -> "SQLiteConnectionPool":
+        """return the pool of database_path. release it when the storage is closed."""
+        if database_path != ":memory:":
+            database_path = os.path.abspath(database_path)
+        with cls._pools_lock:
+            pool = cls._pools.get(database_path)
+            if pool is None:
+                pool = cls(database_path)
+                cls._pools[database_path] = pool
+            pool._ref_count += 1
+        return pool
+
+    def release(self):
+        with self._pools_lock:
+            self._ref_count -= 1
+            if self._ref_count > 0:
+                return
+            if self._pools.get(self.database_path) is self:
+                self._pools.pop(self.database_path)
+        self.close()
+
+    def __get_file_id(self):
+        if self.database_path == ":memory:":
+            return None
+        try:
+            stat = os.stat(self.database_path)
+            return (stat.st_dev, stat.st_ino)
+        except FileNotFoundError:
+            return None
+
+    def __open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.database_path, timeout=self.timeout, cached_statements=self.cached_statements, check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock:
+            self._connections.append(conn)
+            if self._file_id is None:
+                self._file_id = self.__get_file_id()
+        self._local.connection = conn
+        self._local.generation = self._generation
+        self._local.pid = os.getpid()
+        self._local.depth = 0
+        return conn
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "connection", None)
+        if conn is not None and self._local.pid == os.getpid():
+            if self._local.depth > 0:
+                return conn
+            # reopen when the database file is removed or replaced
+            if self._local.generation == self._generation and (
+                self.database_path == ":memory:" or self.__get_file_id() == self._file_id
+            ):
+                return conn
+            if self._local.generation == self._generation:
+                logger.debug(f"{self.database_path} is replaced. reopen connections.")
+                self.close()
+        return self.__open()
+
+    @contextmanager
+    def transaction(self):
+        """scope to commit writes together. Nested scopes are committed by the outermost one."""
+        conn = self.connection
+        self._local.depth += 1
+        try:
+            yield conn
+        except BaseException:
+            self._local.depth -= 1
+            if self._local.depth == 0:
+                conn.rollback()
+            raise
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            conn.commit()
+
+    def execute(self, query: str, params=()):
+        with self.transaction() as conn:
+            conn.execute(query, params)
+
+    def executemany(self, query: str, params_list):
+        with self.transaction() as conn:
+            conn.executemany(query, params_list)
+
+    def fetch(self, query: str, params=()) -> list:
+        return self.connection.execute(query, params).fetchall()
+
+    def close(self):
+        """close connections of all threads"""
+        with self._lock:
+            connections = self._connections
+            self._connections = []
+            self._generation += 1
+            self._file_id = None
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception:
+                logger.debug(f"failed to close a connection of {self.database_path}")
+
+
 class LogStorageBase(metaclass=ABCMeta):
 
     def __init__(self, provider: str, username: str) -> None:
@@ -123,6 +501,13 @@ class LogStorageBase(metaclass=ABCMeta):
         logger.warning("get_profit_logs is not implemented in LogStorageBase.")
         return pd.DataFrame()
 
+    def get_realized_pnl(self, start=None, end=None, provider=None, username=None) -> float:
+        """sum profits of closed positions whose time_index is between start and end (inclusive)"""
+        logs = self.get_profit_logs(provider=provider, username=username, start=start, end=end)
+        if len(logs) == 0:
+            return 0.0
+        return float(logs["profit"].sum())
+
     def get_log(self, provider, username, id=None, order_type=None) -> pd.DataFrame:
         if id is not None and order_type == 1:
             return self._get_open_log_with_id(provider, username, id)
@@ -161,36 +546,62 @@ class LogStorageBase(metaclass=ABCMeta):
         place_holders = self._create_place_holder(len(table_schema_keys))
         return keys, place_holders
 
+    def transaction(self):
+        """scope to store logs together. Storages which don't support transaction write logs immediately."""
+        return nullcontext()
+
     def close(self):
         pass
 
 
 class LogCSVStorage(LogStorageBase):
 
-    def __init__(self, provider, username=None, trade_log_path: str = None, account_history_path: str = None) -> None:
+    def __init__(
+        self, provider, username=None, trade_log_path: str = None, account_history_path: str = None, buffered: bool = True, flush_interval: float = 1.0
+    ) -> None:
+        """
+        Args:
+            provider (str): provider name
+            username (str, optional): user name. Defaults to None.
+            trade_log_path (str, optional): CSV file of trade logs. Defaults to logs/finance_trade_log.csv.
+            account_history_path (str, optional): CSV file of realized profits. Defaults to logs/finance_account_history.csv.
+            buffered (bool, optional): write logs in batches on a background thread. Logs are flushed before the files are read. Defaults to True.
+            flush_interval (float, optional): max seconds buffered logs wait to be written. Defaults to 1.0.
+        """
         super().__init__(provider=provider, username=username)
         self.provider = provider
         self.trade_log_path = _check_path(trade_log_path, "logs/finance_trade_log.csv")
         self.account_history_path = _check_path(account_history_path, "logs/finance_account_history.csv")
-        self.__trade_logs = pd.DataFrame()
+        self.__trade_logs = ColumnarLog()
+        # (provider, username): ProfitLedger. loaded from account history file on first use, then updated when profits are stored.
+        self.__ledgers = None
+        self.__writers = {}
+        if buffered:
+            for file_path in (self.trade_log_path, self.account_history_path):
+                self.__writers[file_path] = BufferedCSVWriter.acquire(file_path, flush_interval=flush_interval)
+
+    def __write(self, file_path: str, rows: List[dict]):
+        writer = self.__writers.get(file_path)
+        if writer is None:
+            _append_csv(file_path, rows)
+        else:
+            writer.write(rows)
 
-    def store_log(self, position: Position, order_type: int, profit: float = None):
-        log_item = self._convert_position_to_log(position, order_type)
-        df = pd.DataFrame.from_dict([log_item])
-        if len(df) == 0:
-            logger.warning("No log item to store.")
-            return
-        save_header = not os.path.exists(self.trade_log_path)
-        df.to_csv(self.trade_log_path, mode="a", header=save_header, index_label=None, index=False)
+    def flush(self):
+        """write buffered logs to the files"""
+        for writer in self.__writers.values():
+            writer.flush()
 
-        # convert None to nan for hiding warning 
-        df = df.where(pd.notnull(df), "nan")
+    def __flush(self, file_path: str):
+        writer = self.__writers.get(file_path)
+        if writer is not None:
+            writer.flush()
 
+    def store_log(self, position: Position, order_type: int, profit: float = None):
+        log_item = self._convert_position_to_log(position, order_type)
+        self.__write(self.trade_log_path, [log_item])
         # store log in memory for later retrieval
-        try:
-            self.__trade_logs = pd.concat([self.__trade_logs, df], ignore_index=True)
-        except Exception as e:
-            logger.warning(f"Failed to store log in memory: {e}")
+        self.__trade_logs.append(log_item)
 
         if order_type == -1:
             if profit is None:
@@ -206,18 +617,13 @@ class LogCSVStorage(LogStorageBase):
                     log_items[log_item["position_id"]] = log_item
             else:
                 log_items = items
-            df = pd.DataFrame.from_dict(log_items)
-            if len(df) == 0:
+            log_items = list(log_items.values())
+            if len(log_items) == 0:
                 logger.warning("No log items to store.")
                 return
-            save_header = not os.path.exists(self.trade_log_path)
-            df.to_csv(self.trade_log_path, mode="a", header=save_header, index_label=None, index=False)
-
+            self.__write(self.trade_log_path, log_items)
             # store log in memory for later retrieval
-            try:
-                self.__trade_logs = pd.concat([self.__trade_logs, df], ignore_index=True)
-            except Exception as e:
-                logger.warning(f"Failed to store log in memory: {e}")
+            self.__trade_logs.extend(log_items)
 
             account_history_items = []
             for item, profit in zip(items, profits) if profits is not None else zip(items, [None] * len(items)):
@@ -237,9 +643,9 @@ class LogCSVStorage(LogStorageBase):
                     }
                     account_history_items.append(account_history_item)
             if len(account_history_items) > 0:
-                account_history_df = pd.DataFrame.from_dict(account_history_items)
-                save_header = not os.path.exists(self.account_history_path)
-                account_history_df.to_csv(self.account_history_path, mode="a", header=save_header, index_label=None, index=False)
+                self.__write(self.account_history_path, account_history_items)
+                if self.__ledgers is not None:
+                    self.__add_to_ledgers(pd.DataFrame.from_dict(account_history_items))
 
     def store_profit_logs(self, position: Position, profit: float):
         if profit is not None:
@@ -252,9 +658,50 @@ class LogCSVStorage(LogStorageBase):
                 "profit": profit,
                 "logged_at": datetime.datetime.now(tz=datetime.timezone.utc).isoformat(),
             }
-            account_history_df = pd.DataFrame.from_dict([account_history_item])
-            save_header = not os.path.exists(self.account_history_path)
-            account_history_df.to_csv(self.account_history_path, mode="a", header=save_header, index_label=None, index=False)
+            self.__write(self.account_history_path, [account_history_item])
+            if self.__ledgers is not None:
+                self.__add_to_ledgers(pd.DataFrame.from_dict([account_history_item]))
+
+    def __add_to_ledgers(self, profit_df: pd.DataFrame, ledgers: dict = None):
+        if ledgers is None:
+            ledgers = self.__ledgers
+            if ledgers is None:
+                # ledgers will be loaded from the file including the profit_df
+                return
+        times = pd.to_datetime(profit_df["time_index"], utc=True, format="ISO8601", errors="coerce")
+        profit_df = profit_df.assign(_time=times).dropna(subset=["profit", "_time"])
+        if len(profit_df) == 0:
+            return
+        profit_df = profit_df.assign(_time_ns=profit_df["_time"].dt.as_unit("ns").astype("int64"))
+        for (provider, username), group in profit_df.groupby(["provider", "username"], sort=False):
+            ledger = ledgers.get((provider, username))
+            if ledger is None:
+                ledger = ProfitLedger()
+                ledgers[(provider, username)] = ledger
+            ledger.add_many(group["_time_ns"].to_numpy(dtype=numpy.int64), group["profit"].to_numpy(dtype=numpy.float64))
+
+    def __get_ledger(self, provider, username) -> ProfitLedger:
+        if self.__ledgers is None:
+            ledgers = {}
+            self.__flush(self.account_history_path)
+            if os.path.exists(self.account_history_path):
+                try:
+                    self.__add_to_ledgers(pd.read_csv(self.account_history_path), ledgers)
+                except Exception:
+                    logger.exception(f"failed to load profits from {self.account_history_path}")
+                    return None
+            self.__ledgers = ledgers
+        return self.__ledgers.get((provider, username), ProfitLedger(capacity=0))
+
+    def get_realized_pnl(self, start=None, end=None, provider=None, username=None) -> float:
+        if provider is None:
+            provider = self.provider
+        if username is None:
+            username = self.username
+        ledger = self.__get_ledger(provider, username)
+        if ledger is None:
+            return super().get_realized_pnl(start=start, end=end, provider=provider, username=username)
+        return ledger.sum(start, end)
 
     def __filter_logs(self, logs, provider=None, username=None, start=None, end=None, id=None):
         if len(logs) == 0:
@@ -292,13 +739,14 @@ class LogCSVStorage(LogStorageBase):
         username,
         id,
     ) -> pd.DataFrame:
-        log_df = self.__filter_logs(self.__trade_logs, provider=provider, username=username, id=id)
+        log_df = self.__filter_logs(self.__trade_logs.get_rows(id), provider=provider, username=username)
         if len(log_df) > 0:
             log_df = log_df.sort_values(by="logged_at", ascending=False)
             return log_df
+        self.__flush(self.trade_log_path)
         if os.path.exists(self.trade_log_path):
             df = pd.read_csv(self.trade_log_path)
-            self.__trade_logs = df.copy()
+            self.__trade_logs = ColumnarLog(df)
             log_df = self.__filter_logs(df, provider=provider, username=username, id=id)
             if len(log_df) > 1:
                 log_df = log_df.sort_values(by="logged_at", ascending=False)
@@ -327,6 +775,7 @@ class LogCSVStorage(LogStorageBase):
             provider = self.provider
         if username is None:
             username = self.username
+        self.__flush(self.trade_log_path)
         df = pd.read_csv(self.trade_log_path)
         log_df = self.__filter_logs(df, provider=provider, username=username, start=start, end=end)
         return log_df
@@ -336,6 +785,7 @@ class LogCSVStorage(LogStorageBase):
             provider = self.provider
         if username is None:
             username = self.username
+        self.__flush(self.account_history_path)
         if os.path.exists(self.account_history_path):
             df = pd.read_csv(self.account_history_path, parse_dates=["time_index", "logged_at"])
             profit_log_df = self.__filter_logs(df, provider=provider, username=username, start=start, end=end)
@@ -343,6 +793,18 @@ class LogCSVStorage(LogStorageBase):
         else:
             return pd.DataFrame()
 
+    def close(self):
+        writers = self.__writers
+        self.__writers = {}
+        for writer in writers.values():
+            writer.release()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
 
 class LogSQLiteStorage(LogStorageBase):
     TRADE_TABLE_NAME = "trade"
@@ -374,62 +836,60 @@ class LogSQLiteStorage(LogStorageBase):
         "profit": "REAL",
         "logged_at": "TIMESTAMP DEFAULT CURRENT_TIMESTAMP",
     }
-
-    __lock = threading.Lock()
+    _REALIZED_PNL_QUERY = (
+        "SELECT SUM(profit) FROM profit WHERE provider=? AND username=? "
+        "AND julianday(time_index) >= julianday(?) AND julianday(time_index) <= julianday(?)"
+    )
 
     def __init__(self, database_path, provider: str, username=None) -> None:
         super().__init__(provider=provider, username=username)
 
         self.__database_path = database_path
+        self._pool = SQLiteConnectionPool.acquire(database_path)
+        # queries are created once so that prepared statements are reused by the connection
+        keys, place_holders = self._create_basic_query(list(self._TRADE_TABLE_KEYS.keys())[1:])
+        self._insert_trade_query = f"INSERT INTO {self.TRADE_TABLE_NAME} ({keys}) VALUES {place_holders}"
+        keys, place_holders = self._create_basic_query(list(self._PROFIT_TABLE_KEYS.keys())[1:])
+        self._insert_profit_query = f"INSERT INTO profit ({keys}) VALUES {place_holders}"
         self._table_init()
 
     def _table_init(self):
-        conn = sqlite3.connect(self.__database_path)
-        cursor = conn.cursor()
         table_schema = ",".join([f"{key} {attr}" for key, attr in self._TRADE_TABLE_KEYS.items()])
-        cursor.execute(
-            f"""
-            CREATE TABLE IF NOT EXISTS {self.TRADE_TABLE_NAME} (
-                {table_schema}
+        with self._pool.transaction() as conn:
+            conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {self.TRADE_TABLE_NAME} (
+                    {table_schema}
+                )
+                """
             )
-            """
-        )
-        conn.commit()
-
-        cursor.execute(
-            f"""
-            CREATE TABLE IF NOT EXISTS profit (
-                {','.join([f"{key} {attr}" for key, attr in self._PROFIT_TABLE_KEYS.items()])}
+            conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS profit (
+                    {','.join([f"{key} {attr}" for key, attr in self._PROFIT_TABLE_KEYS.items()])}
+                )
+                """
             )
-            """
-        )
-        conn.commit()
-        cursor.close()
-        conn.close()
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{self.TRADE_TABLE_NAME}_time ON {self.TRADE_TABLE_NAME} (provider, username, time_index)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.TRADE_TABLE_NAME}_position ON {self.TRADE_TABLE_NAME} (position_id)")
+            # time_index has offsets of each client. julianday converts them to UTC for range queries
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_profit_julianday ON profit (provider, username, julianday(time_index))")
 
     def __commit(self, query, params: tuple):
-        with self.__lock:
-            conn = sqlite3.connect(self.__database_path)
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            conn.commit()
-            cursor.close()
-            conn.close()
+        self._pool.execute(query, params)
 
     def __multi_commit(self, query, params_list: list):
-        with self.__lock:
-            conn = sqlite3.connect(self.__database_path)
-            cursor = conn.cursor()
-            cursor.executemany(query, params_list)
-            conn.commit()
-            cursor.close()
-            conn.close()
+        self._pool.executemany(query, params_list)
+
+    def transaction(self):
+        """scope to commit logs together with other storages on the same database"""
+        return self._pool.transaction()
 
     def store_log(self, position: Position, order_type: int, profit: float = None):
         values_dict = self._convert_position_to_log(position, order_type)
-        keys, place_holders = self._create_basic_query(list(self._TRADE_TABLE_KEYS.keys())[1:])
-        query = f"INSERT INTO {self.TRADE_TABLE_NAME} ({keys}) VALUES {place_holders}"
-        self.__commit(query, tuple(values_dict.values()))
+        self.__commit(self._insert_trade_query, tuple(values_dict.values()))
 
         if order_type == -1:
             if profit is None:
@@ -438,9 +898,7 @@ class LogSQLiteStorage(LogStorageBase):
 
     def store_logs(self, items: List[Union[Position, int]], profits: List[float] = None):
         log_values = [tuple(self._convert_position_to_log(*item).values()) for item in items]
-        keys, place_holders = self._create_basic_query(list(self._TRADE_TABLE_KEYS.keys())[1:])
-        query = f"INSERT INTO {self.TRADE_TABLE_NAME} ({keys}) VALUES {place_holders}"
-        self.__multi_commit(query, log_values)
+        self.__multi_commit(self._insert_trade_query, log_values)
 
         profit_log_items = []
         for item, profit in zip(items, profits) if profits is not None else zip(items, [None] * len(items)):
@@ -460,9 +918,7 @@ class LogSQLiteStorage(LogStorageBase):
                 }
                 profit_log_items.append(tuple(profit_log_item.values()))
         if len(profit_log_items) > 0:
-            keys, place_holders = self._create_basic_query(list(self._PROFIT_TABLE_KEYS.keys())[1:])
-            query = f"INSERT INTO profit ({keys}) VALUES {place_holders}"
-            self.__multi_commit(query, profit_log_items)
+            self.__multi_commit(self._insert_profit_query, profit_log_items)
 
     def store_profit_logs(self, position: Position, profit: float):
         if profit is not None:
@@ -476,44 +932,33 @@ class LogSQLiteStorage(LogStorageBase):
                 "profit": profit,
                 "logged_at": datetime.datetime.now(tz=datetime.timezone.utc).isoformat(),
             }
-            keys, place_holders = self._create_basic_query(list(self._PROFIT_TABLE_KEYS.keys())[1:])
-            query = f"INSERT INTO profit ({keys}) VALUES {place_holders}"
-            self.__commit(query, tuple(profit_log_item.values()))
+            self.__commit(self._insert_profit_query, tuple(profit_log_item.values()))
         else:
             logger.warning(f"Profit is None for position id {position.id}. profit cannot be calculated.")
 
     def _get_log_with_id(self, provider, username, id):
-        with self.__lock:
-            conn = sqlite3.connect(self.__database_path)
-            query = f"SELECT * FROM {self.TRADE_TABLE_NAME} WHERE provider=? AND username=? AND position_id=?"
-            df = pd.read_sql_query(
-                query,
-                conn,
-                params=(provider, username, id),
-            )
-            conn.close()
-            if len(df) > 0:
-                df = df.sort_values(by="logged_at", ascending=False)
-                df = df.iloc[-1:]
-            return df
+        query = f"SELECT * FROM {self.TRADE_TABLE_NAME} WHERE provider=? AND username=? AND position_id=?"
+        df = pd.read_sql_query(
+            query,
+            self._pool.connection,
+            params=(provider, username, id),
+        )
+        if len(df) > 0:
+            df = df.sort_values(by="logged_at", ascending=False)
+            df = df.iloc[-1:]
+        return df
 
     def _get_open_log_with_id(self, provider, username, id):
-        with self.__lock:
-            conn = sqlite3.connect(self.__database_path)
-            query = f"SELECT * FROM {self.TRADE_TABLE_NAME} WHERE provider=? AND username=? AND position_id=? AND order_type=1"
-            df = pd.read_sql_query(query, conn, params=(provider, username, id), parse_dates=["time_index", "logged_at"])
-            conn.close()
-            if len(df) > 0:
-                df = df.sort_values(by="logged_at", ascending=False)
-                df = df.iloc[-1:]
-            return df
+        query = f"SELECT * FROM {self.TRADE_TABLE_NAME} WHERE provider=? AND username=? AND position_id=? AND order_type=1"
+        df = pd.read_sql_query(query, self._pool.connection, params=(provider, username, id), parse_dates=["time_index", "logged_at"])
+        if len(df) > 0:
+            df = df.sort_values(by="logged_at", ascending=False)
+            df = df.iloc[-1:]
+        return df
 
     def get_logs(self, provider, username, start=None, end=None) -> pd.DataFrame:
-        with self.__lock:
-            conn = sqlite3.connect(self.__database_path)
-            query = f"SELECT * FROM {self.TRADE_TABLE_NAME} WHERE provider=? AND username=?"
-            df = pd.read_sql_query(query, conn, params=(provider, username), parse_dates=["time_index", "logged_at"])
-            conn.close()
+        query = f"SELECT * FROM {self.TRADE_TABLE_NAME} WHERE provider=? AND username=?"
+        df = pd.read_sql_query(query, self._pool.connection, params=(provider, username), parse_dates=["time_index", "logged_at"])
         if start is not None:
             df = df[df["time_index"] >= start]
         if end is not None:
@@ -521,24 +966,41 @@ class LogSQLiteStorage(LogStorageBase):
         return df
 
     def get_profit_logs(self, provider=None, username=None, start=None, end=None) -> pd.DataFrame:
-        with self.__lock:
-            if provider is None:
-                provider = self.provider
-            if username is None:
-                username = self.username
-            conn = sqlite3.connect(self.__database_path)
-            query = "SELECT * FROM profit WHERE provider=? AND username=?"
-            df = pd.read_sql_query(query, conn, params=(provider, username), parse_dates=["time_index", "logged_at"])
-            conn.close()
+        if provider is None:
+            provider = self.provider
+        if username is None:
+            username = self.username
+        query = "SELECT * FROM profit WHERE provider=? AND username=?"
+        df = pd.read_sql_query(query, self._pool.connection, params=(provider, username), parse_dates=["time_index", "logged_at"])
         if start is not None:
             df = df[df["time_index"] >= start]
         if end is not None:
             df = df[df["time_index"] <= end]
         return df
 
+    def get_realized_pnl(self, start=None, end=None, provider=None, username=None) -> float:
+        if provider is None:
+            provider = self.provider
+        if username is None:
+            username = self.username
+        # bounds are compared as UTC. Naive index is treated as UTC
+        start = "0001-01-01T00:00:00" if start is None else pd.Timestamp(start).isoformat()
+        end = "9999-12-31T23:59:59" if end is None else pd.Timestamp(end).isoformat()
+        records = self._pool.fetch(self._REALIZED_PNL_QUERY, (provider, username, start, end))
+        if len(records) == 0 or records[0][0] is None:
+            return 0.0
+        return float(records[0][0])
+
     def close(self):
+        if self._pool is not None:
+            self._pool.release()
+            self._pool = None
         return super().close()
 
+    def __del__(self):
+        if getattr(self, "_pool", None) is not None:
+            self.close()
+
 
 class PositionStorageBase:
     """Base Storage for position. Store position in memory."""
@@ -623,6 +1085,10 @@ class PositionStorageBase:
     def update_position(self, position):
         self.store_position(position)
 
+    def transaction(self):
+        """scope to store positions together. Storages which don't support transaction write positions immediately."""
+        return nullcontext()
+
     def close(self):
         pass
 
@@ -669,6 +1135,8 @@ class PositionFileStorage(PositionStorageBase):
         self._load_positions()
 
         self.__update_required = False
+        self.__transaction_depth = 0
+        self.__save_pending = False
         self.save_period = save_period * 60.0
         self.__running = True
         if save_period > 0:
@@ -745,17 +1213,34 @@ class PositionFileStorage(PositionStorageBase):
         else:
             return None
 
+    def __save_immediately(self):
+        if self.__immediate_save is True:
+            if self.__transaction_depth > 0:
+                self.__save_pending = True
+            else:
+                self.__update_positions_file()
+
+    @contextmanager
+    def transaction(self):
+        """scope to save the positions file once for writes in it"""
+        self.__transaction_depth += 1
+        try:
+            yield
+        finally:
+            self.__transaction_depth -= 1
+            if self.__transaction_depth == 0 and self.__save_pending:
+                self.__save_pending = False
+                self.__update_positions_file()
+
     def delete_position(self, id):
         suc, p = super().delete_position(id)
-        if self.__immediate_save is True:
-            self.__update_positions_file()
+        self.__save_immediately()
         self.__update_required = True
         return suc, p
 
     def store_position(self, position: Position):
         super().store_position(position)
-        if self.__immediate_save is True:
-            self.__update_positions_file()
+        self.__save_immediately()
         self.__update_required = True
 
     def store_positions(self, positions: List[Position]):
@@ -776,9 +1261,8 @@ class PositionFileStorage(PositionStorageBase):
         if self.has_position(position.id) is False:
             return False
         super().store_position(position)
-        if self.__immediate_save is True:
-            self.__update_positions_file()
-            # save log file separately as position doesn't have closed price
+        # save log file separately as position doesn't have closed price
+        self.__save_immediately()
         self.__update_required = True
         return True
 
@@ -861,38 +1345,38 @@ class PositionSQLiteStorage(PositionStorageBase):
         "source": "TEXT",
     }
     TRADE_TABLE_NAME = "trade"
-    __lock = threading.Lock()
 
     def _table_init(self):
-        conn = sqlite3.connect(self.__database_path)
-        cursor = conn.cursor()
-        table_schema = ",".join([f"{key} {attr}" for key, attr in self._POSITION_TABLE_KEYS.items()])
-        cursor.execute(
-            f"""
-            CREATE TABLE IF NOT EXISTS {self.POSITION_TABLE_NAME} (
-                {table_schema}
+        with self._pool.transaction() as conn:
+            table_schema = ",".join([f"{key} {attr}" for key, attr in self._POSITION_TABLE_KEYS.items()])
+            conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {self.POSITION_TABLE_NAME} (
+                    {table_schema}
+                )
+                """
             )
-            """
-        )
-        table_schema = ",".join([f"{key} {attr}" for key, attr in self._SYMBOL_TABLE_KEYS.items()])
-        cursor.execute(
-            f"""
-            CREATE TABLE IF NOT EXISTS {self.SYMBOL_TABLE_NAME} (
-                {table_schema}
+            table_schema = ",".join([f"{key} {attr}" for key, attr in self._SYMBOL_TABLE_KEYS.items()])
+            conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {self.SYMBOL_TABLE_NAME} (
+                    {table_schema}
+                )
+                """
             )
-            """
-        )
-        table_schema = ",".join([f"{key} {attr}" for key, attr in self._RATING_TABLE_KEYT.items()])
-        cursor.execute(
-            f"""
-            CREATE TABLE IF NOT EXISTS {self.RATING_TABLE_NAME} (
-                {table_schema},
-                FOREIGN KEY (symbol_id) REFERENCES {self.SYMBOL_TABLE_NAME}(id)
+            table_schema = ",".join([f"{key} {attr}" for key, attr in self._RATING_TABLE_KEYT.items()])
+            conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {self.RATING_TABLE_NAME} (
+                    {table_schema},
+                    FOREIGN KEY (symbol_id) REFERENCES {self.SYMBOL_TABLE_NAME}(id)
+                )
+                """
+            )
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{self.POSITION_TABLE_NAME}_symbol_side "
+                f"ON {self.POSITION_TABLE_NAME} (provider, username, symbol, position_side)"
             )
-            """
-        )
-        cursor.close()
-        conn.close()
 
     def __init__(self, database_path, provider: str, username: str) -> None:
         super().__init__(provider, username)
@@ -900,35 +1384,30 @@ class PositionSQLiteStorage(PositionStorageBase):
             self.username = "__none__"
 
         self.__database_path = database_path
+        self._pool = SQLiteConnectionPool.acquire(database_path)
         self._table_init()
 
     def __commit(self, query, params):
-        with self.__lock:
-            conn = sqlite3.connect(self.__database_path)
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            conn.commit()
-            cursor.close()
-            conn.close()
+        self._pool.execute(query, params)
 
     def __multi_commit(self, query, params_list):
-        with self.__lock:
-            conn = sqlite3.connect(self.__database_path)
-            cursor = conn.cursor()
-            cursor.executemany(query, params_list)
-            conn.commit()
-            cursor.close()
-            conn.close()
+        self._pool.executemany(query, params_list)
 
     def __fetch(self, query, params):
-        with self.__lock:
-            conn = sqlite3.connect(self.__database_path)
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            records = cursor.fetchall()
-            cursor.close()
-            conn.close()
-        return records
+        return self._pool.fetch(query, params)
+
+    def transaction(self):
+        """scope to commit positions together with other storages on the same database"""
+        return self._pool.transaction()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.release()
+            self._pool = None
+
+    def __del__(self):
+        if getattr(self, "_pool", None) is not None:
+            self.close()
 
     def __records_to_positions(self, records, keys) -> List[Position]:
         positions = []
@@ -1152,3 +1631,152 @@ class PositionSQLiteStorage(PositionStorageBase):
             return True, p
         except Exception:
             return False, p
+
+
+class PositionMemoryStorage(PositionStorageBase):
+    """Position storage indexed in memory. Changes are written behind to a backend storage periodically and on close."""
+
+    def __init__(self, provider: str, username: str = None, backend: PositionStorageBase = None, flush_period: float = 1.0) -> None:
+        """
+        Args:
+            provider (str): provider id to separate position information
+            username (str, optional): username to separate position information. Defaults to None.
+            backend (PositionStorageBase, optional): storage to persist positions (e.g. PositionSQLiteStorage or PositionFileStorage). Defaults to None and positions are kept in memory only.
+            flush_period (float, optional): minutes to periodically flush changes to backend. 0 or less flushes them on flush and close only. Defaults to 1.0.
+        """
+        super().__init__(provider, username)
+        self.backend = backend
+        self.flush_period = flush_period * 60.0
+        self._symbol_positions = {POSITION_SIDE.long: {}, POSITION_SIDE.short: {}}
+        # id: (position_side, symbol) to find index entries even when the position object is changed
+        self._keys = {}
+        self._dirty_ids = set()
+        self._deleted_ids = set()
+        self._persisted_ids = set()
+        self._lock = threading.RLock()
+        self.__stop_event = threading.Event()
+        self.__closed = False
+
+        if backend is not None:
+            long_positions, short_positions = backend.get_positions()
+            for position in [*long_positions, *short_positions]:
+                self.__add(position)
+                self._persisted_ids.add(position.id)
+        if backend is not None and self.flush_period > 0:
+            threading.Thread(target=self._periodical_flush, daemon=True).start()
+
+    def __add(self, position: Position):
+        self._positions[position.position_side][position.id] = position
+        self._symbol_positions[position.position_side].setdefault(position.symbol, {})[position.id] = position
+        self._keys[position.id] = (position.position_side, position.symbol)
+
+    def __remove(self, id) -> Position:
+        if id not in self._keys:
+            return None
+        side, symbol = self._keys.pop(id)
+        symbol_positions = self._symbol_positions[side]
+        symbol_positions[symbol].pop(id)
+        if len(symbol_positions[symbol]) == 0:
+            symbol_positions.pop(symbol)
+        return self._positions[side].pop(id)
+
+    def store_position(self, position: Position):
+        with self._lock:
+            # symbol or side may be changed by the caller
+            self.__remove(position.id)
+            self.__add(position)
+            self._dirty_ids.add(position.id)
+
+    def store_positions(self, positions: List[Position]):
+        with self._lock:
+            for position in positions:
+                self.store_position(position)
+
+    def update_position(self, position: Position):
+        with self._lock:
+            if self.has_position(position.id) is False:
+                return False
+            self.store_position(position)
+        return True
+
+    def delete_position(self, id):
+        with self._lock:
+            position = self.__remove(id)
+            if position is None:
+                return False, None
+            self._dirty_ids.discard(id)
+            if id in self._persisted_ids:
+                self._deleted_ids.add(id)
+        return True, position
+
+    def __get_side_positions(self, position_side: POSITION_SIDE, symbols: list = None) -> List[Position]:
+        with self._lock:
+            if symbols is None or len(symbols) == 0:
+                return list(self._positions[position_side].values())
+            if isinstance(symbols, str):
+                symbols = [symbols]
+            symbol_positions = self._symbol_positions[position_side]
+            positions = []
+            for symbol in symbols:
+                if symbol in symbol_positions:
+                    positions.extend(symbol_positions[symbol].values())
+            return positions
+
+    def get_long_positions(self, symbols: list = None) -> List[Position]:
+        return self.__get_side_positions(POSITION_SIDE.long, symbols)
+
+    def get_short_positions(self, symbols: list = None) -> List[Position]:
+        return self.__get_side_positions(POSITION_SIDE.short, symbols)
+
+    def store_symbol_info(self, symbol, rating=None, date=None, source=None, market=None):
+        if self.backend is not None:
+            self.backend.store_symbol_info(symbol, rating=rating, date=date, source=source, market=market)
+
+    def get_symbol_info(self, symbol, source):
+        if self.backend is not None:
+            return self.backend.get_symbol_info(symbol, source)
+        return []
+
+    def flush(self):
+        """write positions changed since the last flush to backend"""
+        if self.backend is None:
+            return
+        with self._lock:
+            deleted_ids = self._deleted_ids
+            dirty_positions = [self.get_position(id) for id in self._dirty_ids]
+            self._deleted_ids = set()
+            self._dirty_ids = set()
+            if len(deleted_ids) == 0 and len(dirty_positions) == 0:
+                return
+            try:
+                with self.backend.transaction():
+                    for id in deleted_ids:
+                        self.backend.delete_position(id)
+                    for position in dirty_positions:
+                        if position.id in self._persisted_ids:
+                            self.backend.update_position(position)
+                        else:
+                            self.backend.store_position(position)
+            except Exception:
+                # keep changes to retry them on next flush
+                self._deleted_ids.update(deleted_ids)
+                self._dirty_ids.update([position.id for position in dirty_positions])
+                raise
+            self._persisted_ids.difference_update(deleted_ids)
+            self._persisted_ids.update([position.id for position in dirty_positions])
+
+    def _periodical_flush(self):
+        while not self.__stop_event.wait(self.flush_period):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("failed to flush positions")
+
+    def close(self):
+        if self.__closed:
+            return
+        self.__closed = True
+        self.__stop_event.set()
+        self.flush()
+        if self.backend is not None:
+            self.backend.close()
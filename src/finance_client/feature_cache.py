@@ -0,0 +1,148 @@
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy
+import pandas as pd
+
+from .fprocess import idcprocess
+
+logger = logging.getLogger(__name__)
+
+
+def process_signature(processes: list):
+    """return a hashable signature of processes by idcprocess.indicaters_to_params. None is returned if a process doesn't have params."""
+    try:
+        params = idcprocess.indicaters_to_params(processes)
+    except AttributeError:
+        return None
+    return json.dumps([[key, params[key]] for key in params], sort_keys=True, default=str)
+
+
+def _to_float_values(data: pd.DataFrame):
+    try:
+        return data.to_numpy(dtype=numpy.float64)
+    except (TypeError, ValueError):
+        return None
+
+
+class _Entry:
+    __slots__ = ("source", "result", "nbytes")
+
+    def __init__(self, source: pd.DataFrame, result: pd.DataFrame):
+        self.source = source
+        self.result = result
+        self.nbytes = int(source.memory_usage(index=True).sum() + result.memory_usage(index=True).sum())
+
+
+class FeatureCache:
+    """LRU cache of features computed by processes on OHLC data.
+
+    Entries are keyed by (symbol, frame, signature of processes) and keep source rows with their features.
+    A request is served from an entry only when its index and values are same as the source rows of the entry, e.g. tools asking indicators of the same bars.
+    Rows of other ranges are always computed, as recursive indicators like EMA, MACD and RSI depend on the first row of the data.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_rows: int = 20000):
+        """
+        Args:
+            max_bytes (int, optional): memory budget of all entries. Least recently used entries are evicted over it. Defaults to 64MB.
+            max_rows (int, optional): data longer than this is not cached. Defaults to 20000.
+        """
+        self.max_bytes = max_bytes
+        self.max_rows = max_rows
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "nbytes": self._nbytes, "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+    def __pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._nbytes -= entry.nbytes
+
+    def __put(self, key, entry: _Entry):
+        with self._lock:
+            self.__pop(key)
+            if entry.nbytes > self.max_bytes:
+                logger.debug(f"features of {key[:2]} are not cached as they exceed the memory budget")
+                return
+            self._entries[key] = entry
+            self._nbytes += entry.nbytes
+            while self._nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._nbytes -= evicted.nbytes
+
+    def __get_entry(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def get(self, symbol, frame, processes: list, data: pd.DataFrame, compute) -> pd.DataFrame:
+        """return features of data computed by compute, reusing cached features of the same symbol, frame, processes and data
+
+        Args:
+            symbol (Any): hashable key of the source like a symbol or a tuple of symbols
+            frame (Any): hashable key of the frame. Defaults to the interval of the last two rows when None.
+            processes (list): processes used by compute. Their params are used as signature.
+            data (pd.DataFrame): source data
+            compute (Callable[[pd.DataFrame], pd.DataFrame]): function to compute features which returns a frame with the same index as its argument
+
+        Returns:
+            pd.DataFrame: same as compute(data)
+        """
+        signature = process_signature(processes)
+        values = _to_float_values(data)
+        if signature is None or values is None or len(data) == 0 or len(data) > self.max_rows:
+            return compute(data)
+        if frame is None and len(data) > 1:
+            frame = data.index[-1] - data.index[-2]
+        key = (symbol, frame, signature)
+
+        entry = self.__get_entry(key)
+        if entry is not None and self.__is_same_source(entry.source, data, values):
+            self.hits += 1
+            return entry.result.copy()
+        self.misses += 1
+        result = compute(data)
+        if isinstance(result, pd.DataFrame) and result.index.equals(data.index):
+            self.__put(key, _Entry(data.copy(), result))
+        return result.copy()
+
+    @staticmethod
+    def __is_same_source(source: pd.DataFrame, data: pd.DataFrame, values: numpy.ndarray) -> bool:
+        # the last bar of live data may be updated after it was cached
+        if not source.index.equals(data.index) or not source.columns.equals(data.columns):
+            return False
+        cached_values = source.to_numpy(dtype=numpy.float64)
+        return bool(((cached_values == values) | (numpy.isnan(cached_values) & numpy.isnan(values))).all())
+
+
+_shared_cache = None
+
+
+def get_shared_cache() -> FeatureCache:
+    """return a FeatureCache shared in the process"""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = FeatureCache()
+    return _shared_cache
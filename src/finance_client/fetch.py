@@ -0,0 +1,153 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """rate limiter which allows `rate` requests per second on average and bursts up to `capacity` requests. Thread safe."""
+
+    def __init__(self, rate: float, capacity: float = None, clock=time.monotonic, sleep=time.sleep):
+        """
+        Args:
+            rate (float): tokens added per second
+            capacity (float, optional): max tokens. Defaults to None and max(rate, 1) is used.
+            clock (Callable, optional): monotonic clock in seconds. Defaults to time.monotonic.
+            sleep (Callable, optional): function to wait seconds. Defaults to time.sleep.
+        """
+        if rate <= 0:
+            raise ValueError("rate should be greater than 0")
+        self.rate = rate
+        self.capacity = max(rate, 1.0) if capacity is None else capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def __reserve(self, tokens: float) -> float:
+        """take tokens and return seconds to wait until they are available"""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            # tokens can be negative so that waiting callers are served in order
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """wait until tokens are available
+
+        Returns:
+            float: seconds waited
+        """
+        wait = self.__reserve(tokens)
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str, rate: float, capacity: float = None) -> TokenBucket:
+    """return a TokenBucket shared by clients of the provider. rate and capacity are used when the bucket is created."""
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(provider)
+        if limiter is None:
+            limiter = TokenBucket(rate, capacity)
+            _rate_limiters[provider] = limiter
+        return limiter
+
+
+class FetchResult:
+    def __init__(self):
+        self.results = {}
+        self.errors = {}
+        self.attempts = {}
+
+    def __repr__(self):
+        return f"FetchResult(succeeded={list(self.results.keys())}, failed={list(self.errors.keys())})"
+
+
+class FetchPipeline:
+    """fetch and persist symbols concurrently on a thread pool.
+
+    Each symbol is fetched by fetch(symbol) and persisted by persist(symbol, result) on the same worker, so files of symbols are written in parallel.
+    Failed fetches are retried with exponential backoff and jitter. A rate limiter shared by the provider is acquired before each attempt.
+    """
+
+    def __init__(
+        self,
+        fetch,
+        persist=None,
+        max_workers: int = 8,
+        rate_limiter: TokenBucket = None,
+        retries: int = 3,
+        backoff: float = 1.0,
+        max_backoff: float = 30.0,
+        sleep=time.sleep,
+    ):
+        """
+        Args:
+            fetch (Callable[[str], Any]): function to fetch data of a symbol. Raise an exception to retry.
+            persist (Callable[[str, Any], None], optional): function to save fetched data of a symbol. Defaults to None.
+            max_workers (int, optional): max number of symbols processed at the same time. Defaults to 8.
+            rate_limiter (TokenBucket, optional): limiter acquired before each fetch. Defaults to None.
+            retries (int, optional): number of retries after the first attempt. Defaults to 3.
+            backoff (float, optional): base seconds of backoff. n-th retry waits backoff * 2 ** (n - 1) seconds with jitter. Defaults to 1.0.
+            max_backoff (float, optional): max seconds of backoff. Defaults to 30.0.
+            sleep (Callable, optional): function to wait seconds. Defaults to time.sleep.
+        """
+        self.fetch = fetch
+        self.persist = persist
+        self.max_workers = max(1, max_workers)
+        self.rate_limiter = rate_limiter
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._sleep = sleep
+
+    def __process(self, symbol):
+        attempt = 0
+        while True:
+            attempt += 1
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            try:
+                result = self.fetch(symbol)
+                if self.persist is not None:
+                    self.persist(symbol, result)
+                return result, attempt
+            except Exception as e:
+                if attempt > self.retries:
+                    logger.error(f"failed to fetch {symbol} after {attempt} attempts: {e}")
+                    raise
+                wait = min(self.max_backoff, self.backoff * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+                logger.warning(f"failed to fetch {symbol}: {e}. retry after {wait:.2f}s")
+                self._sleep(wait)
+
+    def run(self, symbols: list) -> FetchResult:
+        """fetch and persist symbols
+
+        Returns:
+            FetchResult: results and errors by symbol
+        """
+        fetch_result = FetchResult()
+        symbols = list(dict.fromkeys(symbols))
+        if len(symbols) == 0:
+            return fetch_result
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(symbols)), thread_name_prefix="fetch") as executor:
+            futures = {symbol: executor.submit(self.__process, symbol) for symbol in symbols}
+            for symbol, future in futures.items():
+                try:
+                    fetch_result.results[symbol], fetch_result.attempts[symbol] = future.result()
+                except Exception as e:
+                    fetch_result.errors[symbol] = e
+        return fetch_result
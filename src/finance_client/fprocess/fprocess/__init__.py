@@ -1,5 +1,6 @@
 from . import indicaters, ohlc, regime, standalization, validation
 from .addprocess import get_indicater
 from .idcprocess import *
+from .pipeline import IncrementalPipeline
 from .preprocess import *
 from .timeprocess import *
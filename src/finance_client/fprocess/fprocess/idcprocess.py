@@ -1,6 +1,5 @@
 import numpy
 import pandas as pd
-from scipy.stats import linregress
 
 from .convert import concat, get_symbols
 from .indicaters import technical
@@ -59,6 +58,7 @@ def load_indicaters(params: dict) -> list:
 
 class MACDProcess(ProcessBase):
     kinds = "MACD"
+    support_update = True
 
     def __init__(
         self,
@@ -154,36 +154,48 @@ class MACDProcess(ProcessBase):
             )
 
         self.last_data = macd_df.iloc[-self.get_minimum_required_length() :]
+        self.__initialize_state(data, macd_df, symbols, grouped_by_symbol)
         return pd.concat([data, macd_df], axis=1)
 
-    def update(self, tick: pd.Series, symbols: list = []):
-        if type(symbols) == list and len(symbols) > 0:
-            print("update is not implemented for multi symbols yet")
+    def __initialize_state(self, data: pd.DataFrame, macd_df: pd.DataFrame, symbols: list, grouped_by_symbol: bool):
+        self._short_ema = None
+        if len(macd_df) == 0:
+            return
+        option = self.option
+        self._store_update_layout(data, macd_df, symbols, grouped_by_symbol)
+        target_values = self._get_update_values(data, option["column"])
+        values = self._get_result_values(macd_df)
+        self._short_weight = technical.get_EWM_weight(target_values, 2 / (option["short_window"] + 1))
+        self._long_weight = technical.get_EWM_weight(target_values, 2 / (option["long_window"] + 1))
+        self._long_ema = values[self.KEY_LONG_EMA][-1]
+        # keep signal_window - 1 MACD values to caliculate Signal with new MACD
+        self._macd_history = values[self.KEY_MACD][len(macd_df) - option["signal_window"] + 1 :]
+        self._short_ema = values[self.KEY_SHORT_EMA][-1]
+
+    def update(self, tick: pd.Series, symbols: list = [], grouped_by_symbol=False):
+        if getattr(self, "_short_ema", None) is None:
+            raise Exception("run should be called before update")
+        option = self.option
+        signal_window = option["signal_window"]
+
+        new_value = self._get_update_values(tick, option["column"])
+        self._short_ema, self._short_weight = technical.update_EWM(
+            self._short_ema, self._short_weight, new_value, 2 / (option["short_window"] + 1)
+        )
+        self._long_ema, self._long_weight = technical.update_EWM(
+            self._long_ema, self._long_weight, new_value, 2 / (option["long_window"] + 1)
+        )
+        macd = self._short_ema - self._long_ema
+        history = numpy.concatenate([self._macd_history, macd.reshape(1, -1)])
+        if len(history) < signal_window:
+            signal = numpy.full_like(macd, numpy.nan)
         else:
-            option = self.option
-            target_column = option["column"]
-            short_window = option["short_window"]
-            long_window = option["long_window"]
-            signal_window = option["signal_window"]
-
-            cs_ema = self.KEY_SHORT_EMA
-            cl_ema = self.KEY_LONG_EMA
-            c_macd = self.KEY_MACD
-            c_signal = self.KEY_SIGNAL
-
-            short_ema, long_ema, MACD = technical.update_macd(
-                new_tick=tick,
-                short_ema_value=self.last_data[cs_ema].iloc[-1],
-                long_ema_value=self.last_data[cl_ema].iloc[-1],
-                column=target_column,
-                short_window=short_window,
-                long_window=long_window,
-            )
-            Signal = (self.last_data[c_macd].iloc[-signal_window + 1 :].sum() + MACD) / signal_window
+            signal = history.mean(axis=0)
+        self._macd_history = history[len(history) - signal_window + 1 :]
 
-            new_data = pd.Series({cs_ema: short_ema, cl_ema: long_ema, c_macd: MACD, c_signal: Signal})
-            self.last_data = concat(self.last_data.iloc[1:], new_data)
-            return new_data
+        return self._to_update_result(
+            {self.KEY_SHORT_EMA: self._short_ema, self.KEY_LONG_EMA: self._long_ema, self.KEY_MACD: macd, self.KEY_SIGNAL: signal}
+        )
 
     def get_minimum_required_length(self):
         return self.option["long_window"] + self.option["signal_window"] - 2
@@ -265,6 +277,7 @@ class MAProcess(ProcessBase):
 
 class EMAProcess(ProcessBase):
     kinds = "EMA"
+    support_update = True
 
     def __init__(self, key="ema", window=12, column="Close", is_input=True, is_output=True, option=None):
         super().__init__(key)
@@ -305,19 +318,20 @@ class EMAProcess(ProcessBase):
             ema.name = column
 
         self.last_data = ema.iloc[-self.get_minimum_required_length() :]
+        self._ema = None
+        if len(ema) > 0:
+            self._store_update_layout(data, ema, symbols, grouped_by_symbol)
+            self._weight = technical.get_EWM_weight(self._get_update_values(data, target_column), 2 / (window + 1))
+            self._ema = self._get_result_values(ema)[column][-1]
         return pd.concat([data, ema], axis=1)
 
-    def update(self, tick: pd.Series, symbols: list = []):
+    def update(self, tick: pd.Series, symbols: list = [], grouped_by_symbol=False):
+        if getattr(self, "_ema", None) is None:
+            raise Exception("run should be called before update")
         option = self.option
-        target_column = option["column"]
-        window = option["window"]
-        column = self.KEY_EMA
-
-        short_ema, long_ema, MACD = technical.update_ema(new_tick=tick, column=target_column, window=window)
-
-        new_data = pd.Series({column: short_ema})
-        self.last_data = concat(self.last_data.iloc[1:], new_data)
-        return new_data
+        new_value = self._get_update_values(tick, option["column"])
+        self._ema, self._weight = technical.update_EWM(self._ema, self._weight, new_value, 2 / (option["window"] + 1))
+        return self._to_update_result({self.KEY_EMA: self._ema})
 
     def get_minimum_required_length(self):
         return self.option["window"]
@@ -332,6 +346,7 @@ class EMAProcess(ProcessBase):
 
 class BBANDProcess(ProcessBase):
     kinds = "BBAND"
+    support_update = True
 
     def __init__(self, key="BB", window=14, alpha=2, target_column="Close", is_input=True, is_output=True, option=None):
         super().__init__(key)
@@ -398,32 +413,40 @@ class BBANDProcess(ProcessBase):
             )
 
         self.last_data = bb_df.iloc[-self.get_minimum_required_length() :]
+        self._store_update_layout(data, bb_df, symbols, grouped_by_symbol)
+        # keep window - 1 values to caliculate the band with new value
+        target_values = self._get_update_values(data, target_column)
+        self._target_history = target_values[len(target_values) - window + 1 :]
         return pd.concat([data, bb_df], axis=1)
 
-    def update(self, tick: pd.Series, symbols: list = []):
+    def update(self, tick: pd.Series, symbols: list = [], grouped_by_symbol=False):
+        if getattr(self, "_target_history", None) is None:
+            raise Exception("run should be called before update")
         option = self.option
-        target_column = option["column"]
         window = option["window"]
         alpha = option["alpha"]
 
-        target_data = self.last_data[target_column].values
-        target_data = numpy.append(target_data, tick[target_column])
-        target_data = target_data[-window:]
-
-        new_sma = target_data.mean()
-        std = target_data.std(ddof=0)
-        new_ub = new_sma + alpha * std
-        new_lb = new_sma - alpha * std
-        new_width = alpha * 2 * std
-
-        c_ema = self.KEY_MEAN_VALUE
-        c_ub = self.KEY_UPPER_VALUE
-        c_lb = self.KEY_LOWER_VALUE
-        c_width = self.KEY_WIDTH_VALUE
-
-        new_data = pd.Series({c_ema: new_sma, c_ub: new_ub, c_lb: new_lb, c_width: new_width, target_column: tick[target_column]})
-        self.last_data = concat(self.last_data.iloc[1:], new_data)
-        return new_data[[c_ema, c_ub, c_lb, c_width]]
+        new_value = self._get_update_values(tick, option["column"])
+        history = numpy.concatenate([self._target_history, new_value.reshape(1, -1)])
+        self._target_history = history[len(history) - window + 1 :]
+        if len(history) < window:
+            mean = numpy.full_like(new_value, numpy.nan)
+            std = numpy.full_like(new_value, numpy.nan)
+        else:
+            mean = history.mean(axis=0)
+            std = history.std(axis=0, ddof=0)
+        upper = mean + std * alpha
+        lower = mean - std * alpha
+
+        return self._to_update_result(
+            {
+                self.KEY_MEAN_VALUE: mean,
+                self.KEY_UPPER_VALUE: upper,
+                self.KEY_LOWER_VALUE: lower,
+                self.KEY_WIDTH_VALUE: upper - lower,
+                self.KEY_STD_VALUE: std,
+            }
+        )
 
     def get_minimum_required_length(self):
         return self.option["window"]
@@ -431,6 +454,7 @@ class BBANDProcess(ProcessBase):
 
 class ATRProcess(ProcessBase):
     kinds = "ATR"
+    support_update = True
 
     def __init__(
         self, key="atr", window=14, ohlc_column_name=("Open", "High", "Low", "Close"), is_input=True, is_output=True, option=None
@@ -474,19 +498,38 @@ class ATRProcess(ProcessBase):
         last_atr = atr_df.iloc[-self.get_minimum_required_length() :]
 
         self.last_data = pd.concat([last_ohlc, last_atr], axis=1)
+        self.__initialize_state(data, atr_df, symbols, grouped_by_symbol)
         return pd.concat([data, atr_df], axis=1)
 
-    def update(self, tick: pd.Series, symbols: list = []):
-        target_columns = self.option["ohlc_column"]
-        window = self.option["window"]
-        c_atr = self.KEY_ATR
-
-        pre_data = self.last_data.iloc[-1]
-        new_atr_value = technical.update_ATR(pre_data, tick, target_columns, c_atr, window)
-        df = tick.copy()
-        df[c_atr] = new_atr_value
-        self.last_data = concat(self.last_data.iloc[1:], df)
-        return df[[c_atr]]
+    def __get_tr(self, high, low, pre_close):
+        # max of H-L, |H-PC| and |L-PC| ignoring NaN as DataFrame.max does
+        return numpy.fmax(numpy.fmax(high - low, numpy.abs(high - pre_close)), numpy.abs(low - pre_close))
+
+    def __initialize_state(self, data: pd.DataFrame, atr_df, symbols: list, grouped_by_symbol: bool):
+        self._atr = None
+        if len(atr_df) == 0:
+            return
+        ohlc_columns = self.option["ohlc_column"]
+        self._store_update_layout(data, atr_df, symbols, grouped_by_symbol)
+        high = self._get_update_values(data, ohlc_columns[1])
+        low = self._get_update_values(data, ohlc_columns[2])
+        close = self._get_update_values(data, ohlc_columns[3])
+        pre_close = numpy.concatenate([numpy.full((1, close.shape[1]), numpy.nan), close[:-1]])
+        tr = self.__get_tr(high, low, pre_close)
+        self._weight = technical.get_EWM_weight(tr, 2 / (self.option["window"] + 1))
+        self._last_close = close[-1]
+        self._atr = self._get_result_values(atr_df)[self.KEY_ATR][-1]
+
+    def update(self, tick: pd.Series, symbols: list = [], grouped_by_symbol=False):
+        if getattr(self, "_atr", None) is None:
+            raise Exception("run should be called before update")
+        ohlc_columns = self.option["ohlc_column"]
+        high = self._get_update_values(tick, ohlc_columns[1])
+        low = self._get_update_values(tick, ohlc_columns[2])
+        tr = self.__get_tr(high, low, self._last_close)
+        self._last_close = self._get_update_values(tick, ohlc_columns[3])
+        self._atr, self._weight = technical.update_EWM(self._atr, self._weight, tr, 2 / (self.option["window"] + 1))
+        return self._to_update_result({self.KEY_ATR: self._atr})
 
     def get_minimum_required_length(self):
         return self.option["window"]
@@ -494,6 +537,7 @@ class ATRProcess(ProcessBase):
 
 class RSIProcess(ProcessBase):
     kinds = "RSI"
+    support_update = True
 
     def __init__(
         self, key="rsi", window=14, ohlc_column_name=("Open", "High", "Low", "Close"), is_input=True, is_output=True, option=None
@@ -554,20 +598,36 @@ class RSIProcess(ProcessBase):
         last_ohlc = data.iloc[-self.get_minimum_required_length() :]
         last_rsi = rsi_df.iloc[-self.get_minimum_required_length() :]
         self.last_data = pd.concat([last_ohlc, last_rsi], axis=1)
+        self._gain = None
+        if len(rsi_df) > 0:
+            self._store_update_layout(data, rsi_df, symbols, grouped_by_symbol)
+            values = self._get_result_values(rsi_df)
+            self._last_value = self._get_update_values(data, target_column)[-1]
+            self._loss = values[self.KEY_LOSS][-1]
+            self._gain = values[self.KEY_GAIN][-1]
         return pd.concat([data, rsi_df], axis=1)
 
-    def update(self, tick: pd.Series, symbols: list = []):
-        target_column = self.option["ohlc_column"][0]
-        window = self.option["window"]
-        columns = (*self.columns, target_column)
-
-        pre_data = self.last_data.iloc[-1]
-        new_gain_val, new_loss_val, new_rsi_value = technical.update_RSI(pre_data, tick, columns, window)
-        tick[self.KEY_GAIN] = new_gain_val
-        tick[self.KEY_LOSS] = new_loss_val
-        tick[self.KEY_RSI] = new_rsi_value
-        self.last_data = concat(self.last_data.iloc[1:], tick)
-        return tick
+    def update(self, tick: pd.Series, symbols: list = [], grouped_by_symbol=False):
+        if getattr(self, "_gain", None) is None:
+            raise Exception("run should be called before update")
+        alpha = 1 / self.option["window"]
+        new_value = self._get_update_values(tick, self.option["ohlc_column"][0])
+        change = new_value - self._last_value
+        self._last_value = new_value
+        # change is NaN if either value is missing. it is handled as 0 same as run
+        gain = numpy.where(change >= 0, change, 0.0)
+        loss = numpy.where(change < 0, -change, 0.0)
+        # gain and loss are never NaN, so the weight of ewm is always 1
+        weight = numpy.ones_like(gain)
+        self._gain, _ = technical.update_EWM(self._gain, weight, gain, alpha)
+        self._loss, _ = technical.update_EWM(self._loss, weight, loss, alpha)
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            if self._update_symbols is None:
+                rs = self._gain / numpy.where(self._loss == 0, numpy.nan, self._loss)
+                rsi = numpy.nan_to_num(100 - (100 / (1 + rs)), nan=100)
+            else:
+                rsi = 100 - (100 / (1 + self._gain / self._loss))
+        return self._to_update_result({self.KEY_GAIN: self._gain, self.KEY_LOSS: self._loss, self.KEY_RSI: rsi})
 
     def get_minimum_required_length(self):
         return self.option["window"]
@@ -1044,6 +1104,9 @@ class LinearRegressionMomentumProcess:
         }
 
     def __get_momentum(self, data):
+        # scipy is imported on first use as it takes most of the import time of this module
+        from scipy.stats import linregress
+
         log_data = numpy.log(data)
         x_data = numpy.arange(len(log_data))
         beta, intercept, rvalue, pvalue, stderr = linregress(x_data, log_data)
@@ -72,6 +72,55 @@ def update_EMA(last_ema_value: float, new_value, window: int, a=None):
     return last_ema_value * (1 - alpha) + new_value * alpha
 
 
+def update_EWM(weighted, old_weight, new_value, alpha: float):
+    """
+    update exponentially weighted mean in the same way as pandas ewm(alpha=alpha, adjust=False).mean()
+
+    Args:
+        weighted (float | np.ndarray): last mean value. NaN if no value is observed yet
+        old_weight (float | np.ndarray): weight of the last mean. 1 after an observation, and it decays while new values are NaN
+        new_value (float | np.ndarray): new value. NaN is handled as a missing value
+        alpha (float): smoothing factor
+
+    Returns:
+        tuple(np.ndarray, np.ndarray): new mean and new weight
+    """
+    weighted = np.asarray(weighted, dtype=float)
+    old_weight = np.asarray(old_weight, dtype=float)
+    new_value = np.asarray(new_value, dtype=float)
+    is_observation = ~np.isnan(new_value)
+    has_mean = ~np.isnan(weighted)
+
+    decayed_weight = np.where(has_mean, old_weight * (1 - alpha), old_weight)
+    with np.errstate(invalid="ignore"):
+        updated = (decayed_weight * weighted + alpha * new_value) / (decayed_weight + alpha)
+    new_mean = np.where(is_observation, np.where(has_mean, updated, new_value), weighted)
+    new_weight = np.where(is_observation, 1.0, decayed_weight)
+    return new_mean, new_weight
+
+
+def get_EWM_weight(values, alpha: float):
+    """
+    get weight of the last mean of ewm(alpha=alpha, adjust=False) to continue it by update_EWM
+
+    Args:
+        values (np.ndarray): input values of ewm. (rows,) or (rows, columns)
+        alpha (float): smoothing factor
+
+    Returns:
+        np.ndarray: weight for each column
+    """
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values.reshape(-1, 1)
+    is_observation = ~np.isnan(values)
+    # number of NaN after the last observation
+    trailing_nan = np.argmax(is_observation[::-1], axis=0)
+    weight = (1 - alpha) ** trailing_nan
+    weight[~is_observation.any(axis=0)] = 1.0
+    return weight
+
+
 def EMA(data, interval, alpha=None):
     """
     Calculate EMA.
@@ -0,0 +1,112 @@
+import copy
+import logging
+
+import numpy
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalPipeline:
+    """Keep a frame processed by processes and advance it bar by bar with update of each process.
+
+    The pipeline is initialized with the result of running processes on a frame. When the next frame is the last frame shifted by one bar,
+    values of the new bar are caliculated by update of each process instead of running processes on the whole frame again.
+    As update continues EMA based values from the initialized frame, results are same as running processes on all bars since the initialization,
+    not as running processes on the shifted frame only. Values of recursive indicators like EMA, MACD and RSI differ from the latter.
+    """
+
+    def __init__(self, symbols: list = [], grouped_by_symbol=False):
+        """
+        Args:
+            symbols (list, optional): symbols passed to processes. Defaults to [].
+            grouped_by_symbol (bool, optional): column layout of multi symbol frame. Defaults to False.
+        """
+        self.symbols = symbols
+        self.grouped_by_symbol = grouped_by_symbol
+        self.processes = None
+        self._index = None
+        self._last_row = None
+        self._columns = None
+        self._values = None
+
+    @staticmethod
+    def is_supported(processes: list) -> bool:
+        return len(processes) > 0 and all(getattr(process, "support_update", False) for process in processes)
+
+    @property
+    def is_initialized(self) -> bool:
+        return self.processes is not None
+
+    def initialize(self, processes: list, data: pd.DataFrame, processed_data: pd.DataFrame) -> bool:
+        """store the result of processes. processes should be the ones just run on data to get processed_data.
+
+        Args:
+            processes (list): processes which support update
+            data (pd.DataFrame): frame passed to processes
+            processed_data (pd.DataFrame): result of processes
+
+        Returns:
+            bool: False if processed_data doesn't have data columns followed by process columns
+        """
+        self.processes = None
+        raw_size = len(data.columns)
+        if (
+            len(data) < 2
+            or len(processed_data) != len(data)
+            or not processed_data.index.equals(data.index)
+            or not processed_data.columns[:raw_size].equals(data.columns)
+        ):
+            logger.debug("processed data can't be updated incrementally")
+            return False
+        try:
+            values = processed_data.iloc[:, raw_size:].to_numpy(dtype=float)
+        except (TypeError, ValueError):
+            logger.debug("process columns should be numeric to update incrementally")
+            return False
+        # copy processes so that states are not changed when the processes are run by others
+        self.processes = copy.deepcopy(processes)
+        self._index = data.index
+        self._last_row = data.iloc[-1].copy()
+        self._columns = processed_data.columns[raw_size:]
+        self._values = values
+        return True
+
+    def can_update(self, data: pd.DataFrame) -> bool:
+        """check if data is the last frame shifted by one bar"""
+        if self.processes is None or len(data) != len(self._index) or not data.columns.equals(self._last_row.index):
+            return False
+        if data.index[-2] != self._index[-1] or data.index[0] != self._index[1]:
+            return False
+        # the last bar of live data may be changed after it was processed
+        return data.iloc[-2].equals(self._last_row)
+
+    def update(self, data: pd.DataFrame) -> pd.DataFrame:
+        """process the last bar of data and return the processed frame
+
+        Args:
+            data (pd.DataFrame): the last frame shifted by one bar
+
+        Returns:
+            pd.DataFrame: same as the result of running processes on data
+        """
+        tick = data.iloc[-1]
+        results = []
+        for process in self.processes:
+            result = process.update(tick, self.symbols, self.grouped_by_symbol)
+            results.append(result)
+            # following processes may use columns added by previous processes
+            tick = pd.concat([tick, result])
+        new_values = numpy.concatenate([result.to_numpy(dtype=float) for result in results])
+        if len(new_values) != self._values.shape[1]:
+            self.processes = None
+            raise ValueError(f"update returned {len(new_values)} values while processes added {self._values.shape[1]} columns")
+
+        values = numpy.empty_like(self._values)
+        values[:-1] = self._values[1:]
+        values[-1] = new_values
+        self._values = values
+        self._index = data.index
+        self._last_row = data.iloc[-1].copy()
+        process_df = pd.DataFrame(values, index=data.index, columns=self._columns)
+        return pd.concat([data, process_df], axis=1)
@@ -1,9 +1,15 @@
 from abc import ABCMeta, abstractmethod
 
+import numpy
 import pandas as pd
 
+from .convert import get_symbols
+
 
 class ProcessBase(metaclass=ABCMeta):
+    # True if update can continue the state stored by the last run
+    support_update = False
+
     def __init__(self, key: str):
         self.key = key
         self.initialization_required = False
@@ -40,17 +46,73 @@ class ProcessBase(metaclass=ABCMeta):
         """
         raise Exception("Need to implement process method")
 
-    def update(self, tick: pd.Series) -> pd.Series:
+    def update(self, tick: pd.Series, symbols: list = [], grouped_by_symbol=False) -> pd.Series:
         """update data using next tick
 
         Args:
-            tick (pd.DataFrame): new data
+            tick (pd.Series): new data. Index should be columns of data passed to run
 
         Returns:
-            dict: appended data
+            pd.Series: values of process columns for the tick
         """
         raise Exception("Need to implement")
 
+    def _store_update_layout(self, data: pd.DataFrame, result, symbols: list, grouped_by_symbol: bool):
+        """store symbols and output columns of run so that update returns values with the same columns"""
+        if isinstance(data.columns, pd.MultiIndex):
+            if isinstance(symbols, str):
+                symbols = [symbols]
+            if len(symbols) == 0:
+                symbols = get_symbols(data, grouped_by_symbol)
+            self._update_symbols = list(symbols)
+        else:
+            self._update_symbols = None
+        self._update_grouped_by_symbol = grouped_by_symbol
+        if isinstance(result, pd.Series):
+            self._update_columns = pd.Index([result.name])
+        else:
+            self._update_columns = result.columns
+        positions = []
+        for column in self._update_columns:
+            if self._update_symbols is None:
+                positions.append((column, 0))
+            elif grouped_by_symbol:
+                positions.append((column[1], self._update_symbols.index(column[0])))
+            else:
+                positions.append((column[0], self._update_symbols.index(column[1])))
+        self._update_positions = positions
+
+    def _get_update_values(self, data, column) -> numpy.ndarray:
+        """return values of column for each symbol as (rows, symbols) array for DataFrame and (symbols,) array for Series"""
+        if self._update_symbols is None:
+            values = numpy.asarray(data[column], dtype=float)
+            if isinstance(data, pd.DataFrame):
+                return values.reshape(-1, 1)
+            return values.reshape(1)
+        if self._update_grouped_by_symbol:
+            keys = [(symbol, column) for symbol in self._update_symbols]
+        else:
+            keys = [(column, symbol) for symbol in self._update_symbols]
+        if isinstance(data, pd.Series):
+            # scalar access is faster than creating an indexer for a tick
+            return numpy.array([data[key] for key in keys], dtype=float)
+        return numpy.asarray(data[keys], dtype=float)
+
+    def _get_result_values(self, result) -> dict:
+        """return {output name: (rows, symbols) array} from result of run"""
+        values = numpy.asarray(result, dtype=float).reshape(len(result), -1)
+        symbol_num = 1 if self._update_symbols is None else len(self._update_symbols)
+        result_values = {}
+        for index, (name, position) in enumerate(self._update_positions):
+            if name not in result_values:
+                result_values[name] = numpy.full((len(result), symbol_num), numpy.nan)
+            result_values[name][:, position] = values[:, index]
+        return result_values
+
+    def _to_update_result(self, values: dict) -> pd.Series:
+        """create update result from {output name: (symbols,) array} with the columns of run"""
+        return pd.Series([values[name][position] for name, position in self._update_positions], index=self._update_columns, dtype=float)
+
     def get_minimum_required_length(self) -> int:
         return 1
 
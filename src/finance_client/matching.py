@@ -0,0 +1,191 @@
+import logging
+
+import numpy
+
+from finance_client.position import ORDER_TYPE, POSITION_SIDE, Order, Position
+
+logger = logging.getLogger(__name__)
+
+# levels triggered when low reaches them (price >= low) and when high reaches them (price <= high)
+_BELOW = 0
+_ABOVE = 1
+
+_TP = "tp"
+_SL = "sl"
+_ORDER = "order"
+
+
+class _Levels:
+    """trigger prices of a symbol and a direction kept in a sorted array"""
+
+    def __init__(self):
+        self._entries = {}
+        self._prices = numpy.empty(0, dtype=numpy.float64)
+        self._keys = numpy.empty(0, dtype=object)
+        self._is_dirty = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, key, price: float):
+        self._entries[key] = price
+        self._is_dirty = True
+
+    def remove(self, key):
+        if self._entries.pop(key, None) is not None:
+            self._is_dirty = True
+
+    def __sort(self):
+        keys = numpy.empty(len(self._entries), dtype=object)
+        keys[:] = list(self._entries.keys())
+        prices = numpy.fromiter(self._entries.values(), dtype=numpy.float64, count=len(self._entries))
+        order = numpy.argsort(prices, kind="stable")
+        self._prices = prices[order]
+        self._keys = keys[order]
+        self._is_dirty = False
+
+    def triggered(self, direction: int, price: float):
+        """return keys of levels reached by low (direction is _BELOW) or high (direction is _ABOVE)"""
+        if len(self._entries) == 0:
+            return []
+        if self._is_dirty:
+            self.__sort()
+        if direction == _BELOW:
+            return self._keys[numpy.searchsorted(self._prices, price, side="left") :].tolist()
+        return self._keys[: numpy.searchsorted(self._prices, price, side="right")].tolist()
+
+
+class TriggerBook:
+    """TP/SL levels of positions and prices of limit/stop orders indexed by symbol.
+
+    Levels are kept in numpy arrays sorted by trigger price for each symbol and direction, so levels reached by a bar are found by searchsorted on its high and low.
+    """
+
+    def __init__(self):
+        self._levels = {}
+        # (kind, id): list of (symbol, direction, level key) registered for the position or the order
+        self._registered = {}
+        self._positions = {}
+        self._orders = {}
+        # registration order to return hits in the order they are added
+        self._sequence = {}
+        self._next_sequence = 0
+
+    def __len__(self):
+        return len(self._positions) + len(self._orders)
+
+    @property
+    def position_count(self) -> int:
+        return len(self._positions)
+
+    @property
+    def order_count(self) -> int:
+        return len(self._orders)
+
+    def __add_level(self, item_key, symbol, direction, level_key, price):
+        if price is None:
+            return
+        levels = self._levels.get(symbol)
+        if levels is None:
+            levels = (_Levels(), _Levels())
+            self._levels[symbol] = levels
+        levels[direction].add(level_key, float(price))
+        self._registered[item_key].append((symbol, direction, level_key))
+
+    def __remove(self, item_key):
+        for symbol, direction, level_key in self._registered.pop(item_key, []):
+            self._levels[symbol][direction].remove(level_key)
+
+    def __register(self, item_key):
+        """remove levels registered for item_key and keep its registration order"""
+        self.__remove(item_key)
+        self._registered[item_key] = []
+        if item_key not in self._sequence:
+            self._sequence[item_key] = self._next_sequence
+            self._next_sequence += 1
+
+    def add_position(self, position: Position):
+        """register tp and sl of a position. Registered levels of the position are replaced."""
+        if position.tp is None and position.sl is None:
+            self.remove_position(position.id)
+            return
+        item_key = (_TP, position.id)
+        self.__register(item_key)
+        self._positions[position.id] = position
+        if position.position_side == POSITION_SIDE.long:
+            self.__add_level(item_key, position.symbol, _ABOVE, (_TP, position.id), position.tp)
+            self.__add_level(item_key, position.symbol, _BELOW, (_SL, position.id), position.sl)
+        else:
+            self.__add_level(item_key, position.symbol, _BELOW, (_TP, position.id), position.tp)
+            self.__add_level(item_key, position.symbol, _ABOVE, (_SL, position.id), position.sl)
+
+    def remove_position(self, id):
+        self.__remove((_TP, id))
+        self._sequence.pop((_TP, id), None)
+        self._positions.pop(id, None)
+
+    def add_order(self, order: Order):
+        """register a limit or stop order. Market orders are ignored."""
+        if order.order_type not in (ORDER_TYPE.limit, ORDER_TYPE.stop):
+            return
+        item_key = (_ORDER, order.id)
+        self.__register(item_key)
+        self._orders[order.id] = order
+        is_long = order.position_side == POSITION_SIDE.long
+        if order.order_type == ORDER_TYPE.limit:
+            direction = _BELOW if is_long else _ABOVE
+        else:
+            direction = _ABOVE if is_long else _BELOW
+        self.__add_level(item_key, order.symbol, direction, item_key, order.price)
+
+    def remove_order(self, id):
+        self.__remove((_ORDER, id))
+        self._sequence.pop((_ORDER, id), None)
+        self._orders.pop(id, None)
+
+    def match(self, high: float, low: float, symbol=None):
+        """find positions and orders triggered by a bar
+
+        Args:
+            high (float): high price of the bar
+            low (float): low price of the bar
+            symbol (str, optional): symbol of the bar. Defaults to None and the bar is applied to all symbols.
+
+        Returns:
+            Tuple[List[Tuple[Position, float]], List[Tuple[Order, float]]]: positions with closed price and orders with open price in registered order.
+            When both tp and sl of a position are reached, tp is used as same as ClientBase._check_position.
+        """
+        if symbol is None:
+            symbols = list(self._levels.keys())
+        elif symbol in self._levels:
+            symbols = [symbol]
+        else:
+            symbols = []
+        position_prices = {}
+        order_ids = []
+        for symbol in symbols:
+            levels = self._levels[symbol]
+            for direction, price in ((_BELOW, low), (_ABOVE, high)):
+                # skip NaN
+                if price is None or price != price:
+                    continue
+                for kind, id in levels[direction].triggered(direction, price):
+                    if kind == _ORDER:
+                        order_ids.append(id)
+                    elif kind == _TP:
+                        position_prices[id] = self._positions[id].tp
+                    elif id not in position_prices:
+                        position_prices[id] = self._positions[id].sl
+        position_ids = sorted(position_prices.keys(), key=lambda id: self._sequence[(_TP, id)])
+        order_ids = sorted(order_ids, key=lambda id: self._sequence[(_ORDER, id)])
+        return (
+            [(self._positions[id], position_prices[id]) for id in position_ids],
+            [(self._orders[id], self._orders[id].price) for id in order_ids],
+        )
+
+    def clear(self):
+        self._levels = {}
+        self._registered = {}
+        self._positions = {}
+        self._orders = {}
+        self._sequence = {}
@@ -0,0 +1,180 @@
+import contextlib
+import logging
+import threading
+import time
+
+import numpy
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# stages measured by ClientBase
+FETCH = "fetch"
+PROCESS = "process"
+RISK = "risk"
+BROKER = "broker"
+STORAGE = "storage"
+PENDING_CHECK = "pending_check"
+GET_OHLC = "get_ohlc"
+
+
+class _Timer:
+    __slots__ = ("_metrics", "_stage", "_wall", "_cpu")
+
+    def __init__(self, metrics, stage: str):
+        self._metrics = metrics
+        self._stage = stage
+
+    def __enter__(self):
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._metrics.record(self._stage, time.perf_counter() - self._wall, time.thread_time() - self._cpu)
+        return False
+
+
+class NullMetrics:
+    """metrics used when instrumentation is disabled. measure returns a shared context doing nothing."""
+
+    enabled = False
+    _NULL_CONTEXT = contextlib.nullcontext()
+
+    def measure(self, stage: str):
+        return self._NULL_CONTEXT
+
+    def record(self, stage: str, wall: float, cpu: float):
+        pass
+
+    def summary(self) -> dict:
+        return {}
+
+    def get_records(self) -> pd.DataFrame:
+        return pd.DataFrame(columns=["stage", "time", "wall", "cpu"])
+
+    def reset(self):
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+class StageMetrics:
+    """wall and CPU time of stages kept in a ring buffer of numpy arrays.
+
+    Totals and call counts by stage are kept for all records, and the latest `capacity` records are kept to see percentiles and recent spikes.
+    """
+
+    enabled = True
+
+    def __init__(self, capacity: int = 4096, log_interval: float = None):
+        """
+        Args:
+            capacity (int, optional): number of records kept in the ring buffer. Defaults to 4096.
+            log_interval (float, optional): seconds to emit summary through finance_client.metrics logger. Defaults to None and summary is not emitted.
+        """
+        if capacity <= 0:
+            raise ValueError("capacity should be greater than 0")
+        self.capacity = capacity
+        self.log_interval = log_interval
+        self._lock = threading.Lock()
+        self._stage_codes = {}
+        self._stages = []
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._codes = numpy.zeros(self.capacity, dtype=numpy.int32)
+            self._times = numpy.zeros(self.capacity, dtype=numpy.float64)
+            self._walls = numpy.zeros(self.capacity, dtype=numpy.float64)
+            self._cpus = numpy.zeros(self.capacity, dtype=numpy.float64)
+            self._count = 0
+            # stage: [count, total wall, total cpu, max wall]
+            self._totals = {}
+            self._last_log_time = time.monotonic()
+
+    def measure(self, stage: str) -> _Timer:
+        """return a context manager to record wall and CPU time of the block as stage"""
+        return _Timer(self, stage)
+
+    def record(self, stage: str, wall: float, cpu: float):
+        with self._lock:
+            code = self._stage_codes.get(stage)
+            if code is None:
+                code = len(self._stages)
+                self._stage_codes[stage] = code
+                self._stages.append(stage)
+            position = self._count % self.capacity
+            self._codes[position] = code
+            self._times[position] = time.time()
+            self._walls[position] = wall
+            self._cpus[position] = cpu
+            self._count += 1
+            totals = self._totals.get(stage)
+            if totals is None:
+                self._totals[stage] = [1, wall, cpu, wall]
+            else:
+                totals[0] += 1
+                totals[1] += wall
+                totals[2] += cpu
+                if wall > totals[3]:
+                    totals[3] = wall
+        if self.log_interval is not None and time.monotonic() - self._last_log_time >= self.log_interval:
+            self._last_log_time = time.monotonic()
+            self.log()
+
+    def __recent(self):
+        """return codes, times, walls and cpus of records in the ring buffer from older to latest"""
+        if self._count <= self.capacity:
+            size = self._count
+            return self._codes[:size].copy(), self._times[:size].copy(), self._walls[:size].copy(), self._cpus[:size].copy()
+        start = self._count % self.capacity
+        order = numpy.r_[start : self.capacity, 0:start]
+        return self._codes[order], self._times[order], self._walls[order], self._cpus[order]
+
+    def summary(self) -> dict:
+        """return metrics by stage
+
+        Returns:
+            dict: stage: {count, wall_total, wall_mean, wall_max, cpu_total, cpu_mean, wall_p50, wall_p95}. Percentiles are of records in the ring buffer.
+        """
+        with self._lock:
+            codes, _, walls, _ = self.__recent()
+            totals = {stage: list(values) for stage, values in self._totals.items()}
+            stage_codes = dict(self._stage_codes)
+        metrics = {}
+        for stage, (count, wall_total, cpu_total, wall_max) in totals.items():
+            recent_walls = walls[codes == stage_codes[stage]]
+            if len(recent_walls) > 0:
+                wall_p50, wall_p95 = numpy.percentile(recent_walls, [50, 95])
+            else:
+                wall_p50 = wall_p95 = numpy.nan
+            metrics[stage] = {
+                "count": count,
+                "wall_total": wall_total,
+                "wall_mean": wall_total / count,
+                "wall_max": wall_max,
+                "cpu_total": cpu_total,
+                "cpu_mean": cpu_total / count,
+                "wall_p50": float(wall_p50),
+                "wall_p95": float(wall_p95),
+            }
+        return metrics
+
+    def get_records(self) -> pd.DataFrame:
+        """return records in the ring buffer from older to latest"""
+        with self._lock:
+            codes, times, walls, cpus = self.__recent()
+            stages = numpy.array(self._stages, dtype=object)
+        return pd.DataFrame(
+            {"stage": stages[codes] if len(codes) > 0 else [], "time": pd.to_datetime(times, unit="s", utc=True), "wall": walls, "cpu": cpus}
+        )
+
+    def log(self, level: int = logging.INFO):
+        for stage, values in self.summary().items():
+            logger.log(
+                level,
+                f"{stage}: count={values['count']} wall_mean={values['wall_mean'] * 1000:.3f}ms wall_p95={values['wall_p95'] * 1000:.3f}ms "
+                f"wall_max={values['wall_max'] * 1000:.3f}ms cpu_mean={values['cpu_mean'] * 1000:.3f}ms",
+            )
@@ -3,6 +3,8 @@ import json
 import uuid
 from enum import Enum
 
+import numpy
+
 
 class POSITION_SIDE(Enum):
     long = 1
@@ -32,6 +34,8 @@ def _value_to_position_side(value: int):
 
 
 class Position:
+    __slots__ = ("id", "position_side", "price", "volume", "option", "trade_unit", "leverage", "result", "symbol", "index", "tp", "sl", "timestamp")
+
     def __init__(
         self,
         position_side: POSITION_SIDE,
@@ -135,6 +139,8 @@ class Position:
 
 
 class Order:
+    __slots__ = ("id", "order_type", "position_side", "symbol", "price", "volume", "trade_unit", "leverage", "tp", "sl", "magic_number", "created")
+
     def __init__(
         self,
         order_type: ORDER_TYPE,
@@ -184,6 +190,7 @@ class Order:
 
 
 class ClosedResult:
+    __slots__ = ("id", "price", "entry_price", "volume", "price_diff", "profit", "msg", "error")
 
     def __init__(self, id=None, price=0.0, entry_price=0.0, volume=0, price_diff=0.0, profit=0.0, msg="undefined error"):
         self.id = id
@@ -223,3 +230,259 @@ class ClosedResult:
 
     def __str__(self):
         return f"ClosedResult(id={self.id}, price={self.price}, entry_price={self.entry_price}, volume={self.volume}, price_diff={self.price_diff}, profit={self.profit}, msg={self.msg})"
+
+
+def _to_rate_array(rates, symbols: list) -> numpy.ndarray:
+    """return rates of symbols. rates is a mapping like dict or pd.Series, or a rate for all symbols. Unknown rates are NaN."""
+    if hasattr(rates, "get"):
+        values = [rates.get(symbol, None) for symbol in symbols]
+        return numpy.array([numpy.nan if value is None else value for value in values], dtype=numpy.float64)
+    if isinstance(rates, (int, float, numpy.number)) and not isinstance(rates, bool):
+        return numpy.full(len(symbols), rates, dtype=numpy.float64)
+    return numpy.full(len(symbols), numpy.nan, dtype=numpy.float64)
+
+
+def _to_object_array(items: list) -> numpy.ndarray:
+    array = numpy.empty(len(items), dtype=object)
+    array[:] = items
+    return array
+
+
+class PositionBook:
+    """Open positions kept as columns of numpy arrays.
+
+    side, symbol code, price, volume, tp, sl, trade_unit and leverage are stored by row with an id to row map, so that profit, margin and risk of
+    all positions are computed by vectorized reductions. None of price, tp and sl is stored as NaN.
+    """
+
+    _FLOAT_COLUMNS = ("price", "volume", "tp", "sl", "trade_unit", "leverage")
+
+    def __init__(self, capacity: int = 256):
+        capacity = max(1, capacity)
+        self._sides = numpy.zeros(capacity, dtype=numpy.int8)
+        self._symbol_codes = numpy.zeros(capacity, dtype=numpy.int32)
+        # registration order to keep the order of positions after rows are swapped by remove
+        self._sequences = numpy.zeros(capacity, dtype=numpy.int64)
+        self._values = numpy.zeros((len(self._FLOAT_COLUMNS), capacity), dtype=numpy.float64)
+        self._ids = []
+        self._rows = {}
+        self._symbols = []
+        self._symbol_codes_map = {}
+        self._next_sequence = 0
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, id):
+        return id in self._rows
+
+    @property
+    def ids(self) -> list:
+        return list(self._ids)
+
+    def __column(self, name: str) -> numpy.ndarray:
+        return self._values[self._FLOAT_COLUMNS.index(name), : len(self._ids)]
+
+    def __get_symbol_code(self, symbol) -> int:
+        code = self._symbol_codes_map.get(symbol)
+        if code is None:
+            code = len(self._symbols)
+            self._symbols.append(symbol)
+            self._symbol_codes_map[symbol] = code
+        return code
+
+    def __grow(self):
+        capacity = len(self._sides) * 2
+        self._sides = numpy.resize(self._sides, capacity)
+        self._symbol_codes = numpy.resize(self._symbol_codes, capacity)
+        self._sequences = numpy.resize(self._sequences, capacity)
+        values = numpy.zeros((len(self._FLOAT_COLUMNS), capacity), dtype=numpy.float64)
+        values[:, : self._values.shape[1]] = self._values
+        self._values = values
+
+    def add(self, position: Position):
+        """add a position. A position already added is replaced and keeps its order."""
+        row = self._rows.get(position.id)
+        if row is None:
+            row = len(self._ids)
+            if row >= len(self._sides):
+                self.__grow()
+            self._ids.append(position.id)
+            self._rows[position.id] = row
+            self._sequences[row] = self._next_sequence
+            self._next_sequence += 1
+        self._sides[row] = position.position_side.value
+        self._symbol_codes[row] = self.__get_symbol_code(position.symbol)
+        for column_index, name in enumerate(self._FLOAT_COLUMNS):
+            value = getattr(position, name)
+            self._values[column_index, row] = numpy.nan if value is None else value
+
+    def remove(self, id):
+        row = self._rows.pop(id, None)
+        if row is None:
+            return
+        last_row = len(self._ids) - 1
+        if row != last_row:
+            # move the last row to the removed row
+            last_id = self._ids[last_row]
+            self._ids[row] = last_id
+            self._rows[last_id] = row
+            self._sides[row] = self._sides[last_row]
+            self._symbol_codes[row] = self._symbol_codes[last_row]
+            self._sequences[row] = self._sequences[last_row]
+            self._values[:, row] = self._values[:, last_row]
+        self._ids.pop()
+
+    def clear(self):
+        self._ids = []
+        self._rows = {}
+        self._symbols = []
+        self._symbol_codes_map = {}
+
+    def get_symbols(self, position_side: POSITION_SIDE = None) -> list:
+        """return symbols which have positions of position_side (both sides if None)"""
+        codes = self._symbol_codes[: len(self._ids)]
+        if position_side is not None:
+            codes = codes[self._sides[: len(self._ids)] == position_side.value]
+        return [self._symbols[code] for code in numpy.unique(codes)]
+
+    def get_symbols_of(self, mask: numpy.ndarray) -> list:
+        """return symbol of each row where mask is True"""
+        return [self._symbols[code] for code in self._symbol_codes[: len(self._ids)][mask].tolist()]
+
+    def get_profit_losses(self, bid_rates, ask_rates) -> numpy.ndarray:
+        """return profit of each row. Long positions are valued with bid_rates and short positions with ask_rates.
+
+        Args:
+            bid_rates (dict | pd.Series | float): bid rate by symbol or a rate for all symbols
+            ask_rates (dict | pd.Series | float): ask rate by symbol or a rate for all symbols
+
+        Returns:
+            numpy.ndarray: (rate - price) * volume for long and (price - rate) * volume for short. NaN if the rate is unknown.
+        """
+        rates = self.get_current_rates(bid_rates, ask_rates)
+        length = len(self._ids)
+        return (rates - self.__column("price")) * self.__column("volume") * self._sides[:length]
+
+    def get_current_rates(self, bid_rates, ask_rates) -> numpy.ndarray:
+        """return the rate to close each row"""
+        length = len(self._ids)
+        codes = self._symbol_codes[:length]
+        bids = _to_rate_array(bid_rates, self._symbols)
+        asks = _to_rate_array(ask_rates, self._symbols)
+        return numpy.where(self._sides[:length] == POSITION_SIDE.long.value, bids[codes], asks[codes])
+
+    def get_profit_loss(self, bid_rates, ask_rates) -> float:
+        """sum profits of positions whose rate is known"""
+        return float(numpy.nansum(self.get_profit_losses(bid_rates, ask_rates)))
+
+    def get_used_margin(self) -> float:
+        margins = self.__column("trade_unit") * self.__column("volume") * self.__column("price") / self.__column("leverage")
+        return float(numpy.nansum(margins))
+
+    def get_open_risk(self) -> float:
+        """sum losses when positions are closed by stop loss. Positions without sl are not included."""
+        risks = self.__column("trade_unit") * self.__column("volume") * numpy.abs(self.__column("price") - self.__column("sl"))
+        return float(numpy.nansum(risks))
+
+    def count_without_sl(self) -> int:
+        """return the number of positions without sl"""
+        return int(numpy.isnan(self.__column("sl")).sum())
+
+    def get_symbol_exposures(self) -> dict:
+        """return net exposure (trade_unit * volume, short is negative) by symbol"""
+        length = len(self._ids)
+        exposures = self.__column("trade_unit") * self.__column("volume") * self._sides[:length]
+        totals = numpy.bincount(self._symbol_codes[:length], weights=exposures, minlength=len(self._symbols))
+        codes = numpy.unique(self._symbol_codes[:length])
+        return {self._symbols[code]: float(totals[code]) for code in codes}
+
+    def get_values(self, bid_rates, ask_rates) -> dict:
+        """return columns of positions valued by rates in the order positions are added
+
+        Returns:
+            dict: numpy arrays of id, symbol, position_side, price, volume, trade_unit, leverage, tp, sl, rate, profit, profit_rate and margin.
+        """
+        length = len(self._ids)
+        rows = numpy.argsort(self._sequences[:length], kind="stable")
+        rates = self.get_current_rates(bid_rates, ask_rates)[rows]
+        sides = self._sides[:length][rows]
+        values = {
+            "id": _to_object_array(self._ids)[rows],
+            "symbol": _to_object_array(self._symbols)[self._symbol_codes[:length][rows]],
+            "position_side": sides,
+        }
+        for name in self._FLOAT_COLUMNS:
+            values[name] = self.__column(name)[rows]
+        prices = values["price"]
+        values["rate"] = rates
+        values["profit"] = (rates - prices) * values["volume"] * sides
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            values["profit_rate"] = numpy.where(sides == POSITION_SIDE.long.value, rates / prices, prices / rates)
+        values["margin"] = values["trade_unit"] * values["volume"] * prices / values["leverage"]
+        return values
+
+    def get_symbol_values(self, bid_rates, ask_rates) -> dict:
+        """return totals of positions by symbol
+
+        Returns:
+            dict: numpy arrays of symbol, count, long_volume, short_volume, exposure, margin and profit. profit is NaN when a rate of the symbol is unknown.
+        """
+        length = len(self._ids)
+        codes = self._symbol_codes[:length]
+        sides = self._sides[:length]
+        volumes = self.__column("volume")
+        size = len(self._symbols)
+        is_long = sides == POSITION_SIDE.long.value
+        totals = {
+            "count": numpy.bincount(codes, minlength=size),
+            "long_volume": numpy.bincount(codes, weights=numpy.where(is_long, volumes, 0.0), minlength=size),
+            "short_volume": numpy.bincount(codes, weights=numpy.where(is_long, 0.0, volumes), minlength=size),
+            "exposure": numpy.bincount(codes, weights=self.__column("trade_unit") * volumes * sides, minlength=size),
+            "margin": numpy.bincount(
+                codes, weights=numpy.nan_to_num(self.__column("trade_unit") * volumes * self.__column("price") / self.__column("leverage")), minlength=size
+            ),
+            "profit": numpy.bincount(codes, weights=self.get_profit_losses(bid_rates, ask_rates), minlength=size),
+        }
+        used_codes = numpy.unique(codes)
+        values = {"symbol": _to_object_array(self._symbols)[used_codes]}
+        for name, total in totals.items():
+            values[name] = total[used_codes]
+        return values
+
+    def get_portfolio(self, bid_rates, ask_rates) -> tuple:
+        """return states of long and short positions grouped by symbol in the order symbols are added.
+
+        Returns:
+            Tuple[list, list]: lists of (symbol, price, volume, rate, profit, profit_rate) for long and short positions
+        """
+        length = len(self._ids)
+        rates = self.get_current_rates(bid_rates, ask_rates)
+        prices = self.__column("price")
+        volumes = self.__column("volume")
+        sides = self._sides[:length]
+        profits = (rates - prices) * volumes * sides
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            profit_rates = numpy.where(sides == POSITION_SIDE.long.value, rates / prices, prices / rates)
+        states = []
+        for side in (POSITION_SIDE.long.value, POSITION_SIDE.short.value):
+            rows = numpy.flatnonzero(sides == side)
+            rows = rows[numpy.argsort(self._sequences[rows], kind="stable")]
+            codes = self._symbol_codes[rows]
+            # group by symbol in order of the first position of each symbol
+            _, first_positions, inverse = numpy.unique(codes, return_index=True, return_inverse=True)
+            rows = rows[numpy.argsort(first_positions[inverse], kind="stable")]
+            states.append(
+                [
+                    (self._symbols[code], price, volume, rate, profit, profit_rate)
+                    for code, price, volume, rate, profit, profit_rate in zip(
+                        self._symbol_codes[rows].tolist(),
+                        prices[rows].tolist(),
+                        volumes[rows].tolist(),
+                        rates[rows].tolist(),
+                        profits[rows].tolist(),
+                        profit_rates[rows].tolist(),
+                    )
+                ]
+            )
+        return states[0], states[1]
@@ -0,0 +1,145 @@
+import logging
+
+import numpy
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+FIRST = "first"
+MAX = "max"
+MIN = "min"
+LAST = "last"
+SUM = "sum"
+
+_DAY_NS = 24 * 60 * 60 * 10**9
+
+
+def _to_freq_ns(freq: str):
+    """return nanoseconds of a fixed frequency. None is returned for calendar frequencies like week or month."""
+    try:
+        return pd.Timedelta(pd.tseries.frequencies.to_offset(freq)).value
+    except (TypeError, ValueError):
+        return None
+
+
+def _aggregate(values: numpy.ndarray, kinds: list, starts: numpy.ndarray, ends: numpy.ndarray) -> numpy.ndarray:
+    """aggregate rows of each bucket [starts[i], ends[i]) by kind of each column. NaN is skipped as same as groupby."""
+    length = len(values)
+    results = numpy.full((len(starts), values.shape[1]), numpy.nan)
+    if len(starts) == 0:
+        return results
+    positions = numpy.arange(length)
+    for column, kind in enumerate(kinds):
+        column_values = values[:, column]
+        is_nan = numpy.isnan(column_values)
+        if kind == MAX:
+            results[:, column] = numpy.fmax.reduceat(column_values, starts)
+        elif kind == MIN:
+            results[:, column] = numpy.fmin.reduceat(column_values, starts)
+        elif kind == SUM:
+            results[:, column] = numpy.add.reduceat(numpy.where(is_nan, 0.0, column_values), starts)
+        elif kind == LAST:
+            # position of the last valid value until each row
+            last_positions = numpy.maximum.accumulate(numpy.where(is_nan, -1, positions))[ends - 1]
+            is_valid = last_positions >= starts
+            results[is_valid, column] = column_values[last_positions[is_valid]]
+        else:
+            # position of the first valid value from each row
+            first_positions = numpy.minimum.accumulate(numpy.where(is_nan, length, positions)[::-1])[::-1][starts]
+            is_valid = first_positions < ends
+            results[is_valid, column] = column_values[first_positions[is_valid]]
+    return results
+
+
+class RolledOHLC:
+    """OHLC of a source frame rolled to a higher frame.
+
+    Buckets of all source rows are aggregated once with reduceat. When rolled rows before a source position are requested,
+    buckets completed before the position are sliced from the aggregate and only the bucket including the last row is aggregated again.
+    """
+
+    def __init__(self, data: pd.DataFrame, freq: str, aggregations: dict):
+        """
+        Args:
+            data (pd.DataFrame): source data with DatetimeIndex. Columns can be MultiIndex of (symbol, column).
+            freq (str): fixed frequency of pandas like 1h or 1D
+            aggregations (dict): aggregation (first, max, min, last or sum) by column name. Other columns are dropped.
+
+        Raises:
+            ValueError: if the index or freq is not supported
+        """
+        if not isinstance(data.index, pd.DatetimeIndex):
+            raise ValueError("RolledOHLC requires DatetimeIndex")
+        freq_ns = _to_freq_ns(freq)
+        if freq_ns is None:
+            raise ValueError(f"{freq} is not a fixed frequency")
+        if isinstance(data.columns, pd.MultiIndex):
+            # sorted as same as ClientBase.roll_ohlc_data
+            columns = sorted(column for column in data.columns if column[1] in aggregations)
+            kinds = [aggregations[column[1]] for column in columns]
+            self.columns = pd.MultiIndex.from_tuples(columns)
+        else:
+            columns = [column for column in aggregations if column in data.columns]
+            kinds = [aggregations[column] for column in columns]
+            self.columns = pd.Index(columns)
+        self.source = data
+        self.freq = freq
+        self._kinds = kinds
+        self._values = data[columns].to_numpy(dtype=numpy.float64)
+
+        index = data.index
+        self._tz = index.tz
+        wall_times = (index.tz_localize(None) if index.tz is not None else index).as_unit("ns").asi8
+        if len(wall_times) > 1 and numpy.any(wall_times[1:] < wall_times[:-1]):
+            raise ValueError("index should be sorted to roll data")
+        # bins start from midnight of the first day as same as pd.Grouper
+        origin = (wall_times[0] // _DAY_NS) * _DAY_NS if len(wall_times) > 0 else 0
+        keys = (wall_times - origin) // freq_ns
+        self._starts = numpy.flatnonzero(numpy.diff(keys, prepend=keys[0] - 1) != 0) if len(keys) > 0 else numpy.empty(0, dtype=numpy.int64)
+        self._ends = numpy.append(self._starts[1:], len(keys))
+        self._labels = keys[self._starts] * freq_ns + origin
+        self._rolled = _aggregate(self._values, self._kinds, self._starts, self._ends)
+        self._valid_buckets = numpy.flatnonzero(~numpy.isnan(self._rolled).any(axis=1))
+
+    def __len__(self):
+        return len(self._starts)
+
+    def get(self, stop: int, length: int = None, dropna: bool = False) -> pd.DataFrame:
+        """return rolled rows of source rows before stop
+
+        Args:
+            stop (int): source position to stop (exclusive). The bucket including stop - 1 is aggregated with rows until it.
+            length (int, optional): number of rolled rows to return from the last. Defaults to None and all rows are returned.
+            dropna (bool, optional): skip rolled rows which have NaN. Defaults to False.
+
+        Returns:
+            pd.DataFrame: rolled rows indexed by start time of buckets
+        """
+        stop = min(stop, len(self._values))
+        if stop <= 0:
+            return pd.DataFrame(columns=self.columns, dtype=numpy.float64)
+        bucket = numpy.searchsorted(self._starts, stop - 1, side="right") - 1
+        if stop == self._ends[bucket]:
+            last_row = self._rolled[bucket]
+        else:
+            start = self._starts[bucket]
+            last_row = _aggregate(self._values[start:stop], self._kinds, numpy.array([0]), numpy.array([stop - start]))[0]
+        include_last = not (dropna and numpy.isnan(last_row).any())
+        count = None if length is None else length - int(include_last)
+        if dropna:
+            valid_buckets = self._valid_buckets[: numpy.searchsorted(self._valid_buckets, bucket)]
+            buckets = valid_buckets if count is None else valid_buckets[max(len(valid_buckets) - count, 0) :]
+        else:
+            first_bucket = 0 if count is None else max(bucket - count, 0)
+            buckets = numpy.arange(first_bucket, bucket)
+        if count is not None and count <= 0:
+            buckets = buckets[:0]
+        values = self._rolled[buckets]
+        labels = self._labels[buckets]
+        if include_last:
+            values = numpy.vstack([values, last_row])
+            labels = numpy.append(labels, self._labels[bucket])
+        index = pd.DatetimeIndex(labels.view("datetime64[ns]"), name=self.source.index.name)
+        if self._tz is not None:
+            index = index.tz_localize(self._tz)
+        return pd.DataFrame(values, index=index, columns=self.columns)
@@ -8,6 +8,7 @@ import pandas as pd
 
 from . import frames as Frame
 from .client_base import ClientBase
+from .feature_cache import FeatureCache
 from .fprocess import idcprocess
 from .fprocess.fprocess.indicaters import technical
 from .position import POSITION_SIDE
@@ -23,8 +24,19 @@ MACD_SIG_KEY = "MACD_Signal"
 
 class AgentTool:
 
-    def __init__(self, client: ClientBase, max_volume=None, max_length=100):
+    def __init__(self, client: ClientBase, max_volume=None, max_length=100, feature_cache: FeatureCache = None):
+        """
+        Args:
+            client (ClientBase): client to get data and trade
+            max_volume (float, optional): max volume of an order. Defaults to None.
+            max_length (int, optional): max length of indicator values returned by get_XXX. Defaults to 100.
+            feature_cache (FeatureCache, optional): cache of indicator values for the same bars. Use get_shared_cache() to share it between tools.
+              Defaults to None and values are always computed.
+        """
         self.client = client
+        self.feature_cache = feature_cache
+        # separate cached features of clients with the same symbol
+        self._cache_key = getattr(client, "kinds", type(client).__name__)
         self.max_volume = max_volume
         # for simulation, step index is used to simulate time
         self._step_index = self.client._step_index if hasattr(self.client, "_step_index") else 0
@@ -349,6 +361,12 @@ class AgentTool:
         ohlc_df.columns = fixed_columns
         return ohlc_df
 
+    def _get_features(self, symbol: str, frame: str, processes: list, ohlc_df, compute):
+        """compute indicator values of ohlc_df with compute, reusing values cached for the same symbol, frame, processes and rows"""
+        if self.feature_cache is None or not isinstance(ohlc_df, pd.DataFrame):
+            return compute(ohlc_df)
+        return self.feature_cache.get((self._cache_key, symbol), frame, processes, ohlc_df, compute)
+
     def get_ohlc(self, symbol: str, length: int, frame: str):
         """
         Args:
@@ -395,6 +413,12 @@ class AgentTool:
                 "CCI": {},
             }
 
+        processes = [self._MACD, self._RSI, self._Bollinger, self._ATR, self._CCI, self._EMA10, self._EMA50, self._EMA200]
+        ohlc_df = self._get_features(symbol, frame, processes, ohlc_df, self.__run_indicators)
+        ohlc_df = ohlc_df.iloc[-length:]  # Get the last 'length' rows
+        return ohlc_df
+
+    def __run_indicators(self, ohlc_df: pd.DataFrame):
         macd_df = self._MACD.run(ohlc_df)
         macd_df = macd_df[[self._MACD.KEY_MACD, self._MACD.KEY_SIGNAL]]
         ohlc_df = pd.concat([ohlc_df, macd_df], axis=1)
@@ -412,8 +436,6 @@ class AgentTool:
             ohlc_df = self._EMA200.run(ohlc_df)
         except Exception as e:
             logger.exception("Error occurred while calculating EMA indicators")
-
-        ohlc_df = ohlc_df.iloc[-length:]  # Get the last 'length' rows
         return ohlc_df
 
     def get_ohlc_with_indicators(self, symbol: str, length: int, frame: str):
@@ -495,8 +517,7 @@ class AgentTool:
 
         query_length = length + long_window + signal_window
         ohlc_df = self.__get_ohlc(symbol, query_length, frame)
-        macd_df = process.run(ohlc_df)
-        macd_df = macd_df[[process.KEY_MACD, process.KEY_SIGNAL]]
+        macd_df = self._get_features(symbol, frame, [process], ohlc_df, lambda df: process.run(df)[[process.KEY_MACD, process.KEY_SIGNAL]])
         macd_df.columns = ["MACD", "SIGNAL"]
         macd_df = macd_df.iloc[-length:]
         macd_df = macd_df.map(lambda x: f"{x:.5f}" if isinstance(x, float) else str(x))
@@ -526,8 +547,7 @@ class AgentTool:
 
         query_length = length + window
         ohlc_df = self.__get_ohlc(symbol, query_length, frame)
-        atr_df = process.run(ohlc_df)
-        atr_df = atr_df[[process.KEY_ATR]]
+        atr_df = self._get_features(symbol, frame, [process], ohlc_df, lambda df: process.run(df)[[process.KEY_ATR]])
         atr_df.columns = ["ATR"]
         atr_df = atr_df.iloc[-length:]
         atr_df = atr_df.map(lambda x: f"{x:.5f}" if isinstance(x, float) else str(x))
@@ -558,10 +578,8 @@ class AgentTool:
 
         query_length = length + window
         ohlc_df = self.__get_ohlc(symbol, query_length, frame)
-        bband_df = process.run(ohlc_df)
-        bband_df = bband_df[
-            [process.KEY_UPPER_VALUE, process.KEY_LOWER_VALUE, process.KEY_WIDTH_VALUE, process.KEY_STD_VALUE]
-        ]
+        bband_columns = [process.KEY_UPPER_VALUE, process.KEY_LOWER_VALUE, process.KEY_WIDTH_VALUE, process.KEY_STD_VALUE]
+        bband_df = self._get_features(symbol, frame, [process], ohlc_df, lambda df: process.run(df)[bband_columns])
         bband_df.columns = ["UpperBand", "LowerBand", "Width", "StdDev"]
         bband_df = bband_df.iloc[-length:]
         bband_df = bband_df.map(lambda x: f"{x:.5f}" if isinstance(x, float) else str(x))
@@ -591,8 +609,7 @@ class AgentTool:
 
         query_length = length + window
         ohlc_df = self.__get_ohlc(symbol, query_length, frame)
-        rsi_df = process.run(ohlc_df)
-        rsi_df = rsi_df[[process.KEY_RSI, process.KEY_GAIN, process.KEY_LOSS]]
+        rsi_df = self._get_features(symbol, frame, [process], ohlc_df, lambda df: process.run(df)[[process.KEY_RSI, process.KEY_GAIN, process.KEY_LOSS]])
         rsi_df.columns = ["RSI", "Gain", "Loss"]
         rsi_df = rsi_df.iloc[-length:]
         rsi_df = rsi_df.map(lambda x: f"{x:.5f}" if isinstance(x, float) else str(x))
@@ -622,8 +639,7 @@ class AgentTool:
 
         query_length = length + window
         ohlc_df = self.__get_ohlc(symbol, query_length, frame)
-        ma_df = process.run(ohlc_df)
-        ma_df = ma_df[[process.KEY_EMA]]
+        ma_df = self._get_features(symbol, frame, [process], ohlc_df, lambda df: process.run(df)[[process.KEY_EMA]])
         ma_df.columns = ["MA"]
         ma_df = ma_df.iloc[-length:]
         ma_df = ma_df.map(lambda x: f"{x:.5f}" if isinstance(x, float) else str(x))
@@ -653,8 +669,7 @@ class AgentTool:
 
         query_length = length + window
         ohlc_df = self.__get_ohlc(symbol, query_length, frame)
-        ema_df = process.run(ohlc_df)
-        ema_df = ema_df[[process.key]]
+        ema_df = self._get_features(symbol, frame, [process], ohlc_df, lambda df: process.run(df)[[process.key]])
         ema_df.columns = ["EMA"]
         ema_df = ema_df.iloc[-length:]
         ema_df = ema_df.map(lambda x: f"{x:.5f}" if isinstance(x, float) else str(x))
@@ -684,8 +699,7 @@ class AgentTool:
 
         query_length = length + window
         ohlc_df = self.__get_ohlc(symbol, query_length, frame)
-        cci_df = process.run(ohlc_df)
-        cci_df = cci_df[[process.KEY_CCI]]
+        cci_df = self._get_features(symbol, frame, [process], ohlc_df, lambda df: process.run(df)[[process.KEY_CCI]])
         cci_df.columns = ["CCI"]
         cci_df = cci_df.iloc[-length:]
         cci_df = cci_df.map(lambda x: f"{x:.5f}" if isinstance(x, float) else str(x))
@@ -715,8 +729,7 @@ class AgentTool:
 
         query_length = length + window
         ohlc_df = self.__get_ohlc(symbol, query_length, frame)
-        lrm_df = process.run(ohlc_df)
-        lrm_df = lrm_df[[process.KEY_MOMENTUM]]
+        lrm_df = self._get_features(symbol, frame, [process], ohlc_df, lambda df: process.run(df)[[process.KEY_MOMENTUM]])
         lrm_df.columns = ["LRM"]
         lrm_df = lrm_df.iloc[-length:]
         lrm_df = lrm_df.map(lambda x: f"{x:.5f}" if isinstance(x, float) else str(x))
@@ -746,6 +759,7 @@ class AgentTool:
 
         query_length = length + process.get_minimum_required_length()
         ohlc_df = self.__get_ohlc(symbol, query_length, frame)
+        # bricks depend on all bars from the first one, so they are not extended from cached values
         renko_df = process.run(ohlc_df)
         renko_df = renko_df[[process.KEY_VALUE]]
         renko_df.columns = ["Renko"]
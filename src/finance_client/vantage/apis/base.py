@@ -1,9 +1,9 @@
 import json
 import logging
 import os
-import time
 
 import pandas as pd
+import requests
 
 import finance_client.frames as Frame
 
@@ -58,12 +58,18 @@ class API_BASE:
         exists_in_physical = self.check_physical_currency(currency_code)
         return exists_in_digital or exists_in_physical
 
-    def __init__(self, api_key) -> None:
+    def __init__(self, api_key, transport=None) -> None:
+        """
+        Args:
+            api_key (str): apikey of alpha vantage
+            transport (Any, optional): object which has request(method, url) like requests.Session. Defaults to None and requests is used.
+        """
         self.URL_BASE = "https://www.alphavantage.co/"
         self.api_key = api_key
+        self.transport = requests if transport is None else transport
 
     def response_handler(get_rates_function):
-        def response_wrapper(*args, retry_count=0, **kwargs):
+        def response_wrapper(*args, **kwargs):
             self = args[0]
             response = get_rates_function(*args, **kwargs)
             if response.status_code == 200:
@@ -90,14 +96,10 @@ class API_BASE:
                     logger.error(f"unpext response on {get_rates_function.__name__}")
                     return e
             else:
-                retry_count += 1
-                if retry_count <= 5:
-                    time.sleep(retry_count * 3)
-                    return response_wrapper(*args, retry_count=retry_count, **kwargs)
-                else:
-                    err_txt = f"failed 5 times on {get_rates_function.__name__}: {response.text}"
-                    logger.error(err_txt)
-                    return Exception(err_txt)
+                # retry is handled by callers (e.g. FetchPipeline) within the rate limit
+                err_txt = f"failed with status {response.status_code} on {get_rates_function.__name__}: {response.text}"
+                logger.error(err_txt)
+                raise Exception(err_txt)
 
         return response_wrapper
 
@@ -1,15 +1,13 @@
 import logging
 
-import requests
-
 from .base import API_BASE
 
 logger = logging.getLogger(__name__)
 
 
 class DIGITAL(API_BASE):
-    def __init__(self, api_key) -> None:
-        super().__init__(api_key)
+    def __init__(self, api_key, transport=None) -> None:
+        super().__init__(api_key, transport)
         self.work_day_in_week = 7
 
     @API_BASE.response_handler
@@ -19,7 +17,7 @@ class DIGITAL(API_BASE):
         if self.check_physical_currency(to_currency) is False:
             raise ValueError(f"{to_currency} is supported")
         url = f"{self.URL_BASE}/query?function=CURRENCY_EXCHANGE_RATE&from_currency={from_currency}&to_currentcy={to_currency}&apikey={self.api_key}"
-        return requests.request("GET", url)
+        return self.transport.request("GET", url)
 
     @API_BASE.response_handler
     def get_interday_rates(self, symbol, market, interval, output_size="full"):
@@ -34,7 +32,7 @@ class DIGITAL(API_BASE):
         if correct is False:
             logger.warning("outsize should be either full or compact")
         url = f"{self.URL_BASE}/query?function=CRYPTO_INTRADAY&symbol={symbol}&market={market}&interval={interval}&outputsize={size}&apikey={self.api_key}"
-        return requests.request("GET", url)
+        return self.transport.request("GET", url)
 
     @API_BASE.response_handler
     def get_daily_rates(self, symbol, market, output_size="full"):
@@ -47,7 +45,7 @@ class DIGITAL(API_BASE):
             logger.warning("outsize should be either full or compact")
 
         url = f"{self.URL_BASE}/query?function=DIGITAL_CURRENCY_DAILY&symbol={symbol}&market={market}&outputsize={size}&apikey={self.api_key}"
-        return requests.request("GET", url)
+        return self.transport.request("GET", url)
 
     @API_BASE.response_handler
     def get_weekly_rates(self, symbol, market):
@@ -57,7 +55,7 @@ class DIGITAL(API_BASE):
             raise ValueError(f"{market} is supported")
 
         url = f"{self.URL_BASE}/query?function=DIGITAL_CURRENCY_WEEKLY&symbol={symbol}&market={market}&apikey={self.api_key}"
-        return requests.request("GET", url)
+        return self.transport.request("GET", url)
 
     @API_BASE.response_handler
     def get_monthly_rates(self, symbol, market):
@@ -67,4 +65,4 @@ class DIGITAL(API_BASE):
             raise ValueError(f"{market} is supported")
 
         url = f"{self.URL_BASE}/query?function=DIGITAL_CURRENCY_MONTHLY&symbol={symbol}&market={market}&apikey={self.api_key}"
-        return requests.request("GET", url)
+        return self.transport.request("GET", url)
@@ -1,15 +1,13 @@
 import logging
 
-import requests
-
 from .base import API_BASE
 
 logger = logging.getLogger(__name__)
 
 
 class FOREX(API_BASE):
-    def __init__(self, api_key) -> None:
-        super().__init__(api_key)
+    def __init__(self, api_key, transport=None) -> None:
+        super().__init__(api_key, transport)
 
     @API_BASE.response_handler
     def get_exchange_rates(self, from_currency, to_currency, retry_ount=0):
@@ -18,7 +16,7 @@ class FOREX(API_BASE):
         if self.check_physical_currency(to_currency) is False:
             raise ValueError(f"{to_currency} is supported")
         url = f"{self.URL_BASE}/query?function=CURRENCY_EXCHANGE_RATE&from_currency={from_currency}&to_currentcy={to_currency}&apikey={self.api_key}"
-        return requests.request("GET", url)
+        return self.transport.request("GET", url)
 
     @API_BASE.response_handler
     def get_interday_rates(self, from_symbol, to_symbol, interval, output_size="full"):
@@ -33,7 +31,7 @@ class FOREX(API_BASE):
         if correct is False:
             logger.warning("outsize should be either full or compact")
         url = f"{self.URL_BASE}/query?function=FX_INTRADAY&from_symbol={from_symbol}&to_symbol={to_symbol}&interval={interval}&outputsize={size}&apikey={self.api_key}"
-        return requests.request("GET", url)
+        return self.transport.request("GET", url)
 
     @API_BASE.response_handler
     def get_daily_rates(self, from_symbol, to_symbol, output_size="full"):
@@ -46,7 +44,7 @@ class FOREX(API_BASE):
             logger.warning("outsize should be either full or compact")
 
         url = f"{self.URL_BASE}/query?function=FX_DAILY&from_symbol={from_symbol}&to_symbol={to_symbol}&outputsize={size}&apikey={self.api_key}"
-        return requests.request("GET", url)
+        return self.transport.request("GET", url)
 
     @API_BASE.response_handler
     def get_weekly_rates(self, from_symbol, to_symbol):
@@ -56,7 +54,7 @@ class FOREX(API_BASE):
             raise ValueError(f"{to_symbol} is supported")
 
         url = f"{self.URL_BASE}/query?function=FX_WEEKLY&from_symbol={from_symbol}&to_symbol={to_symbol}&apikey={self.api_key}"
-        return requests.request("GET", url)
+        return self.transport.request("GET", url)
 
     @API_BASE.response_handler
     def get_monthly_rates(self, from_symbol, to_symbol):
@@ -66,4 +64,4 @@ class FOREX(API_BASE):
             raise ValueError(f"{to_symbol} is supported")
 
         url = f"{self.URL_BASE}/query?function=FX_MONTHLY&from_symbol={from_symbol}&to_symbol={to_symbol}&apikey={self.api_key}"
-        return requests.request("GET", url)
+        return self.transport.request("GET", url)
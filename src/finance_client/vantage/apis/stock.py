@@ -1,22 +1,20 @@
 import logging
 
-import requests
-
 from .base import API_BASE
 
 logger = logging.getLogger(__name__)
 
 
 class STOCK(API_BASE):
-    def __init__(self, api_key) -> None:
-        super().__init__(api_key)
+    def __init__(self, api_key, transport=None) -> None:
+        super().__init__(api_key, transport)
 
     @API_BASE.response_handler
     def get_exchange_rates(self, symbol):
         if self.check_stock_symbol(symbol) is False:
             raise ValueError(f"{symbol} is not supported")
         url = f"{self.URL_BASE}/query?function=GLOBAL_QUOTE&symbol={symbol}&apikey={self.api_key}"
-        return requests.request("GET", url)
+        return self.transport.request("GET", url)
 
     @API_BASE.response_handler
     def get_interday_rates(self, symbol, interval, adjusted=False, output_size="full"):
@@ -29,7 +27,7 @@ class STOCK(API_BASE):
         if correct is False:
             logger.warning("outsize should be either full or compact")
         url = f"{self.URL_BASE}/query?function=TIME_SERIES_INTRADAY&symbol={symbol}&interval={interval}&outputsize={size}&apikey={self.api_key}"
-        return requests.request("GET", url)
+        return self.transport.request("GET", url)
 
     @API_BASE.response_handler
     def get_daily_rates(self, symbol, output_size="full"):
@@ -40,7 +38,7 @@ class STOCK(API_BASE):
             logger.warning("outsize should be either full or compact")
 
         url = f"{self.URL_BASE}/query?function=TIME_SERIES_DAILY&symbol={symbol}&outputsize={size}&apikey={self.api_key}"
-        return requests.request("GET", url)
+        return self.transport.request("GET", url)
 
     @API_BASE.response_handler
     def get_weekly_rates(self, symbol):
@@ -48,7 +46,7 @@ class STOCK(API_BASE):
             raise ValueError(f"{symbol} is not supported")
 
         url = f"{self.URL_BASE}/query?function=TIME_SERIES_WEEKLY&symbol={symbol}&apikey={self.api_key}"
-        return requests.request("GET", url)
+        return self.transport.request("GET", url)
 
     @API_BASE.response_handler
     def get_monthly_rates(self, symbol):
@@ -56,4 +54,4 @@ class STOCK(API_BASE):
             raise ValueError(f"{symbol} is not supported")
 
         url = f"{self.URL_BASE}/query?function=TIME_SERIES_MONTHLY&symbol={symbol}&apikey={self.api_key}"
-        return requests.request("GET", url)
+        return self.transport.request("GET", url)
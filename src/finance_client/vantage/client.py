@@ -8,6 +8,8 @@ from finance_client.risk_manager.risk_options.risk_option import RiskOption
 
 from .. import frames as Frame
 from ..csv.client import CSVClient
+from ..csv.shared_store import SharedOHLCStore
+from ..fetch import FetchPipeline, get_rate_limiter
 from . import target
 
 try:
@@ -53,7 +55,11 @@ class VantageClient(CSVClient):
         user_name=None,
         risk_option: RiskOption = None,
         account_risk_config: AccountRiskConfig = None,
-        symbol_risk_config: str | SymbolRiskConfig = None
+        symbol_risk_config: str | SymbolRiskConfig = None,
+        shared_store: str | SharedOHLCStore = None,
+        transport=None,
+        max_workers: int = 4,
+        requests_per_minute: float = 5,
     ):
         """Get ohlc rate from alpha vantage api. No online download.
 
@@ -70,6 +76,10 @@ class VantageClient(CSVClient):
             risk_option (RiskOption, optional): _description_. Defaults to None.
             account_risk_config (str|AccountRiskConfig, optional): _description_. Defaults to None.
             symbol_risk_config (str|SymbolRiskConfig, optional): _description_. Defaults to None.
+            shared_store (str|SharedOHLCStore, optional): memory mapped store created by to_shared_store. If specified, rates are read from the store and not requested to the api. Defaults to None.
+            transport (Any, optional): object which has request(method, url) like requests.Session. Defaults to None and requests is used.
+            max_workers (int, optional): number of symbols downloaded at the same time. Defaults to 4.
+            requests_per_minute (float, optional): quota of api requests shared by vantage clients in the process. Defaults to 5.
 
         Raises:
             ValueError: other than 1, 5, 15, 30, 60, 60*24, 60*24*7, 60*24*7*30 is specified as frame
@@ -93,17 +103,19 @@ class VantageClient(CSVClient):
         else:
             self.__currency_trade = False
 
-        self.client = finance_target.create_client(api_key, logger)
+        self.client = finance_target.create_client(api_key, transport)
         self.function_name = finance_target.to_function_name(finance_target, frame)
         self.__updated_times = {}
+        self.max_workers = max_workers
+        self._rate_limiter = get_rate_limiter(self.kinds, requests_per_minute / 60, capacity=requests_per_minute)
 
-        self.__get_rates(self._symbols)
+        if shared_store is None:
+            self.__get_rates(self._symbols)
         super().__init__(
             auto_step_index=auto_step_index,
             file_name_generator=self._generate_file_name,
             symbols=self._symbols,
             frame=frame,
-            provider="Vantage",
             out_frame=None,
             columns=self.OHLC_COLUMNS,
             date_column=self.TIME_INDEX_NAME,
@@ -116,7 +128,8 @@ class VantageClient(CSVClient):
             user_name=user_name,
             risk_option=risk_option,
             account_risk_config=account_risk_config,
-            symbol_risk_config=symbol_risk_config
+            symbol_risk_config=symbol_risk_config,
+            shared_store=shared_store,
         )
 
     def __convert_response_to_df(self, data_json: dict):
@@ -242,28 +255,36 @@ class VantageClient(CSVClient):
             new_data_df = pd.concat([existing_rate_df, new_data_df])
             new_data_df = new_data_df[~new_data_df.index.duplicated(keep="first")]
             new_data_df = new_data_df.sort_index()
-        write_df_to_csv(new_data_df, self.kinds, file_name, panda_option={"index_label": self.TIME_INDEX_NAME})
         return new_data_df
 
+    def __save(self, symbol, df: pd.DataFrame):
+        write_df_to_csv(df, self.kinds, self._generate_file_name(symbol), panda_option={"index_label": self.TIME_INDEX_NAME})
+        self.__updated_times[symbol] = datetime.datetime.now()
+
     def __get_rates(self, symbols):
         if len(symbols) > 0:
-            DFS = {}
-            for symbol in symbols:
-                df = self.__download(symbol)
-                DFS[symbol] = df
-                self.__updated_times[symbol] = datetime.datetime.now()
+            # symbols are downloaded and saved in parallel within the api quota
+            pipeline = FetchPipeline(self.__download, self.__save, max_workers=self.max_workers, rate_limiter=self._rate_limiter)
+            result = pipeline.run(symbols)
+            if len(result.errors) > 0:
+                logger.error(f"failed to get rates of {list(result.errors.keys())}")
+            DFS = {symbol: result.results[symbol] for symbol in symbols if symbol in result.results}
+            if len(DFS) == 0:
+                return pd.DataFrame()
             df = pd.concat(DFS.values(), axis=1, keys=DFS.keys())
             return df
         return pd.DataFrame()
 
     def _update_rates(self, symbols=[]):
+        if self._shared_store is not None:
+            return False
         _symbols = set(symbols) & set(self._symbols)
         isUpdated = False
         if len(_symbols) > 0:
             symbols_require_update = []
             for _symbol in _symbols:
                 current_time = datetime.datetime.now()
-                delta = current_time - self.__updated_time[_symbol]
+                delta = current_time - self.__updated_times[_symbol]
                 if delta > self.__frame_delta:
                     symbols_require_update.append(_symbol)
             if len(symbols_require_update) > 0:
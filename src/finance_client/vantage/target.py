@@ -21,13 +21,13 @@ class __Target:
         self.base_name = name
 
     # TODO: reduce if else
-    def create_client(self, api_key):
+    def create_client(self, api_key, transport=None):
         if self.id == 0:
-            return STOCK(api_key)
+            return STOCK(api_key, transport)
         elif self.id == 1:
-            return FOREX(api_key)
+            return FOREX(api_key, transport)
         elif self.id == 2:
-            return DIGITAL(api_key)
+            return DIGITAL(api_key, transport)
         else:
             raise ValueError(f"{self.base_name} is not supported yet.")
 
@@ -1,22 +1,27 @@
 import datetime
 import logging
 import os
-from time import sleep
 
 import pandas as pd
-import yfinance as yf
+
+try:
+    import yfinance as yf
+except ImportError:
+    yf = None
 
 from finance_client.config.model import AccountRiskConfig, SymbolRiskConfig
 from finance_client.risk_manager.risk_options.risk_option import RiskOption
 
 from .. import frames as Frame
 from ..csv.client import CSVClient
+from ..csv.incremental_store import IncrementalCSVStore
+from ..csv.shared_store import SharedOHLCStore
+from ..fetch import FetchPipeline, get_rate_limiter
 
 try:
-    from ..fprocess.fprocess.csvrw import (get_file_path, read_csv,
-                                           write_df_to_csv)
+    from ..fprocess.fprocess.csvrw import get_file_path
 except ImportError:
-    from ..fprocess.csvrw import get_file_path, read_csv, write_df_to_csv
+    from ..fprocess.csvrw import get_file_path
 
 
 logger = logging.getLogger("finance_client.yfinance.client")
@@ -100,7 +105,11 @@ class YahooClient(CSVClient):
         initialize_rate_after_mins: int = 0,
         risk_option: RiskOption = None,
         account_risk_config: AccountRiskConfig = None,
-        symbol_risk_config: str | SymbolRiskConfig = None
+        symbol_risk_config: str | SymbolRiskConfig = None,
+        shared_store: str | SharedOHLCStore = None,
+        downloader=None,
+        max_workers: int = 8,
+        requests_per_second: float = 2.0,
     ):
         """Get ohlc rate from yfinance
         Args:
@@ -115,6 +124,10 @@ class YahooClient(CSVClient):
             risk_option (RiskOption, optional): risk option to manage risk. Defaults to None.
             account_risk_config (str|AccountRiskConfig, optional): account risk config to manage risk. Defaults to None.
             symbol_risk_config (str|SymbolRiskConfig, optional): symbol risk config to manage risk. It can be file path or SymbolRiskConfig object. Defaults to None.
+            shared_store (str|SharedOHLCStore, optional): memory mapped store created by to_shared_store. If specified, rates are read from the store and not downloaded. Defaults to None.
+            downloader (Callable, optional): function called as yfinance.download(symbol, interval=interval, start=start, end=end, ...). Specify it to use other source or to test offline. Defaults to None and yfinance.download is used.
+            max_workers (int, optional): number of symbols downloaded at the same time. Defaults to 8.
+            requests_per_second (float, optional): download requests per second shared by yfinance clients in the process. Defaults to 2.0.
         Raises:
             ValueError: other than 1, 5, 15, 30, 60, 60*24, 60*24*7, 60*24*7*30 is specified as frame
             ValueError: length of symbol(tuple) isn't 2 when target is FX or CRYPT_CURRENCY
@@ -129,6 +142,9 @@ class YahooClient(CSVClient):
         self.VOLUME_COLUMN = ["Volume"]
         self.TIME_INDEX_NAME = "Datetime"
         self.__updated_time = {}
+        self._downloader = downloader
+        self.max_workers = max_workers
+        self._rate_limiter = get_rate_limiter(self.kinds, requests_per_second)
 
         if frame not in self.available_frames:
             raise ValueError(f"{frame} is not supported")
@@ -147,10 +163,11 @@ class YahooClient(CSVClient):
                 raise TypeError("symbol must be str or list.")
             
         # initialize csv data
-        for symbol in self._symbols:
-            if not os.path.exists(self._file_path_generator(symbol)):
-                self.__get_rates([symbol])
-            
+        if shared_store is None:
+            for symbol in self._symbols:
+                if not os.path.exists(self._file_path_generator(symbol)):
+                    self.__get_rates([symbol])
+
         super().__init__(
             auto_step_index=auto_step_index,
             file_name_generator=self._file_path_generator,
@@ -172,8 +189,12 @@ class YahooClient(CSVClient):
             enable_trade_log=enable_trade_log,
             free_margin=free_margin,
             user_name=user_name,
+            shared_store=shared_store,
         )
-        if initialize_rate_after_mins <= 0:
+        if self._shared_store is not None:
+            # shared store is a read-only snapshot
+            pass
+        elif initialize_rate_after_mins <= 0:
             self.__get_rates(self._symbols)
         else:
             # check if data is older than specified minutes
@@ -216,21 +237,25 @@ class YahooClient(CSVClient):
                 print(f"failed tz_convert of index: ({type(df.index)}) by {e}")
         return df
 
-    def __download(self, symbol, interval):
+    def _create_store(self, symbol: str, frame: int = None) -> IncrementalCSVStore:
+        return IncrementalCSVStore(self._file_path_generator(symbol, frame), self.TIME_INDEX_NAME)
+
+    def _download_rates(self, symbol: str, interval: str, **kwargs) -> pd.DataFrame:
+        # pagination windows of all symbols share the rate limit
+        self._rate_limiter.acquire()
+        if self._downloader is not None:
+            return self._downloader(symbol, interval=interval, **kwargs)
+        if yf is None:
+            raise ImportError("yfinance is required to download rates. Please install it or specify downloader.")
+        return yf.download(symbol, interval=interval, **kwargs)
+
+    def __download(self, symbol, interval, frame: int = None):
+        """download rates after the last date of the stored file. Rows of the stored file are not included."""
         existing_last_date = datetime.datetime.min.date()
-        existing_rate_df = read_csv(
-            self.kinds, self._create_filename(symbol), [self.TIME_INDEX_NAME], pandas_option={"index_col": self.TIME_INDEX_NAME}
-        )
-        if existing_rate_df is not None:
-            existing_rate_df.dropna(how="all", inplace=True)
-            if len(existing_rate_df) > 0:
-                if self.frame < Frame.D1:
-                    existing_rate_df = self.__tz_convert(existing_rate_df)
-                existing_rate_df = existing_rate_df.sort_index()
-                # get last date of existing data
-                existing_last_date = existing_rate_df.index[-1].date()
-            else:
-                existing_rate_df = None
+        last_timestamp = self._create_store(symbol, frame).last_timestamp()
+        if last_timestamp is not None:
+            # get last date of existing data
+            existing_last_date = last_timestamp.date()
 
         end = datetime.datetime.now(tz=datetime.timezone.utc).date()
         delta = None
@@ -260,7 +285,7 @@ class YahooClient(CSVClient):
                 kwargs["start"] = start
                 isDataRemaining = False
             print(f"from {start} to {end} of {symbol}")
-        df = yf.download(symbol, interval=interval, **kwargs)
+        df = self._download_rates(symbol, interval, **kwargs)
         if isinstance(df.columns, pd.MultiIndex):
             df = df[symbol]
         ticks_df = df.copy()
@@ -275,8 +300,9 @@ class YahooClient(CSVClient):
                     isDataRemaining = False
 
                 print(f"from {start} to {end} of {symbol}")
-                sleep(1)  # to avoid a load
-                df = yf.download(symbol, interval=interval, group_by="ticker", start=start, end=end, auto_adjust=self.adjust_close, prepost=False, threads=True, proxy=None)
+                df = self._download_rates(
+                    symbol, interval, group_by="ticker", start=start, end=end, auto_adjust=self.adjust_close, prepost=False, threads=True, proxy=None
+                )
                 if isinstance(df.columns, pd.MultiIndex):
                     df = df[symbol]
                 if len(df) != 0:
@@ -287,30 +313,34 @@ class YahooClient(CSVClient):
                 else:
                     isDataRemaining = False
             ticks_df = ticks_df.sort_index()
-        if len(ticks_df) > 0:
-            if existing_rate_df is not None:
-                ticks_df = pd.concat([existing_rate_df, ticks_df])
-                ticks_df = ticks_df[~ticks_df.index.duplicated(keep="first")]
-                ticks_df = ticks_df.sort_index()
         return ticks_df
 
     def __get_rates(self, symbols):
         if len(symbols) > 0:
             interval = self.frame_to_str(self.frame)
-            DFS = {}
-            for symbol in symbols:
-                ticks_df = self.__download(symbol, interval)
-                write_df_to_csv(ticks_df, self.kinds, self._create_filename(symbol), panda_option={"index_label": self.TIME_INDEX_NAME})
-                DFS[symbol] = ticks_df
-                self.__updated_time[symbol] = datetime.datetime.now()
+            # symbols are downloaded and appended to their files in parallel
+            pipeline = FetchPipeline(lambda symbol: self.__download(symbol, interval), self.__save, max_workers=self.max_workers)
+            result = pipeline.run(symbols)
+            if len(result.errors) > 0:
+                logger.error(f"failed to get rates of {list(result.errors.keys())}")
+            DFS = {symbol: result.results[symbol] for symbol in symbols if symbol in result.results}
             if len(DFS) > 1:
                 df = pd.concat(DFS.values(), axis=1, keys=DFS.keys())
+            elif len(DFS) == 1:
+                df = next(iter(DFS.values()))
             else:
-                df = ticks_df
+                df = pd.DataFrame()
             return df
         return pd.DataFrame()
 
+    def __save(self, symbol, ticks_df: pd.DataFrame):
+        # only rows after the stored ones are appended to the file
+        self._create_store(symbol).append(ticks_df)
+        self.__updated_time[symbol] = datetime.datetime.now()
+
     def _update_rates(self, symbols=[]):
+        if self._shared_store is not None:
+            return False
         _symbols = set(symbols) & set(self._symbols)
         isUpdated = False
         if len(_symbols) > 0:
@@ -331,8 +361,8 @@ class YahooClient(CSVClient):
         interval = self.frame_to_str(frame)
         for symbol in symbols:
             if symbol not in self._symbols:
-                ticks_df = self.__download(symbol, interval)
-                write_df_to_csv(ticks_df, self.kinds, self._create_filename(symbol, frame), panda_option={"index_label": self.TIME_INDEX_NAME})
+                ticks_df = self.__download(symbol, interval, frame)
+                self._create_store(symbol, frame).append(ticks_df)
                 self.__updated_time[symbol] = datetime.datetime.now()
         return super()._get_ohlc_from_client(length, symbols, frame, columns, index, grouped_by_symbol)
 
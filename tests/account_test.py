@@ -1,5 +1,6 @@
 import datetime
 import os
+import sqlite3
 import unittest
 
 import pandas as pd
@@ -553,6 +554,37 @@ class ManagerTest(unittest.TestCase):
         ) * position2.trade_unit * position2.leverage * position2.volume
         self.assertEqual(total_risk_volume, expected_risk_volume)
 
+    def test_aggregates_follow_position_changes(self):
+        manager = _make_manager(10000)
+        position1 = manager.open_position(POSITION_SIDE.long, "USDJPY", price=100, volume=2)
+        position2 = manager.open_position(POSITION_SIDE.short, "USDJPY", price=200, volume=1, sl=220)
+        position3 = manager.open_position(POSITION_SIDE.long, "EURUSD", price=150, volume=1)
+        manager.update_position(position1, sl=90)
+        manager.close_position(position1.id, price=110, volume=1)
+        manager.close_position(position3.id, price=140)
+
+        self.assertEqual(manager.get_used_margin(), 100 * 1 + 200 * 1)
+        self.assertEqual(manager.get_open_positions_risk_loss(), (100 - 90) * 1 + (220 - 200) * 1)
+        self.assertEqual(manager.get_symbol_exposure("USDJPY"), 0.0)
+        self.assertEqual(manager.get_symbol_exposure("EURUSD"), 0.0)
+        self.assertTrue(manager.check_aggregates())
+
+        manager.close_position(position2.id, price=190)
+        self.assertEqual(manager.get_symbol_exposure("USDJPY"), 1.0)
+        self.assertEqual(manager.get_balance(), manager.get_free_margin() + 100)
+
+    def test_check_aggregates_with_external_change(self):
+        manager = _make_manager(10000)
+        manager.open_position(POSITION_SIDE.long, "USDJPY", price=100, volume=1)
+        self.assertTrue(manager.check_aggregates())
+        # positions changed without the manager (e.g. synced with a broker)
+        manager.storage.store_position(Position(POSITION_SIDE.short, "USDJPY", 1, 1.0, 200.0, 2.0, None, 210.0))
+        self.assertFalse(manager.check_aggregates())
+        self.assertEqual(manager.get_used_margin(), 100 + 400)
+        self.assertEqual(manager.get_open_positions_risk_loss(), 20)
+        self.assertEqual(manager.get_symbol_exposure(), {"USDJPY": -1.0})
+        self.assertTrue(manager.check_aggregates())
+
     def test_get_max_total_loss_risk_with_no_open_positions_or_daily_loss(self):
         config = AccountRiskConfig(
             base_currency="JPY",
@@ -657,6 +689,38 @@ class ManagerTest(unittest.TestCase):
         ) * position2.trade_unit * position2.leverage * position2.volume
         self.assertEqual(total_risk_volume, expected_risk_volume)
 
+    def test_transaction_commits_position_and_log_together(self):
+        position_storage = db.PositionSQLiteStorage(_TEST_DB, "test_default", username="test_default")
+        log_storage = db.LogSQLiteStorage(_TEST_DB, "test_default", username="test_default")
+        manager = _make_manager(100000, position_storage=position_storage, log_storage=log_storage)
+
+        position = manager.open_position(POSITION_SIDE.long, "USDJPY", 150.0, 1.0)
+        self.assertIsNotNone(position_storage.get_position(position.id))
+        self.assertEqual(len(log_storage.get_logs("test_default", "test_default")), 1)
+
+        with self.assertRaises(RuntimeError):
+            with manager.transaction():
+                position_storage.store_position(Position(POSITION_SIDE.long, "EURUSD", 1, 1.0, 160.0, 1.0, None, None))
+                log_storage.store_log(position, order_type=0)
+                raise RuntimeError("failed after writes")
+        long_positions, _ = position_storage.get_positions()
+        self.assertEqual(len(long_positions), 1)
+        self.assertEqual(len(log_storage.get_logs("test_default", "test_default")), 1)
+
+        # other connections don't see writes until the scope ends
+        with manager.transaction():
+            manager.close_position(position.id, 151.0)
+            other_conn = sqlite3.connect(_TEST_DB)
+            position_count = other_conn.execute("SELECT COUNT(*) FROM position").fetchone()[0]
+            log_count = other_conn.execute("SELECT COUNT(*) FROM trade").fetchone()[0]
+            other_conn.close()
+        self.assertEqual((position_count, log_count), (1, 1))
+        long_positions, _ = position_storage.get_positions()
+        self.assertEqual(len(long_positions), 0)
+        self.assertEqual(len(log_storage.get_logs("test_default", "test_default")), 2)
+        position_storage.close()
+        log_storage.close()
+
     def tearDown(self):
         # clean up after each test
         if os.path.exists(_TEST_DB):
@@ -1,6 +1,7 @@
 import datetime
 import os
 import sys
+import tempfile
 import unittest
 
 import dotenv
@@ -14,11 +15,12 @@ module_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
 print(module_path)
 sys.path.append(module_path)
 
+import numpy as np
 import pandas as pd
 
 import finance_client.frames as Frame
 from finance_client import db, fprocess
-from finance_client.csv.client import CSVClient
+from finance_client.csv.client import CSVChunkClient, CSVClient
 from finance_client.position import ORDER_TYPE, ClosedResult
 
 file_base = "L:/data/yfinance"
@@ -575,6 +577,121 @@ class TestCCSVClientMultiTrade(unittest.TestCase):
         self.assertIsInstance(results[0], ClosedResult)
         self.assertNotEqual(results[0].entry_price, results[0].price)
 
+
+class TestCSVChunkClientStream(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        index = pd.date_range("2024-01-01", periods=600, freq="5min", tz="UTC")
+        close = 100 + np.random.default_rng(1017).standard_normal(len(index)).cumsum()
+        cls.files = []
+        for symbol, scale in (("USDJPY", 1.0), ("EURUSD", 0.01)):
+            df = pd.DataFrame({"time": index, "open": close * scale, "high": (close + 1) * scale, "low": (close - 1) * scale, "close": close * scale})
+            if symbol == "EURUSD":
+                # missing rows are merged as NaN and filled on ask/bid
+                df = df.drop(index=range(100, 130))
+            file = os.path.join(cls.temp_dir.name, f"mt5_{symbol}_min5.csv")
+            df.to_csv(file, index=False)
+            cls.files.append(file)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def __create_clients(self, **kwargs):
+        client = CSVClient(files=self.files, date_column="time", slip_type="none", file_cache=False, **kwargs)
+        chunk_client = CSVChunkClient(chunksize=64, files=self.files, date_column="time", slip_type="none", file_cache=False, **kwargs)
+        return client, chunk_client
+
+    def test_get_ohlc_same_as_csv_client(self):
+        client, chunk_client = self.__create_clients(start_index=90)
+        for _ in range(100):
+            expected = client.get_ohlc(length=30)
+            rates = chunk_client.get_ohlc(length=30)
+            pd.testing.assert_frame_equal(rates[expected.columns], expected, check_freq=False)
+        # buffer is kept to chunksize
+        self.assertEqual(chunk_client._time_buffer.capacity, 64)
+
+    def test_get_current_values_with_missing_rows(self):
+        client, chunk_client = self.__create_clients(start_index=120, auto_step_index=False)
+        for _ in range(20):
+            for symbol in client.symbols:
+                self.assertEqual(chunk_client.get_current_ask(symbol), client.get_current_ask(symbol))
+                self.assertEqual(chunk_client.get_current_bid(symbol), client.get_current_bid(symbol))
+            expected_tick, _ = client.get_next_tick()
+            tick, _ = chunk_client.get_next_tick()
+            pd.testing.assert_series_equal(tick[expected_tick.index], expected_tick, check_names=False)
+        self.assertIsNone(chunk_client.get_current_ask("UNKNOWN"))
+
+    def test_longer_length_than_buffer(self):
+        chunk_client = CSVChunkClient(chunksize=64, files=self.files, date_column="time", start_index=10, auto_step_index=False, file_cache=False)
+        rates = chunk_client.get_ohlc(length=200)
+        self.assertEqual(len(rates), 200)
+
+    def test_index_before_buffer(self):
+        client, chunk_client = self.__create_clients(start_index=300, auto_step_index=False)
+        expected = client.get_ohlc(length=10)
+        pd.testing.assert_frame_equal(chunk_client.get_ohlc(length=10)[expected.columns], expected, check_freq=False)
+        self.assertGreater(chunk_client._time_buffer.first_position, 20)
+        # rows dropped from the buffer are read again
+        expected = client._get_ohlc_from_client(length=10, index=20)
+        rates = chunk_client._get_ohlc_from_client(length=10, index=20)
+        pd.testing.assert_frame_equal(rates[expected.columns], expected, check_freq=False)
+        expected = client._get_ohlc_from_client(index=20)
+        rates = chunk_client._get_ohlc_from_client(index=20)
+        pd.testing.assert_frame_equal(rates[expected.columns], expected, check_freq=False)
+        # current step is kept
+        self.assertEqual(chunk_client.get_current_index(), 300)
+        expected = client.get_ohlc(length=10)
+        pd.testing.assert_frame_equal(chunk_client.get_ohlc(length=10)[expected.columns], expected, check_freq=False)
+
+    def test_trade_after_chunks(self):
+        client, chunk_client = self.__create_clients(start_index=10, storage="memory")
+        for _ in range(300):
+            expected = client.get_ohlc(length=10)
+            chunk_client.get_ohlc(length=10)
+        self.assertGreater(chunk_client._time_buffer.first_position, 0)
+        self.assertEqual(chunk_client.get_current_datetime(), client.get_current_datetime())
+        symbol = chunk_client.symbols[0]
+        chunk_client.open_trade(True, symbol, volume=1)
+        for _ in range(5):
+            chunk_client.get_ohlc(length=10)
+        results = chunk_client.close_long_positions(symbol)
+        self.assertEqual(len(results), 1)
+        self.assertIsInstance(results[0], ClosedResult)
+
+    def test_batch_after_chunks(self):
+        client, chunk_client = self.__create_clients(start_index=10, observation_length=10)
+        for _ in range(300):
+            chunk_client.get_ohlc(length=10)
+        batch_idx = [0, 5, 250]
+        np.testing.assert_array_equal(chunk_client[batch_idx], client[batch_idx])
+        np.testing.assert_array_equal(chunk_client[3, "close"], client[3, "close"])
+        # current step is kept after rows are read again
+        self.assertEqual(chunk_client.get_current_index(), client.get_current_index() + 300)
+
+    def test_start_date(self):
+        start_date = datetime.datetime(2024, 1, 2, tzinfo=datetime.timezone.utc)
+        client, chunk_client = self.__create_clients(start_date=start_date, auto_step_index=False)
+        self.assertEqual(chunk_client.get_current_index(), client.get_current_index())
+        self.assertEqual(chunk_client.get_ohlc(length=5).index[-1], start_date)
+
+    def test_end_and_reset(self):
+        chunk_client = CSVChunkClient(chunksize=64, files=self.files, date_column="time", start_index=590, file_cache=False)
+        is_end = False
+        for _ in range(20):
+            tick, is_end = chunk_client.get_next_tick()
+            if is_end:
+                break
+        self.assertTrue(is_end)
+        self.assertEqual(len(chunk_client), 600)
+        expected_max = chunk_client.max
+        self.assertTrue(chunk_client.reset())
+        self.assertEqual(chunk_client.get_current_index(), 590)
+        self.assertEqual(len(chunk_client.get_ohlc(length=10)), 10)
+        pd.testing.assert_series_equal(chunk_client.max, expected_max)
+
+
 """
 
 class TestCSVClientMultiChunkWOInit:
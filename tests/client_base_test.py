@@ -15,7 +15,7 @@ except ImportError:
     sys.path.append(module_path)
 
 import finance_client.frames as Frame
-from finance_client import ORDER_TYPE, db
+from finance_client import ORDER_TYPE, POSITION_SIDE, db, fprocess
 from finance_client.client_base import ClientBase
 
 
@@ -476,6 +476,166 @@ class TestBaseClient(unittest.TestCase):
         self.assertIn(("USDAUD", "Open"), ohlc.columns)
         self.assertEqual(len(ohlc), 10)
 
+    def test_get_ohlc_with_indices(self):
+        client = TestClient(do_render=False)
+        indices = [300, 120, 500, 121]
+        length = 20
+        data = client.get_ohlc(symbols=["USDJPY"], index=indices, length=length)
+        self.assertIsInstance(data, np.ndarray)
+        self.assertEqual(data.shape, (len(indices), length, 4))
+        for batch_index, index in enumerate(indices):
+            np.testing.assert_array_equal(data[batch_index], client.data.iloc[index - length : index].values)
+
+    def test_get_ohlc_with_indices_runs_processes_once(self):
+        macd = fprocess.MACDProcess(target_column="Close")
+        client = TestClient(do_render=False, indicater_processes=[macd])
+        run_count = []
+        run_processes = client.run_processes
+
+        def count_run_processes(*args, **kwargs):
+            run_count.append(1)
+            return run_processes(*args, **kwargs)
+
+        client.run_processes = count_run_processes
+        indices = list(range(100, 356))
+        data = client.get_ohlc(symbols=["USDJPY"], index=indices, length=10)
+        self.assertEqual(len(run_count), 1)
+        self.assertEqual(data.shape, (len(indices), 10, 4 + len(macd.columns)))
+        np.testing.assert_array_equal(data[:, :, 3], np.array([client.data["Close"].iloc[index - 10 : index].values for index in indices]))
+
+    def __create_incremental_processes(self):
+        return [
+            fprocess.MACDProcess(target_column="Close"),
+            fprocess.EMAProcess(column="Close"),
+            fprocess.BBANDProcess(target_column="Close"),
+            fprocess.ATRProcess(),
+            fprocess.RSIProcess(ohlc_column_name=("Close", "Open", "High", "Low")),
+        ]
+
+    def test_get_ohlc_processes_returned_frame(self):
+        client = TestClient(do_render=False, indicater_processes=self.__create_incremental_processes())
+        close = 100 + np.random.default_rng(7).standard_normal(len(client.data)).cumsum()
+        client.data = pd.DataFrame({"Open": close + 0.1, "High": close + 1, "Low": close - 1, "Close": close})
+        for _ in range(50):
+            data = client.get_ohlc(symbols=["USDJPY"], length=100)
+            # processes are run on the returned frame by default
+            ohlc_df = data[["Open", "High", "Low", "Close"]]
+            expected = client.run_processes(ohlc_df, [], self.__create_incremental_processes(), [], True)
+            pd.testing.assert_frame_equal(data, expected, check_exact=False, rtol=1e-9)
+
+    def test_get_ohlc_updates_processes_incrementally(self):
+        client = TestClient(do_render=False, indicater_processes=self.__create_incremental_processes())
+        client.incremental_process = True
+        close = 100 + np.random.default_rng(7).standard_normal(len(client.data)).cumsum()
+        client.data = pd.DataFrame({"Open": close + 0.1, "High": close + 1, "Low": close - 1, "Close": close})
+        run_count = []
+        run_processes = client.run_processes
+
+        def count_run_processes(*args, **kwargs):
+            run_count.append(1)
+            return run_processes(*args, **kwargs)
+
+        client.run_processes = count_run_processes
+        start_index = client.step_index
+        for _ in range(50):
+            data = client.get_ohlc(symbols=["USDJPY"], length=100)
+        self.assertEqual(len(run_count), 1)
+
+        # same as running processes on all bars since the first call
+        raw_data = client.data.iloc[start_index - 99 : client.step_index]
+        expected = run_processes(raw_data, [], self.__create_incremental_processes(), [], True).iloc[-100:]
+        pd.testing.assert_frame_equal(data, expected, check_exact=False, rtol=1e-9)
+
+    def test_tp_sl_are_checked_with_bar_of_each_symbol(self):
+        client = TestMultiClient(do_render=False)
+        uj_data = pd.DataFrame({"Open": 195.0, "High": 200.0, "Low": 190.0, "Close": 195.0}, index=range(1000))
+        ua_data = pd.DataFrame({"Open": 1.1, "High": 1.2, "Low": 1.0, "Close": 1.1}, index=range(1000))
+        client.data = pd.concat([uj_data, ua_data], keys=["USDJPY", "USDAUD"], axis=1)
+        uj_position = client.account.open_position(POSITION_SIDE.long, "USDJPY", 180.0, 1.0, tp=198.0)
+        ua_tp_position = client.account.open_position(POSITION_SIDE.long, "USDAUD", 1.1, 1.0, tp=1.5)
+        ua_sl_position = client.account.open_position(POSITION_SIDE.long, "USDAUD", 1.1, 1.0, sl=1.05)
+
+        client.get_ohlc(symbols=["USDJPY", "USDAUD"], length=10)
+        # checked synchronously in get_ohlc
+        remaining_ids = [position.id for position in client.get_positions()]
+        self.assertEqual(remaining_ids, [ua_tp_position.id])
+        self.assertEqual(list(client.account.listening_positions.keys()), [ua_tp_position.id])
+        self.assertIn(uj_position.id, client._ClientBase__closed_position_with_exist)
+        self.assertIn(ua_sl_position.id, client._ClientBase__closed_position_with_exist)
+
+    def test_portfolio_frame(self):
+        client = TestMultiClient(do_render=False)
+        uj_data = pd.DataFrame({"Open": 195.0, "High": 200.0, "Low": 190.0, "Close": 195.0}, index=range(1000))
+        ua_data = pd.DataFrame({"Open": 1.1, "High": 1.2, "Low": 1.0, "Close": 1.1}, index=range(1000))
+        client.data = pd.concat([uj_data, ua_data], keys=["USDJPY", "USDAUD"], axis=1)
+        positions = [
+            client.account.open_position(POSITION_SIDE.long, "USDJPY", 180.0, 1.0),
+            client.account.open_position(POSITION_SIDE.short, "USDAUD", 1.3, 2.0),
+            client.account.open_position(POSITION_SIDE.long, "USDAUD", 1.0, 1.0),
+        ]
+        bid_rates = client.get_current_bid(["USDJPY", "USDAUD"])
+        ask_rates = client.get_current_ask(["USDJPY", "USDAUD"])
+
+        frame = client.get_portfolio_frame()
+        self.assertEqual(frame.index.tolist(), [position.id for position in positions])
+        expected_profits = [
+            bid_rates["USDJPY"] - 180.0,
+            (1.3 - ask_rates["USDAUD"]) * 2.0,
+            bid_rates["USDAUD"] - 1.0,
+        ]
+        np.testing.assert_allclose(frame["profit"].to_numpy(), expected_profits)
+        self.assertAlmostEqual(client.get_profit_loss(), sum(expected_profits))
+
+        symbol_frame = client.get_portfolio_frame(by_symbol=True)
+        self.assertEqual(symbol_frame.loc["USDAUD", "count"], 2)
+        self.assertAlmostEqual(symbol_frame.loc["USDAUD", "profit"], sum(expected_profits[1:]))
+        self.assertAlmostEqual(symbol_frame.loc["USDAUD", "exposure"], -1.0)
+        self.assertAlmostEqual(symbol_frame["margin"].sum(), client.account.get_used_margin())
+
+    def test_metrics(self):
+        client = TestClient(do_render=False, indicater_processes=self.__create_incremental_processes())
+        client.get_ohlc(symbols=["USDJPY"], length=100)
+        self.assertEqual(client.get_metrics(), {})
+
+        client.enable_metrics(capacity=8)
+        for _ in range(10):
+            client.get_ohlc(symbols=["USDJPY"], length=100)
+        suc, position = client.open_trade(is_buy=True, volume=1.0, symbol="USDJPY")
+        client.close_position(position=position)
+        metrics = client.get_metrics()
+        for stage in ["get_ohlc", "fetch", "process"]:
+            self.assertEqual(metrics[stage]["count"], 10)
+        self.assertEqual(metrics["broker"]["count"], 2)
+        self.assertEqual(metrics["storage"]["count"], 2)
+        self.assertGreaterEqual(metrics["get_ohlc"]["wall_total"], metrics["fetch"]["wall_total"])
+        records = client.get_metrics(records=True)
+        # only the latest records are kept
+        self.assertEqual(len(records), 8)
+        self.assertEqual(records["stage"].iloc[-1], "storage")
+
+        client.disable_metrics()
+        self.assertEqual(client.get_metrics(), {})
+
+    def test_multi_get_ohlc_updates_processes_incrementally(self):
+        client = TestMultiClient(do_render=False)
+        client.idc_process = self.__create_incremental_processes()
+        client.incremental_process = True
+        rng = np.random.default_rng(11)
+        frames = {}
+        for symbol in ["USDJPY", "USDAUD"]:
+            close = 100 + rng.standard_normal(len(client.data)).cumsum()
+            frames[symbol] = pd.DataFrame({"Open": close + 0.1, "High": close + 1, "Low": close - 1, "Close": close})
+        client.data = pd.concat(frames.values(), keys=frames.keys(), axis=1)
+        symbols = ["USDJPY", "USDAUD"]
+
+        start_index = client.step_index
+        for _ in range(30):
+            data = client.get_ohlc(symbols=symbols, length=60)
+
+        raw_data = client.data.loc[start_index - 59 : client.step_index, symbols]
+        expected = client.run_processes(raw_data, symbols, self.__create_incremental_processes(), [], True).iloc[-len(data) :]
+        pd.testing.assert_frame_equal(data, expected, check_exact=False, rtol=1e-9)
+
     def tearDown(self):
         # clean up after each test
         base_path = os.path.dirname(os.getcwd())
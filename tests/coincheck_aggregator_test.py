@@ -0,0 +1,141 @@
+import datetime
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+try:
+    import finance_client
+except ImportError:
+    module_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    sys.path.append(module_path)
+
+from finance_client.coincheck.aggregator import TickAggregator
+
+
+def record_ticks(start: datetime.datetime, minutes: int, seed=1017):
+    """create a tick stream like coincheck trades. some frames don't have ticks."""
+    rng = np.random.default_rng(seed)
+    seconds = np.sort(rng.uniform(0, minutes * 60, size=minutes * 20))
+    # no trade for 12 minutes
+    seconds = seconds[(seconds < 600) | (seconds > 1320)]
+    prices = 14000000 + rng.standard_normal(len(seconds)).cumsum() * 1000
+    volumes = rng.uniform(0.001, 0.1, size=len(seconds))
+    return [
+        {"time": start + datetime.timedelta(seconds=float(second)), "symbol": "btc_jpy", "price": float(price), "volume": float(volume), "type": "buy"}
+        for second, price, volume in zip(seconds, prices, volumes)
+    ]
+
+
+def resample_ticks(ticks, frame: int, origin: datetime.datetime):
+    df = pd.DataFrame(ticks).set_index("time")
+    ohlcv = df["price"].resample(f"{frame}min", origin=origin).ohlc()
+    ohlcv["volume"] = df["volume"].resample(f"{frame}min", origin=origin).sum()
+    ohlcv = ohlcv.dropna()
+    ohlcv.index.name = "time"
+    return ohlcv
+
+
+class FakeTradeHistory:
+    """TradeHistory which replays recorded ticks instead of connecting to the websocket"""
+
+    instances = []
+
+    def __init__(self, debug=False):
+        self.on_tick = None
+        FakeTradeHistory.instances.append(self)
+
+    def subscribe(self, on_tick, pair="btc_jpy"):
+        self.on_tick = on_tick
+
+    def replay(self, ticks, chunk_size=7):
+        for index in range(0, len(ticks), chunk_size):
+            self.on_tick(ticks[index : index + chunk_size])
+
+    def close(self):
+        pass
+
+
+class TestTickAggregator(unittest.TestCase):
+    def setUp(self):
+        self.start = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+        self.ticks = record_ticks(self.start, 60)
+        self.expected = resample_ticks(self.ticks, 5, self.start)
+
+    def create_aggregator(self, **kwargs):
+        return TickAggregator(self.start, lambda frame_time: frame_time + datetime.timedelta(minutes=5), **kwargs)
+
+    def test_aggregate(self):
+        aggregator = self.create_aggregator(capacity=2)
+        finished = sum(aggregator.add_ticks(self.ticks[index : index + 5]) for index in range(0, len(self.ticks), 5))
+        self.assertEqual(finished, len(self.expected) - 1)
+        self.assertGreaterEqual(aggregator.capacity, len(aggregator))
+        pd.testing.assert_frame_equal(aggregator.to_frame(include_current=True), self.expected, check_freq=False)
+        pd.testing.assert_frame_equal(aggregator.current(), self.expected.iloc[-1:], check_freq=False)
+        pd.testing.assert_frame_equal(aggregator.to_frame(3), self.expected.iloc[-4:-1], check_freq=False)
+
+    def test_ring_and_new_bars(self):
+        aggregator = self.create_aggregator(capacity=2, max_bars=4)
+        history = self.expected.iloc[:1].copy()
+        history.index = history.index - datetime.timedelta(minutes=5)
+        aggregator.extend(history)
+
+        position = 0
+        collected = []
+        for index in range(0, len(self.ticks), 50):
+            aggregator.add_ticks(self.ticks[index : index + 50])
+            new_bars, position = aggregator.new_bars(position)
+            collected.append(new_bars)
+        self.assertEqual(len(aggregator), 4)
+        self.assertEqual(aggregator.capacity, 4)
+        pd.testing.assert_frame_equal(aggregator.to_frame(), self.expected.iloc[-5:-1], check_freq=False)
+        # each bar is returned once
+        pd.testing.assert_frame_equal(pd.concat(collected), pd.concat([history, self.expected.iloc[:-1]]), check_freq=False)
+
+
+class TestCoinCheckClientTicks(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_path = os.environ.get("data_path")
+        os.environ["data_path"] = self.temp_dir.name
+        FakeTradeHistory.instances.clear()
+
+    def tearDown(self):
+        if self.data_path is None:
+            os.environ.pop("data_path")
+        else:
+            os.environ["data_path"] = self.data_path
+        self.temp_dir.cleanup()
+
+    def test_replay(self):
+        with mock.patch("finance_client.coincheck.client.TradeHistory", FakeTradeHistory):
+            from finance_client.coincheck.client import CoinCheckClient
+
+            client = CoinCheckClient(frame=5, simulation=True, storage="memory")
+        trade_history = FakeTradeHistory.instances[-1]
+        ticks = record_ticks(client.current_frame, 60)
+        expected = resample_ticks(ticks, 5, client.current_frame)
+
+        half = len(ticks) // 2
+        trade_history.replay(ticks[:half])
+        client._get_ohlc_from_client()
+        file_path = client._CoinCheckClient__store.file_path
+        with open(file_path, "rb") as fp:
+            head = fp.read()
+
+        trade_history.replay(ticks[half:])
+        self.assertEqual(len(client), len(expected) - 1)
+        pd.testing.assert_frame_equal(client._get_ohlc_from_client(length=5), expected.iloc[-6:-1], check_freq=False)
+        # persisted rows are appended
+        with open(file_path, "rb") as fp:
+            self.assertTrue(fp.read().startswith(head))
+        stored = pd.read_csv(file_path, index_col="time", parse_dates=["time"])
+        np.testing.assert_allclose(stored.to_numpy(), expected.iloc[:-1].to_numpy())
+
+
+if __name__ == "__main__":
+    unittest.main()
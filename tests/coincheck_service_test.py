@@ -0,0 +1,122 @@
+import asyncio
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import finance_client
+except ImportError:
+    module_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    sys.path.append(module_path)
+
+from finance_client.coincheck import apis
+from finance_client.coincheck.apis.servicebase import ServiceBase
+
+
+class FakeCoinCheckHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        self.server.nonces.append(int(self.headers["ACCESS-NONCE"]))
+        time.sleep(self.server.delay)
+        body = json.dumps({"success": True, "path": self.path, "stop_loss_rate": None}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        if self.server.drop_connections:
+            # close without notifying the client like an idle timeout of the server
+            self.close_connection = True
+
+    def do_POST(self):
+        self.server.posts.append(self.rfile.read(int(self.headers["Content-Length"])))
+        if self.server.drop_posts:
+            # close after the order is received as if the response was lost
+            self.close_connection = True
+            return
+        self.do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestServiceBase(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeCoinCheckHandler)
+        self.server.connections = 0
+        self.server.nonces = []
+        self.server.posts = []
+        self.server.drop_posts = False
+        self.server.delay = 0.0
+        self.server.drop_connections = False
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        port = self.server.server_address[1]
+        self.credentials = {key: os.environ.get(key) for key in [ServiceBase.ACCESS_ID_KEY, ServiceBase.ACCESS_SECRET_KEY]}
+        os.environ.setdefault(ServiceBase.ACCESS_ID_KEY, "id")
+        os.environ.setdefault(ServiceBase.ACCESS_SECRET_KEY, "secret")
+        ServiceBase.configure(connection_factory=lambda host, timeout: http.client.HTTPConnection("127.0.0.1", port, timeout=timeout), timeout=5)
+
+    def tearDown(self):
+        ServiceBase.configure(connection_factory=http.client.HTTPSConnection, timeout=10.0)
+        self.server.shutdown()
+        self.server.server_close()
+        for key, value in self.credentials.items():
+            if value is None:
+                os.environ.pop(key, None)
+
+    def test_keep_alive(self):
+        account = apis.Account()
+        for _ in range(5):
+            response = ServiceBase().parse_str_to_dict(account.balance())
+            # json literals can't be parsed by ast
+            self.assertEqual(response, {"success": True, "path": "/api/accounts/balance", "stop_loss_rate": None})
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(sorted(self.server.nonces), self.server.nonces)
+
+    def test_reconnect(self):
+        self.server.drop_connections = True
+        account = apis.Account()
+        for _ in range(3):
+            self.assertIn("/api/accounts/balance", account.balance())
+        self.assertEqual(self.server.connections, 3)
+        self.assertEqual(len(self.server.nonces), 3)
+
+    def test_post_is_not_sent_again(self):
+        service = ServiceBase()
+        service.request("GET", "/api/accounts/balance")
+        self.server.drop_posts = True
+        with self.assertRaises(http.client.RemoteDisconnected):
+            service.request("POST", "/api/exchange/orders", _body={"pair": "btc_jpy"})
+        # the order received by the server is not sent again with another connection
+        self.assertEqual(len(self.server.posts), 1)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_async(self):
+        self.server.delay = 0.2
+        account = apis.Account()
+
+        async def check():
+            return await asyncio.gather(account.balance_async(), apis.get_pending_orders_async(), account.leverage_balance_async())
+
+        start = time.monotonic()
+        balance, orders, leverage_balance = asyncio.run(check())
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertIn("/api/accounts/balance", balance)
+        self.assertIn("/api/exchange/orders/opens", orders)
+        self.assertIn("/api/accounts/leverage_balance", leverage_balance)
+        self.assertEqual(len(set(self.server.nonces)), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,328 @@
+import os
+import sys
+import tempfile
+import unittest
+import unittest.mock
+
+import numpy as np
+import pandas as pd
+
+try:
+    import finance_client
+except ImportError:
+    module_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    sys.path.append(module_path)
+
+from finance_client import fprocess
+from finance_client.csv import cache as csv_cache
+from finance_client.csv import client as csv_client
+from finance_client.csv.client import CSVClient
+
+datetime_column = "time"
+ohlc_columns = ["open", "high", "low", "close"]
+
+
+def write_ohlc_files(
+    directory: str,
+    periods: int,
+    seed: int,
+    symbols=(("USDJPY", 1.0), ("EURJPY", 1.5)),
+    start="2024-01-01",
+    drop: dict = None,
+    volume: bool = False,
+) -> list:
+    """write 5 minutes ohlc of symbols to mt5 like csv files and return their paths
+
+    Args:
+        directory (str): directory to write files
+        periods (int): number of rows
+        seed (int): seed of random walk of close
+        symbols (tuple, optional): pairs of symbol and scale of prices. Defaults to USDJPY and EURJPY.
+        start (str, optional): time of the first row. Defaults to "2024-01-01".
+        drop (dict, optional): positions of rows dropped from the file of each symbol. Defaults to None.
+        volume (bool, optional): add tick_volume and real_volume columns like mt5. Defaults to False.
+    """
+    index = pd.date_range(start, periods=periods, freq="5min", tz="UTC")
+    close = 100 + np.random.default_rng(seed).standard_normal(len(index)).cumsum()
+    files = []
+    for symbol, scale in symbols:
+        df = pd.DataFrame(
+            {
+                datetime_column: index,
+                "open": close * scale,
+                "high": close * scale + 1,
+                "low": close * scale - 1,
+                "close": close * scale + 0.5,
+            }
+        )
+        if volume:
+            df["tick_volume"] = (np.arange(len(index)) % 7 + 1) * 0.5
+            df["real_volume"] = 0
+        if drop is not None and symbol in drop:
+            df = df.drop(index=drop[symbol])
+        file = os.path.join(directory, f"mt5_{symbol}_min5.csv")
+        df.to_csv(file, index=False)
+        files.append(file)
+    return files
+
+
+class TestCSVClientBatch(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.files = write_ohlc_files(cls.temp_dir.name, periods=500, seed=1017)
+        cls.length = 30
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def _expected(self, client, indices, columns=None):
+        df = client.data
+        if columns is not None:
+            df = df.swaplevel(0, 1, axis=1)[columns]
+        return np.array([df.iloc[index - self.length : index].values for index in indices])
+
+    def test_slice_batch_is_view(self):
+        client = CSVClient(files=self.files[0], observation_length=self.length, date_column=datetime_column, start_index=self.length)
+        batch = client[0:16]
+        self.assertEqual(batch.shape, (16, self.length, len(ohlc_columns)))
+        self.assertFalse(batch.flags.writeable)
+        np.testing.assert_allclose(batch, self._expected(client, client.indices[0:16]))
+
+    def test_list_batch(self):
+        client = CSVClient(files=self.files, observation_length=self.length, date_column=datetime_column, start_index=self.length)
+        batch_idx = [3, 50, 7, 200]
+        batch = client[batch_idx]
+        self.assertEqual(batch.shape, (len(batch_idx), self.length, len(ohlc_columns) * 2))
+        np.testing.assert_allclose(batch, self._expected(client, [client.indices[i] for i in batch_idx]))
+
+    def test_batch_with_columns(self):
+        client = CSVClient(files=self.files, observation_length=self.length, date_column=datetime_column, start_index=self.length)
+        batch = client[10:26, "close"]
+        self.assertEqual(batch.shape, (16, self.length, 2))
+        np.testing.assert_allclose(batch, self._expected(client, client.indices[10:26], "close"))
+
+    def test_copy_batch(self):
+        client = CSVClient(
+            files=self.files[0], observation_length=self.length, date_column=datetime_column, start_index=self.length, copy_batch=True
+        )
+        batch = client[0:16]
+        self.assertTrue(batch.flags.writeable)
+        batch[:] = 0
+        self.assertNotEqual(client.data.iloc[0, 0], 0)
+
+
+class TestCSVClientCurrentPrice(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        # missing ticks should be filled by the previous tick
+        cls.files = write_ohlc_files(cls.temp_dir.name, periods=200, seed=1018, drop={"EURJPY": range(50, 60)})
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def _expected_tick(self, client):
+        return client.data.iloc[: client.get_current_index()].ffill().iloc[-1]
+
+    def test_current_value_with_filled_ticks(self):
+        client = CSVClient(files=self.files, date_column=datetime_column, start_index=58, slip_type="none")
+        usd_symbol, eur_symbol = client._symbols
+        self.assertTrue(client.data[(eur_symbol, "open")].iloc[:58].isna().any())
+        for _ in range(5):
+            tick = self._expected_tick(client)
+            self.assertEqual(client.get_current_ask(eur_symbol), tick[(eur_symbol, "open")])
+            self.assertEqual(client.get_current_bid([usd_symbol]), tick[(usd_symbol, "open")])
+            ask_values = client.get_current_ask([usd_symbol, eur_symbol])
+            self.assertEqual(list(ask_values.index), [usd_symbol, eur_symbol])
+            self.assertEqual(ask_values[eur_symbol], tick[(eur_symbol, "open")])
+            client.get_next_tick()
+        self.assertIsNone(client.get_current_ask("UNKNOWN"))
+
+    def test_current_value_with_pct_slip(self):
+        client = CSVClient(files=self.files[0], date_column=datetime_column, start_index=100, slip_type="pct")
+        symbol = client._symbols[0]
+        tick = self._expected_tick(client)
+        open_value = tick[(symbol, "open")]
+        self.assertAlmostEqual(client.get_current_ask(), open_value + (tick[(symbol, "high")] - open_value) * 0.1)
+        self.assertAlmostEqual(client.get_current_bid(), open_value - (open_value - tick[(symbol, "low")]) * 0.1)
+
+    def test_current_value_after_data_replaced(self):
+        client = CSVClient(files=self.files[0], date_column=datetime_column, start_index=100, slip_type="none")
+        symbol = client._symbols[0]
+        client.get_current_ask()
+        client.data = client.data * 2
+        self.assertEqual(client.get_current_ask(), self._expected_tick(client)[(symbol, "open")])
+
+
+class TestCSVClientRolledRates(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        # EURJPY misses rows for 2.5 hours and both miss rows from 2:00 to 3:35 of the second day
+        gap = range(310, 330)
+        drop = {"USDJPY": gap, "EURJPY": list(range(100, 130)) + list(gap)}
+        cls.files = write_ohlc_files(cls.temp_dir.name, periods=600, seed=1019, start="2024-01-01 00:10", drop=drop, volume=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def _expected(self, client, symbols, index):
+        rolled = client.roll_ohlc_data(client.data[symbols].iloc[:index], 60, grouped_by_symbol=True, Volume="Volume")
+        return rolled.dropna(thresh=len(rolled.columns))
+
+    def test_rolled_rates_match_roll_ohlc_data(self):
+        client = CSVClient(files=self.files, date_column=datetime_column, start_index=150, auto_step_index=True)
+        symbols = client._symbols
+        with unittest.mock.patch("finance_client.csv.client.RolledOHLC", wraps=csv_client.RolledOHLC) as rolled_ohlc:
+            for _ in range(30):
+                index = client.get_current_index()
+                df = client.get_ohlc(length=5, symbols=symbols, frame=60, grouped_by_symbol=True)
+                pd.testing.assert_frame_equal(df, self._expected(client, symbols, index).iloc[-5:], check_freq=False, check_names=False)
+            # rolled data is built once and reused for each step
+            self.assertEqual(rolled_ohlc.call_count, 1)
+        # volume is summed in each bucket
+        self.assertEqual(df.columns.get_level_values(1).unique().tolist(), ["close", "high", "low", "open", "tick_volume"])
+
+    def test_rolled_rates_without_length(self):
+        client = CSVClient(files=self.files, date_column=datetime_column, start_index=500, auto_step_index=False)
+        symbol = client._symbols[0]
+        index = client.get_current_index()
+        df = client.get_ohlc(symbols=symbol, frame=60)
+        expected = self._expected(client, [symbol], index)[symbol]
+        pd.testing.assert_frame_equal(df, expected, check_freq=False, check_names=False)
+        self.assertEqual(df["tick_volume"].sum(), client.data[symbol]["tick_volume"].iloc[:index].sum())
+        # buckets without rows are not returned
+        self.assertFalse(df.isna().any().any())
+        self.assertNotIn(pd.Timestamp("2024-01-02 02:00", tz="UTC"), df.index)
+        self.assertIn(pd.Timestamp("2024-01-02 01:00", tz="UTC"), df.index)
+
+    def test_batch_matches_single_index_when_rolled(self):
+        client = CSVClient(files=self.files, date_column=datetime_column, start_index=150, auto_step_index=False)
+        symbol = client._symbols[1]
+        indices = [200, 340, 345, 590]
+        data = client.get_ohlc(symbols=symbol, index=indices, length=5, frame=60)
+        self.assertEqual(data.shape[:2], (len(indices), 5))
+        for batch_index, index in enumerate(indices):
+            expected = client.get_ohlc(symbols=symbol, index=index, length=5, frame=60)
+            np.testing.assert_array_equal(data[batch_index], expected.values)
+
+    def test_batch_runs_pre_processes_per_window(self):
+        client = CSVClient(files=self.files, date_column=datetime_column, start_index=150, auto_step_index=False)
+        symbol = client._symbols[0]
+        pre_processes = [fprocess.MinMaxPreProcess()]
+        indices = [160, 400]
+        data = client.get_ohlc(symbols=symbol, index=indices, length=20, pre_processes=pre_processes)
+        # statistics are initialized by the first window, not by the span covering all indices
+        single_pre_processes = [fprocess.MinMaxPreProcess()]
+        for batch_index, index in enumerate(indices):
+            expected = client.get_ohlc(symbols=symbol, index=index, length=20, pre_processes=single_pre_processes)
+            np.testing.assert_allclose(data[batch_index], expected.values)
+
+
+class TestCSVFileCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.files = write_ohlc_files(self.temp_dir.name, periods=300, seed=1019, symbols=(("USDJPY", 1.0), ("EURUSD", 1.0)))
+        self.cache_dir = os.path.join(self.temp_dir.name, "cache")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    @unittest.skipUnless(csv_cache.is_available(), "pyarrow is required for file cache")
+    def test_load_from_cache(self):
+        no_cache_client = CSVClient(files=self.files, date_column=datetime_column, file_cache=False)
+        client = CSVClient(files=self.files, date_column=datetime_column, file_cache=True, file_cache_dir=self.cache_dir)
+        self.assertEqual(len(os.listdir(self.cache_dir)), len(self.files))
+
+        with unittest.mock.patch("pandas.read_csv", side_effect=AssertionError("csv should not be parsed")):
+            with unittest.mock.patch.object(CSVClient, "_infer_frame", side_effect=AssertionError("frame should be cached")):
+                cached_client = CSVClient(files=self.files, date_column=datetime_column, file_cache=True, file_cache_dir=self.cache_dir)
+        pd.testing.assert_frame_equal(cached_client.data, no_cache_client.data)
+        pd.testing.assert_frame_equal(client.data, no_cache_client.data)
+        self.assertEqual(cached_client.frame, no_cache_client.frame)
+        self.assertEqual(cached_client._symbols, no_cache_client._symbols)
+
+    @unittest.skipUnless(csv_cache.is_available(), "pyarrow is required for file cache")
+    def test_cache_is_updated_when_file_changed(self):
+        CSVClient(files=self.files[0], date_column=datetime_column, file_cache=True, file_cache_dir=self.cache_dir)
+        df = pd.read_csv(self.files[0])
+        df.iloc[:-10].to_csv(self.files[0], index=False)
+        client = CSVClient(files=self.files[0], date_column=datetime_column, file_cache=True, file_cache_dir=self.cache_dir)
+        self.assertEqual(len(client), len(df) - 10)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+    @unittest.skipUnless(csv_cache.is_available(), "pyarrow is required for file cache")
+    def test_cache_normalized_frame(self):
+        # naive and unsorted times
+        df = pd.read_csv(self.files[0])
+        df[datetime_column] = pd.to_datetime(df[datetime_column]).dt.tz_localize(None)
+        df.sample(frac=1, random_state=1017).to_csv(self.files[0], index=False)
+        no_cache_client = CSVClient(files=self.files[0], date_column=datetime_column, file_cache=False)
+        CSVClient(files=self.files[0], date_column=datetime_column, file_cache=True, file_cache_dir=self.cache_dir)
+
+        cached = pd.read_parquet(os.path.join(self.cache_dir, os.listdir(self.cache_dir)[0]))
+        self.assertTrue(cached.index.is_monotonic_increasing)
+        self.assertEqual(str(cached.index.tz), "UTC")
+        cached_client = CSVClient(files=self.files[0], date_column=datetime_column, file_cache=True, file_cache_dir=self.cache_dir)
+        pd.testing.assert_frame_equal(cached_client.data, no_cache_client.data)
+        self.assertEqual(cached_client.frame, 5)
+
+    def test_no_cache_by_default(self):
+        CSVClient(files=self.files, date_column=datetime_column)
+        self.assertEqual(os.listdir(self.temp_dir.name), [os.path.basename(file) for file in self.files])
+
+    @unittest.skipUnless(csv_cache.is_available(), "pyarrow is required for file cache")
+    def test_cache_with_chunk(self):
+        cache = csv_cache.CSVFrameCache(self.cache_dir)
+        kwargs = {"parse_dates": True, "index_col": datetime_column}
+        expected = pd.read_csv(self.files[0], **kwargs)
+        reader = cache.read_csv(self.files[0], chunksize=100, **kwargs)
+        chunks = [reader.get_chunk() for _ in range(3)]
+        self.assertRaises(StopIteration, reader.get_chunk)
+        self.assertEqual([len(chunk) for chunk in chunks], [100, 100, 100])
+        pd.testing.assert_frame_equal(pd.concat(chunks), expected, check_freq=False)
+        # full read shares the cache entry with chunk read
+        pd.testing.assert_frame_equal(cache.read_csv(self.files[0], **kwargs), expected, check_freq=False)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+
+class TestCSVClientSharedStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.files = write_ohlc_files(self.temp_dir.name, periods=300, seed=1020, symbols=(("USDJPY", 1.0), ("EURUSD", 1.0)))
+        self.store_path = os.path.join(self.temp_dir.name, "store")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_attach_shared_store(self):
+        client = CSVClient(files=self.files, date_column=datetime_column, file_cache=False)
+        store = client.to_shared_store(self.store_path)
+        shared_client = CSVClient(shared_store=self.store_path, start_index=50, slip_type="none")
+        pd.testing.assert_frame_equal(shared_client.data, client.data, check_freq=False)
+        self.assertEqual(shared_client._symbols, client._symbols)
+        self.assertEqual(shared_client.frame, client.frame)
+        self.assertEqual(shared_client.ohlc_columns, client.ohlc_columns)
+        self.assertTrue(np.shares_memory(shared_client.data.to_numpy(), shared_client._shared_store.values))
+        self.assertEqual(len(shared_client), len(store))
+
+        ohlc = shared_client.get_ohlc(length=10)
+        self.assertEqual(len(ohlc), 10)
+        symbol = shared_client._symbols[0]
+        self.assertEqual(shared_client.get_current_ask(symbol), client.data[(symbol, "open")].iloc[shared_client.get_current_index() - 1])
+
+    def test_shared_store_is_read_only(self):
+        client = CSVClient(files=self.files[0], date_column=datetime_column, file_cache=False)
+        client.to_shared_store(self.store_path, dtype=np.float32)
+        shared_client = CSVClient(shared_store=self.store_path)
+        self.assertEqual(shared_client.data.dtypes.iloc[0], np.float32)
+        with self.assertRaises(ValueError):
+            shared_client.data.iloc[0, 0] = 0
+
+
+if __name__ == "__main__":
+    unittest.main()
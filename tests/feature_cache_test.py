@@ -0,0 +1,104 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+
+try:
+    import finance_client
+except ImportError:
+    module_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    sys.path.append(module_path)
+
+from finance_client.feature_cache import FeatureCache
+from finance_client.fprocess import idcprocess
+
+
+def create_ohlc(length=500, seed=20):
+    close = 100 + np.random.default_rng(seed).standard_normal(length).cumsum()
+    index = pd.date_range("2025-01-01", periods=length, freq="1h", tz="UTC")
+    return pd.DataFrame({"open": close + 0.1, "high": close + 1, "low": close - 1, "close": close}, index=index)
+
+
+def recursive_processes():
+    """processes and columns of their values like AgentTool"""
+    ema = idcprocess.EMAProcess(window=200, key="EMA200", column="close")
+    macd = idcprocess.MACDProcess(key="MACD", target_column="close", short_window=12, long_window=26, signal_window=9)
+    rsi = idcprocess.RSIProcess(window=14, key="RSI", ohlc_column_name=("open", "high", "low", "close"))
+    return [(ema, [ema.key]), (macd, [macd.KEY_MACD, macd.KEY_SIGNAL]), (rsi, [rsi.KEY_RSI, rsi.KEY_GAIN, rsi.KEY_LOSS])]
+
+
+class TestFeatureCache(unittest.TestCase):
+    def setUp(self):
+        self.process = idcprocess.MAProcess(window=20, key="MA", column="close")
+        self.computed = []
+
+    def compute(self, df):
+        self.computed.append(len(df))
+        return self.process.run(df)[[self.process.KEY_EMA]]
+
+    def test_hit(self):
+        cache = FeatureCache()
+        data = create_ohlc()
+        result = cache.get("USDJPY", "1h", [self.process], data.iloc[:300], self.compute)
+        pd.testing.assert_frame_equal(result, self.compute(data.iloc[:300]))
+        self.computed.clear()
+
+        # same rows are served from the cache
+        result = cache.get("USDJPY", "1h", [self.process], data.iloc[:300], self.compute)
+        pd.testing.assert_frame_equal(result, self.process.run(data.iloc[:300])[[self.process.KEY_EMA]])
+        self.assertEqual(self.computed, [])
+        # same params with other instance share the cache
+        other_process = idcprocess.MAProcess(window=20, key="MA", column="close")
+        cache.get("USDJPY", "1h", [other_process], data.iloc[:300], self.compute)
+        self.assertEqual(self.computed, [])
+        self.assertEqual(cache.stats()["hits"], 2)
+
+        # other ranges and params are computed
+        result = cache.get("USDJPY", "1h", [self.process], data.iloc[100:250], self.compute)
+        pd.testing.assert_frame_equal(result, self.process.run(data.iloc[100:250])[[self.process.KEY_EMA]])
+        cache.get("USDJPY", "1h", [idcprocess.MAProcess(window=10, key="MA", column="close")], data.iloc[100:250], self.compute)
+        self.assertEqual(self.computed, [150, 150])
+
+    def test_sliding_window_of_recursive_indicators(self):
+        cache = FeatureCache()
+        data = create_ohlc(length=1000)
+        for process, columns in recursive_processes():
+            for start in range(0, 200, 10):
+                window = data.iloc[start : start + 410]
+                # tools of the same step ask the same rows
+                for _ in range(2):
+                    result = cache.get("USDJPY", "1h", [process], window, lambda df: process.run(df)[columns])
+                    expected = process.run(window)[columns]
+                    pd.testing.assert_frame_equal(result, expected)
+        self.assertEqual(cache.stats()["hits"], 3 * 20)
+        self.assertEqual(cache.stats()["misses"], 3 * 20)
+
+    def test_updated_last_bar(self):
+        cache = FeatureCache()
+        data = create_ohlc()
+        cache.get("USDJPY", "1h", [self.process], data.iloc[:300], self.compute)
+        # the last bar was updated after it was cached
+        live_data = data.iloc[:300].copy()
+        live_data.iloc[299, 3] += 5
+        result = cache.get("USDJPY", "1h", [self.process], live_data, self.compute)
+        pd.testing.assert_frame_equal(result, self.process.run(live_data)[[self.process.KEY_EMA]])
+        self.assertEqual(self.computed, [300, 300])
+
+    def test_memory_budget(self):
+        data = create_ohlc()
+        cache = FeatureCache(max_bytes=50000)
+        for symbol in ["USDJPY", "EURUSD", "GBPJPY"]:
+            cache.get(symbol, "1h", [self.process], data, self.compute)
+        self.assertLessEqual(cache.nbytes, 50000)
+        self.assertEqual(len(cache), 1)
+        # least recently used entries are evicted
+        cache.get("GBPJPY", "1h", [self.process], data, self.compute)
+        self.assertEqual(len(self.computed), 3)
+        cache.get("USDJPY", "1h", [self.process], data, self.compute)
+        self.assertEqual(len(self.computed), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,183 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+try:
+    import finance_client
+except ImportError:
+    module_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    sys.path.append(module_path)
+
+import finance_client.frames as Frame
+from finance_client.fetch import FetchPipeline, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, body: dict):
+        self.status_code = status_code
+        self.text = json.dumps(body)
+
+
+class FakeAlphaVantage:
+    """transport which responds FX_DAILY like alpha vantage and records concurrent requests"""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def request(self, method, url):
+        query = {key: values[0] for key, values in parse_qs(urlparse(url).query).items()}
+        with self._lock:
+            self.requests.append(query)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+        index = pd.date_range("2024-01-01", periods=30, freq="1D")
+        seed = sum(ord(c) for c in query["from_symbol"] + query["to_symbol"])
+        close = 100 + np.random.default_rng(seed).standard_normal(len(index)).cumsum()
+        series = {
+            date.strftime("%Y-%m-%d"): {"1. open": f"{value:.4f}", "2. high": f"{value + 1:.4f}", "3. low": f"{value - 1:.4f}", "4. close": f"{value:.4f}"}
+            for date, value in zip(index, close)
+        }
+        body = {"Meta Data": {"1. Information": "Forex Daily Prices", "5. Time Zone": "UTC"}, "Time Series FX (Daily)": series}
+        return FakeResponse(200, body)
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=4, clock=clock, sleep=clock.sleep)
+        # burst up to capacity
+        for _ in range(4):
+            self.assertEqual(bucket.acquire(), 0.0)
+        self.assertAlmostEqual(bucket.acquire(), 0.5)
+        self.assertAlmostEqual(bucket.acquire(), 0.5)
+        clock.now += 10
+        self.assertEqual(bucket.acquire(), 0.0)
+
+    def test_threads(self):
+        bucket = TokenBucket(rate=100, capacity=1)
+        start = time.monotonic()
+        threads = [threading.Thread(target=bucket.acquire) for _ in range(21)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertGreaterEqual(time.monotonic() - start, 0.19)
+
+
+class TestFetchPipeline(unittest.TestCase):
+    def test_retry_and_persist(self):
+        failures = {"A": 2, "B": 10}
+        persisted = {}
+        waits = []
+
+        def fetch(symbol):
+            if failures.get(symbol, 0) > 0:
+                failures[symbol] -= 1
+                raise ConnectionError(f"{symbol} is not available")
+            return symbol.lower()
+
+        pipeline = FetchPipeline(fetch, persisted.__setitem__, max_workers=4, retries=3, backoff=1.0, sleep=waits.append)
+        result = pipeline.run(["A", "B", "C", "A"])
+        self.assertEqual(result.results, {"A": "a", "C": "c"})
+        self.assertEqual(persisted, {"A": "a", "C": "c"})
+        self.assertEqual(result.attempts["A"], 3)
+        self.assertIsInstance(result.errors["B"], ConnectionError)
+        # A waits twice and B waits three times with exponential backoff
+        self.assertEqual(len(waits), 5)
+        self.assertTrue(all(0.5 <= wait <= 4.0 for wait in waits))
+
+    def test_concurrency(self):
+        lock = threading.Lock()
+        state = {"in_flight": 0, "max": 0}
+
+        def fetch(symbol):
+            with lock:
+                state["in_flight"] += 1
+                state["max"] = max(state["max"], state["in_flight"])
+            time.sleep(0.05)
+            with lock:
+                state["in_flight"] -= 1
+            return symbol
+
+        start = time.monotonic()
+        result = FetchPipeline(fetch, max_workers=5).run([f"S{i}" for i in range(20)])
+        self.assertEqual(len(result.results), 20)
+        self.assertEqual(state["max"], 5)
+        self.assertLess(time.monotonic() - start, 0.05 * 20 / 2)
+
+
+class TestVantageClientRefresh(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_path = os.environ.get("data_path")
+        os.environ["data_path"] = self.temp_dir.name
+
+    def tearDown(self):
+        if self.data_path is None:
+            os.environ.pop("data_path")
+        else:
+            os.environ["data_path"] = self.data_path
+        self.temp_dir.cleanup()
+
+    def test_symbols_are_downloaded_in_parallel(self):
+        from finance_client.vantage import target
+        from finance_client.vantage.client import VantageClient
+
+        transport = FakeAlphaVantage()
+        symbols = ["USDJPY", "EURUSD", "GBPJPY", "AUDUSD"]
+        client = VantageClient(
+            "dummy", symbols, frame=Frame.D1, finance_target=target.FX, transport=transport, max_workers=4, requests_per_minute=6000, slip_type="none"
+        )
+        self.assertEqual(len(transport.requests), 4)
+        self.assertGreater(transport.max_in_flight, 1)
+        self.assertEqual({request["from_symbol"] + request["to_symbol"] for request in transport.requests}, set(symbols))
+        for symbol in symbols:
+            self.assertTrue(os.path.exists(client._generate_file_name(symbol)))
+        rates = client.get_ohlc(symbols, length=10, index=20)
+        self.assertEqual(len(rates), 10)
+
+    def test_error_response_is_raised_without_retry(self):
+        from finance_client.vantage.apis.forex import FOREX
+
+        class ErrorTransport:
+            def __init__(self):
+                self.count = 0
+
+            def request(self, method, url):
+                self.count += 1
+                return FakeResponse(503, {"message": "unavailable"})
+
+        transport = ErrorTransport()
+        with self.assertRaises(Exception):
+            FOREX("dummy", transport=transport).get_daily_rates("USD", "JPY")
+        self.assertEqual(transport.count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+LAZY_MODULES = ["matplotlib", "scipy", "yfinance", "websocket", "finance_client.tool", "finance_client.coincheck.client", "finance_client.yfinance.client"]
+
+
+def _run(code: str) -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([src_path, env.get("PYTHONPATH", "")])
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+class TestLazyImport(unittest.TestCase):
+    def test_import_does_not_load_optional_clients(self):
+        loaded = _run(f"import json, sys; import finance_client; print(json.dumps([name for name in {LAZY_MODULES!r} if name in sys.modules]))")
+        self.assertEqual(loaded, [])
+
+    def test_lazy_attributes(self):
+        code = (
+            "import json, sys; import finance_client; from finance_client import YahooClient;"
+            "kinds = sorted(finance_client.available_clients.keys());"
+            "print(json.dumps({'yahoo': 'finance_client.yfinance.client' in sys.modules, 'tool': 'finance_client.tool' in sys.modules,"
+            " 'kinds': len(kinds), 'name': YahooClient.__name__}))"
+        )
+        result = _run(code)
+        self.assertEqual(result, {"yahoo": True, "tool": False, "kinds": 4, "name": "YahooClient"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import datetime
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+try:
+    import finance_client
+except ImportError:
+    module_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    sys.path.append(module_path)
+
+import finance_client.frames as Frame
+from finance_client.csv.incremental_store import IncrementalCSVStore
+
+
+def create_rates(start, periods, freq="1D", tz=None, seed=0):
+    index = pd.date_range(start, periods=periods, freq=freq, tz=tz, name="Date")
+    close = 100 + np.random.default_rng(seed).standard_normal(periods).cumsum()
+    return pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close, "Volume": 100.0}, index=index)
+
+
+class FakeDownloader:
+    """return rates of days until end_date like yfinance.download"""
+
+    def __init__(self, end_date: datetime.date):
+        self.rates = create_rates("2020-01-01", (end_date - datetime.date(2020, 1, 1)).days + 1)
+        self.calls = []
+
+    def __call__(self, symbol, interval, start=None, end=None, **kwargs):
+        self.calls.append((symbol, interval, start, end))
+        rates = self.rates
+        if start is not None:
+            rates = rates[rates.index >= pd.Timestamp(start)]
+        if end is not None:
+            rates = rates[rates.index < pd.Timestamp(end)]
+        return rates.copy()
+
+
+class TestIncrementalCSVStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.temp_dir.name, "rates.csv")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_append(self):
+        rates = create_rates("2024-01-01", 100, freq="5min", tz="UTC")
+        store = IncrementalCSVStore(self.file_path, "Datetime")
+        self.assertIsNone(store.last_timestamp())
+        self.assertEqual(store.append(rates.iloc[:60]), 60)
+        with open(self.file_path, "rb") as fp:
+            head = fp.read()
+
+        # the last row is replaced and older rows are ignored
+        updated = rates.iloc[50:100].copy()
+        updated.iloc[9, 3] = 0.0
+        self.assertEqual(store.append(updated), 41)
+        self.assertEqual(store.last_timestamp(), rates.index[-1])
+        with open(self.file_path, "rb") as fp:
+            content = fp.read()
+        last_line_start = head.rstrip(b"\n").rfind(b"\n") + 1
+        self.assertTrue(content.startswith(head[:last_line_start]))
+
+        df = store.read()
+        self.assertEqual(len(df), 100)
+        self.assertEqual(df["Close"].iloc[59], 0.0)
+        np.testing.assert_allclose(df["Close"].iloc[60:].to_numpy(), rates["Close"].iloc[60:].to_numpy())
+
+    def test_rebuild_index(self):
+        rates = create_rates("2024-01-01", 30)
+        IncrementalCSVStore(self.file_path, "Datetime").append(rates.iloc[:20])
+        # file is changed by others
+        rates.iloc[:25].to_csv(self.file_path, index_label="Datetime")
+        store = IncrementalCSVStore(self.file_path, "Datetime")
+        self.assertEqual(store.last_timestamp(), rates.index[24])
+        store.append(rates)
+        self.assertEqual(len(store.read()), 30)
+
+
+class TestYahooClientRefresh(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_path = os.environ.get("data_path")
+        os.environ["data_path"] = self.temp_dir.name
+
+    def tearDown(self):
+        if self.data_path is None:
+            os.environ.pop("data_path")
+        else:
+            os.environ["data_path"] = self.data_path
+        self.temp_dir.cleanup()
+
+    def test_refresh_appends_new_rows(self):
+        from finance_client.yfinance.client import YahooClient
+
+        today = datetime.datetime.now(tz=datetime.timezone.utc).date()
+        downloader = FakeDownloader(today - datetime.timedelta(days=10))
+        client = YahooClient("TEST", frame=Frame.D1, start_index=100, storage="memory", slip_type="none", downloader=downloader)
+        store = client._create_store("TEST")
+        self.assertEqual(store.last_timestamp(), downloader.rates.index[-1])
+        self.assertEqual(len(client.data), len(downloader.rates))
+        # the second download starts from the last stored date
+        self.assertEqual(downloader.calls[-1][2], downloader.rates.index[-1].date())
+
+        size = os.path.getsize(store.file_path)
+        downloader.rates = create_rates("2020-01-01", len(downloader.rates) + 5)
+        # existing file is refreshed on initialization
+        client = YahooClient("TEST", frame=Frame.D1, start_index=100, storage="memory", slip_type="none", downloader=downloader)
+        self.assertGreater(os.path.getsize(store.file_path), size)
+        self.assertEqual(len(store.read()), len(downloader.rates))
+        self.assertEqual(store.last_timestamp(), downloader.rates.index[-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
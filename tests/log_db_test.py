@@ -1,4 +1,8 @@
+import datetime
 import os
+import shutil
+import tempfile
+import time
 import unittest
 
 import pandas as pd
@@ -244,5 +248,181 @@ class TestDB(unittest.TestCase):
             os.remove(os.path.join(base_dir, "test_logs.db"))
         super().tearDown()
 
+
+class TestSQLiteConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.database_path = os.path.join(self.temp_dir, "pool_test.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def __create_position(self, symbol="USDJPY"):
+        return Position(
+            position_side=POSITION_SIDE.long,
+            symbol=symbol,
+            trade_unit=1,
+            leverage=1.0,
+            price=150.0,
+            volume=1.0,
+            tp=151.0,
+            sl=149.0,
+            time_index=pd.Timestamp("2024-01-03"),
+        )
+
+    def test_wal_mode_and_indexes(self):
+        log_storage = db.LogSQLiteStorage(self.database_path, "Default", "test_user")
+        position_storage = db.PositionSQLiteStorage(self.database_path, "Default", "test_user")
+        self.assertIs(log_storage._pool, position_storage._pool)
+        conn = log_storage._pool.connection
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        # connection is reused in a thread
+        self.assertIs(conn, position_storage._pool.connection)
+        indexes = {record[0] for record in conn.execute("SELECT name FROM sqlite_master WHERE type='index'").fetchall()}
+        self.assertIn("idx_trade_time", indexes)
+        self.assertIn("idx_trade_position", indexes)
+        self.assertIn("idx_profit_julianday", indexes)
+        self.assertIn("idx_position_symbol_side", indexes)
+        log_storage.close()
+        position_storage.close()
+        self.assertNotIn(os.path.abspath(self.database_path), db.SQLiteConnectionPool._pools)
+
+    def test_reopen_removed_database(self):
+        storage = db.LogSQLiteStorage(self.database_path, "Default", "test_user")
+        storage.store_log(self.__create_position(), order_type=1)
+        self.assertEqual(len(storage.get_logs("Default", "test_user")), 1)
+        storage._pool.close()
+        os.remove(self.database_path)
+        for suffix in ("-wal", "-shm"):
+            if os.path.exists(self.database_path + suffix):
+                os.remove(self.database_path + suffix)
+
+        new_storage = db.LogSQLiteStorage(self.database_path, "Default", "test_user")
+        self.assertEqual(len(new_storage.get_logs("Default", "test_user")), 0)
+        new_storage.store_log(self.__create_position(), order_type=1)
+        self.assertEqual(len(storage.get_logs("Default", "test_user")), 1)
+        storage.close()
+        new_storage.close()
+
+
+class TestRealizedPnL(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def __store_profits(self, storage):
+        # closed in UTC+9 and UTC. 2026-01-03T04:00+09:00 is 2026-01-02 in UTC
+        items = [
+            ("2026-01-03T04:00:00+09:00", 100.0),
+            ("2026-01-02T23:00:00+00:00", -30.0),
+            ("2026-01-03T12:00:00+00:00", 50.0),
+            ("2026-01-04T00:00:00+09:00", 7.0),
+        ]
+        for time_index, profit in items:
+            position = Position(POSITION_SIDE.long, "USDJPY", 1, 1.0, 150.0, 1.0, None, None, time_index=pd.Timestamp(time_index))
+            storage.store_profit_logs(position, profit)
+
+    def __assert_realized_pnl(self, storage):
+        jst = datetime.timezone(datetime.timedelta(hours=9))
+        start = pd.Timestamp("2026-01-03", tz=jst)
+        self.assertEqual(storage.get_realized_pnl(start=start, end=start + pd.Timedelta(hours=12)), 100.0 - 30.0)
+        # end is inclusive as same as get_profit_logs
+        self.assertEqual(storage.get_realized_pnl(start=start, end=start + pd.Timedelta(days=1)), 127.0)
+        start = pd.Timestamp("2026-01-03", tz="UTC")
+        self.assertEqual(storage.get_realized_pnl(start=start, end=start + pd.Timedelta(days=1)), 50.0 + 7.0)
+        self.assertEqual(storage.get_realized_pnl(), 127.0)
+        self.assertEqual(storage.get_realized_pnl(provider="other"), 0.0)
+
+    def test_csv_ledger(self):
+        trade_log_path = os.path.join(self.temp_dir, "trade_log.csv")
+        account_history_path = os.path.join(self.temp_dir, "account_history.csv")
+        storage = db.LogCSVStorage("Default", trade_log_path=trade_log_path, account_history_path=account_history_path)
+        self.__store_profits(storage)
+        self.__assert_realized_pnl(storage)
+
+        # ledger is rebuilt from the file, then updated by stored profits
+        storage = db.LogCSVStorage("Default", trade_log_path=trade_log_path, account_history_path=account_history_path)
+        self.__assert_realized_pnl(storage)
+        position = Position(POSITION_SIDE.long, "USDJPY", 1, 1.0, 150.0, 1.0, None, None, time_index=pd.Timestamp("2026-01-01", tz="UTC"))
+        storage.store_profit_logs(position, 3.0)
+        self.assertEqual(storage.get_realized_pnl(), 130.0)
+        self.assertEqual(storage.get_realized_pnl(end=pd.Timestamp("2026-01-01T12:00:00", tz="UTC")), 3.0)
+
+    def test_sqlite_aggregate(self):
+        storage = db.LogSQLiteStorage(os.path.join(self.temp_dir, "logs.db"), "Default")
+        self.__store_profits(storage)
+        self.__assert_realized_pnl(storage)
+        plan = storage._pool.fetch("EXPLAIN QUERY PLAN " + storage._REALIZED_PNL_QUERY, ("Default", "__none__", "2026-01-01", "2026-01-02"))
+        self.assertIn("idx_profit_julianday", str(plan))
+        storage.close()
+
+    def test_ledger_out_of_order(self):
+        ledger = db.ProfitLedger(capacity=1)
+        for day, profit in [(3, 1.0), (1, 2.0), (2, 4.0), (5, 8.0)]:
+            ledger.add(pd.Timestamp(f"2026-01-0{day}", tz="UTC"), profit)
+        self.assertEqual(ledger.sum(start=pd.Timestamp("2026-01-02", tz="UTC"), end=pd.Timestamp("2026-01-03", tz="UTC")), 5.0)
+        daily = ledger.to_daily()
+        self.assertEqual(daily.tolist(), [2.0, 4.0, 1.0, 8.0])
+
+
+class TestBufferedCSVLog(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_writer_batches(self):
+        file_path = os.path.join(self.temp_dir, "rows.csv")
+        writer = db.BufferedCSVWriter.acquire(file_path, batch_size=3, flush_interval=60)
+        self.assertIs(db.BufferedCSVWriter.acquire(file_path), writer)
+        writer.write([{"a": 1, "b": "x"}, {"a": 2, "b": None}])
+        time.sleep(0.1)
+        # rows are kept until batch_size rows are queued
+        self.assertFalse(os.path.exists(file_path))
+        writer.write([{"a": 3, "b": "z"}])
+        writer.flush()
+        self.assertEqual(pd.read_csv(file_path)["a"].tolist(), [1, 2, 3])
+        writer.write([{"a": 4, "b": "w"}])
+        writer.release()
+        self.assertFalse(writer._is_closed)
+        writer.release()
+        # remaining rows are written on close
+        df = pd.read_csv(file_path)
+        self.assertEqual(df["a"].tolist(), [1, 2, 3, 4])
+        self.assertTrue(pd.isna(df["b"].iloc[1]))
+
+    def test_writer_flushes_by_interval(self):
+        file_path = os.path.join(self.temp_dir, "rows.csv")
+        writer = db.BufferedCSVWriter.acquire(file_path, batch_size=100, flush_interval=0.05)
+        writer.write([{"a": 1}])
+        for _ in range(50):
+            if os.path.exists(file_path):
+                break
+            time.sleep(0.02)
+        self.assertEqual(pd.read_csv(file_path)["a"].tolist(), [1])
+        writer.release()
+
+    def test_storage_reads_buffered_logs(self):
+        trade_log_path = os.path.join(self.temp_dir, "trade_log.csv")
+        account_history_path = os.path.join(self.temp_dir, "account_history.csv")
+        storage = db.LogCSVStorage("Default", trade_log_path=trade_log_path, account_history_path=account_history_path, flush_interval=60)
+        for i in range(3):
+            position = Position(POSITION_SIDE.long, "USDJPY", 1, 1.0, 150.0 + i, 1.0, None, None, time_index=pd.Timestamp("2026-01-01") + pd.Timedelta(minutes=i))
+            storage.store_log(position, order_type=1)
+            position.price += 1
+            storage.store_log(position, order_type=-1)
+        self.assertEqual(storage.get_log(storage.provider, storage.username, position.id, order_type=1).iloc[0]["price"], 152.0)
+        self.assertEqual(len(storage.get_logs()), 6)
+        self.assertEqual(storage.get_profit_logs()["profit"].tolist(), [1.0, 1.0, 1.0])
+        storage.close()
+
+        storage = db.LogCSVStorage("Default", trade_log_path=trade_log_path, account_history_path=account_history_path, buffered=False)
+        self.assertEqual(len(storage.get_log(storage.provider, storage.username, position.id)), 1)
+        self.assertEqual(storage.get_realized_pnl(), 3.0)
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,89 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+try:
+    import finance_client
+except ImportError:
+    module_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    sys.path.append(module_path)
+
+from finance_client.client_base import ClientBase
+from finance_client.matching import TriggerBook
+from finance_client.position import ORDER_TYPE, POSITION_SIDE, Order, Position
+
+
+class TestTriggerBook(unittest.TestCase):
+    def test_same_result_as_check_position(self):
+        rng = np.random.default_rng(3)
+        book = TriggerBook()
+        positions = []
+        for _ in range(500):
+            side = POSITION_SIDE.long if rng.random() > 0.5 else POSITION_SIDE.short
+            price = 100 + rng.standard_normal()
+            tp = price + rng.uniform(0.1, 3) * side.value if rng.random() > 0.2 else None
+            sl = price - rng.uniform(0.1, 3) * side.value if rng.random() > 0.2 else None
+            position = Position(side, "USDJPY", 1, 1.0, price, 1.0, tp, sl)
+            positions.append(position)
+            book.add_position(position)
+
+        for _ in range(20):
+            low = 100 + rng.standard_normal() * 2
+            high = low + rng.uniform(0, 3)
+            expected = []
+            for position in positions:
+                closed_price = ClientBase._check_position(None, position, low_price=low, high_price=high)
+                if closed_price is not None:
+                    expected.append((position.id, closed_price))
+            hits, _ = book.match(high, low)
+            self.assertEqual([(position.id, price) for position, price in hits], expected)
+
+    def test_orders(self):
+        book = TriggerBook()
+        long_limit = Order(ORDER_TYPE.limit, POSITION_SIDE.long, "USDJPY", 99.0, 1.0, 1, 1.0, None, None, 0)
+        short_limit = Order(ORDER_TYPE.limit, POSITION_SIDE.short, "USDJPY", 101.0, 1.0, 1, 1.0, None, None, 0)
+        long_stop = Order(ORDER_TYPE.stop, POSITION_SIDE.long, "USDJPY", 102.0, 1.0, 1, 1.0, None, None, 0)
+        short_stop = Order(ORDER_TYPE.stop, POSITION_SIDE.short, "USDJPY", 98.0, 1.0, 1, 1.0, None, None, 0)
+        for order in [long_limit, short_limit, long_stop, short_stop]:
+            book.add_order(order)
+
+        _, orders = book.match(high=100.5, low=99.5)
+        self.assertEqual(orders, [])
+        _, orders = book.match(high=101.0, low=99.0)
+        self.assertEqual(orders, [(long_limit, 99.0), (short_limit, 101.0)])
+        _, orders = book.match(high=102.5, low=97.5)
+        self.assertEqual([order for order, _ in orders], [long_limit, short_limit, long_stop, short_stop])
+        book.remove_order(short_limit.id)
+        _, orders = book.match(high=102.5, low=97.5)
+        self.assertEqual([order for order, _ in orders], [long_limit, long_stop, short_stop])
+        self.assertEqual(book.order_count, 3)
+
+    def test_update_and_remove_position(self):
+        book = TriggerBook()
+        position = Position(POSITION_SIDE.long, "USDJPY", 1, 1.0, 100.0, 1.0, 105.0, None)
+        other = Position(POSITION_SIDE.short, "EURUSD", 1, 1.0, 100.0, 1.0, None, 103.0)
+        book.add_position(position)
+        book.add_position(other)
+        hits, _ = book.match(high=104.0, low=99.0, symbol="USDJPY")
+        self.assertEqual(hits, [])
+
+        position.tp = 103.0
+        book.add_position(position)
+        hits, _ = book.match(high=104.0, low=99.0, symbol="USDJPY")
+        self.assertEqual(hits, [(position, 103.0)])
+        # bar of a symbol doesn't trigger levels of other symbols
+        hits, _ = book.match(high=104.0, low=99.0)
+        self.assertEqual(hits, [(position, 103.0), (other, 103.0)])
+
+        position.tp = None
+        book.add_position(position)
+        self.assertEqual(book.position_count, 1)
+        book.remove_position(other.id)
+        hits, _ = book.match(high=200.0, low=0.0)
+        self.assertEqual(hits, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
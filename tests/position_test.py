@@ -1,14 +1,17 @@
 import json
 import os
+import random
+import shutil
 import sys
+import tempfile
 import time
 import unittest
 
 module_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.append(module_path)
 from finance_client import db
-from finance_client.account import Manager
-from finance_client.position import POSITION_SIDE, ClosedResult, Position
+from finance_client.account import AccountRiskConfig, Manager
+from finance_client.position import POSITION_SIDE, ClosedResult, Position, PositionBook
 
 
 class TestPositionWithFile(unittest.TestCase):
@@ -136,5 +139,177 @@ class TestPositionWithSQLite(unittest.TestCase):
                 self.tearDownClass(retry=retry + 1)
 
 
+class TestPositionWithMemory(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_file_path = os.path.join(self.temp_dir, "positions_test.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def __create_position(self, position_side, symbol):
+        return Position(position_side, symbol, 1, 1.0, 100.0, 1.0, None, None)
+
+    def test_get_positions_by_symbol(self):
+        storage = db.PositionMemoryStorage("memory_test", "memory_test")
+        for symbol in ["USDJPY", "EURUSD", "USDJPY"]:
+            storage.store_position(self.__create_position(POSITION_SIDE.long, symbol))
+        short_position = self.__create_position(POSITION_SIDE.short, "USDJPY")
+        storage.store_position(short_position)
+
+        self.assertEqual(len(storage.get_long_positions(["USDJPY"])), 2)
+        self.assertEqual(len(storage.get_long_positions("EURUSD")), 1)
+        self.assertEqual(len(storage.get_long_positions()), 3)
+        self.assertEqual(storage.get_short_positions(["USDJPY"]), [short_position])
+        self.assertEqual(storage.get_short_positions(["EURUSD"]), [])
+
+        short_position.symbol = "EURUSD"
+        self.assertTrue(storage.update_position(short_position))
+        self.assertEqual(storage.get_short_positions(["USDJPY"]), [])
+        self.assertEqual(storage.get_short_positions(["EURUSD"]), [short_position])
+        suc, position = storage.delete_position(short_position.id)
+        self.assertTrue(suc)
+        self.assertIs(position, short_position)
+        self.assertEqual(storage.get_short_positions(["EURUSD"]), [])
+        self.assertFalse(storage.update_position(short_position))
+
+    def test_flush_to_sqlite(self):
+        backend = db.PositionSQLiteStorage(self.db_file_path, "memory_test", "memory_test")
+        storage = db.PositionMemoryStorage("memory_test", "memory_test", backend=backend, flush_period=0)
+        positions = [self.__create_position(POSITION_SIDE.long, "USDJPY") for _ in range(3)]
+        storage.store_positions(positions)
+        # changes are not written until flush
+        self.assertEqual(len(backend.get_long_positions()), 0)
+        storage.flush()
+        self.assertEqual(len(backend.get_long_positions()), 3)
+
+        storage.delete_position(positions[0].id)
+        positions[1].volume = 0.5
+        storage.update_position(positions[1])
+        storage.close()
+
+        backend = db.PositionSQLiteStorage(self.db_file_path, "memory_test", "memory_test")
+        storage = db.PositionMemoryStorage("memory_test", "memory_test", backend=backend, flush_period=0)
+        long_positions = storage.get_long_positions(["USDJPY"])
+        self.assertEqual(sorted([position.id for position in long_positions]), sorted([positions[1].id, positions[2].id]))
+        self.assertEqual(storage.get_position(positions[1].id).volume, 0.5)
+        storage.close()
+
+    def test_flush_to_file(self):
+        positions_path = os.path.join(self.temp_dir, "positions_test.json")
+        backend = db.PositionFileStorage("memory_test", "memory_test", positions_path=positions_path, save_period=0)
+        storage = db.PositionMemoryStorage("memory_test", "memory_test", backend=backend, flush_period=0)
+        position = self.__create_position(POSITION_SIDE.short, "USDJPY")
+        storage.store_position(position)
+        storage.flush()
+        with open(positions_path, mode="r") as fp:
+            file_positions = json.load(fp)
+        self.assertEqual(len(file_positions["memory_test"][POSITION_SIDE.short.name]), 1)
+        storage.delete_position(position.id)
+        storage.close()
+        with open(positions_path, mode="r") as fp:
+            file_positions = json.load(fp)
+        self.assertEqual(len(file_positions["memory_test"][POSITION_SIDE.short.name]), 0)
+
+
+class TestPositionBook(unittest.TestCase):
+    def __create_positions(self, count, seed=1017):
+        rng = random.Random(seed)
+        positions = []
+        for _ in range(count):
+            side = rng.choice([POSITION_SIDE.long, POSITION_SIDE.short])
+            price = rng.uniform(90, 110)
+            sl = rng.choice([None, price - 5, price + 5])
+            positions.append(Position(side, rng.choice(["USDJPY", "EURJPY", "BTCJPY"]), rng.choice([1, 1000]), rng.choice([1.0, 25.0]), price, rng.uniform(0.1, 2), None, sl))
+        return positions
+
+    def test_slots(self):
+        position = Position(POSITION_SIDE.long, "USDJPY", 1, 1.0, 100.0, 1.0, None, None)
+        self.assertFalse(hasattr(position, "__dict__"))
+        self.assertFalse(hasattr(ClosedResult(), "__dict__"))
+
+    def test_reductions_match_positions(self):
+        positions = self.__create_positions(300)
+        book = PositionBook(capacity=4)
+        for position in positions:
+            book.add(position)
+        # remove some positions and update others
+        for position in positions[::7]:
+            book.remove(position.id)
+        positions = [position for index, position in enumerate(positions) if index % 7 != 0]
+        for position in positions[::5]:
+            position.volume /= 2
+            book.add(position)
+        self.assertEqual(len(book), len(positions))
+        self.assertEqual(set(book.ids), set(position.id for position in positions))
+
+        bid_rates = {"USDJPY": 101.0, "EURJPY": 99.0}
+        ask_rates = {"USDJPY": 101.5, "EURJPY": 99.5, "BTCJPY": 100.0}
+        expected_profit = 0.0
+        expected_margin = 0.0
+        expected_risk = 0.0
+        expected_exposures = {}
+        for position in positions:
+            if position.position_side == POSITION_SIDE.long:
+                if position.symbol in bid_rates:
+                    expected_profit += (bid_rates[position.symbol] - position.price) * position.volume
+            else:
+                expected_profit += (position.price - ask_rates[position.symbol]) * position.volume
+            expected_margin += position.trade_unit * position.volume * position.price / position.leverage
+            if position.sl is not None:
+                expected_risk += position.trade_unit * position.volume * abs(position.price - position.sl)
+            exposure = position.trade_unit * position.volume * position.position_side.value
+            expected_exposures[position.symbol] = expected_exposures.get(position.symbol, 0.0) + exposure
+        self.assertAlmostEqual(book.get_profit_loss(bid_rates, ask_rates), expected_profit)
+        self.assertAlmostEqual(book.get_used_margin(), expected_margin)
+        self.assertAlmostEqual(book.get_open_risk(), expected_risk)
+        self.assertEqual(book.count_without_sl(), len([position for position in positions if position.sl is None]))
+        for symbol, exposure in book.get_symbol_exposures().items():
+            self.assertAlmostEqual(exposure, expected_exposures[symbol])
+
+        long_states, short_states = book.get_portfolio(bid_rates, ask_rates)
+        long_positions = [position for position in positions if position.position_side == POSITION_SIDE.long]
+        symbols = list(dict.fromkeys(position.symbol for position in long_positions))
+        expected = [(position.symbol, position.price) for symbol in symbols for position in long_positions if position.symbol == symbol]
+        self.assertEqual([(state[0], state[1]) for state in long_states], expected)
+        self.assertEqual(len(short_states), len(positions) - len(long_positions))
+
+    def test_manager_keeps_book(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            storage = db.PositionMemoryStorage("test_book")
+            log_storage = db.LogCSVStorage(
+                "test_book", trade_log_path=os.path.join(temp_dir, "trade.csv"), account_history_path=os.path.join(temp_dir, "history.csv"), buffered=False
+            )
+            manager = Manager(
+                account_risk_config=AccountRiskConfig(
+                    base_currency="JPY",
+                    max_single_trade_percent=3.0,
+                    max_total_risk_percent=6.0,
+                    daily_max_loss_percent=None,
+                    allow_aggressive_mode=False,
+                    aggressive_multiplier=None,
+                    enforce_volume_reduction=False,
+                    atr_ratio_min_stop_loss=None,
+                ),
+                free_margin=10**8,
+                position_storage=storage,
+                log_storage=log_storage,
+            )
+            positions = self.__create_positions(20)
+            for position in positions:
+                manager.open_position(
+                    position.position_side, position.symbol, position.price, position.volume, trade_unit=position.trade_unit, leverage=position.leverage, sl=position.sl
+                )
+            long_positions, short_positions = manager.get_positions()
+            for position in (long_positions + short_positions)[:5]:
+                manager.close_position(position.id, price=position.price)
+            self.assertEqual(len(manager.position_book), 15)
+            self.assertAlmostEqual(manager.position_book.get_used_margin(), manager.get_used_margin())
+            self.assertAlmostEqual(manager.position_book.get_open_risk(), manager.get_open_positions_risk_loss())
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,135 @@
+import asyncio
+import datetime
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+import pandas as pd
+
+try:
+    import finance_client
+except ImportError:
+    module_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    sys.path.append(module_path)
+
+import finance_client.frames as Frame
+from finance_client.coincheck.tick_stream import ReplayTickSource, TickStreamHub
+
+FRAMES = [Frame.MIN1, Frame.MIN5, Frame.H1]
+
+
+def create_source(start: datetime.datetime, hours: int = 3, seed=1017, chunk_size=250) -> ReplayTickSource:
+    rng = np.random.default_rng(seed)
+    seconds = np.sort(rng.uniform(0, hours * 3600, size=hours * 3000))
+    # no trade for 20 minutes
+    seconds = seconds[(seconds < 3000) | (seconds > 4200)]
+    times = pd.Timestamp(start) + pd.to_timedelta(seconds, unit="s")
+    prices = 14000000 + rng.standard_normal(len(seconds)).cumsum() * 1000
+    volumes = rng.uniform(0.001, 0.1, size=len(seconds))
+    return ReplayTickSource(times, prices, volumes, chunk_size=chunk_size)
+
+
+def resample(source: ReplayTickSource, frame: int, origin: datetime.datetime) -> pd.DataFrame:
+    index = pd.to_datetime(source.batch.times, utc=True)
+    prices = pd.Series(source.batch.prices, index=index)
+    ohlcv = prices.resample(f"{frame}min", origin=origin).ohlc()
+    ohlcv["volume"] = pd.Series(source.batch.volumes, index=index).resample(f"{frame}min", origin=origin).sum()
+    ohlcv = ohlcv.dropna()
+    ohlcv.index.name = "time"
+    return ohlcv
+
+
+class TestTickStreamHub(unittest.TestCase):
+    def setUp(self):
+        self.start = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+        self.source = create_source(self.start)
+
+    def test_fan_out(self):
+        hub = TickStreamHub(start=self.source.start)
+        received = {frame: [] for frame in FRAMES}
+        for frame in FRAMES:
+            hub.register(frame, on_bar=lambda frame, bars: received[frame].append(bars))
+        hub.attach(self.source)
+        self.assertEqual(self.source.replay(), len(self.source))
+
+        for frame in FRAMES:
+            expected = resample(self.source, frame, self.start)
+            pd.testing.assert_frame_equal(hub.get_ohlc(frame, include_current=True), expected, check_freq=False)
+            # each closed bar is notified once
+            pd.testing.assert_frame_equal(pd.concat(received[frame]), expected.iloc[:-1], check_freq=False)
+
+    def test_dict_ticks(self):
+        times, prices, volumes = self.source.batch
+        ticks = [
+            {"time": pd.Timestamp(time, tz="UTC").to_pydatetime(warn=False), "price": price, "volume": volume}
+            for time, price, volume in zip(times[:2000], prices[:2000], volumes[:2000])
+        ]
+        hub = TickStreamHub(start=self.start)
+        hub.register(Frame.MIN5)
+        for index in range(0, len(ticks), 30):
+            hub.add_ticks(ticks[index : index + 30])
+        # same as ticks aggregated one by one
+        aggregator = TickStreamHub(start=self.start).register(Frame.MIN5)
+        aggregator.add_ticks(ticks)
+        pd.testing.assert_frame_equal(hub.get_ohlc(Frame.MIN5, include_current=True), aggregator.to_frame(include_current=True))
+
+    def test_async_iterator(self):
+        hub = TickStreamHub(start=self.source.start)
+        for frame in FRAMES:
+            hub.register(frame)
+        hub.attach(self.source)
+
+        async def collect():
+            stream = hub.bars([Frame.MIN5, Frame.H1])
+            received = []
+
+            def replay():
+                self.source.replay()
+                stream.close()
+
+            thread = threading.Thread(target=replay)
+            thread.start()
+            async for frame, bars in stream:
+                received.append((frame, len(bars)))
+            thread.join()
+            return received
+
+        received = asyncio.run(collect())
+        self.assertEqual({frame for frame, _ in received}, {Frame.MIN5, Frame.H1})
+        for frame in [Frame.MIN5, Frame.H1]:
+            self.assertEqual(sum(length for bar_frame, length in received if bar_frame == frame), len(resample(self.source, frame, self.start)) - 1)
+
+
+class TestCoinCheckClientHub(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_path = os.environ.get("data_path")
+        os.environ["data_path"] = self.temp_dir.name
+
+    def tearDown(self):
+        if self.data_path is None:
+            os.environ.pop("data_path")
+        else:
+            os.environ["data_path"] = self.data_path
+        self.temp_dir.cleanup()
+
+    def test_clients_share_ticks(self):
+        from finance_client.coincheck.client import CoinCheckClient
+
+        hub = TickStreamHub()
+        clients = {frame: CoinCheckClient(frame=frame, simulation=True, storage="memory", tick_hub=hub) for frame in [Frame.MIN1, Frame.MIN5]}
+        # ticks after bars in progress of both clients
+        source = create_source(max(client.current_frame for client in clients.values()), hours=1)
+        hub.attach(source)
+        source.replay()
+        for frame, client in clients.items():
+            expected = resample(source, frame, client.current_frame)
+            self.assertEqual(len(client), len(expected) - 1)
+            pd.testing.assert_frame_equal(client._get_ohlc_from_client(length=3), expected.iloc[-4:-1], check_freq=False)
+
+
+if __name__ == "__main__":
+    unittest.main()